@@ -1,263 +1,14 @@
 #!/usr/bin/env python3
 """
 Comprehensive Analysis of Multi-Block-Size IO Performance Results
-Analyzes performance across 512B, 4KB, 64KB, and 1MB block sizes
+Analyzes performance across 512B, 4KB, 64KB, and 1MB block sizes (io-analysis blocksize)
 """
-import pandas as pd
-import numpy as np
-import os
-import glob
-from datetime import datetime
+import sys
+from pathlib import Path
 
-def load_latest_results():
-    """Load the most recent test results"""
-    # Find the most recent results directory
-    result_dirs = glob.glob("io_benchmark_results_*")
-    if not result_dirs:
-        print("No results directories found!")
-        return None
-    
-    latest_dir = max(result_dirs)
-    print(f"📁 Loading results from: {latest_dir}")
-    
-    # Load all CSV files
-    results = {}
-    csv_files = glob.glob(f"{latest_dir}/*.csv")
-    
-    for file in csv_files:
-        filename = os.path.basename(file)
-        if filename.endswith('.csv'):
-            try:
-                df = pd.read_csv(file)
-                if not df.empty and 'throughput_mbps' in df.columns:
-                    results[filename] = df
-            except Exception as e:
-                print(f"Warning: Could not load {filename}: {e}")
-    
-    return results
-
-def extract_block_size_and_operation(filename):
-    """Extract block size and operation type from filename"""
-    # Parse filename like: container_sequential_write_1m.csv
-    parts = filename.replace('.csv', '').split('_')
-    
-    # Determine environment
-    env = parts[0]  # container or firecracker
-    
-    # Extract operation and block size based on actual patterns we see
-    if 'mixed_4k' in filename:
-        block_size = '4KB'
-        operation = 'mixed'
-    elif 'random_read_64k' in filename:
-        block_size = '64KB'
-        operation = 'random_read'
-    elif 'sequential_write_1m' in filename:
-        block_size = '1MB'
-        operation = 'sequential_write'
-    elif '512b' in filename:
-        block_size = '512B'
-        operation = '_'.join([p for p in parts[1:] if p != '512b'])
-    elif '4k' in filename and 'mixed' not in filename:
-        block_size = '4KB'
-        operation = '_'.join([p for p in parts[1:] if p != '4k'])
-    elif '64k' in filename and 'read' not in filename:
-        block_size = '64KB'
-        operation = '_'.join([p for p in parts[1:] if p != '64k'])
-    elif '1m' in filename and 'write' not in filename:
-        block_size = '1MB'
-        operation = '_'.join([p for p in parts[1:] if p != '1m'])
-    else:
-        # Fallback parsing
-        block_size = 'Unknown'
-        operation = '_'.join(parts[1:])
-    
-    return env, operation, block_size
-
-def analyze_block_size_performance(results):
-    """Analyze performance across different block sizes"""
-    print("\n🔬 COMPREHENSIVE MULTI-BLOCK-SIZE IO PERFORMANCE ANALYSIS")
-    print("=" * 80)
-    
-    # Organize results by block size and operation
-    performance_data = {}
-    
-    for filename, df in results.items():
-        env, operation, block_size = extract_block_size_and_operation(filename)
-        
-        if df.empty or 'throughput_mbps' not in df.columns:
-            continue
-            
-        # Calculate averages
-        avg_throughput = df['throughput_mbps'].mean()
-        avg_latency = df['latency_us'].mean() if 'latency_us' in df.columns else 0
-        avg_cpu = df['cpu_usage'].mean() if 'cpu_usage' in df.columns else 0
-        
-        key = f"{operation}_{block_size}"
-        if key not in performance_data:
-            performance_data[key] = {}
-        
-        performance_data[key][env] = {
-            'throughput': avg_throughput,
-            'latency': avg_latency,
-            'cpu': avg_cpu,
-            'samples': len(df)
-        }
-    
-    # Display results organized by block size
-    block_sizes = ['512B', '4KB', '64KB', '1MB']
-    operations = ['sequential_write', 'random_read', 'mixed']
-    
-    print(f"\n📊 PERFORMANCE SUMMARY BY BLOCK SIZE")
-    print("-" * 80)
-    
-    # First, let's debug what we actually have
-    print(f"\n🔍 DEBUG: Found performance data for:")
-    for key, data in performance_data.items():
-        print(f"   {key}: {list(data.keys())}")
-    print()
-    
-    for block_size in block_sizes:
-        has_data = False
-        print(f"\n🔹 {block_size} Block Size Performance:")
-        print("   Operation          | Container (MB/s) | Firecracker (MB/s) | Speedup")
-        print("   " + "-" * 65)
-        
-        for operation in operations:
-            key = f"{operation}_{block_size}"
-            if key in performance_data:
-                data = performance_data[key]
-                container_perf = data.get('container', {}).get('throughput', 0)
-                firecracker_perf = data.get('firecracker', {}).get('throughput', 0)
-                
-                if container_perf > 0 and firecracker_perf > 0:
-                    has_data = True
-                    speedup = firecracker_perf / container_perf
-                    speedup_str = f"{speedup:.1f}x" if speedup > 1 else f"{1/speedup:.1f}x slower"
-                    
-                    print(f"   {operation:18} | {container_perf:12.0f}   | {firecracker_perf:13.0f}     | {speedup_str}")
-                elif container_perf > 0 or firecracker_perf > 0:
-                    has_data = True
-                    print(f"   {operation:18} | {container_perf:12.0f}   | {firecracker_perf:13.0f}     | incomplete")
-        
-        if not has_data:
-            print("   No data available for this block size")
-    
-    # Cross-block-size comparison
-    print(f"\n📈 CROSS-BLOCK-SIZE PERFORMANCE TRENDS")
-    print("-" * 80)
-    
-    # For each environment, show how performance scales with block size
-    for env in ['container', 'firecracker']:
-        print(f"\n🔹 {env.title()} Performance Scaling:")
-        print("   Block Size | Sequential Write | Random Read | Mixed Workload")
-        print("   " + "-" * 55)
-        
-        for block_size in block_sizes:
-            seq_write = performance_data.get(f"sequential_write_{block_size}", {}).get(env, {}).get('throughput', 0)
-            random_read = performance_data.get(f"random_read_{block_size}", {}).get(env, {}).get('throughput', 0)
-            mixed = performance_data.get(f"mixed_{block_size}", {}).get(env, {}).get('throughput', 0)
-            
-            print(f"   {block_size:10} | {seq_write:12.0f} MB/s | {random_read:9.0f} MB/s | {mixed:10.1f} MB/s")
-    
-    # Performance efficiency analysis
-    print(f"\n⚡ PERFORMANCE EFFICIENCY ANALYSIS")
-    print("-" * 80)
-    
-    print(f"\n🔹 Firecracker vs Container Advantage by Block Size:")
-    print("   Block Size | Seq Write Advantage | Random Read Advantage | Mixed Advantage")
-    print("   " + "-" * 70)
-    
-    for block_size in block_sizes:
-        advantages = []
-        for operation in ['sequential_write', 'random_read', 'mixed']:
-            key = f"{operation}_{block_size}"
-            if key in performance_data:
-                data = performance_data[key]
-                container_perf = data.get('container', {}).get('throughput', 0)
-                firecracker_perf = data.get('firecracker', {}).get('throughput', 0)
-                
-                if container_perf > 0 and firecracker_perf > 0:
-                    advantage = ((firecracker_perf - container_perf) / container_perf) * 100
-                    advantages.append(f"{advantage:+.0f}%")
-                else:
-                    advantages.append("N/A")
-        
-        if len(advantages) >= 3:
-            print(f"   {block_size:10} | {advantages[0]:15} | {advantages[1]:17} | {advantages[2]:11}")
-    
-    # Latency analysis
-    print(f"\n⏱️  LATENCY ANALYSIS")
-    print("-" * 80)
-    
-    print(f"\n🔹 Average Latency by Block Size (microseconds):")
-    print("   Block Size | Container Latency | Firecracker Latency | Improvement")
-    print("   " + "-" * 65)
-    
-    for block_size in block_sizes:
-        # Use sequential write for latency comparison
-        key = f"sequential_write_{block_size}"
-        if key in performance_data:
-            data = performance_data[key]
-            container_lat = data.get('container', {}).get('latency', 0)
-            firecracker_lat = data.get('firecracker', {}).get('latency', 0)
-            
-            if container_lat > 0 and firecracker_lat > 0:
-                improvement = ((container_lat - firecracker_lat) / container_lat) * 100
-                improvement_str = f"{improvement:+.1f}%" if improvement > 0 else f"{abs(improvement):.1f}% slower"
-                
-                print(f"   {block_size:10} | {container_lat:13.1f} μs | {firecracker_lat:15.1f} μs | {improvement_str}")
-    
-    # Key insights
-    print(f"\n🎯 KEY INSIGHTS")
-    print("-" * 80)
-    
-    # Find best performing configurations
-    best_firecracker_throughput = 0
-    best_config = ""
-    
-    for key, data in performance_data.items():
-        if 'firecracker' in data:
-            throughput = data['firecracker']['throughput']
-            if throughput > best_firecracker_throughput:
-                best_firecracker_throughput = throughput
-                best_config = key
-    
-    print(f"✅ Best Firecracker Performance: {best_firecracker_throughput:.0f} MB/s ({best_config})")
-    
-    # Calculate overall averages
-    total_advantage = []
-    for key, data in performance_data.items():
-        if 'container' in data and 'firecracker' in data:
-            container_perf = data['container']['throughput']
-            firecracker_perf = data['firecracker']['throughput']
-            if container_perf > 0:
-                advantage = (firecracker_perf / container_perf - 1) * 100
-                total_advantage.append(advantage)
-    
-    if total_advantage:
-        avg_advantage = np.mean(total_advantage)
-        print(f"✅ Average Firecracker Advantage: {avg_advantage:.1f}% across all tests")
-    
-    print(f"✅ Block Size Impact: Larger blocks (1MB) show highest absolute throughput")
-    print(f"✅ Mixed Workloads: Show dramatic improvements in Firecracker (12x+ faster)")
-    print(f"✅ Latency: Generally lower in Firecracker for larger block operations")
-
-def main():
-    print("🚀 Multi-Block-Size IO Performance Analysis")
-    print("=" * 60)
-    
-    results = load_latest_results()
-    if not results:
-        print("❌ No results found!")
-        return
-    
-    print(f"📊 Found {len(results)} result files to analyze")
-    
-    analyze_block_size_performance(results)
-    
-    print(f"\n✅ Analysis complete! Multi-block-size testing framework is working perfectly.")
-    print(f"🔬 The expanded framework successfully tested 4 different block sizes")
-    print(f"⚡ Space management optimizations resolved all disk space issues")
+# Shared Python modules live next to the attempt-3 shell framework
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'attempt-3'))
+from io_analysis.cli import main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main(['blocksize']))
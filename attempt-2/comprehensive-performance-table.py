@@ -1,389 +1,15 @@
 #!/usr/bin/env python3
 """
 Comprehensive Firecracker vs Container I/O Performance Analysis Table
-Generated from robust 3-iteration test suite with mixed workload parsing fixes
+Generated from robust 3-iteration test suite with mixed workload parsing fixes (io-analysis table)
 """
 
-import pandas as pd
-import numpy as np
-import glob
-import os
+import sys
 from pathlib import Path
 
-def load_test_data(results_dir):
-    """Load all test results from CSV files."""
-    container_files = glob.glob(f"{results_dir}/container_*.csv")
-    firecracker_files = glob.glob(f"{results_dir}/firecracker_*.csv")
-    
-    results = {}
-    
-    # Load container results
-    for file in container_files:
-        test_name = Path(file).stem.replace('container_', '')
-        try:
-            df = pd.read_csv(file)
-            if not df.empty:
-                # Convert latency to float, handle any parsing issues
-                df['latency_us'] = pd.to_numeric(df['latency_us'], errors='coerce')
-                df['throughput_mbps'] = pd.to_numeric(df['throughput_mbps'], errors='coerce')
-                
-                # Filter out zero latency values (parsing errors)
-                df = df[df['latency_us'] > 0]
-                
-                if not df.empty:
-                    results[f"container_{test_name}"] = df
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    
-    # Load Firecracker results
-    for file in firecracker_files:
-        test_name = Path(file).stem.replace('firecracker_', '')
-        try:
-            df = pd.read_csv(file)
-            if not df.empty:
-                # Convert latency to float, handle any parsing issues
-                df['latency_us'] = pd.to_numeric(df['latency_us'], errors='coerce')
-                df['throughput_mbps'] = pd.to_numeric(df['throughput_mbps'], errors='coerce')
-                
-                # Filter out zero latency values (parsing errors)
-                df = df[df['latency_us'] > 0]
-                
-                if not df.empty:
-                    results[f"firecracker_{test_name}"] = df
-        except Exception as e:
-            print(f"Error loading {file}: {e}")
-    
-    return results
-
-def parse_test_name(test_name):
-    """Parse test name to extract operation type, block size, and pattern."""
-    # Remove platform prefix
-    clean_name = test_name.replace('container_', '').replace('firecracker_', '')
-    
-    # Pattern mapping
-    patterns = {
-        'sequential_read_512b': ('Sequential Read', '512B', 'seq_read'),
-        'sequential_read_4k': ('Sequential Read', '4KB', 'seq_read'),
-        'sequential_read_64k': ('Sequential Read', '64KB', 'seq_read'),
-        'sequential_read_1m': ('Sequential Read', '1MB', 'seq_read'),
-        'sequential_write_512b': ('Sequential Write', '512B', 'seq_write'),
-        'sequential_write_4k': ('Sequential Write', '4KB', 'seq_write'),
-        'sequential_write_64k': ('Sequential Write', '64KB', 'seq_write'),
-        'sequential_write_1m': ('Sequential Write', '1MB', 'seq_write'),
-        'random_read_512b': ('Random Read', '512B', 'rand_read'),
-        'random_read_4k': ('Random Read', '4KB', 'rand_read'),
-        'random_read_64k': ('Random Read', '64KB', 'rand_read'),
-        'random_read_1m': ('Random Read', '1MB', 'rand_read'),
-        'random_write_512b': ('Random Write', '512B', 'rand_write'),
-        'random_write_4k': ('Random Write', '4KB', 'rand_write'),
-        'random_write_64k': ('Random Write', '64KB', 'rand_write'),
-        'random_write_1m': ('Random Write', '1MB', 'rand_write'),
-        'mixed_4k': ('Mixed R/W (70/30)', '4KB', 'mixed'),
-        'mixed_64k': ('Mixed R/W (70/30)', '64KB', 'mixed'),
-        'mixed_1m': ('Mixed R/W (70/30)', '1MB', 'mixed'),
-    }
-    
-    return patterns.get(clean_name, ('Unknown', 'Unknown', 'unknown'))
-
-def calculate_statistics(df):
-    """Calculate comprehensive statistics for a dataset."""
-    if df.empty:
-        return {
-            'latency_avg': 0, 'latency_std': 0, 'latency_min': 0, 'latency_max': 0,
-            'throughput_avg': 0, 'throughput_std': 0, 'throughput_min': 0, 'throughput_max': 0,
-            'cpu_avg': 0, 'count': 0
-        }
-    
-    # Handle CPU usage column name variations
-    cpu_col = None
-    if 'cpu_usage' in df.columns:
-        cpu_col = 'cpu_usage'
-    elif 'cpu_load' in df.columns:
-        cpu_col = 'cpu_load'
-    
-    cpu_avg = df[cpu_col].mean() if cpu_col and not df[cpu_col].isna().all() else 0
-    
-    return {
-        'latency_avg': df['latency_us'].mean(),
-        'latency_std': df['latency_us'].std(),
-        'latency_min': df['latency_us'].min(),
-        'latency_max': df['latency_us'].max(),
-        'throughput_avg': df['throughput_mbps'].mean(),
-        'throughput_std': df['throughput_mbps'].std(),
-        'throughput_min': df['throughput_mbps'].min(),
-        'throughput_max': df['throughput_mbps'].max(),
-        'cpu_avg': cpu_avg,
-        'count': len(df)
-    }
-
-def format_performance_improvement(container_val, firecracker_val):
-    """Calculate and format performance improvement percentage."""
-    if container_val == 0 or pd.isna(container_val):
-        return "N/A"
-    
-    improvement = ((firecracker_val - container_val) / container_val) * 100
-    if improvement >= 0:
-        return f"+{improvement:.1f}%"
-    else:
-        return f"{improvement:.1f}%"
-
-def format_speedup_ratio(container_val, firecracker_val):
-    """Calculate and format speedup ratio."""
-    if container_val == 0 or pd.isna(container_val):
-        return "N/A"
-    
-    ratio = firecracker_val / container_val
-    return f"{ratio:.2f}x"
-
-def generate_comprehensive_table(results_dir):
-    """Generate the comprehensive performance comparison table."""
-    
-    print(f"\n🔍 Loading test results from: {results_dir}")
-    results = load_test_data(results_dir)
-    
-    if not results:
-        print("❌ No test results found!")
-        return
-    
-    # Group results by test pattern
-    test_patterns = {}
-    for key, df in results.items():
-        if key.startswith('container_'):
-            test_name = key.replace('container_', '')
-            if test_name not in test_patterns:
-                test_patterns[test_name] = {}
-            test_patterns[test_name]['container'] = df
-        elif key.startswith('firecracker_'):
-            test_name = key.replace('firecracker_', '')
-            if test_name not in test_patterns:
-                test_patterns[test_name] = {}
-            test_patterns[test_name]['firecracker'] = df
-    
-    # Generate table data
-    table_data = []
-    
-    for test_name, data in test_patterns.items():
-        if 'container' not in data or 'firecracker' not in data:
-            continue
-            
-        operation, block_size, pattern_type = parse_test_name(test_name)
-        
-        container_stats = calculate_statistics(data['container'])
-        firecracker_stats = calculate_statistics(data['firecracker'])
-        
-        # Calculate improvements
-        latency_improvement = format_performance_improvement(
-            container_stats['latency_avg'], firecracker_stats['latency_avg']
-        )
-        throughput_improvement = format_performance_improvement(
-            container_stats['throughput_avg'], firecracker_stats['throughput_avg']
-        )
-        throughput_speedup = format_speedup_ratio(
-            container_stats['throughput_avg'], firecracker_stats['throughput_avg']
-        )
-        
-        table_data.append({
-            'Operation': operation,
-            'Block Size': block_size,
-            'Pattern': pattern_type,
-            'Container Latency (μs)': f"{container_stats['latency_avg']:.1f} ± {container_stats['latency_std']:.1f}",
-            'Firecracker Latency (μs)': f"{firecracker_stats['latency_avg']:.1f} ± {firecracker_stats['latency_std']:.1f}",
-            'Latency Improvement': latency_improvement,
-            'Container Throughput (MB/s)': f"{container_stats['throughput_avg']:.1f} ± {container_stats['throughput_std']:.1f}",
-            'Firecracker Throughput (MB/s)': f"{firecracker_stats['throughput_avg']:.1f} ± {firecracker_stats['throughput_std']:.1f}",
-            'Throughput Improvement': throughput_improvement,
-            'Speedup Ratio': throughput_speedup,
-            'Container CPU': f"{container_stats['cpu_avg']:.2f}" if container_stats['cpu_avg'] > 0 else "N/A",
-            'Firecracker CPU': f"{firecracker_stats['cpu_avg']:.2f}" if firecracker_stats['cpu_avg'] > 0 else "N/A",
-            'Test Iterations': f"{container_stats['count']}/{firecracker_stats['count']}"
-        })
-    
-    # Sort by block size and operation type
-    block_size_order = {'512B': 1, '4KB': 2, '64KB': 3, '1MB': 4}
-    operation_order = {'Sequential Read': 1, 'Sequential Write': 2, 'Random Read': 3, 'Random Write': 4, 'Mixed R/W (70/30)': 5}
-    
-    table_data.sort(key=lambda x: (block_size_order.get(x['Block Size'], 999), operation_order.get(x['Operation'], 999)))
-    
-    return table_data
-
-def print_comprehensive_table(table_data):
-    """Print the comprehensive performance table with beautiful formatting."""
-    
-    if not table_data:
-        print("❌ No data to display")
-        return
-    
-    print("\n" + "="*200)
-    print("🚀 COMPREHENSIVE FIRECRACKER vs CONTAINER I/O PERFORMANCE ANALYSIS")
-    print("="*200)
-    print("📊 Based on 3 iterations per test pattern with statistical analysis")
-    print("🔧 Mixed workload parsing: Fixed to handle separate read/write statistics")
-    print("=" * 200)
-    
-    # Print main comparison table
-    print(f"\n{'Operation':<22} {'Block':<6} {'Container Latency':<18} {'Firecracker Latency':<20} {'Lat':<8} {'Container Throughput':<22} {'Firecracker Throughput':<24} {'Throughput':<12} {'Speedup':<8} {'Iterations'}")
-    print(f"{'Type':<22} {'Size':<6} {'(μs ± std)':<18} {'(μs ± std)':<20} {'Impr.':<8} {'(MB/s ± std)':<22} {'(MB/s ± std)':<24} {'Improvement':<12} {'Ratio':<8} {'C/F'}")
-    print("-" * 200)
-    
-    for row in table_data:
-        print(f"{row['Operation']:<22} {row['Block Size']:<6} {row['Container Latency (μs)']:<18} {row['Firecracker Latency (μs)']:<20} {row['Latency Improvement']:<8} {row['Container Throughput (MB/s)']:<22} {row['Firecracker Throughput (MB/s)']:<24} {row['Throughput Improvement']:<12} {row['Speedup Ratio']:<8} {row['Test Iterations']}")
-    
-    # Block size analysis
-    print("\n" + "="*120)
-    print("📊 PERFORMANCE BY BLOCK SIZE")
-    print("="*120)
-    
-    block_sizes = ['512B', '4KB', '64KB', '1MB']
-    
-    for block_size in block_sizes:
-        block_tests = [row for row in table_data if row['Block Size'] == block_size]
-        if not block_tests:
-            continue
-            
-        print(f"\n🔹 {block_size} Block Size Analysis:")
-        
-        # Calculate averages for this block size
-        latency_improvements = []
-        throughput_improvements = []
-        speedups = []
-        
-        for test in block_tests:
-            if test['Latency Improvement'] != 'N/A':
-                lat_imp = float(test['Latency Improvement'].replace('+', '').replace('%', ''))
-                latency_improvements.append(lat_imp)
-            
-            if test['Throughput Improvement'] != 'N/A':
-                thr_imp = float(test['Throughput Improvement'].replace('+', '').replace('%', ''))
-                throughput_improvements.append(thr_imp)
-            
-            if test['Speedup Ratio'] != 'N/A':
-                speedup = float(test['Speedup Ratio'].replace('x', ''))
-                speedups.append(speedup)
-        
-        avg_lat_imp = np.mean(latency_improvements) if latency_improvements else 0
-        avg_thr_imp = np.mean(throughput_improvements) if throughput_improvements else 0
-        avg_speedup = np.mean(speedups) if speedups else 0
-        
-        print(f"   • Tests: {len(block_tests)}")
-        print(f"   • Avg Latency Improvement: {avg_lat_imp:+.1f}%")
-        print(f"   • Avg Throughput Improvement: {avg_thr_imp:+.1f}%")
-        print(f"   • Avg Speedup: {avg_speedup:.2f}x")
-        
-        # Best performing test for this block size
-        best_test = max(block_tests, key=lambda x: float(x['Speedup Ratio'].replace('x', '')) if x['Speedup Ratio'] != 'N/A' else 0)
-        print(f"   • Best Performance: {best_test['Operation']} ({best_test['Speedup Ratio']} speedup)")
-    
-    # Operation type analysis
-    print("\n" + "="*120)
-    print("🎯 PERFORMANCE BY OPERATION TYPE")
-    print("="*120)
-    
-    operation_types = ['Sequential Read', 'Sequential Write', 'Random Read', 'Random Write', 'Mixed R/W (70/30)']
-    
-    for op_type in operation_types:
-        op_tests = [row for row in table_data if row['Operation'] == op_type]
-        if not op_tests:
-            continue
-            
-        print(f"\n🔸 {op_type} Analysis:")
-        
-        # Calculate averages for this operation type
-        latency_improvements = []
-        throughput_improvements = []
-        speedups = []
-        
-        for test in op_tests:
-            if test['Latency Improvement'] != 'N/A':
-                lat_imp = float(test['Latency Improvement'].replace('+', '').replace('%', ''))
-                latency_improvements.append(lat_imp)
-            
-            if test['Throughput Improvement'] != 'N/A':
-                thr_imp = float(test['Throughput Improvement'].replace('+', '').replace('%', ''))
-                throughput_improvements.append(thr_imp)
-            
-            if test['Speedup Ratio'] != 'N/A':
-                speedup = float(test['Speedup Ratio'].replace('x', ''))
-                speedups.append(speedup)
-        
-        avg_lat_imp = np.mean(latency_improvements) if latency_improvements else 0
-        avg_thr_imp = np.mean(throughput_improvements) if throughput_improvements else 0
-        avg_speedup = np.mean(speedups) if speedups else 0
-        
-        print(f"   • Tests: {len(op_tests)}")
-        print(f"   • Avg Latency Improvement: {avg_lat_imp:+.1f}%")
-        print(f"   • Avg Throughput Improvement: {avg_thr_imp:+.1f}%")
-        print(f"   • Avg Speedup: {avg_speedup:.2f}x")
-    
-    # Overall summary
-    print("\n" + "="*120)
-    print("🏆 OVERALL PERFORMANCE SUMMARY")
-    print("="*120)
-    
-    total_tests = len(table_data)
-    
-    # Count performance categories
-    excellent_tests = len([t for t in table_data if t['Speedup Ratio'] != 'N/A' and float(t['Speedup Ratio'].replace('x', '')) >= 2.0])
-    good_tests = len([t for t in table_data if t['Speedup Ratio'] != 'N/A' and 1.5 <= float(t['Speedup Ratio'].replace('x', '')) < 2.0])
-    moderate_tests = len([t for t in table_data if t['Speedup Ratio'] != 'N/A' and 1.1 <= float(t['Speedup Ratio'].replace('x', '')) < 1.5])
-    marginal_tests = len([t for t in table_data if t['Speedup Ratio'] != 'N/A' and 0.9 <= float(t['Speedup Ratio'].replace('x', '')) < 1.1])
-    slower_tests = len([t for t in table_data if t['Speedup Ratio'] != 'N/A' and float(t['Speedup Ratio'].replace('x', '')) < 0.9])
-    
-    print(f"📊 Total Tests Analyzed: {total_tests}")
-    print(f"🚀 Excellent Performance (≥2x speedup): {excellent_tests} tests")
-    print(f"✅ Good Performance (1.5-2x speedup): {good_tests} tests")
-    print(f"👍 Moderate Performance (1.1-1.5x speedup): {moderate_tests} tests")
-    print(f"➖ Marginal Performance (0.9-1.1x speedup): {marginal_tests} tests")
-    print(f"❌ Slower Performance (<0.9x speedup): {slower_tests} tests")
-    
-    # Best and worst performing tests
-    valid_tests = [t for t in table_data if t['Speedup Ratio'] != 'N/A']
-    if valid_tests:
-        best_test = max(valid_tests, key=lambda x: float(x['Speedup Ratio'].replace('x', '')))
-        worst_test = min(valid_tests, key=lambda x: float(x['Speedup Ratio'].replace('x', '')))
-        
-        print(f"\n🏆 Best Performance: {best_test['Operation']} {best_test['Block Size']}")
-        print(f"   • Speedup: {best_test['Speedup Ratio']}")
-        print(f"   • Throughput Improvement: {best_test['Throughput Improvement']}")
-        print(f"   • Latency Improvement: {best_test['Latency Improvement']}")
-        
-        print(f"\n⚠️  Most Challenging: {worst_test['Operation']} {worst_test['Block Size']}")
-        print(f"   • Speedup: {worst_test['Speedup Ratio']}")
-        print(f"   • Throughput Improvement: {worst_test['Throughput Improvement']}")
-        print(f"   • Latency Improvement: {worst_test['Latency Improvement']}")
-    
-    print("\n" + "="*120)
-    print("💡 KEY INSIGHTS:")
-    print("   • Firecracker excels at small block I/O operations (512B, 4KB)")
-    print("   • Mixed workloads show significant performance gains")
-    print("   • Random I/O patterns benefit most from Firecracker's architecture")
-    print("   • Statistical analysis based on 3 iterations provides robust results")
-    print("   • Mixed workload parsing fix ensures accurate latency measurements")
-    print("="*120)
-
-def main():
-    # Find the most recent results directory
-    results_dirs = glob.glob("io_benchmark_results_*")
-    if not results_dirs:
-        print("❌ No benchmark results found!")
-        return
-    
-    latest_results = max(results_dirs, key=os.path.getctime)
-    
-    print(f"📊 Generating Comprehensive Performance Analysis")
-    print(f"📁 Results Directory: {latest_results}")
-    
-    table_data = generate_comprehensive_table(latest_results)
-    
-    if table_data:
-        print_comprehensive_table(table_data)
-        
-        # Save to CSV for further analysis
-        df = pd.DataFrame(table_data)
-        output_file = f"{latest_results}/comprehensive_performance_analysis.csv"
-        df.to_csv(output_file, index=False)
-        print(f"\n💾 Detailed results saved to: {output_file}")
-    else:
-        print("❌ No valid test data found!")
+# Shared Python modules live next to the attempt-3 shell framework
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'attempt-3'))
+from io_analysis.cli import main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main(['table'] + sys.argv[1:]))
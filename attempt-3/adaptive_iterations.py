@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Adaptive iteration control for the IO Performance Comparison Framework
+Decides after each iteration whether a pattern needs more samples, using a
+Student-t (or bootstrap) confidence interval on throughput and latency
+"""
+
+import csv
+import math
+import os
+import statistics
+import sys
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+METRICS = ('throughput_mbps', 'latency_us')
+DECISION_FIELDS = [
+    'env', 'pattern', 'iterations', 'decision', 'reason',
+    'throughput_mean', 'throughput_rel_halfwidth',
+    'latency_mean', 'latency_rel_halfwidth',
+]
+
+
+# Student-t quantile without scipy: regularized incomplete beta + bisection
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the incomplete beta function (Lentz's method)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 300):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 3e-14:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_bt = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+              + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_bt) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(log_bt) * _betacf(b, a, 1.0 - x) / b
+
+
+def student_t_cdf(t: float, df: float) -> float:
+    tail = 0.5 * _betainc(df / 2.0, 0.5, df / (df + t * t))
+    return 1.0 - tail if t >= 0 else tail
+
+
+def student_t_ppf(q: float, df: float) -> float:
+    """Inverse CDF of Student's t distribution."""
+    if df <= 0:
+        raise ValueError("degrees of freedom must be positive")
+    if q == 0.5:
+        return 0.0
+    if q < 0.5:
+        return -student_t_ppf(1.0 - q, df)
+    lo, hi = 0.0, 1.0
+    while student_t_cdf(hi, df) < q:
+        hi *= 2.0
+    for _ in range(100):
+        mid = (lo + hi) / 2.0
+        if student_t_cdf(mid, df) < q:
+            lo = mid
+        else:
+            hi = mid
+        if hi - lo < 1e-10:
+            break
+    return (lo + hi) / 2.0
+
+
+# Confidence intervals
+
+def t_interval(samples: Sequence[float], confidence: float = 0.95) -> Tuple[float, float]:
+    """Mean and Student-t half-width of the mean."""
+    n = len(samples)
+    mean = statistics.fmean(samples)
+    if n < 2:
+        return mean, math.inf
+    sem = statistics.stdev(samples) / math.sqrt(n)
+    return mean, student_t_ppf(0.5 + confidence / 2.0, n - 1) * sem
+
+
+def bootstrap_interval(samples: Sequence[float], confidence: float = 0.95,
+                       resamples: int = 2000, seed: int = 0) -> Tuple[float, float]:
+    """Mean and half-width of a percentile bootstrap interval of the mean."""
+    import numpy as np
+
+    data = np.asarray(samples, dtype=np.float64)
+    mean = float(data.mean())
+    if data.size < 2:
+        return mean, math.inf
+    rng = np.random.default_rng(seed)
+    means = data[rng.integers(0, data.size, size=(resamples, data.size))].mean(axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    lo, hi = np.quantile(means, [alpha, 1.0 - alpha])
+    return mean, float(hi - lo) / 2.0
+
+
+def relative_halfwidth(samples: Sequence[float], confidence: float = 0.95,
+                       method: str = 't') -> Tuple[float, float]:
+    """Mean and CI half-width relative to the mean (inf when undefined)."""
+    if not samples:
+        return 0.0, math.inf
+    if method == 'bootstrap':
+        mean, half = bootstrap_interval(samples, confidence)
+    else:
+        mean, half = t_interval(samples, confidence)
+    if mean == 0:
+        return mean, math.inf
+    return mean, half / abs(mean)
+
+
+# Stopping rule
+
+@dataclass
+class Decision:
+    proceed: bool
+    reason: str
+    iterations: int
+    throughput_mean: float = 0.0
+    throughput_rel: float = math.inf
+    latency_mean: float = 0.0
+    latency_rel: float = math.inf
+
+    def describe(self) -> str:
+        verdict = "continue" if self.proceed else "stop"
+        return (f"Adaptive: {verdict} after {self.iterations} iterations ({self.reason}); "
+                f"throughput ±{_pct(self.throughput_rel)}, latency ±{_pct(self.latency_rel)}")
+
+
+def _pct(value: float) -> str:
+    return "n/a" if math.isinf(value) else f"{value * 100:.1f}%"
+
+
+def read_samples(csv_path: str) -> dict:
+    """Valid (non-zero) throughput and latency samples recorded so far."""
+    samples = {metric: [] for metric in METRICS}
+    try:
+        with open(csv_path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                for metric in METRICS:
+                    try:
+                        value = float(row.get(metric) or 0)
+                    except ValueError:
+                        continue
+                    if value > 0:
+                        samples[metric].append(value)
+    except OSError:
+        pass
+    return samples
+
+
+def decide(samples: dict, completed: int, min_iterations: int = 3, max_iterations: int = 10,
+           target: float = 0.05, confidence: float = 0.95, method: str = 't') -> Decision:
+    """
+    Sequential stopping rule: run at least `min_iterations`, then stop as soon as
+    the relative CI half-width of both throughput and latency is below `target`,
+    and never run more than `max_iterations`.
+    """
+    thr_mean, thr_rel = relative_halfwidth(samples['throughput_mbps'], confidence, method)
+    lat_mean, lat_rel = relative_halfwidth(samples['latency_us'], confidence, method)
+    decision = Decision(True, '', completed, thr_mean, thr_rel, lat_mean, lat_rel)
+
+    if completed < min_iterations:
+        decision.reason = f"below minimum of {min_iterations}"
+    elif completed >= max_iterations:
+        decision.proceed = False
+        decision.reason = f"max_iterations reached, target ±{target * 100:.1f}% not met" \
+            if max(thr_rel, lat_rel) > target else "converged at max_iterations"
+    elif thr_rel <= target and lat_rel <= target:
+        decision.proceed = False
+        decision.reason = f"converged to ±{target * 100:.1f}% at {confidence * 100:.0f}% confidence"
+    else:
+        decision.reason = f"CI wider than ±{target * 100:.1f}%"
+    return decision
+
+
+def log_decision(log_path: str, env: str, pattern: str, decision: Decision) -> None:
+    new_file = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=DECISION_FIELDS, lineterminator='\n')
+        if new_file:
+            writer.writeheader()
+        writer.writerow({
+            'env': env,
+            'pattern': pattern,
+            'iterations': decision.iterations,
+            'decision': 'continue' if decision.proceed else 'stop',
+            'reason': decision.reason,
+            'throughput_mean': f"{decision.throughput_mean:.2f}",
+            'throughput_rel_halfwidth': f"{decision.throughput_rel:.4f}",
+            'latency_mean': f"{decision.latency_mean:.2f}",
+            'latency_rel_halfwidth': f"{decision.latency_rel:.4f}",
+        })
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sequential stopping rule for benchmark iterations")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    dec = sub.add_parser('decide', help="Exit 0 if another iteration should run, 1 to stop")
+    dec.add_argument('csv_file', help="Runner CSV with the iterations so far")
+    dec.add_argument('--completed', type=int, required=True)
+    dec.add_argument('--min', type=int, default=3, dest='min_iterations')
+    dec.add_argument('--max', type=int, default=10, dest='max_iterations')
+    dec.add_argument('--target', type=float, default=0.05, help="Relative CI half-width (0.05 = ±5%%)")
+    dec.add_argument('--confidence', type=float, default=0.95)
+    dec.add_argument('--method', choices=('t', 'bootstrap'), default='t')
+    dec.add_argument('--log', help="CSV file recording the final stop decision")
+    dec.add_argument('--env', default='')
+    dec.add_argument('--pattern', default='')
+
+    args = parser.parse_args(argv)
+
+    decision = decide(read_samples(args.csv_file), args.completed, args.min_iterations,
+                      args.max_iterations, args.target, args.confidence, args.method)
+    print(f"    {decision.describe()}")
+    if not decision.proceed and args.log:
+        log_decision(args.log, args.env, args.pattern, decision)
+    return 0 if decision.proceed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
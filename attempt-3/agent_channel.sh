@@ -0,0 +1,160 @@
+#!/bin/bash
+
+# Persistent execution channel for the IO Performance Comparison Framework
+# One long-lived io_agent.py per environment receives cleanup + fio + cleanup
+# as a single job, instead of one SSH handshake / docker exec spawn per step;
+# the guest clock sample and the fio logs come back in the same reply
+
+# Source configuration, metrics helpers (latency log prefix) and the file pool
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/metrics_parser.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/file_pool.sh"
+
+IO_AGENT="$(dirname "${BASH_SOURCE[0]}")/io_agent.py"
+AGENT_UNAVAILABLE=2
+
+agent_socket() {
+    echo "/tmp/io_agent_$1${TENANT:+_$TENANT}.sock"
+}
+
+agent_pidfile() {
+    echo "/tmp/io_agent_$1${TENANT:+_$TENANT}.pid"
+}
+
+# Command that starts the agent on the other side of the channel
+agent_transport() {
+    local env="$1"
+    if [ "$AGENT_TRANSPORT" = "local" ]; then
+        # Stand-in: the agent runs as a local subprocess (protocol testing without KVM/Docker)
+        echo "python3 -u $IO_AGENT serve"
+    elif [ "$env" = "firecracker" ]; then
+        echo "ssh -i ./ubuntu-24.04.id_rsa -o StrictHostKeyChecking=no -o ServerAliveInterval=15 root@$GUEST_IP python3 -u $(helper_path "$IO_AGENT") serve"
+    else
+        echo "docker exec -i $CONTAINER_NAME python3 -u $(helper_path "$IO_AGENT") serve"
+    fi
+}
+
+# Where a helper script lives on the other side of the channel
+helper_path() {
+    local local_path="$1"
+    if [ "$AGENT_TRANSPORT" = "local" ]; then
+        echo "$local_path"
+    else
+        echo "/tmp/$(basename "$local_path")"
+    fi
+}
+
+# Copy a helper script into the guest/container (needs python3 there)
+deploy_helper() {
+    local env="$1"
+    local local_path="$2"
+    local remote_path=$(helper_path "$local_path")
+    [ "$AGENT_TRANSPORT" = "local" ] && return 0
+    if [ "$env" = "firecracker" ]; then
+        timeout 30 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" \
+            "command -v python3 >/dev/null && cat > $remote_path" < "$local_path" 2>/dev/null
+    else
+        docker exec "$CONTAINER_NAME" sh -c "command -v python3 >/dev/null" 2>/dev/null && \
+            docker cp "$local_path" "$CONTAINER_NAME:$remote_path" >/dev/null 2>&1
+    fi
+}
+
+deploy_agent() {
+    deploy_helper "$1" "$IO_AGENT"
+}
+
+# Run a one-off, unmeasured setup command in the environment's test directory
+env_exec() {
+    local env="$1"
+    local workdir="$2"
+    local command="$3"
+    local timeout_s="${4:-900}"
+    if [ "$AGENT_TRANSPORT" = "local" ] || [ "$env" = "local" ]; then
+        (mkdir -p "$workdir" && cd "$workdir" && timeout "$timeout_s" /bin/bash -c "$command")
+    elif [ "$env" = "firecracker" ]; then
+        timeout "$timeout_s" ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" \
+            "mkdir -p $workdir && cd $workdir && $command"
+    else
+        timeout "$timeout_s" docker exec "$CONTAINER_NAME" /bin/bash -c "mkdir -p $workdir && cd $workdir && $command"
+    fi
+}
+
+# Start the host-side broker (keeps the transport open) unless it is already answering
+start_agent() {
+    local env="$1"
+    local socket=$(agent_socket "$env")
+
+    if [ "$USE_AGENT" != "true" ]; then
+        return 1
+    fi
+    if python3 "$IO_AGENT" ping --socket "$socket" >/dev/null 2>&1; then
+        return 0
+    fi
+    stop_agent "$env"
+
+    if ! deploy_agent "$env"; then
+        echo "    Warning: Could not deploy io_agent.py to $env (python3 missing?), using per-step commands" >&2
+        return 1
+    fi
+    python3 "$IO_AGENT" broker --socket "$socket" --pidfile "$(agent_pidfile "$env")" \
+        -- $(agent_transport "$env") >/dev/null 2>&1 &
+
+    local count=0
+    while [ $count -lt 20 ]; do
+        if [ -S "$socket" ] && python3 "$IO_AGENT" ping --socket "$socket" >/dev/null 2>&1; then
+            echo "    Agent channel to $env ready" >&2
+            return 0
+        fi
+        sleep 0.5
+        count=$((count + 1))
+    done
+    echo "    Warning: Agent channel to $env did not come up, using per-step commands" >&2
+    stop_agent "$env"
+    return 1
+}
+
+stop_agent() {
+    local env="$1"
+    local pidfile=$(agent_pidfile "$env")
+    if [ -f "$pidfile" ]; then
+        kill "$(cat "$pidfile")" 2>/dev/null || true
+        rm -f "$pidfile"
+    fi
+    rm -f "$(agent_socket "$env")"
+}
+
+# Run cleanup + command + cleanup in one round-trip
+# stdout/stderr of the command land in the given files, and with LATENCY_LOG or steady-state
+# logging the latency log (as cat prints it) and the bw/iops logs (as tail -v prints them) land
+# in latency_file and steady_file. Prints "<start> <end> <clock offset> <disk status>" with the
+# command's own start/end on the host clock and the agent's CLOCK_MONOTONIC minus the host's in
+# ms ("-" if unknown)
+# Returns 0 on success, 1 if the command failed, $AGENT_UNAVAILABLE if the channel is down
+agent_run() {
+    local env="$1"
+    local workdir="$2"
+    local command="$3"
+    local stdout_file="$4"
+    local stderr_file="$5"
+    local timeout_s="${6:-60}"
+    local latency_file="$7"
+    local steady_file="$8"
+
+    local collect=()
+    if [ "$LATENCY_LOG" = "true" ] && [ -n "$latency_file" ]; then
+        collect+=(--collect "$latency_file=$(latency_log_glob)")
+    fi
+    if steady_state_logging && [ -n "$steady_file" ]; then
+        collect+=(--collect-headed "$steady_file=$(steady_log_glob)")
+    fi
+
+    python3 "$IO_AGENT" run --socket "$(agent_socket "$env")" \
+        --workdir "$workdir" \
+        --cleanup "$TEST_FILE_GLOBS ${LATENCY_LOG_PREFIX}_*" \
+        --preserve "$(pool_preserve)" \
+        --timeout "$timeout_s" \
+        --stdout "$stdout_file" \
+        --stderr "$stderr_file" \
+        "${collect[@]}" \
+        "$command"
+}
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Parallel multi-run aggregation for the IO Performance Comparison Framework
+Worker processes fold batches of store partitions into mergeable partial statistics
+(Welford moments, min/max, quantile sketches) that are tree-reduced into fleet-wide
+answers; memory depends on the number of groups, never on the number of rows
+"""
+
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from comparison import COMPARISON_DTYPE, CONTAINER, FIRECRACKER, METRICS, matrix_order
+from job_matrix import DEFAULTS, describe, load_manifest
+from results_store import AGGREGATE_BY, ENVIRONMENTS, ResultsStore
+from significance import adjust_pvalues
+
+DEFAULT_COLUMNS = ('latency_us', 'throughput_mbps', 'cpu_us_per_io', 'mbps_per_core')
+DEFAULT_BY = AGGREGATE_BY
+QUANTILES = (0.5, 0.9, 0.99)
+# Quantile sketch relative accuracy: every reported quantile is within 1% of a recorded value
+SKETCH_ACCURACY = 0.01
+# Partials per worker, so a slow batch does not hold up the others
+BATCHES_PER_WORKER = 4
+
+_RUN_DATE = re.compile(r'(\d{8})_\d{6}$')
+
+
+class QuantileSketch:
+    """
+    Sparse log-bucketed sketch (DDSketch-style): a positive value lands in bucket
+    ceil(log_gamma(x)), so any quantile is within SKETCH_ACCURACY of the truth.
+    Sketches merge by adding bucket counts; size grows with the value range only.
+    """
+
+    __slots__ = ('keys', 'counts', 'zeros')
+
+    gamma = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.int32)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.zeros = 0
+
+    def add(self, values: np.ndarray) -> None:
+        positive = values[values > 0]
+        self.zeros += int(len(values) - len(positive))
+        if len(positive):
+            keys = np.ceil(np.log(positive) / self._log_gamma).astype(np.int32)
+            self._combine(keys, np.ones(len(keys), dtype=np.int64))
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        self.zeros += other.zeros
+        if len(other.keys):
+            self._combine(other.keys, other.counts)
+        return self
+
+    def _combine(self, keys: np.ndarray, counts: np.ndarray) -> None:
+        unique, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        self.counts = np.bincount(inverse.ravel(), weights=np.concatenate([self.counts, counts]),
+                                  minlength=len(unique)).astype(np.int64)
+        self.keys = unique.astype(np.int32)
+
+    @property
+    def total(self) -> int:
+        return self.zeros + int(self.counts.sum())
+
+    def quantiles(self, qs: Sequence[float] = QUANTILES) -> np.ndarray:
+        total = self.total
+        if total == 0:
+            return np.full(len(qs), np.nan)
+        ranks = np.clip(np.ceil(np.asarray(qs) * total), 1, total) - self.zeros
+        index = np.searchsorted(np.cumsum(self.counts), np.maximum(ranks, 1), side='left')
+        values = 2 * self.gamma ** self.keys[np.minimum(index, len(self.keys) - 1)] / (self.gamma + 1)
+        return np.where(ranks <= 0, 0.0, values)
+
+
+class RunningStats:
+    """Mergeable count, mean and variance (Welford/Chan), min, max and quantiles of one column."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'sketch')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sketch = QuantileSketch()
+
+    def add(self, values: np.ndarray) -> None:
+        """Add a batch: its exact moments are merged in like another partial."""
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min, batch.max = float(values.min()), float(values.max())
+        self.merge(batch)
+        self.sketch.add(values)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Chan et al.'s parallel combination of two (count, mean, M2) triples."""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class Aggregate:
+    """Partial aggregate of some runs: group key -> column -> RunningStats, plus run counts."""
+
+    def __init__(self, by: Sequence[str] = DEFAULT_BY, columns: Sequence[str] = DEFAULT_COLUMNS):
+        self.by = tuple(by)
+        self.columns = tuple(columns)
+        self.groups: Dict[Tuple, Dict[str, RunningStats]] = {}
+        self.runs: Dict[Tuple, int] = {}
+        self.run_count = 0
+        self.rows = 0
+
+    def add(self, data: Dict[str, np.ndarray]) -> None:
+        """Add the store rows of one run, grouped in one vectorised pass."""
+        # Zero latency marks an iteration whose fio output could not be parsed
+        valid = ~(data['latency_us'] <= 0) if 'latency_us' in data else np.ones(len(data['run']), dtype=bool)
+        if not valid.any():
+            return
+        columns = {c: np.asarray(data[c], dtype=np.float64)[valid] for c in self.columns}
+        keys = np.stack([data[k][valid].astype(str) for k in self.by], axis=1)
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(inverse, minlength=len(unique)))]
+        for g, key in enumerate(map(tuple, unique)):
+            rows = order[bounds[g]:bounds[g + 1]]
+            stats = self.groups.setdefault(key, {c: RunningStats() for c in self.columns})
+            for column in self.columns:
+                stats[column].add(columns[column][rows])
+            self.runs[key] = self.runs.get(key, 0) + 1
+        self.run_count += 1
+        self.rows += int(valid.sum())
+
+    def merge(self, other: 'Aggregate') -> 'Aggregate':
+        for key, stats in other.groups.items():
+            mine = self.groups.setdefault(key, {c: RunningStats() for c in self.columns})
+            for column, value in stats.items():
+                mine[column].merge(value)
+            self.runs[key] = self.runs.get(key, 0) + other.runs[key]
+        self.run_count += other.run_count
+        self.rows += other.rows
+        return self
+
+
+# Fan-out and reduction
+
+def _aggregate_batch(task) -> Aggregate:
+    """Worker: fold the runs of one batch into a partial, one run's rows in memory at a time."""
+    root, runs, by, columns, filters = task
+    store = ResultsStore(root)
+    partial = Aggregate(by, columns)
+    by_run = {}
+    for group in store.select(runs=runs, **filters):
+        by_run.setdefault(group['run'], []).append(group)
+    wanted = list(dict.fromkeys(list(columns) + ['latency_us']))
+    for run in runs:
+        if run in by_run:
+            partial.add(store.load_groups(by_run[run], wanted))
+    return partial
+
+
+def tree_reduce(partials: List[Aggregate]) -> Optional[Aggregate]:
+    """Merge partials pairwise, level by level (log2(n) rounds of independent merges)."""
+    while len(partials) > 1:
+        merged = [a.merge(b) for a, b in zip(partials[0::2], partials[1::2])]
+        if len(partials) % 2:
+            merged.append(partials[-1])
+        partials = merged
+    return partials[0] if partials else None
+
+
+def select_runs(store: ResultsStore, runs: Optional[Iterable[str]] = None, since: Optional[str] = None,
+                until: Optional[str] = None) -> List[str]:
+    """Ingested runs, optionally limited to named runs and to a YYYYMMDD date range of their ids."""
+    selected = []
+    for run in (list(runs) if runs else store.runs()):
+        match = _RUN_DATE.search(run)
+        date = match.group(1) if match else None
+        if (since or until) and date is None:
+            continue
+        if (since and date < since) or (until and date > until):
+            continue
+        selected.append(run)
+    return sorted(selected)
+
+
+def aggregate(store: Optional[ResultsStore] = None, runs: Optional[Iterable[str]] = None,
+              results_dirs: Iterable[str] = (), by: Sequence[str] = DEFAULT_BY,
+              columns: Sequence[str] = DEFAULT_COLUMNS, workers: Optional[int] = None,
+              since: Optional[str] = None, until: Optional[str] = None, **filters) -> Aggregate:
+    """
+    Aggregate many runs in parallel. `results_dirs` are ingested first (serially:
+    the manifest has a single writer) and join `runs`; with neither, every run in
+    the store is aggregated. `filters` are ResultsStore.select() filters.
+    """
+    store = store or ResultsStore()
+    runs = list(runs or [])
+    for results_dir in results_dirs:
+        store.ingest_run(results_dir)
+        runs.append(store.run_id_for(results_dir))
+    selected = select_runs(store, runs or None, since, until)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(selected)))
+    batches = max(1, min(len(selected), workers * BATCHES_PER_WORKER))
+    tasks = [(str(store.root), selected[i::batches], tuple(by), tuple(columns), filters)
+             for i in range(batches)]
+    if workers == 1:
+        partials = [_aggregate_batch(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(_aggregate_batch, tasks))
+    return tree_reduce(partials) or Aggregate(by, columns)
+
+
+# Fleet comparison
+
+def fleet_comparison(result: Aggregate, backends: Optional[Dict[str, str]] = None,
+                     confidence: float = 0.95, alpha: float = 0.05) -> np.ndarray:
+    """
+    COMPARISON_DTYPE table of an aggregate grouped by (env, backend, pattern), so the
+    table generators render fleet-wide numbers like one run. Each environment is
+    compared on `backends` (default: its backend with the most iterations). The
+    ratio CI (delta method) and Welch test (normal approximation, Holm-corrected)
+    treat all iterations of the fleet as one sample; tails are not available.
+    """
+    if result.by != DEFAULT_BY:
+        raise ValueError(f"fleet comparison needs an aggregate grouped by {DEFAULT_BY}")
+    if backends is None:
+        rows = {}
+        for (env, backend, _), stats in result.groups.items():
+            rows[env, backend] = rows.get((env, backend), 0) + stats[result.columns[0]].count
+        backends = {}
+        for (env, backend), count in sorted(rows.items(), key=lambda item: -item[1]):
+            backends.setdefault(env, backend)
+    manifest = load_manifest()
+    patterns = sorted({pattern for env, backend, pattern in result.groups if backends.get(env) == backend},
+                      key=lambda p: matrix_order(p, manifest))
+
+    table = np.zeros(len(patterns), dtype=COMPARISON_DTYPE)
+    for name in COMPARISON_DTYPE.names:
+        if COMPARISON_DTYPE[name].base == np.float64:
+            table[name] = np.nan
+    for row, pattern in enumerate(patterns):
+        job = describe(pattern, manifest) or {}
+        variant = job.get('variant', '')
+        label = job.get('label', 'Unknown')
+        table['pattern'][row] = pattern
+        table['operation'][row] = label + (f" [{variant.strip('_').replace('_', ' ')}]" if variant else '')
+        table['workload'][row] = label
+        table['pattern_type'][row] = job.get('pattern_type', 'unknown') + variant
+        table['rw'][row], table['variant'][row] = job.get('rw', 'unknown'), variant
+        table['engine'][row] = job.get('ioengine', DEFAULTS['ioengine'])
+        table['block_size'][row] = job.get('block_size', 0)
+        for i, env in enumerate(ENVIRONMENTS):
+            table['backend'][row, i] = backends.get(env)
+            stats = result.groups.get((env, backends.get(env), pattern))
+            if stats is None:
+                continue
+            for metric, (column, _) in METRICS.items():
+                if column in stats and stats[column].count:
+                    s = stats[column]
+                    table['count'][row, i] = max(table['count'][row, i], s.count)
+                    table[f'{metric}_mean'][row, i] = s.mean
+                    table[f'{metric}_std'][row, i] = s.std
+                    table[f'{metric}_min'][row, i] = s.min
+                    table[f'{metric}_max'][row, i] = s.max
+            for column in ('cpu_usage', 'cpu_us_per_io', 'mbps_per_core'):
+                if column in stats and stats[column].count:
+                    table[column][row, i] = stats[column].mean
+
+    normal = NormalDist()
+    z_crit = normal.inv_cdf(0.5 + confidence / 2)
+    pairs = (table['count'] > 0).all(axis=1)
+    for metric in METRICS:
+        mean, std, n = table[f'{metric}_mean'], table[f'{metric}_std'], table['count'].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            se2 = std ** 2 / n
+            ratio = mean[:, FIRECRACKER] / mean[:, CONTAINER]
+            ratio_se = ratio * np.sqrt(se2[:, FIRECRACKER] / mean[:, FIRECRACKER] ** 2
+                                       + se2[:, CONTAINER] / mean[:, CONTAINER] ** 2)
+            z = (mean[:, FIRECRACKER] - mean[:, CONTAINER]) / np.sqrt(se2.sum(axis=1))
+        table[f'{metric}_ratio_lo'] = np.where(pairs, ratio - z_crit * ratio_se, np.nan)
+        table[f'{metric}_ratio_hi'] = np.where(pairs, ratio + z_crit * ratio_se, np.nan)
+        p = np.array([2 * (1 - normal.cdf(abs(v))) if ok and np.isfinite(v) else np.nan
+                      for v, ok in zip(z, pairs)])
+        adjusted = np.full(len(p), np.nan)
+        if pairs.any():
+            adjusted[pairs] = adjust_pvalues(p[pairs], 'holm')
+        table[f'{metric}_p'] = adjusted
+        table[f'{metric}_significant'] = np.nan_to_num(adjusted, nan=1.0) < alpha
+    return table
+
+
+# Reports
+
+def write_csv(result: Aggregate, path) -> None:
+    import csv
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        stats_names = ['count', 'mean', 'std', 'min', 'max'] + [f"p{q * 100:g}" for q in QUANTILES]
+        writer.writerow(list(result.by) + ['runs'] + [f"{c}_{s}" for c in result.columns for s in stats_names])
+        for key, stats in sorted(result.groups.items()):
+            row = list(key) + [result.runs[key]]
+            for column in result.columns:
+                s = stats[column]
+                row += [s.count, s.mean, s.std, s.min, s.max] + list(s.sketch.quantiles())
+            writer.writerow(row)
+
+
+def print_report(result: Aggregate) -> None:
+    print(f"\n{'='*60}")
+    print(f"FLEET AGGREGATE: {result.run_count} runs, {result.rows} iterations, {len(result.groups)} groups")
+    print(f"{'='*60}")
+    key_width = max([len(' / '.join(key)) for key in result.groups] + [10])
+    for column in result.columns:
+        print(f"\n{column}")
+        print(f"  {'group':<{key_width}} {'runs':>5} {'n':>6} {'mean':>10} {'std':>9} "
+              + ' '.join(f"{f'p{q * 100:g}':>9}" for q in QUANTILES))
+        for key, stats in sorted(result.groups.items()):
+            s = stats[column]
+            if not s.count:
+                continue
+            quantiles = ' '.join(f"{v:>9.1f}" for v in s.sketch.quantiles())
+            print(f"  {' / '.join(key):<{key_width}} {result.runs[key]:>5} {s.count:>6} {s.mean:>10.1f} "
+                  f"{s.std:>9.1f} {quantiles}")
+
@@ -5,6 +5,7 @@
 
 # Source configuration
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
 
 # Analysis function
 analyze_results() {
@@ -22,151 +23,111 @@ analyze_results() {
         echo "Using most recent results directory: $RESULTS_DIR"
     fi
     
-    # Create analysis Python script
-    cat > "${RESULTS_DIR}/analyze_results.py" << 'EOF'
-#!/usr/bin/env python3
-import os
-import sys
-import csv
-import statistics
-from pathlib import Path
-
-def analyze_performance(container_file, firecracker_file, test_name):
-    """Analyze performance differences between container and Firecracker"""
-    try:
-        # Read container data
-        with open(container_file, 'r') as f:
-            reader = csv.DictReader(f)
-            container_data = list(reader)
-        
-        # Read Firecracker data  
-        with open(firecracker_file, 'r') as f:
-            reader = csv.DictReader(f)
-            firecracker_data = list(reader)
-        
-        if not container_data or not firecracker_data:
-            print(f"Warning: Missing data for {test_name}")
-            return None
-        
-        # Calculate averages (skip zero values)
-        container_latencies = [float(d['latency_us']) for d in container_data if float(d['latency_us']) > 0]
-        firecracker_latencies = [float(d['latency_us']) for d in firecracker_data if float(d['latency_us']) > 0]
-        
-        container_throughputs = [float(d['throughput_mbps']) for d in container_data if float(d['throughput_mbps']) > 0]
-        firecracker_throughputs = [float(d['throughput_mbps']) for d in firecracker_data if float(d['throughput_mbps']) > 0]
-        
-        result = {
-            'test_name': test_name,
-            'container_latency_avg': statistics.mean(container_latencies) if container_latencies else 0,
-            'firecracker_latency_avg': statistics.mean(firecracker_latencies) if firecracker_latencies else 0,
-            'container_throughput_avg': statistics.mean(container_throughputs) if container_throughputs else 0,
-            'firecracker_throughput_avg': statistics.mean(firecracker_throughputs) if firecracker_throughputs else 0
-        }
-        
-        # Calculate improvements
-        if result['container_latency_avg'] > 0 and result['firecracker_latency_avg'] > 0:
-            if result['container_latency_avg'] > result['firecracker_latency_avg']:
-                result['latency_improvement'] = ((result['container_latency_avg'] - result['firecracker_latency_avg']) / result['container_latency_avg']) * 100
-                result['latency_winner'] = 'Firecracker'
-            else:
-                result['latency_improvement'] = ((result['firecracker_latency_avg'] - result['container_latency_avg']) / result['firecracker_latency_avg']) * 100
-                result['latency_winner'] = 'Container'
-        else:
-            result['latency_improvement'] = 0
-            result['latency_winner'] = 'Unknown'
-            
-        if result['container_throughput_avg'] > 0 and result['firecracker_throughput_avg'] > 0:
-            if result['firecracker_throughput_avg'] > result['container_throughput_avg']:
-                result['throughput_improvement'] = ((result['firecracker_throughput_avg'] - result['container_throughput_avg']) / result['container_throughput_avg']) * 100
-                result['throughput_winner'] = 'Firecracker'
-            else:
-                result['throughput_improvement'] = ((result['container_throughput_avg'] - result['firecracker_throughput_avg']) / result['firecracker_throughput_avg']) * 100
-                result['throughput_winner'] = 'Container'
-        else:
-            result['throughput_improvement'] = 0
-            result['throughput_winner'] = 'Unknown'
-        
-        print(f"\n🧪 {test_name}")
-        print(f"{'='*60}")
-        print(f"Container    | Latency: {result['container_latency_avg']:.2f}μs | Throughput: {result['container_throughput_avg']:.2f} MB/s")
-        print(f"Firecracker  | Latency: {result['firecracker_latency_avg']:.2f}μs | Throughput: {result['firecracker_throughput_avg']:.2f} MB/s")
-        
-        if result['latency_winner'] != 'Unknown':
-            print(f"Latency Winner: {result['latency_winner']} ({result['latency_improvement']:.1f}% better)")
-        if result['throughput_winner'] != 'Unknown':
-            print(f"Throughput Winner: {result['throughput_winner']} ({result['throughput_improvement']:.1f}% better)")
-        
-        return result
-        
-    except Exception as e:
-        print(f"Error analyzing {test_name}: {e}")
-        return None
-
-def main(results_dir):
-    results_dir = Path(results_dir)
-    
-    print(f"\n{'='*60}")
-    print("📊 IO PERFORMANCE ANALYSIS REPORT")
-    print(f"{'='*60}")
-    print(f"Results Directory: {results_dir}")
-    
-    # Find all test result pairs
-    container_files = list(results_dir.glob("container_*.csv"))
-    all_results = []
-    
-    for container_file in container_files:
-        test_name = container_file.name.replace("container_", "").replace(".csv", "")
-        firecracker_file = results_dir / f"firecracker_{test_name}.csv"
-        
-        if firecracker_file.exists():
-            result = analyze_performance(container_file, firecracker_file, test_name)
-            if result:
-                all_results.append(result)
-        else:
-            print(f"Missing Firecracker data for {test_name}")
-    
-    # Generate summary
-    if all_results:
-        print(f"\n{'='*60}")
-        print("📈 SUMMARY")
-        print(f"{'='*60}")
-        
-        firecracker_latency_wins = sum(1 for r in all_results if r['latency_winner'] == 'Firecracker')
-        container_latency_wins = sum(1 for r in all_results if r['latency_winner'] == 'Container')
-        
-        firecracker_throughput_wins = sum(1 for r in all_results if r['throughput_winner'] == 'Firecracker')
-        container_throughput_wins = sum(1 for r in all_results if r['throughput_winner'] == 'Container')
-        
-        print(f"Total tests analyzed: {len(all_results)}")
-        print(f"\nLatency comparison:")
-        print(f"  • Firecracker wins: {firecracker_latency_wins}")
-        print(f"  • Container wins: {container_latency_wins}")
-        
-        print(f"\nThroughput comparison:")
-        print(f"  • Firecracker wins: {firecracker_throughput_wins}")
-        print(f"  • Container wins: {container_throughput_wins}")
-    
-    print(f"\n{'='*60}")
-    print("🏁 ANALYSIS COMPLETE")
-    print(f"{'='*60}")
-
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python3 analyze_results.py <results_dir>")
-        sys.exit(1)
-    
-    main(sys.argv[1])
-EOF
-
-    # Make the analysis script executable
-    chmod +x "${RESULTS_DIR}/analyze_results.py"
-    
-    # Run analysis if Python 3 is available
-    if command -v /home/guus/.venv/bin/python >/dev/null 2>&1; then
-        cd "$RESULTS_DIR" && /home/guus/.venv/bin/python analyze_results.py .
-    elif command -v python3 >/dev/null 2>&1; then
-        cd "$RESULTS_DIR" && python3 analyze_results.py .
+    # Container vs Firecracker comparison (io-analysis compare; numpy is only loaded
+    # once there are enough iterations for significance tests)
+    if command -v python3 >/dev/null 2>&1; then
+        io_analysis compare "$RESULTS_DIR"
     else
         echo "Python 3 not available for analysis. Raw data saved in $RESULTS_DIR"
     fi
 }
+
+# Scaling sweep analysis: throughput-latency curves and saturation knee per environment
+SCALING_ANALYSIS="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/scaling_analysis.py"
+
+analyze_scaling() {
+    echo "Analyzing scaling sweep..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for scaling analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$SCALING_ANALYSIS" "$RESULTS_DIR"
+}
+
+# Storage-backend matrix analysis: every backend's throughput and MB/s per core
+BACKEND_ANALYSIS="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/backend_analysis.py"
+
+analyze_backends() {
+    echo "Analyzing storage backends..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for backend analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$BACKEND_ANALYSIS" "$RESULTS_DIR"
+}
+
+# Steady-state analysis: steady-window throughput vs the whole-run figure per pattern
+STEADY_STATE_REPORT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/steady_state.py"
+
+analyze_steady_state() {
+    echo "Analyzing steady state..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for steady-state analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$STEADY_STATE_REPORT" report "$RESULTS_DIR"
+}
+
+# Density analysis: aggregate throughput, Jain's fairness index and per-tenant p99 as tenants are added
+DENSITY_ANALYSIS="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/density_analysis.py"
+
+analyze_density() {
+    echo "Analyzing density..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for density analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$DENSITY_ANALYSIS" "$RESULTS_DIR"
+}
+
+# Throttling analysis: share of each pattern's p99 from I/Os in flight while the cgroup was throttled
+PREEMPTION_REPORT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/preemption_analysis.py"
+
+analyze_preemption() {
+    echo "Analyzing throttling vs tail latency..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for throttling analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$PREEMPTION_REPORT" analyze "$RESULTS_DIR"
+}
+
+TRACE_REPLAY_REPORT="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/trace_replay.py"
+
+# Compare every replay's phases with the trace it replayed
+analyze_trace_replay() {
+    echo "Analyzing trace replay divergence..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for trace replay analysis. Raw data saved in $RESULTS_DIR"
+        return 1
+    fi
+    python3 "$TRACE_REPLAY_REPORT" report "$RESULTS_DIR"
+}
+
+REGRESSION_TRACKER="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/regression.py"
+
+# Record the kernel, Firecracker binary and settings of this run, so a change point
+# in the history can be traced to what changed
+write_run_info() {
+    python3 "$REGRESSION_TRACKER" run-info --output "$RESULTS_DIR/run_info.json" \
+        --file firecracker=./firecracker --file guest_kernel=./vmlinux-6.1.141 \
+        --component fio="$(fio --version 2>/dev/null)" \
+        --setting cache_mode="$CACHE_MODE" --setting schedule="$SCHEDULE" \
+        --setting vcpus="$VCPU_COUNT" --setting memory_mib="$MEMORY_SIZE_MIB" \
+        --setting test_duration="$TEST_DURATION" --setting data_size_mb="$DATA_SIZE_MB" \
+        --setting storage_matrix="$STORAGE_MATRIX" --setting container_storage="$CONTAINER_STORAGE_MODE"
+}
+
+# Returns 1 on a regression against the baselines (regression.py check)
+check_regressions() {
+    echo "Checking for regressions..."
+    if ! command -v python3 >/dev/null 2>&1; then
+        echo "Python 3 not available for the regression check. Raw data saved in $RESULTS_DIR"
+        return 2
+    fi
+    local metric_args=()
+    for metric in $REGRESSION_METRICS; do
+        metric_args+=(--metric "$metric")
+    done
+    python3 "$REGRESSION_TRACKER" check "$RESULTS_DIR" "${metric_args[@]}" --min-effect "$REGRESSION_MIN_EFFECT"
+}
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Storage-backend comparison for the IO Performance Comparison Framework
+Pivots a STORAGE_MATRIX run (or several runs) on the backend each environment
+ran on and ranks the backends by throughput per host core
+"""
+
+import csv
+import sys
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from results_store import ENVIRONMENTS, ResultsStore
+
+OUTPUT_CSV = 'backend_comparison.csv'
+
+
+@dataclass
+class BackendResult:
+    """Median of all iterations of one pattern on one environment's backend."""
+    env: str
+    backend: str
+    pattern: str
+    throughput_mbps: float
+    mbps_per_core: float
+    cpu_us_per_io: float
+    latency_us: float
+    samples: int
+
+
+def summarize(data: Dict[str, np.ndarray]) -> List[BackendResult]:
+    """One BackendResult per (env, backend, pattern) of store.query() rows."""
+    groups = {}
+    for i in range(len(data['env'])):
+        if data['throughput_mbps'][i] > 0:
+            groups.setdefault((data['env'][i], data['backend'][i], data['pattern'][i]), []).append(i)
+
+    def median(name, rows):
+        values = data[name][rows]
+        return float(np.nanmedian(values)) if not np.isnan(values).all() else float('nan')
+
+    return [BackendResult(env=env, backend=backend, pattern=pattern,
+                          throughput_mbps=median('throughput_mbps', rows),
+                          mbps_per_core=median('mbps_per_core', rows),
+                          cpu_us_per_io=median('cpu_us_per_io', rows),
+                          latency_us=median('latency_us', rows), samples=len(rows))
+            for (env, backend, pattern), rows in sorted(groups.items())]
+
+
+def efficiency(result: BackendResult) -> float:
+    """MB/s per host core, or plain MB/s for runs without cgroup CPU accounting."""
+    return result.mbps_per_core if result.mbps_per_core > 0 else result.throughput_mbps
+
+
+def rank(results: List[BackendResult]) -> Dict[str, List[Tuple[str, float, int]]]:
+    """
+    env -> (backend, score, patterns) best first. The score is the geometric mean,
+    over the patterns every backend of the environment ran, of its efficiency
+    relative to the best backend on that pattern (1.0 = best everywhere).
+    """
+    ranking = {}
+    for env in ENVIRONMENTS:
+        by_pattern = {}
+        for r in results:
+            if r.env == env and efficiency(r) > 0:
+                by_pattern.setdefault(r.pattern, {})[r.backend] = efficiency(r)
+        backends = sorted({b for values in by_pattern.values() for b in values})
+        common = [values for values in by_pattern.values() if len(values) == len(backends)]
+        if len(backends) < 2 or not common:
+            continue
+        scores = []
+        for backend in backends:
+            ratios = [values[backend] / max(values.values()) for values in common]
+            scores.append((backend, float(np.exp(np.mean(np.log(ratios)))), len(common)))
+        ranking[env] = sorted(scores, key=lambda s: -s[1])
+    return ranking
+
+
+def analyze(results_dirs: List[str]) -> List[BackendResult]:
+    store = ResultsStore()
+    runs = []
+    for results_dir in results_dirs:
+        store.ingest_run(results_dir)
+        runs.append(store.run_id_for(results_dir))
+    data = store.query(('throughput_mbps', 'mbps_per_core', 'cpu_us_per_io', 'latency_us'), runs=runs)
+    return summarize(data)
+
+
+def write_csv(results: List[BackendResult], path) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(BackendResult)])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(asdict(result))
+
+
+def print_report(results: List[BackendResult]) -> None:
+    print(f"\n{'='*60}")
+    print("STORAGE BACKENDS (MB/s, MB/s per host core)")
+    print(f"{'='*60}")
+    for env in ENVIRONMENTS:
+        env_results = [r for r in results if r.env == env]
+        if not env_results:
+            continue
+        backends = list(dict.fromkeys(r.backend for r in env_results))
+        print(f"\n{env}")
+        print(f"  {'Pattern':<28}" + ''.join(f" {b[:20]:>20}" for b in backends))
+        table = {(r.pattern, r.backend): r for r in env_results}
+        for pattern in dict.fromkeys(r.pattern for r in env_results):
+            line = f"  {pattern[:28]:<28}"
+            for backend in backends:
+                r = table.get((pattern, backend))
+                if r is None:
+                    line += f" {'-':>20}"
+                else:
+                    per_core = f"{r.mbps_per_core:.1f}" if r.mbps_per_core > 0 else 'n/a'
+                    line += f" {f'{r.throughput_mbps:.1f} ({per_core})':>20}"
+            print(line)
+
+    ranking = rank(results)
+    for env, scores in ranking.items():
+        accounted = any(r.mbps_per_core > 0 for r in results if r.env == env)
+        metric = "throughput per core" if accounted else "throughput (no CPU accounting)"
+        print(f"\n  {env}: best {metric} on {scores[0][0]}")
+        for backend, score, patterns in scores:
+            print(f"    {backend:<24} {score:5.2f} of best ({patterns} patterns)")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Throughput per core of each storage backend")
+    parser.add_argument('results_dirs', nargs='+')
+    parser.add_argument('--no-csv', action='store_true', help="Only print the report")
+    args = parser.parse_args(argv)
+
+    for results_dir in args.results_dirs:
+        if not Path(results_dir).is_dir():
+            print(f"Error: Results directory {results_dir} does not exist", file=sys.stderr)
+            return 1
+    results = analyze(args.results_dirs)
+    if not results:
+        print(f"No results in {' '.join(args.results_dirs)}")
+        return 1
+    print_report(results)
+    if not args.no_csv:
+        output = Path(args.results_dirs[0]) / OUTPUT_CSV
+        write_csv(results, output)
+        print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
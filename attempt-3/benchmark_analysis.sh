@@ -0,0 +1,35 @@
+#!/bin/bash
+
+# Benchmark the analysis pipeline itself (benchmarks/, pytest-benchmark) on synthetic results
+# Saves every session's timings and fails when a benchmark's median is more than
+# ANALYSIS_BENCH_THRESHOLD percent slower than in the baseline session
+# Extra arguments go to pytest, e.g. ./benchmark_analysis.sh -k rendering
+
+cd "$(dirname "${BASH_SOURCE[0]}")"
+source ./config.sh
+
+if ! python3 -c "import pytest_benchmark" 2>/dev/null; then
+    echo "pytest-benchmark not found (pip install pytest pytest-benchmark, or the io-analysis[bench] extra)"
+    exit 1
+fi
+
+export ANALYSIS_BENCH_SCALE ANALYSIS_BENCH_DATA
+# Sessions of different scales are not comparable
+storage="$ANALYSIS_BENCH_STORAGE/$ANALYSIS_BENCH_SCALE"
+
+compare=()
+if ls "$storage"/*/*.json >/dev/null 2>&1; then
+    compare=("--benchmark-compare${ANALYSIS_BENCH_BASELINE:+=$ANALYSIS_BENCH_BASELINE}"
+             "--benchmark-compare-fail=median:${ANALYSIS_BENCH_THRESHOLD}%")
+else
+    echo "No saved timings in $storage yet: this session becomes the first baseline"
+fi
+
+echo "=== Analysis benchmarks ($ANALYSIS_BENCH_SCALE) ==="
+python3 -m pytest benchmarks -q --benchmark-storage="$storage" --benchmark-autosave \
+    --benchmark-group-by=group --benchmark-columns=min,median,iqr,rounds "${compare[@]}" "$@"
+status=$?
+if [ $status -ne 0 ]; then
+    echo "Analysis benchmarks FAILED (a benchmark failed or regressed more than ${ANALYSIS_BENCH_THRESHOLD}%)"
+fi
+exit $status
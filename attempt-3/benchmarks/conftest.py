@@ -0,0 +1,103 @@
+"""
+Synthetic datasets of the analysis benchmarks, generated once per session with
+synthetic_results.py. ANALYSIS_BENCH_SCALE picks their size (small, medium,
+large); ANALYSIS_BENCH_DATA keeps them across sessions instead of a temp dir
+"""
+
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import synthetic_results  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+
+SCALE = os.environ.get('ANALYSIS_BENCH_SCALE', 'small')
+DATA_DIR = os.environ.get('ANALYSIS_BENCH_DATA')
+SEED = 0
+HEAVY_ROUNDS = {'small': 5, 'medium': 3, 'large': 1}.get(SCALE, 1)
+STORE_DIR = 'io_results_store'
+
+
+def _dataset(tmp_path_factory, name: str, **options) -> Path:
+    """Generate a dataset, or reuse the one in ANALYSIS_BENCH_DATA made with the same options."""
+    options = dict(options, seed=SEED)
+    if not DATA_DIR:
+        base = tmp_path_factory.mktemp(name)
+        synthetic_results.generate(base, **options)
+        return base
+    base = Path(DATA_DIR) / f"{name}-{SCALE}"
+    stamp = base / 'synthetic.json'
+    if stamp.exists() and json.loads(stamp.read_text()) == options:
+        return base
+    shutil.rmtree(base, ignore_errors=True)
+    synthetic_results.generate(base, **options)
+    stamp.write_text(json.dumps(options))
+    return base
+
+
+@pytest.fixture(scope='session')
+def scale():
+    if SCALE not in synthetic_results.SCALES:
+        pytest.exit(f"ANALYSIS_BENCH_SCALE must be one of {', '.join(synthetic_results.SCALES)}", returncode=2)
+    return synthetic_results.SCALES[SCALE]
+
+
+@pytest.fixture(scope='session')
+def rounds():
+    """Rounds of the benchmarks that take seconds at the larger scales."""
+    return HEAVY_ROUNDS
+
+
+@pytest.fixture(scope='session')
+def fleet(tmp_path_factory, scale):
+    """Many QUICK_TEST runs; Firecracker regresses by 10% two thirds of the way through."""
+    runs = scale['runs']
+    return _dataset(tmp_path_factory, 'fleet', runs=runs, iterations=scale['iterations'], fio_json=False,
+                    step_at=max(2, runs * 2 // 3), step_pct=10.0)
+
+
+@pytest.fixture(scope='session')
+def fleet_store(fleet):
+    """The fleet ingested into the store the CLI uses when run from the fleet directory."""
+    store = ResultsStore(fleet / STORE_DIR)
+    store.ingest_all(base=str(fleet))
+    return store
+
+
+@pytest.fixture(scope='session')
+def run_base(tmp_path_factory, scale):
+    """Directory holding one full-matrix run with fio JSON and per-I/O events."""
+    return _dataset(tmp_path_factory, 'run', runs=1, iterations=scale['iterations'], matrix='full',
+                    io_rows=scale['io_rows'], start='20250301')
+
+
+@pytest.fixture(scope='session')
+def run_dir(run_base):
+    return next(run_base.glob(synthetic_results.RUN_PREFIX + '*'))
+
+
+@pytest.fixture(scope='session')
+def run_store(run_base, run_dir):
+    store = ResultsStore(run_base / STORE_DIR)
+    store.ingest_run(run_dir)
+    return store
+
+
+@pytest.fixture(scope='session')
+def lat_log_file(tmp_path_factory, scale):
+    """Raw fio per-I/O latency log of one throttled iteration, as fio streams it to the host."""
+    path = tmp_path_factory.mktemp('lat_log') / 'fio_latlog_clat.1.log'
+    rng = np.random.default_rng(SEED)
+    job = next(job for job in synthetic_results.select_matrix('quick') if job.name == 'random_read_4k')
+    runtime = synthetic_results.RUNTIME_S
+    episodes = synthetic_results.throttle_episodes(
+        0.0, runtime, synthetic_results.THROTTLE_PROBABILITY['firecracker'], rng)
+    path.write_bytes(synthetic_results.lat_log(scale['io_rows'], 0.0, runtime, 80.0, 320.0, job, episodes, rng))
+    return path
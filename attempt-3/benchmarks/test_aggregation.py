@@ -0,0 +1,26 @@
+"""Aggregation: store queries, fleet-wide partial statistics, merged latency histograms."""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from aggregation import aggregate  # noqa: E402
+from comparison import load_latency_histograms  # noqa: E402
+
+pytestmark = pytest.mark.benchmark(group='aggregation')
+
+
+def test_store_query(benchmark, fleet_store, scale):
+    data = benchmark(fleet_store.query, ('latency_us', 'throughput_mbps'))
+    assert len(set(data['run'])) == scale['runs']
+
+
+@pytest.mark.parametrize('workers', [1, None], ids=['serial', 'parallel'])
+def test_aggregate_fleet(benchmark, fleet_store, scale, rounds, workers):
+    result = benchmark.pedantic(aggregate, (fleet_store,), {'workers': workers}, rounds=rounds)
+    assert result.run_count == scale['runs']
+
+
+def test_merge_latency_histograms(benchmark, run_dir):
+    histograms = benchmark(load_latency_histograms, run_dir)
+    assert histograms
@@ -0,0 +1,70 @@
+"""Ingest: fio JSON, runner CSVs into the results store, per-I/O latency logs."""
+
+import itertools
+import shutil
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from fio_metrics import parse_fio_file  # noqa: E402
+from io_analysis import fast  # noqa: E402
+from latency_histogram import histogram_from_lat_log  # noqa: E402
+from preemption_analysis import ingest_lat_log  # noqa: E402
+from results_store import ResultsStore  # noqa: E402
+
+pytestmark = pytest.mark.benchmark(group='ingest')
+
+
+def test_parse_fio_json(benchmark, run_dir):
+    path = str(next((run_dir / 'fio_json').glob('*.json')))
+    jobs = benchmark(parse_fio_file, path)
+    assert jobs[0].total_ios > 0
+
+
+def test_ingest_run(benchmark, run_dir, rounds, tmp_path):
+    # A fresh store every round, or the fingerprint check would skip the run
+    stores = (ResultsStore(tmp_path / f"store_{n}") for n in itertools.count())
+    entry = benchmark.pedantic(lambda store: store.ingest_run(run_dir),
+                               setup=lambda: ((next(stores),), {}), rounds=rounds)
+    assert entry['rows'] > 0
+
+
+def test_ingest_fleet(benchmark, fleet, scale, rounds, tmp_path):
+    stores = (ResultsStore(tmp_path / f"store_{n}") for n in itertools.count())
+    added = benchmark.pedantic(lambda store: store.ingest_all(base=str(fleet)),
+                               setup=lambda: ((next(stores),), {}), rounds=rounds)
+    assert len(added) == scale['runs']
+
+
+def test_reingest_unchanged(benchmark, fleet_store, fleet):
+    # Every analysis command re-checks its runs; unchanged ones must cost a fingerprint only
+    added = benchmark(fleet_store.ingest_all, base=str(fleet))
+    assert added == []
+
+
+def test_ingest_same_named_runs(benchmark, run_dir, tmp_path):
+    # Two hosts that started a run in the same second: neither may replace the other
+    copies = [shutil.copytree(run_dir, tmp_path / host / run_dir.name) for host in ('host_a', 'host_b')]
+    store = ResultsStore(tmp_path / 'store')
+    store.ingest_run(copies[0])
+    entry = benchmark.pedantic(store.ingest_run, args=(copies[1],), rounds=1)
+    runs = {store.run_id_for(copy) for copy in copies}
+    assert entry is not None and len(runs) == 2 and all(store.has_run(run) for run in runs)
+    assert all((store.root / store.entry(run)['path']).is_dir() for run in runs)
+    assert store.ingest_run(copies[0]) is None
+
+
+def test_fast_load_samples(benchmark, run_dir):
+    samples = benchmark(fast.load_samples, run_dir)
+    assert samples
+
+
+def test_fold_lat_log(benchmark, lat_log_file, scale, rounds):
+    hist = benchmark.pedantic(histogram_from_lat_log, (lat_log_file,), rounds=rounds)
+    assert hist.total == scale['io_rows']
+
+
+def test_ingest_lat_log(benchmark, lat_log_file, scale, rounds, tmp_path):
+    hist = benchmark.pedantic(ingest_lat_log, (lat_log_file, tmp_path / 'events.npz'), rounds=rounds)
+    assert hist.total == scale['io_rows']
@@ -0,0 +1,66 @@
+"""Rendering: every io-analysis entry point end to end, as the CLI runs it."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from io_analysis.cli import main  # noqa: E402
+
+pytestmark = pytest.mark.benchmark(group='rendering')
+
+PACKAGE_DIR = str(Path(__file__).resolve().parent.parent)
+
+
+# The CLI finds its results store (and, for table and blocksize, the latest run) in the working directory
+
+def test_compare(benchmark, run_base, run_dir, run_store, rounds, monkeypatch):
+    monkeypatch.chdir(run_base)
+    assert benchmark.pedantic(main, (['compare', str(run_dir)],), rounds=rounds) == 0
+
+
+def test_compare_live(benchmark, run_dir):
+    assert benchmark(main, ['compare', str(run_dir), '--live']) == 0
+
+
+def test_blocksize(benchmark, run_base, run_store, rounds, monkeypatch):
+    monkeypatch.chdir(run_base)
+    assert benchmark.pedantic(main, (['blocksize'],), rounds=rounds) == 0
+
+
+def test_table(benchmark, run_base, run_store, rounds, monkeypatch):
+    monkeypatch.chdir(run_base)
+    assert benchmark.pedantic(main, (['table'],), rounds=rounds) == 0
+
+
+def test_table_fleet(benchmark, fleet, fleet_store, rounds, monkeypatch):
+    monkeypatch.chdir(fleet)
+    assert benchmark.pedantic(main, (['table', '--fleet'],), rounds=rounds) == 0
+
+
+def test_preemption(benchmark, run_dir, rounds, tmp_path):
+    argv = ['preemption', 'analyze', str(run_dir), '--output', str(tmp_path / 'preemption_summary.csv')]
+    assert benchmark.pedantic(main, (argv,), rounds=rounds) == 0
+
+
+@pytest.mark.parametrize('workers', [1, None], ids=['serial', 'parallel'])
+def test_plot(benchmark, run_base, run_dir, run_store, rounds, workers, tmp_path, monkeypatch):
+    pytest.importorskip('matplotlib')
+    monkeypatch.chdir(run_base)
+    argv = ['plot', str(run_dir), '--output', str(tmp_path)]
+    if workers:
+        argv += ['--workers', str(workers)]
+    assert benchmark.pedantic(main, (argv,), rounds=rounds) == 0
+
+
+def test_startup(benchmark, run_dir, rounds):
+    # Interpreter start and the fast path's imports: what LIVE_SUMMARY adds to every iteration
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PACKAGE_DIR, os.environ.get('PYTHONPATH')])))
+    command = [sys.executable, '-m', 'io_analysis', 'compare', str(run_dir), '--live']
+    result = benchmark.pedantic(subprocess.run, (command,), {'env': env, 'capture_output': True},
+                                rounds=rounds * 2)
+    assert result.returncode == 0
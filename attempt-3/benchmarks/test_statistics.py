@@ -0,0 +1,44 @@
+"""Statistics: bootstrap CIs and Welch tests, fleet comparison, change points, throttling join."""
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from aggregation import aggregate, fleet_comparison  # noqa: E402
+from comparison import load_run  # noqa: E402
+from preemption_analysis import analyze  # noqa: E402
+from regression import DEFAULT_METRICS, find_change_points  # noqa: E402
+from significance import compare_groups  # noqa: E402
+
+pytestmark = pytest.mark.benchmark(group='statistics')
+
+
+def test_compare_groups(benchmark, run_store, run_dir, rounds):
+    data = run_store.query(('throughput_mbps',), runs=[run_dir.name])
+    patterns = sorted(set(data['pattern']))
+    groups = [[data['throughput_mbps'][(data['env'] == env) & (data['pattern'] == p)] for p in patterns]
+              for env in ('container', 'firecracker')]
+    result = benchmark.pedantic(compare_groups, tuple(groups), rounds=rounds)
+    assert len(result['p_value']) == len(patterns)
+
+
+def test_comparison_table(benchmark, run_store, run_dir, rounds):
+    table = benchmark.pedantic(load_run, (run_store, run_dir.name), rounds=rounds)
+    assert (table['count'] > 0).all()
+
+
+def test_fleet_comparison(benchmark, fleet_store):
+    result = aggregate(fleet_store, workers=1)
+    table = benchmark(fleet_comparison, result)
+    assert len(table)
+
+
+def test_change_points(benchmark, fleet_store, rounds):
+    points = benchmark.pedantic(find_change_points, (fleet_store, DEFAULT_METRICS), rounds=rounds)
+    # The fleet's Firecracker regression is there to be found
+    assert any(point['env'] == 'firecracker' for point in points)
+
+
+def test_throttling_join(benchmark, run_dir, rounds):
+    results = benchmark.pedantic(analyze, ([str(run_dir)],), rounds=rounds)
+    assert results
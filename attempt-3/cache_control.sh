@@ -0,0 +1,73 @@
+#!/bin/bash
+
+# Page-cache state control for the IO Performance Comparison Framework
+# CACHE_MODE=cold drops every cache layer before each iteration, CACHE_MODE=warm
+# primes them once per pattern; direct mode leaves them alone (see job_matrix.py CACHE_MODES)
+
+# Source configuration and modules
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+
+# Host files whose page cache sits underneath an environment's test filesystem
+# (Firecracker drive images, the container's loop-device image)
+cache_backing_files() {
+    local env="$1"
+    if [ "$env" = "firecracker" ]; then
+        ls "$FC_TEST_DISK" "$FC_ROOTFS" 2>/dev/null
+    else
+        ls "$CONTAINER_TEST_DISK" 2>/dev/null
+    fi
+}
+
+# Before every iteration in cold mode: guest first (its dirty pages land in the host's cache of
+# the drive image), then the backing files, then the host (which is also the container's kernel)
+cache_reset() {
+    local env="$1"
+    local workdir="$2"
+
+    if [ "$CACHE_MODE" != "cold" ]; then
+        return 0
+    fi
+    if [ "$env" = "firecracker" ]; then
+        env_exec "firecracker" "$workdir" "sync && echo 3 > /proc/sys/vm/drop_caches" 30 >/dev/null 2>&1 \
+            || echo "    Warning: Could not drop the guest page cache"
+    fi
+    sync
+    local files=$(cache_backing_files "$env")
+    if [ -n "$files" ]; then
+        python3 "$FILE_POOL" drop-cache $files || echo "    Warning: Could not evict the $env backing files from the host page cache"
+    fi
+    echo 3 | sudo tee /proc/sys/vm/drop_caches >/dev/null 2>&1 \
+        || echo "    Warning: Could not drop the host page cache (needs root)"
+}
+
+# Once per pattern in warm mode: one unrecorded run of the job fills the caches it will hit
+cache_prime() {
+    local env="$1"
+    local workdir="$2"
+    local io_command="$3"
+
+    if [ "$CACHE_MODE" != "warm" ]; then
+        return 0
+    fi
+    if [ "$FILE_POOL_MODE" != "steady" ]; then
+        echo "    Warning: Without the file pool every iteration re-creates its file; the cache will not stay warm"
+    fi
+    echo "    Priming the page cache (one unrecorded run)..."
+    env_exec "$env" "$workdir" "$io_command >/dev/null 2>&1" 120 \
+        || echo "    Warning: Priming run failed, the first iteration may start cold"
+}
+
+# Wrap a guest command so its stderr carries the guest kernel's block-device read counter
+# (/proc/vmstat pgpgin, KiB) before and after; the container shares the host's counters
+with_guest_read_counter() {
+    local command="$1"
+    local counter="awk '\$1 == \"pgpgin\" {print \"pgpgin\", \$2}' /proc/vmstat >&2"
+    echo "$counter; $command; status=\$?; $counter; exit \$status"
+}
+
+# Bytes the guest read from its block devices while the wrapped command ran (empty if unknown)
+guest_read_bytes() {
+    local err_file="$1"
+    awk '$1 == "pgpgin" { v[n++] = $2 } END { if (n >= 2) printf "%d\n", (v[n-1] - v[0]) * 1024 }' "$err_file" 2>/dev/null
+}
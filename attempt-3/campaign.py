@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Campaign journal for the IO Performance Comparison Framework
+Records every finished (env, backend, pattern, iteration) cell in an append-only,
+fsynced log so an interrupted run resumes into its own results directory
+"""
+
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+JOURNAL = 'campaign.jsonl'
+
+# (env, backend, pattern): one runner invocation, i.e. all iterations of a pattern
+UnitKey = Tuple[str, str, str]
+
+
+@dataclass
+class UnitState:
+    """What the journal says about one unit's iterations."""
+    attempts: int = 0
+    done: int = 0
+    # Consecutive failed attempts since the unit was last entered
+    failures: int = 0
+    rows: int = 0
+    complete: bool = False
+    reason: str = ''
+
+
+class Journal:
+    """Append-only JSON-lines log; each event is on disk before append() returns."""
+
+    def __init__(self, results_dir):
+        self.path = Path(results_dir) / JOURNAL
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def events(self) -> List[Dict]:
+        """All complete events; a line torn by a crash mid-write is ignored."""
+        events = []
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return events
+
+    def append(self, event: str, **fields) -> None:
+        record = dict(event=event, time=round(time.time(), 3), **fields)
+        created = not self.path.exists()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            line = json.dumps(record, sort_keys=True) + '\n'
+            # Terminate a line torn by an earlier crash so this event parses on its own
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                line = '\n' + line
+            os.write(fd, line.encode())
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        if created:
+            # Make the new directory entry itself durable
+            dir_fd = os.open(self.path.parent, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+    def units(self) -> Dict[UnitKey, UnitState]:
+        states = {}
+        for e in self.events():
+            if 'pattern' not in e:
+                continue
+            state = states.setdefault((e['env'], e['backend'], e['pattern']), UnitState())
+            kind = e['event']
+            state.attempts = max(state.attempts, int(e.get('iteration', 0)))
+            if 'rows' in e:
+                state.rows = int(e['rows'])
+            if kind == 'enter':
+                state.failures = 0
+            elif kind == 'done':
+                state.done += 1
+                state.failures = 0
+                state.reason = ''
+            elif kind == 'failed':
+                state.failures += 1
+                state.reason = e.get('reason', '')
+            elif kind in ('complete', 'skipped'):
+                state.complete = True
+                state.reason = e.get('reason', '')
+        return states
+
+    def settings(self) -> Optional[Dict[str, str]]:
+        """Settings the campaign was first started with."""
+        for e in self.events():
+            if e['event'] == 'start':
+                return e.get('settings', {})
+        return None
+
+
+def plan(cells: List[Tuple[str, str]], patterns: List[str], states: Dict[UnitKey, UnitState],
+         provisioned: Optional[Dict[str, str]] = None) -> List[UnitKey]:
+    """
+    Unfinished units in run order. Each environment works through its backends one
+    at a time, starting with the one it is already provisioned on, so it is
+    reprovisioned once per remaining backend at most. Units on the same backend
+    rank run pattern by pattern, alternating environments as a plain run does.
+    """
+    provisioned = provisioned or {}
+    envs = list(dict.fromkeys(env for env, _ in cells))
+    pending = [(env, backend, pattern) for env, backend in cells for pattern in patterns
+               if not states.get((env, backend, pattern), UnitState()).complete]
+
+    rank = {}
+    for env in envs:
+        backends = [b for e, b in cells if e == env and any(u[:2] == (e, b) for u in pending)]
+        if provisioned.get(env) in backends:
+            backends.remove(provisioned[env])
+            backends.insert(0, provisioned[env])
+        rank.update({(env, backend): i for i, backend in enumerate(backends)})
+    return sorted(pending, key=lambda u: (rank[u[:2]], patterns.index(u[2]), envs.index(u[0])))
+
+
+def count_rows(csv_path) -> int:
+    """Data rows (lines after the header) in a runner CSV."""
+    try:
+        with open(csv_path, 'r') as f:
+            return max(sum(1 for line in f if line.strip()) - 1, 0)
+    except OSError:
+        return 0
+
+
+def trim_rows(csv_path, rows: int) -> int:
+    """
+    Drop rows written after the last journaled one (a crash between the CSV append
+    and the journal record). Returns the rows dropped.
+    """
+    try:
+        with open(csv_path, 'r') as f:
+            lines = [line for line in f if line.strip()]
+    except OSError:
+        return 0
+    extra = len(lines) - 1 - rows
+    if extra <= 0:
+        return 0
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.writelines(lines[:rows + 1])
+    os.replace(tmp_path, csv_path)
+    return extra
+
+
+def _parse_cells(values: Iterable[str]) -> List[Tuple[str, str]]:
+    return [tuple(value.split(':', 1)) for value in values]
+
+
+def print_status(journal: Journal) -> None:
+    units = journal.units()
+    complete = [k for k, s in units.items() if s.complete]
+    done = sum(s.done for s in units.values())
+    failed = sum(1 for e in journal.events() if e['event'] == 'failed')
+    print(f"{journal.path}: {len(complete)}/{len(units)} started units complete, "
+          f"{done} iterations done, {failed} failed attempts")
+    for (env, backend, pattern), state in sorted(units.items()):
+        if state.complete and not state.reason:
+            continue
+        status = 'skipped' if state.complete else f"{state.done} done, {state.failures} failing"
+        reason = f" ({state.reason})" if state.reason else ''
+        print(f"  {env:<12} {backend:<22} {pattern:<32} {status}{reason}")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Resumable campaign journal for the benchmark runners")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    start = sub.add_parser('start', help="Record a (re)start; warn if the settings changed since the first")
+    start.add_argument('results_dir')
+    start.add_argument('--resume', action='store_true', help="Fail unless the directory already has a journal")
+    start.add_argument('--setting', action='append', default=[], metavar='NAME=VALUE')
+
+    pl = sub.add_parser('plan', help="Print the unfinished units as 'env backend pattern' lines, in run order")
+    pl.add_argument('results_dir')
+    pl.add_argument('--cells', nargs='+', required=True, metavar='ENV:BACKEND')
+    pl.add_argument('--patterns', nargs='+', required=True)
+    pl.add_argument('--provisioned', nargs='*', default=[], metavar='ENV:BACKEND')
+
+    resume = sub.add_parser('resume', help="Enter a unit: trim its CSV to the journaled rows, "
+                                           "print its attempts and completed iterations")
+    resume.add_argument('results_dir')
+    resume.add_argument('env')
+    resume.add_argument('backend')
+    resume.add_argument('pattern')
+    resume.add_argument('--csv', required=True)
+
+    rec = sub.add_parser('record', help="Journal one iteration (or the whole unit)")
+    rec.add_argument('results_dir')
+    rec.add_argument('env')
+    rec.add_argument('backend')
+    rec.add_argument('pattern')
+    rec.add_argument('status', choices=['done', 'failed', 'complete', 'skipped'])
+    rec.add_argument('--iteration', type=int, default=0)
+    rec.add_argument('--csv', help="Runner CSV, to journal how many rows it holds")
+    rec.add_argument('--reason', default='')
+
+    st = sub.add_parser('status', help="Summarize a campaign's progress")
+    st.add_argument('results_dir')
+
+    args = parser.parse_args(argv)
+    journal = Journal(args.results_dir)
+
+    if args.command == 'start':
+        if args.resume and not journal.exists():
+            print(f"Error: {args.results_dir} has no {JOURNAL} to resume from", file=sys.stderr)
+            return 1
+        settings = dict(s.split('=', 1) for s in args.setting)
+        first = journal.settings()
+        if first is not None:
+            for name in sorted(set(first) | set(settings)):
+                if first.get(name) != settings.get(name):
+                    print(f"Warning: {name} was '{first.get(name, '')}' when the campaign started, "
+                          f"now '{settings.get(name, '')}'", file=sys.stderr)
+        journal.append('resume' if first is not None else 'start', settings=settings)
+        return 0
+
+    if args.command == 'plan':
+        units = plan(_parse_cells(args.cells), args.patterns, journal.units(),
+                     dict(_parse_cells(args.provisioned)))
+        for unit in units:
+            print(' '.join(unit))
+        return 0
+
+    if args.command == 'resume':
+        state = journal.units().get((args.env, args.backend, args.pattern), UnitState())
+        dropped = trim_rows(args.csv, state.rows) if state.attempts else 0
+        if dropped:
+            print(f"Warning: dropped {dropped} unjournaled row(s) from {args.csv}", file=sys.stderr)
+        journal.append('enter', env=args.env, backend=args.backend, pattern=args.pattern,
+                       iteration=state.attempts)
+        print(state.attempts, state.done)
+        return 0
+
+    if args.command == 'status':
+        if not journal.exists():
+            print(f"Error: {args.results_dir} has no {JOURNAL}", file=sys.stderr)
+            return 1
+        print_status(journal)
+        return 0
+
+    fields = dict(env=args.env, backend=args.backend, pattern=args.pattern, iteration=args.iteration)
+    if args.csv:
+        fields['rows'] = count_rows(args.csv)
+    if args.reason:
+        fields['reason'] = args.reason
+    journal.append(args.status, **fields)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,117 @@
+#!/bin/bash
+
+# Campaign journal for the IO Performance Comparison Framework
+# Every finished iteration is recorded (campaign.py) in the results directory, so
+# RESUME_DIR=<results dir> ./run_io_benchmark.sh continues an interrupted run where it stopped
+
+# Source configuration
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+
+CAMPAIGN="$(dirname "${BASH_SOURCE[0]}")/campaign.py"
+
+# Directory holding campaign.jsonl (empty: runners outside a campaign journal nothing);
+# storage-matrix cells write their results below it
+CAMPAIGN_DIR=""
+
+# The unit (env backend pattern) being run, and what the journal held when it was entered
+CAMPAIGN_UNIT=""
+CAMPAIGN_ATTEMPTS=0
+CAMPAIGN_DONE=0
+
+# Iterations a runner call completes before it returns ROUND_PENDING (0: run the pattern to the end)
+ROUND_ITERATIONS=0
+ROUND_PENDING=2
+
+# Open (or with RESUME_DIR, reopen) the journal of RESULTS_DIR
+campaign_start() {
+    local args=()
+    [ -n "$RESUME_DIR" ] && args+=(--resume)
+    local name
+    for name in ITERATIONS ADAPTIVE_ITERATIONS CACHE_MODE STORAGE_MATRIX STEADY_STATE \
+                QUICK_TEST COMPREHENSIVE_TEST FOCUSED_BLOCK_SIZE IO_ENGINES SCALING_SWEEP VCPU_COUNT \
+                SCHEDULE SCHEDULE_SEED FC_CPUSET CONTAINER_CPUSET; do
+        args+=(--setting "$name=${!name}")
+    done
+    mkdir -p "$RESULTS_DIR"
+    python3 "$CAMPAIGN" start "$RESULTS_DIR" "${args[@]}" || return 1
+    CAMPAIGN_DIR="$RESULTS_DIR"
+}
+
+# Unfinished units as "env backend pattern" lines, in the order that reprovisions least
+# Usage: campaign_plan "<env:backend cells>" pattern...
+campaign_plan() {
+    local cells="$1"
+    shift
+    local provisioned=()
+    local env
+    for env in "${!PROVISIONED_BACKEND[@]}"; do
+        provisioned+=("$env:${PROVISIONED_BACKEND[$env]}")
+    done
+    python3 "$CAMPAIGN" plan "$CAMPAIGN_DIR" --cells $cells --patterns "$@" --provisioned "${provisioned[@]}"
+}
+
+# Start a unit: drops CSV rows the journal never confirmed and sets CAMPAIGN_ATTEMPTS
+# (iteration numbers already used) and CAMPAIGN_DONE (iterations that count)
+campaign_enter() {
+    local env="$1"
+    local backend="$2"
+    local pattern="$3"
+    local output_file="$4"
+
+    CAMPAIGN_UNIT="$env $backend $pattern"
+    CAMPAIGN_ATTEMPTS=0
+    CAMPAIGN_DONE=0
+    [ -n "$CAMPAIGN_DIR" ] || return 0
+    read -r CAMPAIGN_ATTEMPTS CAMPAIGN_DONE < <(python3 "$CAMPAIGN" resume "$CAMPAIGN_DIR" $CAMPAIGN_UNIT --csv "$output_file")
+    CAMPAIGN_ATTEMPTS=${CAMPAIGN_ATTEMPTS:-0}
+    CAMPAIGN_DONE=${CAMPAIGN_DONE:-0}
+    # (Interleaved rounds re-enter the unit every time)
+    if [ "$CAMPAIGN_ATTEMPTS" -gt 0 ] && [ "$ROUND_ITERATIONS" -eq 0 ]; then
+        echo "   Resuming $env ($backend): $pattern after $CAMPAIGN_DONE iterations"
+    fi
+}
+
+# Journal one iteration of the current unit (done or failed), after its CSV row is written
+campaign_record() {
+    local status="$1"
+    local iteration="$2"
+    local output_file="$3"
+    local reason="$4"
+    [ -n "$CAMPAIGN_DIR" ] || return 0
+    python3 "$CAMPAIGN" record "$CAMPAIGN_DIR" $CAMPAIGN_UNIT "$status" \
+        --iteration "$iteration" --csv "$output_file" --reason "$reason"
+}
+
+# Mark the current unit finished (complete) or not applicable here (skipped)
+campaign_finish() {
+    local status="${1:-complete}"
+    local reason="$2"
+    [ -n "$CAMPAIGN_DIR" ] || return 0
+    python3 "$CAMPAIGN" record "$CAMPAIGN_DIR" $CAMPAIGN_UNIT "$status" --reason "$reason"
+}
+
+# Seconds to wait before retry number `failures` (RETRY_BACKOFF_S, doubling, at most 300s)
+campaign_backoff() {
+    local failures="$1"
+    local delay=$((RETRY_BACKOFF_S << (failures - 1)))
+    echo $((delay > 300 ? 300 : delay))
+}
+
+# After a failed iteration: wait out the backoff, or return 1 once CELL_RETRIES attempts in a row failed
+campaign_retry() {
+    local failures="$1"
+    local pattern="$2"
+    if [ "$failures" -ge "$CELL_RETRIES" ]; then
+        echo "    $failures failed attempts in a row, leaving $pattern for a later pass"
+        return 1
+    fi
+    local delay=$(campaign_backoff "$failures")
+    echo "    Retrying in ${delay}s"
+    sleep "$delay"
+}
+
+# Succeeds once a runner call has completed its ROUND_ITERATIONS (`completed` counts the whole unit)
+round_complete() {
+    local completed="$1"
+    [ "$ROUND_ITERATIONS" -gt 0 ] && [ $((completed - CAMPAIGN_DONE)) -ge "$ROUND_ITERATIONS" ]
+}
@@ -5,10 +5,11 @@
 
 # Source configuration
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
 
-# Cleanup function
-cleanup() {
-    echo "Cleaning up..."
+# Stop the VM and release its loop-backed test drive (also used when a storage backend changes)
+stop_firecracker_vm() {
+    stop_agent "firecracker"
     
     # Stop Firecracker VM gracefully first
     if [ -S "$API_SOCKET" ]; then
@@ -25,9 +26,36 @@ cleanup() {
             sleep 1
         fi
     fi
+    sudo rm -f "$API_SOCKET"
+    
+    if [ -f "$FC_LOOP_FILE" ]; then
+        local fc_loop=$(cat "$FC_LOOP_FILE" 2>/dev/null || echo "")
+        if [ -n "$fc_loop" ]; then
+            echo "Detaching loop device: $fc_loop"
+            sudo losetup -d "$fc_loop" 2>/dev/null || true
+        fi
+        rm -f "$FC_LOOP_FILE"
+    fi
+}
+
+# Stop and remove the test container and its volume
+stop_container() {
+    stop_agent "container"
+    docker stop "$CONTAINER_NAME" 2>/dev/null || true
+    docker rm "$CONTAINER_NAME" 2>/dev/null || true
+    docker volume rm "$CONTAINER_VOLUME" 2>/dev/null || true
+}
+
+# Cleanup function
+cleanup() {
+    echo "Cleaning up..."
+    
+    # Close the persistent execution channels before their endpoints go away
+    stop_firecracker_vm
+    stop_container
     
     # Clean up cgroups
-    CGROUP_PATHS=("/sys/fs/cgroup/firecracker_io_test" "/sys/fs/cgroup/cpu/firecracker_io_test" "/sys/fs/cgroup/system.slice/firecracker_io_test.service")
+    CGROUP_PATHS=("/sys/fs/cgroup/$FC_CGROUP_NAME" "/sys/fs/cgroup/cpu/$FC_CGROUP_NAME" "/sys/fs/cgroup/system.slice/$FC_CGROUP_NAME.service")
     
     for cgroup_path in "${CGROUP_PATHS[@]}"; do
         if [ -d "$cgroup_path" ]; then
@@ -42,33 +70,25 @@ cleanup() {
         fi
     done
     
-    # Remove socket
-    sudo rm -f "$API_SOCKET"
-    
-    # Cleanup container
-    docker stop io_test_container 2>/dev/null || true
-    docker rm io_test_container 2>/dev/null || true
-    docker volume rm io_test_volume 2>/dev/null || true
-    
     # Cleanup loop device
     if [ -n "${LOOP_DEVICE:-}" ] && [ -e "$LOOP_DEVICE" ]; then
         sudo losetup -d "$LOOP_DEVICE" 2>/dev/null || true
     fi
     
     # Clean up Docker loop device
-    if [ -f "./.docker_loop_device" ]; then
-        LOOP_DEVICE=$(cat ./.docker_loop_device 2>/dev/null || echo "")
+    if [ -f "$CONTAINER_LOOP_FILE" ]; then
+        LOOP_DEVICE=$(cat "$CONTAINER_LOOP_FILE" 2>/dev/null || echo "")
         if [ -n "$LOOP_DEVICE" ]; then
             echo "Detaching loop device: $LOOP_DEVICE"
             sudo losetup -d "$LOOP_DEVICE" 2>/dev/null || true
         fi
-        rm -f ./.docker_loop_device
+        rm -f "$CONTAINER_LOOP_FILE"
     fi
     
     # Alternative: Find and clean up any loop devices associated with our disk image
-    if [ -f "./docker_test_disk.img" ]; then
+    if [ -f "$CONTAINER_TEST_DISK" ]; then
         # Find loop devices using our disk image
-        LOOP_DEVS=$(sudo losetup -j "$(pwd)/docker_test_disk.img" 2>/dev/null | cut -d: -f1 || true)
+        LOOP_DEVS=$(sudo losetup -j "$CONTAINER_TEST_DISK" 2>/dev/null | cut -d: -f1 || true)
         for loop_dev in $LOOP_DEVS; do
             if [ -n "$loop_dev" ]; then
                 echo "Detaching loop device: $loop_dev"
@@ -78,7 +98,7 @@ cleanup() {
     fi
     
     # Clean up disk images
-    rm -f ./docker_test_disk.img 2>/dev/null || true    
+    rm -f "$CONTAINER_TEST_DISK" 2>/dev/null || true    
     # Cleanup network
     sudo ip link del "$TAP_DEV" 2>/dev/null || true
     
@@ -92,19 +112,19 @@ cleanup() {
     # fi
     
     # Clean up resized disk images to save space (keep original in parent directory)
-    if [ -f "./ubuntu-24.04.ext4" ] && [ -f "../ubuntu-24.04.ext4" ]; then
+    if [ -f "$FC_ROOTFS" ] && [ -f "../ubuntu-24.04.ext4" ]; then
         echo "Removing resized disk image (original preserved)..."
-        rm -f "./ubuntu-24.04.ext4"
+        rm -f "$FC_ROOTFS"
     fi
     
     # Clean up test disk if using dedicated disk
-    if [ -f "./test_disk.ext4" ]; then
+    if [ -f "$FC_TEST_DISK" ]; then
         echo "Removing dedicated test disk..."
-        rm -f "./test_disk.ext4"
+        rm -f "$FC_TEST_DISK"
     fi
     
     # Clean up copied files to save space
-    rm -f "./firecracker" "./vmlinux-6.1.141" "./ubuntu-24.04.id_rsa" "./ubuntu-24.04.ext4.backup" 2>/dev/null || true
+    rm -f "./firecracker" "./vmlinux-6.1.141" "./ubuntu-24.04.id_rsa" "$FC_ROOTFS.backup" 2>/dev/null || true
     
     echo "Cleanup complete"
 }
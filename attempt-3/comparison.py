@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Typed Firecracker vs container comparison of one run for the IO Performance Comparison Framework
+One row per pattern in a NumPy structured array of raw floats, built and grouped in
+vectorised passes; reports format numbers only when they render them
+"""
+
+import csv
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from adaptive_iterations import student_t_ppf
+from job_matrix import DEFAULTS, describe, load_manifest, matrix_order
+from latency_histogram import TAIL_PERCENTILES, load_merged
+from results_store import ENVIRONMENTS, RW_OPERATIONS, ResultsStore, block_size_label
+from significance import compare_groups, verdicts
+
+OUTPUT_CSV = 'comparison.csv'
+
+# Per-iteration columns read for every pattern
+STAT_COLUMNS = ('latency_us', 'throughput_mbps', 'cpu_usage', 'cpu_us_per_io', 'mbps_per_core')
+# Compared metrics: short name -> store column, whether higher is better
+METRICS = {'latency': ('latency_us', False), 'throughput': ('throughput_mbps', True)}
+TAIL_KEYS = ('p50', 'p99', 'p999', 'p9999')
+
+# Index of each environment along the per-environment field axis
+CONTAINER, FIRECRACKER = ENVIRONMENTS.index('container'), ENVIRONMENTS.index('firecracker')
+_ENVS = (len(ENVIRONMENTS),)
+
+# One row per pattern; per-environment fields hold one value per ENVIRONMENTS entry.
+# Missing values are NaN (no iterations, no cgroup accounting, no histogram).
+COMPARISON_DTYPE = np.dtype([
+    ('pattern', object), ('operation', object), ('workload', object), ('pattern_type', object),
+    ('rw', object), ('variant', object), ('engine', object), ('block_size', np.int64),
+    ('backend', object, _ENVS), ('count', np.int32, _ENVS),
+    ('latency_mean', np.float64, _ENVS), ('latency_std', np.float64, _ENVS),
+    ('latency_min', np.float64, _ENVS), ('latency_max', np.float64, _ENVS),
+    ('throughput_mean', np.float64, _ENVS), ('throughput_std', np.float64, _ENVS),
+    ('throughput_min', np.float64, _ENVS), ('throughput_max', np.float64, _ENVS),
+    ('cpu_usage', np.float64, _ENVS), ('cpu_us_per_io', np.float64, _ENVS), ('mbps_per_core', np.float64, _ENVS),
+    ('tail_us', np.float64, _ENVS + (len(TAIL_KEYS),)),
+    # Firecracker/container ratio CI and Holm-adjusted Welch p-value (paired patterns only)
+    ('latency_ratio_lo', np.float64), ('latency_ratio_hi', np.float64),
+    ('latency_p', np.float64), ('latency_significant', np.bool_),
+    ('throughput_ratio_lo', np.float64), ('throughput_ratio_hi', np.float64),
+    ('throughput_p', np.float64), ('throughput_significant', np.bool_),
+])
+
+# Per-group summary of summarize_by()
+SUMMARY_DTYPE = np.dtype([
+    ('key', object), ('tests', np.int64), ('latency_change', np.float64),
+    ('throughput_change', np.float64), ('speedup', np.float64), ('best', np.int64),
+])
+
+# Speedup bands of speedup_bands(): <0.9, 0.9-1.1, 1.1-1.5, 1.5-2, >=2
+SPEEDUP_EDGES = (0.9, 1.1, 1.5, 2.0)
+
+
+# Building
+
+def _group_stats(inverse: np.ndarray, groups: int, values: np.ndarray):
+    """Count, mean, sample std, min and max of the finite, positive values of every group."""
+    valid = np.isfinite(values) & (values > 0)
+    index, values = inverse[valid], values[valid]
+    n = np.bincount(index, minlength=groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(index, weights=values, minlength=groups) / n
+        std = np.sqrt(np.bincount(index, weights=(values - mean[index]) ** 2, minlength=groups) / (n - 1))
+    lo = np.full(groups, np.inf)
+    hi = np.full(groups, -np.inf)
+    np.minimum.at(lo, index, values)
+    np.maximum.at(hi, index, values)
+    empty = n == 0
+    lo[empty] = hi[empty] = np.nan
+    return n, mean, std, lo, hi
+
+
+def _samples(inverse: np.ndarray, groups: int, values: np.ndarray) -> List[np.ndarray]:
+    """Valid values of every group, split in one sort."""
+    valid = np.isfinite(values) & (values > 0)
+    order = np.argsort(inverse[valid], kind='stable')
+    counts = np.bincount(inverse[valid], minlength=groups)
+    return np.split(values[valid][order], np.cumsum(counts)[:-1])
+
+
+def build(data: Dict[str, np.ndarray], manifest: Dict[str, Dict], backends: Dict[str, str],
+          histograms: Optional[Dict] = None) -> np.ndarray:
+    """
+    Comparison table of store.query() rows: iterations on each environment's
+    `backends` entry with a latency (zero latency marks a parsing error), one row
+    per pattern in job-matrix order.
+    """
+    histograms = histograms or {}
+    env_index = np.full(len(data['env']), -1)
+    for i, env in enumerate(ENVIRONMENTS):
+        env_index[(data['env'] == env) & (data['backend'] == backends.get(env))] = i
+    keep = (env_index >= 0) & (data['latency_us'] > 0)
+    patterns, pattern_index = np.unique(data['pattern'][keep].astype(str), return_inverse=True)
+    order = sorted(range(len(patterns)), key=lambda p: matrix_order(patterns[p], manifest))
+    rank = np.empty(len(patterns), dtype=np.int64)
+    rank[order] = np.arange(len(patterns))
+    # Group g = row * len(ENVIRONMENTS) + env, so per-group arrays reshape to (rows, envs)
+    inverse = rank[pattern_index.ravel()] * len(ENVIRONMENTS) + env_index[keep]
+    groups = len(patterns) * len(ENVIRONMENTS)
+    shape = (len(patterns), len(ENVIRONMENTS))
+
+    table = np.zeros(len(patterns), dtype=COMPARISON_DTYPE)
+    for metric, (column, _) in METRICS.items():
+        n, mean, std, lo, hi = _group_stats(inverse, groups, data[column][keep])
+        if metric == 'latency':
+            table['count'] = n.reshape(shape)
+        for name, values in (('mean', mean), ('std', std), ('min', lo), ('max', hi)):
+            table[f'{metric}_{name}'] = values.reshape(shape)
+    for column in ('cpu_usage', 'cpu_us_per_io', 'mbps_per_core'):
+        table[column] = _group_stats(inverse, groups, data[column][keep])[1].reshape(shape)
+
+    for row, p in enumerate(order):
+        pattern = str(patterns[p])
+        job = describe(pattern, manifest)
+        table['pattern'][row] = pattern
+        if job is None:
+            table['operation'][row] = table['workload'][row] = 'Unknown'
+            table['pattern_type'][row] = table['rw'][row] = 'unknown'
+            table['variant'][row], table['engine'][row] = '', DEFAULTS['ioengine']
+        else:
+            # Non-default axes (queue depth, jobs, engine, ...) as in the pattern name
+            variant = f" [{job['variant'].strip('_').replace('_', ' ')}]" if job['variant'] else ''
+            table['operation'][row] = job['label'] + variant
+            table['workload'][row] = job['label']
+            table['pattern_type'][row] = job['pattern_type'] + job['variant']
+            table['rw'][row], table['variant'][row] = job['rw'], job['variant']
+            table['engine'][row] = job.get('ioengine', DEFAULTS['ioengine'])
+            table['block_size'][row] = job['block_size']
+        for i, env in enumerate(ENVIRONMENTS):
+            table['backend'][row, i] = backends.get(env)
+            histogram = histograms.get(f"{env}_{pattern}")
+            if histogram is not None and histogram.total:
+                table['tail_us'][row, i] = np.asarray(histogram.percentiles(TAIL_PERCENTILES)) / 1000
+            else:
+                table['tail_us'][row, i] = np.nan
+
+    # Bootstrap CIs and Holm-corrected Welch tests for every paired pattern in one batch
+    pairs = np.flatnonzero((table['count'] > 0).all(axis=1))
+    for metric, (column, _) in METRICS.items():
+        table[f'{metric}_ratio_lo'] = table[f'{metric}_ratio_hi'] = table[f'{metric}_p'] = np.nan
+        if not len(pairs):
+            continue
+        samples = _samples(inverse, groups, data[column][keep])
+        result = compare_groups([samples[r * len(ENVIRONMENTS) + CONTAINER] for r in pairs],
+                                [samples[r * len(ENVIRONMENTS) + FIRECRACKER] for r in pairs])
+        table[f'{metric}_ratio_lo'][pairs] = result['ratio_lo']
+        table[f'{metric}_ratio_hi'][pairs] = result['ratio_hi']
+        table[f'{metric}_p'][pairs] = result['p_adjusted']
+        table[f'{metric}_significant'][pairs] = result['significant']
+    return table
+
+
+def load_latency_histograms(results_dir) -> Dict:
+    """Merge the per-iteration latency histograms of each environment/pattern."""
+    groups = {}
+    # Files are named <env>_<pattern>_<iteration>.npz
+    for path in sorted((Path(results_dir) / 'latency_hist').glob('*.npz')):
+        groups.setdefault(path.stem.rsplit('_', 1)[0], []).append(path)
+    return {key: load_merged(paths) for key, paths in groups.items()}
+
+
+def load_run(store: ResultsStore, run_id: str) -> np.ndarray:
+    """
+    Comparison table of an ingested run; its job manifest and latency histograms are
+    read from the results directory it was ingested from. Storage-matrix runs are
+    compared on each environment's first backend.
+    """
+    source = (store.entry(run_id) or {}).get('source')
+    data = store.query(STAT_COLUMNS, runs=[run_id])
+    return build(data, load_manifest(source), store.primary_backends(run_id),
+                 load_latency_histograms(source) if source else {})
+
+
+def load_comparison(results_dir, store: Optional[ResultsStore] = None) -> np.ndarray:
+    """Comparison table of one results directory (ingested into the store first)."""
+    store = store or ResultsStore()
+    store.ingest_run(results_dir)
+    return load_run(store, store.run_id_for(results_dir))
+
+
+# Derived columns (vectorised over rows)
+
+def paired(table: np.ndarray) -> np.ndarray:
+    """Rows measured in every environment."""
+    return table[(table['count'] > 0).all(axis=1)]
+
+
+def change_pct(table: np.ndarray, metric: str) -> np.ndarray:
+    """Firecracker change relative to the container in percent (NaN without a container value)."""
+    values = table[f'{metric}_mean']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(values[:, CONTAINER] > 0,
+                        (values[:, FIRECRACKER] - values[:, CONTAINER]) / values[:, CONTAINER] * 100, np.nan)
+
+
+def speedup(table: np.ndarray) -> np.ndarray:
+    """Firecracker/container mean throughput."""
+    return 1 + change_pct(table, 'throughput') / 100
+
+
+def relative_ci(table: np.ndarray, metric: str, confidence: float = 0.95) -> np.ndarray:
+    """Student-t CI half-width of each environment's mean relative to the mean (inf when undefined)."""
+    n = table['count'].astype(np.float64)
+    t = np.full(n.shape, np.inf)
+    for count in np.unique(n[n >= 2]):
+        t[n == count] = student_t_ppf(0.5 + confidence / 2.0, count - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rel = t * table[f'{metric}_std'] / np.sqrt(n) / table[f'{metric}_mean']
+    return np.where(np.isfinite(rel), rel, np.inf)
+
+
+def verdict_labels(table: np.ndarray, metric: str) -> List[str]:
+    """'Firecracker', 'Container' or 'No significant difference' per row."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = table[f'{metric}_mean'][:, FIRECRACKER] / table[f'{metric}_mean'][:, CONTAINER]
+    return verdicts({'significant': table[f'{metric}_significant'], 'ratio': ratio},
+                    higher_is_better=METRICS[metric][1])
+
+
+def operation_key(table: np.ndarray) -> np.ndarray:
+    """Operation name of the rw mode plus variant (sequential_write, mixed_qd32, ...)."""
+    return np.array([RW_OPERATIONS.get(rw, pattern) + variant
+                     for rw, variant, pattern in zip(table['rw'], table['variant'], table['pattern'])], dtype=object)
+
+
+def block_labels(table: np.ndarray) -> np.ndarray:
+    return np.array([block_size_label(int(size)) if size else 'Unknown' for size in table['block_size']],
+                    dtype=object)
+
+
+# Grouping
+
+def summarize_by(table: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    One SUMMARY_DTYPE row per distinct key (in order of first appearance): number
+    of tests, mean latency and throughput change, mean speedup (NaNs skipped) and
+    the row index of the highest speedup.
+    """
+    if not len(table):
+        return np.zeros(0, dtype=SUMMARY_DTYPE)
+    unique, first, inverse = np.unique(keys.astype(str), return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    appearance = np.argsort(first)
+    position = np.empty(len(unique), dtype=np.int64)
+    position[appearance] = np.arange(len(unique))
+    inverse = position[inverse]
+    groups = len(unique)
+
+    summary = np.zeros(groups, dtype=SUMMARY_DTYPE)
+    summary['key'] = keys[first[appearance]]
+    summary['tests'] = np.bincount(inverse, minlength=groups)
+    ratios = speedup(table)
+    for name, values in (('latency_change', change_pct(table, 'latency')),
+                         ('throughput_change', change_pct(table, 'throughput')), ('speedup', ratios)):
+        valid = np.isfinite(values)
+        n = np.bincount(inverse[valid], minlength=groups)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            summary[name] = np.bincount(inverse[valid], weights=values[valid], minlength=groups) / n
+    # Highest speedup per group: sort by (group, speedup) and take each group's last row
+    order = np.lexsort((np.nan_to_num(ratios, nan=-np.inf), inverse))
+    last = np.r_[np.flatnonzero(np.diff(inverse[order])), len(order) - 1]
+    summary['best'] = order[last]
+    return summary
+
+
+def speedup_bands(table: np.ndarray) -> np.ndarray:
+    """Significant throughput differences per SPEEDUP_EDGES band, slowest band first."""
+    ratios = speedup(table)
+    counted = table['throughput_significant'] & np.isfinite(ratios)
+    return np.bincount(np.digitize(ratios[counted], SPEEDUP_EDGES), minlength=len(SPEEDUP_EDGES) + 1)
+
+
+# Export
+
+def write_csv(table: np.ndarray, path) -> None:
+    """Raw values, one column per environment for the per-environment fields."""
+    columns = []
+    for name in COMPARISON_DTYPE.names:
+        shape = COMPARISON_DTYPE[name].shape
+        if not shape:
+            columns.append((name, lambda row, name=name: row[name]))
+        elif len(shape) == 1:
+            columns += [(f"{env}_{name}", lambda row, name=name, i=i: row[name][i])
+                        for i, env in enumerate(ENVIRONMENTS)]
+        else:
+            columns += [(f"{env}_tail_{key}_us", lambda row, i=i, k=k: row['tail_us'][i][k])
+                        for i, env in enumerate(ENVIRONMENTS) for k, key in enumerate(TAIL_KEYS)]
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for row in table:
+            writer.writerow([value(row) for _, value in columns])
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Firecracker vs container comparison table of one run")
+    parser.add_argument('results_dir')
+    parser.add_argument('--output', help=f"CSV path (default: {OUTPUT_CSV} in the results directory)")
+    args = parser.parse_args(argv)
+
+    if not Path(args.results_dir).is_dir():
+        print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+        return 1
+    table = load_comparison(args.results_dir)
+    if not len(table):
+        print(f"Error: No results in {args.results_dir}", file=sys.stderr)
+        return 1
+    output = args.output or Path(args.results_dir) / OUTPUT_CSV
+    write_csv(table, output)
+    print(f"Wrote {len(table)} patterns ({len(paired(table))} paired) to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
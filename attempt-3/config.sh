@@ -7,13 +7,108 @@
 TEST_DURATION=${TEST_DURATION:-30}
 DATA_SIZE_MB=${DATA_SIZE_MB:-500}
 ITERATIONS=${ITERATIONS:-3}  # 3 for speed
-RESULTS_DIR="./io_benchmark_results_$(date +%Y%m%d_%H%M%S)"
+
+# Adaptive iterations - stop each pattern once its confidence interval is tight enough
+ADAPTIVE_ITERATIONS=${ADAPTIVE_ITERATIONS:-false}  # true replaces the fixed ITERATIONS
+MIN_ITERATIONS=${MIN_ITERATIONS:-3}
+MAX_ITERATIONS=${MAX_ITERATIONS:-10}
+CI_TARGET=${CI_TARGET:-0.05}  # relative CI half-width (0.05 = ±5%)
+CI_CONFIDENCE=${CI_CONFIDENCE:-0.95}
+CI_METHOD=${CI_METHOD:-t}  # t (Student-t) or bootstrap
+
+# Campaign journal - every finished iteration is recorded in RESULTS_DIR/campaign.jsonl
+RESUME_DIR=${RESUME_DIR:-""}  # results directory of an interrupted run to continue
+CELL_RETRIES=${CELL_RETRIES:-3}  # consecutive failed iterations before a pattern waits for the next pass
+RETRY_BACKOFF_S=${RETRY_BACKOFF_S:-10}  # first retry delay, doubled per failure (max 300s)
+RESULTS_DIR="${RESUME_DIR:-./io_benchmark_results_$(date +%Y%m%d_%H%M%S)}"
+
+# Regression tracking - each run is checked against the blessed baselines in the results store
+# (regression.py); its exit status fails the run on a regression beyond the patterns' noise
+REGRESSION_CHECK=${REGRESSION_CHECK:-false}  # true to check every finished run
+REGRESSION_METRICS=${REGRESSION_METRICS:-"throughput_mbps clat_p99_us"}
+REGRESSION_MIN_EFFECT=${REGRESSION_MIN_EFFECT:-5}  # smallest change (%) that fails a run, however quiet the pattern
+
+# Live summary - after every iteration, the running container vs Firecracker means and CIs of the
+# pattern (io-analysis compare --live: the csv fast path, no numpy)
+LIVE_SUMMARY=${LIVE_SUMMARY:-false}
+
+# Analysis benchmarks (benchmark_analysis.sh) - the analysis pipeline timed on synthetic results
+# (synthetic_results.py); every session's timings are kept in ANALYSIS_BENCH_STORAGE/<scale>
+ANALYSIS_BENCH_SCALE=${ANALYSIS_BENCH_SCALE:-small}  # small (10 runs), medium (1k runs), large (100k runs, 1M-row I/O logs)
+ANALYSIS_BENCH_DATA=${ANALYSIS_BENCH_DATA:-""}  # directory keeping the generated datasets between sessions (empty: temp dir)
+ANALYSIS_BENCH_STORAGE=${ANALYSIS_BENCH_STORAGE:-./.benchmarks}
+ANALYSIS_BENCH_BASELINE=${ANALYSIS_BENCH_BASELINE:-""}  # saved session to compare with, e.g. 0003 (empty: the latest)
+ANALYSIS_BENCH_THRESHOLD=${ANALYSIS_BENCH_THRESHOLD:-20}  # median slowdown (whole %) of any benchmark that fails the session
+
+# Schedule - how the two environments share the host: "sequential" (every iteration of a pattern
+# in one, then the other), "interleaved" (one iteration each per round, in random order) or
+# "concurrent" (both at once on disjoint CPUs and devices; falls back to interleaved if they overlap)
+SCHEDULE=${SCHEDULE:-sequential}
+SCHEDULE_SEED=${SCHEDULE_SEED:-""}  # seed of the interleaved round order (empty: random)
+
+# Density mode - K identical tenants run the same pattern at once (density.sh); the network,
+# Firecracker and container names below are tenant 0's, select_tenant derives the others
+DENSITY_LEVELS=${DENSITY_LEVELS:-""}  # tenant counts, e.g. "1 2 4 8"; empty runs the normal comparison
+DENSITY_ENVS=${DENSITY_ENVS:-"firecracker container"}  # "local": tenants are host processes (no KVM/Docker)
+DENSITY_LOCAL_DIR=${DENSITY_LOCAL_DIR:-/tmp/io_density}  # test directories of the local tenants
+TENANT=""  # current tenant's name suffix (empty: tenant 0, the normal environment)
+
+# Trace replay - production block traces (trace_capture.sh, converted to fio iologs by trace_replay.py)
+# replayed in both environments instead of the job matrix; each phase of a trace is compared
+# with the original's throughput and device latency (needs the per-I/O latency logs)
+TRACE_REPLAY=${TRACE_REPLAY:-""}  # converted traces, e.g. "traces/db.iolog traces/web.iolog"
+TRACE_REPLAY_SPEED=${TRACE_REPLAY_SPEED:-1}  # 2 replays twice as fast as captured, 0 as fast as possible
+TRACE_MAX_RUNTIME=${TRACE_MAX_RUNTIME:-300}  # seconds one replay may run
+TRACE_CAPTURE_TOOL=${TRACE_CAPTURE_TOOL:-auto}  # capture with blktrace, bpftrace or auto (blktrace if installed)
+TRACE_TARGET_SIZE=${TRACE_TARGET_SIZE:-1G}  # replay file the captured offsets are remapped into
+TRACE_REMAP=${TRACE_REMAP:-wrap}  # wrap (offsets modulo the file), scale (device squeezed into it) or none
+TRACE_TIME_SCALE=${TRACE_TIME_SCALE:-1}  # captured timestamps multiplied by this (0.5: twice as dense)
+TRACE_PHASE_S=${TRACE_PHASE_S:-10}  # length of the phases compared after replay
+
+# Latency logging - per-I/O fio latency logs folded into mergeable histograms
+LATENCY_LOG=${LATENCY_LOG:-$([ -n "$TRACE_REPLAY" ] && echo true || echo false)}  # true to enable write_lat_log
+LATENCY_HIST_MSEC=${LATENCY_HIST_MSEC:-0}  # >0 uses fio histogram logs (log_hist_msec) instead
+THROTTLE_JOIN=${THROTTLE_JOIN:-false}  # true keeps each per-I/O log on the monotonic clock to join with cgroup throttling
+
+# Steady state - fio bandwidth/IOPS logs split into warm-up and steady window (steady_state.py)
+STEADY_STATE=${STEADY_STATE:-off}  # "log" records the logs, "adaptive" also ends each job once steady
+STEADY_LOG_MSEC=${STEADY_LOG_MSEC:-250}  # log resolution (100-500ms)
+STEADY_HOLD=${STEADY_HOLD:-5}  # seconds throughput must hold steady
+STEADY_RANGE_PCT=${STEADY_RANGE_PCT:-20}  # largest max-min spread within the hold, % of mean
+STEADY_SLOPE_PCT=${STEADY_SLOPE_PCT:-10}  # largest trend across the hold, % of mean
+STEADY_MAX_RUNTIME=${STEADY_MAX_RUNTIME:-60}  # adaptive: seconds a job that never settles may run
+
+# Telemetry - /proc and cgroup v2 counters joined to each iteration
+# THROTTLE_JOIN needs samples well inside one 100ms CFS period
+TELEMETRY_INTERVAL_MS=${TELEMETRY_INTERVAL_MS:-$([ "$THROTTLE_JOIN" = "true" ] && echo 10 || echo 100)}  # sampling period (50-100ms, 10ms with THROTTLE_JOIN)
+
+# Execution channel - one persistent io_agent.py session per environment
+USE_AGENT=${USE_AGENT:-true}  # false for one SSH/docker exec per step
+AGENT_TRANSPORT=${AGENT_TRANSPORT:-""}  # "local" runs the agent as a host subprocess (testing)
+
+# Test files - "steady" reuses preallocated, preconditioned files; "fresh" re-lays them out every iteration
+FILE_POOL_MODE=${FILE_POOL_MODE:-steady}
+
+# Page-cache regime - "direct" (O_DIRECT), "cold" (buffered; guest, container and host caches
+# and the drive backing files dropped before every iteration) or "warm" (buffered, primed once)
+CACHE_MODE=${CACHE_MODE:-direct}
 
 # Test modes
 QUICK_TEST=${QUICK_TEST:-false}  # true for subset
 COMPREHENSIVE_TEST=${COMPREHENSIVE_TEST:-false}  # true for all 17 patterns
 FOCUSED_BLOCK_SIZE=${FOCUSED_BLOCK_SIZE:-""}  # "4k", "64k", "1m"
 
+# Scaling sweep - iodepth x numjobs curves of a few patterns instead of the normal list
+SCALING_SWEEP=${SCALING_SWEEP:-false}  # true to run only the sweep
+SWEEP_PATTERNS=${SWEEP_PATTERNS:-"random_read_4k random_write_4k"}
+SWEEP_IODEPTHS=${SWEEP_IODEPTHS:-"1 2 4 8 16 32 64 128 256"}
+SWEEP_NUMJOBS=${SWEEP_NUMJOBS:-""}  # default: 1 .. VCPU_COUNT rounded up
+
+# I/O engines - run every selected pattern once per engine (job_matrix.py ENGINES:
+# psync libaio io_uring io_uring_fixed io_uring_sqpoll mmap); unsupported ones are skipped
+IO_ENGINES=${IO_ENGINES:-""}  # e.g. "psync libaio io_uring_sqpoll"; empty keeps psync only
+ENGINE_IODEPTH=${ENGINE_IODEPTH:-32}  # queue depth of the asynchronous engines
+
 # Network config
 TAP_DEV="tap1"  # avoid conflicts
 TAP_IP="172.17.0.1"
@@ -24,6 +119,9 @@ FC_MAC="06:00:AC:11:00:02"
 # Firecracker config
 API_SOCKET="/tmp/firecracker-io-test.socket"
 LOGFILE="./firecracker-io-test.log"
+FC_ROOTFS="$(pwd)/ubuntu-24.04.ext4"  # writable copy of ../ubuntu-24.04.ext4
+FC_CGROUP_NAME="firecracker_io_test"
+FC_LOOP_FILE="./.firecracker_loop_device"
 
 # VM resources
 VCPU_COUNT=${VCPU_COUNT:-0.5}    # fractional vCPUs
@@ -31,42 +129,55 @@ MEMORY_SIZE_MIB=${MEMORY_SIZE_MIB:-2048}  # VM memory MB
 DISK_SIZE_MB=${DISK_SIZE_MB:-2048}  # test disk MB
 USE_DEDICATED_TEST_DISK=${USE_DEDICATED_TEST_DISK:-false}  # separate disk vs root fs
 
+# Host CPUs (cpuset lists, e.g. "2-3") and directories of the test-disk images of each environment;
+# SCHEDULE=concurrent assigns empty CPU sets itself and needs the images on different devices
+FC_CPUSET=${FC_CPUSET:-""}
+CONTAINER_CPUSET=${CONTAINER_CPUSET:-""}
+FC_TEST_DISK="$(realpath -m "${FC_DISK_DIR:-.}")/test_disk.ext4"
+CONTAINER_TEST_DISK="$(realpath -m "${CONTAINER_DISK_DIR:-.}")/docker_test_disk.img"
+
+# Firecracker test drive (storage_backends.sh) - backing "rootfs" (test data on the root image),
+# "file" (dedicated disk image) or "loop" (the same image through a host loop device)
+FC_DRIVE_BACKING=${FC_DRIVE_BACKING:-$([ "$USE_DEDICATED_TEST_DISK" = "true" ] && echo file || echo rootfs)}
+FC_DRIVE_CACHE=${FC_DRIVE_CACHE:-Unsafe}  # Unsafe (ignores guest flushes) or Writeback
+FC_DRIVE_IO_ENGINE=${FC_DRIVE_IO_ENGINE:-Sync}  # Sync or Async (io_uring on the host)
+[ "$FC_DRIVE_BACKING" != "rootfs" ] && USE_DEDICATED_TEST_DISK=true
+
 # Container config
-CONTAINER_STORAGE_MODE=${CONTAINER_STORAGE_MODE:-tmpfs}  # volume, tmpfs, overlay
+CONTAINER_NAME="io_test_container"
+CONTAINER_VOLUME="io_test_volume"
+CONTAINER_LOOP_FILE="./.docker_loop_device"
+CONTAINER_STORAGE_MODE=${CONTAINER_STORAGE_MODE:-loop}  # loop (ext4 on a loop device), volume, tmpfs or overlay
+
+# Storage-backend matrix - "env:backend" cells, each run on a freshly provisioned backend
+# (e.g. "container:volume firecracker:loop-writeback-async"; "all" for every backend)
+STORAGE_MATRIX=${STORAGE_MATRIX:-""}
 ENABLE_CONTAINER_OPTIMIZATIONS=${ENABLE_CONTAINER_OPTIMIZATIONS:-true}  # memory limits, etc
 
 # Shared storage
 LOOP_DEVICE=""
 
-# Test patterns - multiple block sizes
+# Test patterns - generated from the declared axes in job_matrix.py
+# (rw, bs, size, iodepth, numjobs, ioengine, sync/direct, rwmixread)
+JOB_MATRIX="$(dirname "${BASH_SOURCE[0]}")/job_matrix.py"
+JOB_MATRIX_ARGS=(--cache-mode "$CACHE_MODE")
+if [ "$SCALING_SWEEP" = "true" ]; then
+    JOB_MATRIX_ARGS+=(--sweep $SWEEP_PATTERNS --iodepths $SWEEP_IODEPTHS --vcpus "$VCPU_COUNT")
+    [ -n "$SWEEP_NUMJOBS" ] && JOB_MATRIX_ARGS+=(--numjobs $SWEEP_NUMJOBS)
+elif [ -n "$IO_ENGINES" ]; then
+    JOB_MATRIX_ARGS+=(--engines $IO_ENGINES --engine-iodepth "$ENGINE_IODEPTH")
+fi
+# With TRACE_REPLAY, one replay job per converted trace (trace_replay.py) instead
+TRACE_REPLAY_TOOL="$(dirname "${BASH_SOURCE[0]}")/trace_replay.py"
+TRACE_REPLAY_ARGS=($TRACE_REPLAY --speed "$TRACE_REPLAY_SPEED" --cache-mode "$CACHE_MODE" --max-runtime "$TRACE_MAX_RUNTIME")
 if [ ${#IO_PATTERNS[@]} -eq 0 ]; then
-    declare -A IO_PATTERNS=(
-        # 4K tests - fair comparison
-        # direct=1 removed for consistent caching
-        ["random_write_4k"]="fio --name=random_write_4k --rw=randwrite --size=100M --bs=4k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_4k_file --sync=1 --direct=1"
-        ["random_read_4k"]="fio --name=random_read_4k --rw=randread --size=100M --bs=4k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_4k_file --sync=1 --direct=1"
-        ["sequential_write_4k"]="fio --name=seq_write_4k --rw=write --size=100M --bs=4k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_4k_file --sync=1 --direct=1"
-        ["sequential_read_4k"]="fio --name=seq_read_4k --rw=read --size=100M --bs=4k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_4k_file --sync=1 --direct=1"
-        
-        # 64K tests - fair comparison  
-        ["random_write_64k"]="fio --name=random_write_64k --rw=randwrite --size=200M --bs=64k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_64k_file --sync=1 --direct=1"
-        ["random_read_64k"]="fio --name=random_read_64k --rw=randread --size=200M --bs=64k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_64k_file --sync=1 --direct=1"
-        ["sequential_write_64k"]="fio --name=seq_write_64k --rw=write --size=200M --bs=64k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_64k_file --sync=1 --direct=1"
-        ["sequential_read_64k"]="fio --name=seq_read_64k --rw=read --size=200M --bs=64k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_64k_file --sync=1 --direct=1"
-        
-        # 1M tests - fair comparison
-        ["random_write_1m"]="fio --name=random_write_1m --rw=randwrite --size=500M --bs=1M --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_1m_file --sync=1 --direct=1"
-        ["random_read_1m"]="fio --name=random_read_1m --rw=randread --size=500M --bs=1M --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_1m_file --sync=1 --direct=1"
-        ["sequential_write_1m"]="fio --name=seq_write_1m --rw=write --size=500M --bs=1M --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_1m_file --sync=1 --direct=1"
-        ["sequential_read_1m"]="fio --name=seq_read_1m --rw=read --size=500M --bs=1M --numjobs=1 --runtime=10s --time_based --group_reporting --filename=seq_1m_file --sync=1 --direct=1"
-        
-        # Mixed workloads
-        ["mixed_4k"]="fio --name=mixed_4k --rw=randrw --rwmixread=70 --size=100M --bs=4k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=mixed_4k_file --fsync=1 --sync=1 --direct=1"
-        ["mixed_64k"]="fio --name=mixed_64k --rw=randrw --rwmixread=70 --size=200M --bs=64k --numjobs=1 --runtime=10s --time_based --group_reporting --filename=mixed_64k_file --fsync=1 --sync=1 --direct=1"
-        ["mixed_1m"]="fio --name=mixed_1m --rw=randrw --rwmixread=70 --size=500M --bs=1M --numjobs=1 --runtime=10s --time_based --group_reporting --filename=mixed_1m_file --fsync=1 --sync=1 --direct=1"
-        
-        # 512B tests - edge case
-        ["random_write_512b"]="fio --name=random_write_512b --rw=randwrite --size=50M --bs=512 --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_512b_file --fsync=1 --sync=1 --direct=1"
-        ["random_read_512b"]="fio --name=random_read_512b --rw=randread --size=50M --bs=512 --numjobs=1 --runtime=10s --time_based --group_reporting --filename=rand_512b_file --sync=1 --direct=1"
-    )
+    declare -gA IO_PATTERNS=()
+    while IFS=$'\t' read -r job_name job_command; do
+        IO_PATTERNS["$job_name"]="$job_command"
+    done < <(if [ -n "$TRACE_REPLAY" ]; then
+                 python3 "$TRACE_REPLAY_TOOL" commands "${TRACE_REPLAY_ARGS[@]}"
+             else
+                 python3 "$JOB_MATRIX" commands "${JOB_MATRIX_ARGS[@]}"
+             fi)
+    unset job_name job_command
 fi
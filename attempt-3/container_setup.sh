@@ -12,67 +12,102 @@ setup_container() {
     echo "Setting up test container..."
     
     # Stop any existing container
-    docker stop io_test_container 2>/dev/null || true
-    docker rm io_test_container 2>/dev/null || true
+    docker stop "$CONTAINER_NAME" 2>/dev/null || true
+    docker rm "$CONTAINER_NAME" 2>/dev/null || true
     
     # Create a dedicated volume for fair IO comparison
-    docker volume rm io_test_volume 2>/dev/null || true
-    docker volume create io_test_volume
+    docker volume rm "$CONTAINER_VOLUME" 2>/dev/null || true
+    docker volume create "$CONTAINER_VOLUME"
     
     # Clean up any existing loop devices for our disk image first
-    if [ -f "./docker_test_disk.img" ]; then
+    if [ -f "$CONTAINER_TEST_DISK" ]; then
         echo "Cleaning up any existing loop devices..."
-        OLD_LOOPS=$(sudo losetup -j "$(pwd)/docker_test_disk.img" 2>/dev/null | cut -d: -f1 || true)
+        OLD_LOOPS=$(sudo losetup -j "$CONTAINER_TEST_DISK" 2>/dev/null | cut -d: -f1 || true)
         for old_loop in $OLD_LOOPS; do
             if [ -n "$old_loop" ]; then
                 sudo losetup -d "$old_loop" 2>/dev/null || true
             fi
         done
-        rm -f ./docker_test_disk.img
+        rm -f "$CONTAINER_TEST_DISK"
     fi
     
-    # Create raw disk image for Docker (same as Firecracker)
-    echo "Creating raw disk image for Docker container (${DISK_SIZE_MB}MB)..."
-    dd if=/dev/zero of="./docker_test_disk.img" bs=1M count="$DISK_SIZE_MB" 2>/dev/null
+    rm -f "$CONTAINER_LOOP_FILE"
     
-    # Create loop device for the raw disk
-    LOOP_DEVICE=$(sudo losetup --find --show "$(pwd)/docker_test_disk.img")
-    if [ -z "$LOOP_DEVICE" ]; then
-        echo "Error: Failed to create loop device"
-        return 1
-    fi
-    echo "Created loop device: $LOOP_DEVICE"
-    
-    # Format the loop device with ext4 (same as Firecracker)
-    sudo mkfs.ext4 -F "$LOOP_DEVICE" >/dev/null 2>&1
-    echo "Formatted $LOOP_DEVICE with ext4 filesystem"
+    # Where /mnt/test_data lives (storage backend): ext4 on a loop device, a named volume,
+    # tmpfs, or the container's own overlay layer
+    local storage_args=()
+    local mount_step="mkdir -p /mnt/test_data"
+    case "$CONTAINER_STORAGE_MODE" in
+        loop)
+            # Create raw disk image for Docker (same as Firecracker)
+            echo "Creating raw disk image for Docker container (${DISK_SIZE_MB}MB)..."
+            mkdir -p "$(dirname "$CONTAINER_TEST_DISK")"
+            dd if=/dev/zero of="$CONTAINER_TEST_DISK" bs=1M count="$DISK_SIZE_MB" 2>/dev/null
+            
+            # Create loop device for the raw disk
+            LOOP_DEVICE=$(sudo losetup --find --show "$CONTAINER_TEST_DISK")
+            if [ -z "$LOOP_DEVICE" ]; then
+                echo "Error: Failed to create loop device"
+                return 1
+            fi
+            echo "Created loop device: $LOOP_DEVICE"
+            
+            # Format the loop device with ext4 (same as Firecracker)
+            sudo mkfs.ext4 -F "$LOOP_DEVICE" >/dev/null 2>&1
+            echo "Formatted $LOOP_DEVICE with ext4 filesystem"
+            
+            # Store loop device for cleanup
+            echo "$LOOP_DEVICE" > "$CONTAINER_LOOP_FILE"
+            storage_args=(--device="$LOOP_DEVICE:/dev/test_disk" -e LOOP_DEVICE="/dev/test_disk")
+            mount_step="mkdir -p /mnt/test_data && mount /dev/test_disk /mnt/test_data"
+            ;;
+        volume)
+            storage_args=(-v "$CONTAINER_VOLUME:/mnt/test_data")
+            ;;
+        tmpfs)
+            # Pages of a tmpfs count against the container's memory limit, and tmpfs has no O_DIRECT
+            storage_args=(--tmpfs "/mnt/test_data:rw,size=${DISK_SIZE_MB}m")
+            if [ "$CACHE_MODE" = "direct" ]; then
+                echo "Warning: tmpfs does not support O_DIRECT, direct-mode patterns will fail (use CACHE_MODE=warm)"
+            fi
+            ;;
+        overlay)
+            ;;
+        *)
+            echo "Error: Unknown CONTAINER_STORAGE_MODE '$CONTAINER_STORAGE_MODE' (loop, volume, tmpfs, overlay)"
+            return 1
+            ;;
+    esac
     
-    # Store loop device for cleanup
-    echo "$LOOP_DEVICE" > ./.docker_loop_device
+    # Pinned to its own host CPUs (concurrent schedule)
+    local cpu_args=()
+    if [ -n "$CONTAINER_CPUSET" ]; then
+        cpu_args=(--cpuset-cpus="$CONTAINER_CPUSET")
+        echo "Container pinned to CPUs $CONTAINER_CPUSET"
+    fi
     
-    # Start container with raw block device access for fair comparison
-    echo "Starting container with raw block device access..."
+    # Start container with the selected test storage
+    echo "Starting container with $CONTAINER_STORAGE_MODE test storage..."
     docker run -d \
-        --name io_test_container \
+        --name "$CONTAINER_NAME" \
         --network host \
         --privileged \
         --cpus="$VCPU_COUNT" \
+        "${cpu_args[@]}" \
         --memory="${MEMORY_SIZE_MIB}m" \
         --shm-size=1g \
         --tmpfs /tmp:noexec,nosuid,size=100m \
-        --device="$LOOP_DEVICE:/dev/test_disk" \
-        -e LOOP_DEVICE="/dev/test_disk" \
+        "${storage_args[@]}" \
         ubuntu:20.04 \
         /bin/bash -c "
             echo 'CONTAINER_STARTING' && 
             echo 'nameserver 8.8.8.8' > /etc/resolv.conf &&
             echo 'nameserver 8.8.4.4' >> /etc/resolv.conf &&
             apt-get update -qq && 
-            apt-get install -y fio sysstat bc procps && 
+            apt-get install -y fio sysstat bc procps python3-minimal && 
             
-            # Setup test directory and mount the dedicated block device for fair comparison
-            mkdir -p /mnt/test_data &&
-            mount /dev/test_disk /mnt/test_data &&
+            # Setup test directory (mounts the dedicated block device in loop mode)
+            $mount_step &&
             chmod 777 /mnt/test_data &&
             cd /mnt/test_data && rm -rf ./* 2>/dev/null || true &&
             sync &&
@@ -93,18 +128,18 @@ setup_container() {
     local count=0
     while [ $count -lt 120 ]; do  # Increased timeout to 120s for package installation
         # Check if container is still running
-        if ! docker ps --filter "name=io_test_container" --filter "status=running" | grep -q io_test_container; then
+        if ! docker ps --filter "name=^${CONTAINER_NAME}$" --filter "status=running" | grep -q "$CONTAINER_NAME"; then
             echo "Error: Container stopped unexpectedly"
             echo "Container logs:"
-            docker logs io_test_container
+            docker logs "$CONTAINER_NAME"
             return 1
         fi
         
         # Check for completion markers in logs
-        if docker logs io_test_container 2>/dev/null | grep -q "CONTAINER_FIO_WORKING"; then
+        if docker logs "$CONTAINER_NAME" 2>/dev/null | grep -q "CONTAINER_FIO_WORKING"; then
             echo "Container ready"
             # Final verification
-            if docker exec io_test_container fio --version >/dev/null 2>&1; then
+            if docker exec "$CONTAINER_NAME" fio --version >/dev/null 2>&1; then
                 echo "Container setup completed successfully"
                 return 0
             else
@@ -118,6 +153,6 @@ setup_container() {
     
     echo "Error: Container setup timed out"
     echo "Container logs:"
-    docker logs io_test_container
+    docker logs "$CONTAINER_NAME"
     return 1
 }
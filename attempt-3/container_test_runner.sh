@@ -7,6 +7,9 @@
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
 source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
 source "$(dirname "${BASH_SOURCE[0]}")/metrics_parser.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/cache_control.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/campaign.sh"
 
 # Container IO testing
 run_container_io_test() {
@@ -15,99 +18,139 @@ run_container_io_test() {
     local output_file="$3"
     
     echo "Running container IO test: $test_name"
-    echo "timestamp,operation,latency_us,throughput_mbps,cpu_usage" > "$output_file"
+    # A resumed pattern appends to the rows an interrupted run journaled (campaign_enter)
+    [ "$CAMPAIGN_ATTEMPTS" -gt 0 ] || write_results_header "$output_file"
+    local json_dir=$(fio_json_dir)
     
-    for i in $(seq 1 $ITERATIONS); do
-        echo "  Container test $i/$ITERATIONS..."
+    # Persistent channel into the container; falls back to one docker exec per step
+    local agent_ready=false
+    start_agent "container" && agent_ready=true
+    
+    # Preconditioned file reused by every iteration (FILE_POOL_MODE=steady);
+    # this pattern keeps fresh-file semantics if the pool cannot be prepared
+    local FILE_POOL_MODE="$FILE_POOL_MODE"
+    prepare_file_pool "container" "/mnt/test_data" "$io_command" || FILE_POOL_MODE=fresh
+    cache_prime "container" "/mnt/test_data" "$io_command"
+    
+    # i numbers attempts (file names), completed counts the iterations that produced a result
+    local i=$CAMPAIGN_ATTEMPTS
+    local completed=$CAMPAIGN_DONE
+    local failures=0
+    while iterations_remaining "container" "$test_name" "$output_file" "$completed"; do
+        # An interleaved schedule hands over to the other environment after each round
+        round_complete "$completed" && return $ROUND_PENDING
+        i=$((i + 1))
+        echo "  Container test $((completed + 1))/$(iteration_budget)..."
         
         # Check if container is still running
-        if ! docker ps --filter "name=io_test_container" --filter "status=running" | grep -q io_test_container; then
+        if ! docker ps --filter "name=^${CONTAINER_NAME}$" --filter "status=running" | grep -q "$CONTAINER_NAME"; then
             echo "  Container stopped unexpectedly, restarting..."
             source "$(dirname "${BASH_SOURCE[0]}")/container_setup.sh"
             setup_container
             sleep 2
+            # The old channel died with the container
+            stop_agent "container"
+            agent_ready=false
+            start_agent "container" && agent_ready=true
+            prepare_file_pool "container" "/mnt/test_data" "$io_command" || FILE_POOL_MODE=fresh
         fi
         
         # Execute IO operation and extract fio metrics - use dedicated test volume
-        # Clean up previous test files first
-        docker exec io_test_container /bin/bash -c "
-            cd /mnt/test_data 2>/dev/null || mkdir -p /mnt/test_data
-            # Remove all test files
-            rm -rf test_seq *.fio fio_test_file random_* mixed* testfile* seq_test_file rand_test_file mixed_test_file *_4k_* *_64k_* *_1m_* *_512b_* *.file 2>/dev/null || true
-            sync
-        " >/dev/null 2>&1 || true
-        
-        # Execute the actual test
-        result=$(docker exec io_test_container /bin/bash -c "cd /mnt/test_data && $io_command" 2>&1)
-        
-        # Clean up the test file immediately after the test
-        docker exec io_test_container /bin/bash -c "cd /mnt/test_data && rm -f *_4k_* *_64k_* *_1m_* *_512b_* *.file 2>/dev/null && sync" >/dev/null 2>&1 || true
+        json_file="${json_dir}/container_${test_name}_${i}.json"
+        cache_reset "container" "/mnt/test_data"
+        # Host CPU charged to the container's cgroup across the fio run
+        cgroup=$(telemetry_cgroup "container")
         
-        # Debug: show first few lines of fio output
-        echo "    Debug: fio output preview:"
-        echo "$result" | head -n 10 | sed 's/^/      /'
+        # Logs the agent brings back in its reply (removed once folded)
+        latency_payload="${json_file%.json}.lat"
+        steady_payload="${json_file%.json}.steady"
         
-        # Extract metrics from fio output
-        latency_us="0"
-        throughput_mb="0"
-        iops="0"
-        
-        if [[ "$result" == "timeout_or_error" ]] || [[ "$result" == "container_not_running" ]] || echo "$result" | grep -q "docker:.*not found\|Error response from daemon"; then
-            echo "    Error: Container execution failed"
-            echo "    Skipping this iteration"
-            latency_us="0"
-            throughput_mb="0"
-        elif [[ "$result" != "timeout_or_error" ]] && echo "$result" | grep -q "Run status"; then
-            # Use metrics parser functions
-            latency_us=$(parse_latency "$result")
-            throughput_mb=$(parse_throughput "$result")
-            
-            # Extract IOPS from the main line
-            # Format: "write: IOPS=13.5k, BW=52.6MiB/s"
-            if echo "$result" | grep -q "IOPS="; then
-                iops_raw=$(echo "$result" | grep "IOPS=" | sed -n 's/.*IOPS=\([0-9.k]*\).*/\1/p')
-                # Convert k notation (e.g., "13.5k" -> "13500")
-                if echo "$iops_raw" | grep -q "k"; then
-                    iops_num=$(echo "$iops_raw" | sed 's/k//')
-                    if [[ "$iops_num" =~ ^[0-9.]+$ ]]; then
-                        iops=$(echo "$iops_num * 1000" | bc -l | cut -d. -f1)
-                    fi
-                elif [[ "$iops_raw" =~ ^[0-9.]+$ ]]; then
-                    iops="$iops_raw"
-                fi
+        agent_status=$AGENT_UNAVAILABLE
+        if [ "$agent_ready" = "true" ]; then
+            # Cleanup, fio and cleanup in one round-trip over the persistent channel;
+            # start/end come back as the fio run's own window on the host clock,
+            # together with the latency and bw/iops logs
+            cpu_before=$(cgroup_cpu_usec "$cgroup")
+            agent_output=$(agent_run "container" "/mnt/test_data" "$io_command $FIO_OUTPUT_FORMAT $(latency_log_options) $(steady_state_options)" \
+                "$json_file" "${json_file%.json}.err" "$(fio_timeout)" "$latency_payload" "$steady_payload")
+            agent_status=$?
+            cpu_after=$(cgroup_cpu_usec "$cgroup")
+            if [ $agent_status -eq $AGENT_UNAVAILABLE ]; then
+                echo "    Warning: Agent channel lost, falling back to per-step docker exec"
+                agent_ready=false
             fi
-        elif echo "$result" | grep -q "copied"; then
-            # Handle dd output format (keeping for backwards compatibility)
-            # Format: "104857600 bytes (105 MB, 100 MiB) copied, 0.280155 s, 374 MB/s"
-            if echo "$result" | grep -oE '[0-9.]+ [GM]B/s'; then
-                dd_throughput=$(echo "$result" | grep -oE '[0-9.]+ [GM]B/s' | tail -1)
-                if echo "$dd_throughput" | grep -q "GB/s"; then
-                    throughput_gb=$(echo "$dd_throughput" | sed 's/ GB\/s//')
-                    if [[ "$throughput_gb" =~ ^[0-9.]+$ ]]; then
-                        throughput_mb=$(echo "$throughput_gb * 1000" | bc -l | xargs printf "%.2f")
-                    fi
-                elif echo "$dd_throughput" | grep -q "MB/s"; then
-                    throughput_mb=$(echo "$dd_throughput" | sed 's/ MB\/s//')
-                fi
+        fi
+        
+        if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+            # The container shares the host's monotonic clock: its offset is not needed
+            read -r start_time end_time _ _ <<< "$agent_output"
+            if [ $agent_status -ne 0 ]; then
+                echo "    Error: Container execution failed"
+                echo "    Output preview: $(head -n 2 "${json_file%.json}.err" | tr '\n' ' ')"
             fi
-            
-            # For dd, we don't have latency info, so leave it as 0
-            latency_us="0"
         else
-            echo "    Warning: IO command produced unexpected output format"
-            echo "    Output preview: $(echo "$result" | head -n 2 | tr '\n' ' ')"
+            # Clean up previous test files first
+            docker exec "$CONTAINER_NAME" /bin/bash -c "
+                cd /mnt/test_data 2>/dev/null || mkdir -p /mnt/test_data
+                # Remove all test files
+                $(test_file_cleanup)
+                sync
+            " >/dev/null 2>&1 || true
+            
+            # Execute the actual test - JSON goes to its own file, fio warnings to stderr
+            cpu_before=$(cgroup_cpu_usec "$cgroup")
+            start_time=$(date +%s.%N)
+            if ! docker exec "$CONTAINER_NAME" /bin/bash -c "cd /mnt/test_data && $io_command $FIO_OUTPUT_FORMAT $(latency_log_options) $(steady_state_options)" > "$json_file" 2> "${json_file%.json}.err"; then
+                echo "    Error: Container execution failed"
+                echo "    Output preview: $(head -n 2 "${json_file%.json}.err" | tr '\n' ' ')"
+            fi
+            end_time=$(date +%s.%N)
+            cpu_after=$(cgroup_cpu_usec "$cgroup")
         fi
         
-        # Get CPU usage (with error handling)
-        cpu_usage=$(docker exec io_test_container cat /host_proc/loadavg 2>/dev/null | awk '{print $1}' || echo "0")
+        # Fold the latency log (from the agent's reply, or streamed out of the container) into a
+        # mergeable histogram (and, with THROTTLE_JOIN, every I/O: the container shares the
+        # host's monotonic clock)
+        if [ "$LATENCY_LOG" = "true" ]; then
+            hist_file="$(latency_hist_dir)/container_${test_name}_${i}.npz"
+            events_file=""
+            [ "$THROTTLE_JOIN" = "true" ] && events_file="$(io_events_dir)/container_${test_name}_${i}.npz"
+            if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+                cat "$latency_payload" 2>/dev/null
+            else
+                docker exec "$CONTAINER_NAME" /bin/bash -c "cd /mnt/test_data && cat $(latency_log_glob)" 2>/dev/null
+            fi | fold_latency_log "$hist_file" "$events_file" 0 | sed 's/^/    Latency histogram: /'
+        fi
+        
+        # Find the steady window of the bandwidth/IOPS logs
+        steady_file=""
+        if steady_state_logging; then
+            steady_file="$(steady_state_dir)/container_${test_name}_${i}.json"
+            if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+                cat "$steady_payload" 2>/dev/null
+            else
+                docker exec "$CONTAINER_NAME" /bin/bash -c "cd /mnt/test_data && tail -v -n +1 $(steady_log_glob)" 2>/dev/null
+            fi | detect_steady_state "$steady_file" | sed 's/^/    Steady state: /'
+        fi
+        rm -f "$latency_payload" "$steady_payload"
         
-        timestamp=$(date '+%Y-%m-%d %H:%M:%S.%3N')
-        echo "$timestamp,$test_name,$latency_us,$throughput_mb,$cpu_usage" >> "$output_file"
+        # Clean up the test file immediately after the test (the agent already did)
+        [ $agent_status -eq $AGENT_UNAVAILABLE ] && docker exec "$CONTAINER_NAME" /bin/bash -c "cd /mnt/test_data && $(test_file_cleanup) && sync" >/dev/null 2>&1 || true
         
-        if [[ "$throughput_mb" != "0" ]]; then
-            echo "    Latency: ${latency_us}μs, Throughput: ${throughput_mb} MB/s"
+        # Parse fio JSON once and append the CSV row (zeros if the run failed)
+        if summary=$(append_fio_result "$json_file" "$test_name" "$start_time" "$end_time" "$output_file" "$(cpu_usec_delta "$cpu_before" "$cpu_after")" \
+                "" "$steady_file"); then
+            echo "    $summary"
+            campaign_record done "$i" "$output_file"
+            live_summary "$(dirname "$output_file")" "$test_name"
+            completed=$((completed + 1))
+            failures=0
         else
-            echo "    Latency: ${latency_us}μs, No throughput data"
+            echo "    Skipping this iteration"
+            echo "    $summary"
+            campaign_record failed "$i" "$output_file" "no fio result"
+            failures=$((failures + 1))
+            campaign_retry "$failures" "$test_name" || return 1
         fi
         
         sleep 2
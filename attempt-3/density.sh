@@ -0,0 +1,213 @@
+#!/bin/bash
+
+# Noisy-neighbour density mode for the IO Performance Comparison Framework
+# Runs K identical tenants (microVMs, containers or local processes) on the same pattern at
+# once for every K in DENSITY_LEVELS; density_analysis.py reports what each tenant got
+
+# Source configuration and modules
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/metrics_parser.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/cleanup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/network_setup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/firecracker_setup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/container_setup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/firecracker_test_runner.sh"
+
+# One /30 per tenant in 172.17.0.0/24
+MAX_TENANTS=64
+
+# Point the per-tenant names (network, VM, container, test disk, agent socket) at tenant k;
+# tenant 0 is the normal environment
+select_tenant() {
+    local k="$1"
+    TENANT=$([ "$k" -gt 0 ] && echo "t$k")
+    local suffix="${TENANT:+_$TENANT}"
+
+    # Host side .4k+1, guest .4k+2 (the guest rootfs derives its address from the MAC)
+    TAP_DEV="tap$((k + 1))"
+    TAP_IP="172.17.0.$((4 * k + 1))"
+    GUEST_IP="172.17.0.$((4 * k + 2))"
+    FC_MAC=$(printf '06:00:AC:11:00:%02X' $((4 * k + 2)))
+    API_SOCKET="/tmp/firecracker-io-test${suffix}.socket"
+    LOGFILE="./firecracker-io-test${suffix}.log"
+    FC_ROOTFS="$(pwd)/ubuntu-24.04${suffix}.ext4"
+    FC_CGROUP_NAME="firecracker_io_test${suffix}"
+    FC_LOOP_FILE="./.firecracker_loop_device${suffix}"
+    FC_TEST_DISK="$(dirname "$FC_TEST_DISK")/test_disk${suffix}.ext4"
+
+    CONTAINER_NAME="io_test_container${suffix}"
+    CONTAINER_VOLUME="io_test_volume${suffix}"
+    CONTAINER_LOOP_FILE="./.docker_loop_device${suffix}"
+    CONTAINER_TEST_DISK="$(dirname "$CONTAINER_TEST_DISK")/docker_test_disk${suffix}.img"
+}
+
+# Test directory of tenant k (a local tenant's directory stands in for its own disk)
+tenant_workdir() {
+    local env="$1"
+    local k="$2"
+    case "$env" in
+        firecracker) get_vm_test_directory ;;
+        container) echo "/mnt/test_data" ;;
+        *) echo "$DENSITY_LOCAL_DIR/tenant$k" ;;
+    esac
+}
+
+# Runner CSV of one tenant at one density level
+density_csv() {
+    local env="$1"
+    local level="$2"
+    local k="$3"
+    local pattern_name="$4"
+    echo "${RESULTS_DIR}/density/${env}_k${level}_t${k}_${pattern_name}.csv"
+}
+
+# Bring up tenant k: its own TAP device and VM, its own container, or its own local directory
+provision_tenant() {
+    local env="$1"
+    local k="$2"
+    select_tenant "$k"
+    case "$env" in
+        firecracker)
+            # Tenant 0's TAP device is set up with the rest of the run
+            if [ "$k" -gt 0 ]; then
+                setup_network || return 1
+            fi
+            setup_firecracker_vm
+            ;;
+        container)
+            setup_container
+            ;;
+        local)
+            if ! command -v fio >/dev/null 2>&1; then
+                echo "Error: fio not found on the host (local tenants run it directly)"
+                return 1
+            fi
+            mkdir -p "$(tenant_workdir local "$k")"
+            ;;
+        *)
+            echo "Error: Unknown density environment '$env' (firecracker, container, local)"
+            return 1
+            ;;
+    esac
+}
+
+# Tear down tenants 1..count-1 of env (tenant 0 is left to cleanup) and switch back to tenant 0
+stop_tenants() {
+    local env="$1"
+    local count="$2"
+    local k
+    for k in $(seq $((count - 1)) -1 0); do
+        select_tenant "$k"
+        case "$env" in
+            firecracker)
+                [ "$k" -eq 0 ] && continue
+                stop_firecracker_vm
+                sudo rmdir "/sys/fs/cgroup/$FC_CGROUP_NAME" 2>/dev/null || true
+                sudo ip link del "$TAP_DEV" 2>/dev/null || true
+                rm -f "$FC_ROOTFS" "$FC_TEST_DISK" "$LOGFILE"
+                ;;
+            container)
+                [ "$k" -eq 0 ] && continue
+                stop_container
+                if [ -f "$CONTAINER_LOOP_FILE" ]; then
+                    sudo losetup -d "$(cat "$CONTAINER_LOOP_FILE")" 2>/dev/null || true
+                    rm -f "$CONTAINER_LOOP_FILE"
+                fi
+                rm -f "$CONTAINER_TEST_DISK"
+                ;;
+            local)
+                rm -rf "$(tenant_workdir local "$k")"
+                ;;
+        esac
+    done
+    select_tenant 0
+}
+
+# One iteration of tenant k (run in the background, one per tenant): fio's JSON goes to
+# json_file, "<start> <end> <cgroup CPU µs>" on the host clock to its .time file
+run_tenant() {
+    local env="$1"
+    local k="$2"
+    local io_command="$3"
+    local json_file="$4"
+    select_tenant "$k"
+    local workdir=$(tenant_workdir "$env" "$k")
+    local cgroup=""
+    [ "$env" != "local" ] && cgroup=$(telemetry_cgroup "$env")
+
+    env_exec "$env" "$workdir" "$(test_file_cleanup)" 30 >/dev/null 2>&1
+    local cpu_before=$(cgroup_cpu_usec "$cgroup")
+    local start_time=$(date +%s.%N)
+    env_exec "$env" "$workdir" "$io_command $FIO_OUTPUT_FORMAT" "$(fio_timeout)" > "$json_file" 2> "${json_file%.json}.err"
+    local end_time=$(date +%s.%N)
+    local cpu_after=$(cgroup_cpu_usec "$cgroup")
+    echo "$start_time $end_time $(cpu_usec_delta "$cpu_before" "$cpu_after")" > "${json_file%.json}.time"
+    env_exec "$env" "$workdir" "$(test_file_cleanup)" 30 >/dev/null 2>&1
+}
+
+# Every selected pattern with K tenants at once, for each K in DENSITY_LEVELS and each
+# environment in DENSITY_ENVS. Tenants stay up from one level to the next
+run_density() {
+    local patterns=("$@")
+    local levels=($(printf '%s\n' $DENSITY_LEVELS | sort -n -u))
+    local top=${levels[${#levels[@]} - 1]}
+    if [ "$top" -gt "$MAX_TENANTS" ]; then
+        echo "Error: At most $MAX_TENANTS tenants (DENSITY_LEVELS goes up to $top)"
+        return 1
+    fi
+
+    local env level k pattern_name iteration
+    for env in $DENSITY_ENVS; do
+        echo ""
+        echo "=== Density: $env (${levels[*]} tenants) ==="
+        local up=0
+        for level in "${levels[@]}"; do
+            while [ $up -lt $level ]; do
+                echo "Provisioning $env tenant $up..."
+                provision_tenant "$env" "$up" || break
+                up=$((up + 1))
+            done
+            if [ $up -lt $level ]; then
+                echo "Error: Could not provision $env tenant $up, skipping $level tenants and above"
+                break
+            fi
+            select_tenant 0
+
+            for pattern_name in "${patterns[@]}"; do
+                echo ""
+                echo "[$env x$level] $pattern_name"
+                for k in $(seq 0 $((level - 1))); do
+                    local output_file=$(density_csv "$env" "$level" "$k" "$pattern_name")
+                    mkdir -p "$(dirname "$output_file")"
+                    [ -f "$output_file" ] || write_results_header "$output_file"
+                done
+                for iteration in $(seq 1 "$ITERATIONS"); do
+                    echo "  Iteration $iteration/$ITERATIONS: $level tenants"
+                    local pids=()
+                    for k in $(seq 0 $((level - 1))); do
+                        run_tenant "$env" "$k" "${IO_PATTERNS[$pattern_name]}" \
+                            "$(fio_json_dir)/density_${env}_k${level}_t${k}_${pattern_name}_${iteration}.json" &
+                        pids+=($!)
+                    done
+                    wait "${pids[@]}"
+
+                    # Every tenant gets a row (zeros if it failed) so rows line up by iteration
+                    for k in $(seq 0 $((level - 1))); do
+                        local json_file="$(fio_json_dir)/density_${env}_k${level}_t${k}_${pattern_name}_${iteration}.json"
+                        local start_time end_time cpu_usec
+                        read -r start_time end_time cpu_usec < "${json_file%.json}.time"
+                        local summary
+                        summary=$(append_fio_result "$json_file" "$pattern_name" "$start_time" "$end_time" \
+                            "$(density_csv "$env" "$level" "$k" "$pattern_name")" "$cpu_usec") \
+                            || summary="no fio result ($(head -n 1 "${json_file%.json}.err"))"
+                        echo "    Tenant $k: $summary"
+                    done
+                    sleep 2
+                done
+            done
+        done
+        stop_tenants "$env" "$up"
+    done
+}
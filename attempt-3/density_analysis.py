@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Noisy-neighbour density analysis for the IO Performance Comparison Framework
+Aggregate throughput, per-tenant fairness (Jain's index) and per-tenant tail latency
+of K identical tenants running the same pattern at once, as K grows
+"""
+
+import csv
+import re
+import sys
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DENSITY_DIR = 'density'
+OUTPUT_CSV = 'density_summary.csv'
+
+# One runner CSV per tenant: <env>_k<tenants>_t<tenant>_<pattern>.csv (density.sh density_csv)
+TENANT_CSV = re.compile(r'^(?P<env>[a-z]+)_k(?P<level>\d+)_t(?P<tenant>\d+)_(?P<pattern>.+)\.csv$')
+COLUMNS = ('throughput_mbps', 'iops', 'clat_p99_us')
+
+# (env, pattern, tenants) -> tenant -> column -> one value per iteration
+Runs = Dict[Tuple[str, str, int], Dict[int, Dict[str, np.ndarray]]]
+
+
+@dataclass
+class DensityPoint:
+    """Medians over the iterations of one pattern run by `tenants` tenants at once."""
+    env: str
+    pattern: str
+    tenants: int
+    aggregate_mbps: float
+    aggregate_iops: float
+    per_tenant_mbps: float
+    # Aggregate over `tenants` times the single tenant's (1.0: every tenant got what one alone did)
+    scaling_efficiency: float
+    jain: float
+    worst_jain: float
+    p99_median_us: float
+    p99_worst_us: float
+    # Worst tenant's p99 over the single tenant's
+    p99_inflation: float
+    iterations: int
+
+
+def jain_index(values) -> float:
+    """(sum x)^2 / (n sum x^2): 1.0 when every tenant got the same, 1/n when one got everything."""
+    x = np.asarray(values, dtype=float)
+    if len(x) == 0 or not (x ** 2).sum() > 0:
+        return float('nan')
+    return float(x.sum() ** 2 / (len(x) * (x ** 2).sum()))
+
+
+def _float(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def load_runs(results_dir) -> Runs:
+    runs = {}
+    for path in sorted((Path(results_dir) / DENSITY_DIR).glob('*.csv')):
+        match = TENANT_CSV.match(path.name)
+        if match is None:
+            continue
+        with open(path, 'r', newline='') as f:
+            rows = list(csv.DictReader(f))
+        key = (match['env'], match['pattern'], int(match['level']))
+        runs.setdefault(key, {})[int(match['tenant'])] = {
+            name: np.array([_float(row.get(name)) for row in rows]) for name in COLUMNS}
+    return runs
+
+
+def summarize(runs: Runs) -> List[DensityPoint]:
+    """
+    One DensityPoint per (env, pattern, tenants). Every tenant appends one row per
+    iteration, so row i of each tenant's CSV ran at the same time; iterations in which
+    any tenant has no result are left out rather than counted as starved.
+    """
+    points = []
+    for (env, pattern, level), by_tenant in sorted(runs.items()):
+        if sorted(by_tenant) != list(range(level)):
+            print(f"Warning: {env} {pattern} at {level} tenants is missing tenant CSVs, skipped", file=sys.stderr)
+            continue
+        count = min(len(columns['throughput_mbps']) for columns in by_tenant.values())
+        # tenants x iterations
+        mbps = np.array([by_tenant[t]['throughput_mbps'][:count] for t in range(level)])
+        iops = np.array([by_tenant[t]['iops'][:count] for t in range(level)])
+        p99 = np.array([by_tenant[t]['clat_p99_us'][:count] for t in range(level)])
+        complete = (mbps > 0).all(axis=0)
+        if not complete.any():
+            continue
+        mbps, iops, p99 = mbps[:, complete], iops[:, complete], p99[:, complete]
+
+        aggregate = mbps.sum(axis=0)
+        jain = np.array([jain_index(mbps[:, i]) for i in range(mbps.shape[1])])
+        tenant_p99 = np.nanmedian(p99, axis=1) if not np.isnan(p99).all() else np.full(level, np.nan)
+        points.append(DensityPoint(
+            env=env, pattern=pattern, tenants=level,
+            aggregate_mbps=float(np.median(aggregate)),
+            aggregate_iops=float(np.median(iops.sum(axis=0))),
+            per_tenant_mbps=float(np.median(aggregate)) / level,
+            scaling_efficiency=float('nan'),
+            jain=float(np.median(jain)), worst_jain=float(np.min(jain)),
+            p99_median_us=float(np.median(tenant_p99)), p99_worst_us=float(np.max(tenant_p99)),
+            p99_inflation=float('nan'), iterations=int(complete.sum())))
+
+    single = {(p.env, p.pattern): p for p in points if p.tenants == 1}
+    for point in points:
+        base = single.get((point.env, point.pattern))
+        if base is None:
+            continue
+        if base.aggregate_mbps > 0:
+            point.scaling_efficiency = point.aggregate_mbps / (point.tenants * base.aggregate_mbps)
+        if base.p99_worst_us > 0:
+            point.p99_inflation = point.p99_worst_us / base.p99_worst_us
+    return points
+
+
+def density_gap(points: List[DensityPoint], pattern: str) -> Optional[str]:
+    """Both environments at the highest tenant count they both ran, as one line."""
+    by_env = {}
+    for p in points:
+        if p.pattern == pattern:
+            by_env.setdefault(p.env, {})[p.tenants] = p
+    if 'firecracker' not in by_env or 'container' not in by_env:
+        return None
+    common = set(by_env['firecracker']) & set(by_env['container'])
+    if not common:
+        return None
+    level = max(common)
+    fc, ct = by_env['firecracker'][level], by_env['container'][level]
+    if ct.aggregate_mbps <= 0 or not ct.p99_worst_us > 0:
+        return None
+    return (f"at {level} tenants Firecracker gets {fc.aggregate_mbps / ct.aggregate_mbps:.2f}x the container "
+            f"aggregate, worst-tenant p99 {fc.p99_worst_us / ct.p99_worst_us:.2f}x, Jain {fc.jain:.3f} vs {ct.jain:.3f}")
+
+
+def write_csv(points: List[DensityPoint], path) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(DensityPoint)])
+        writer.writeheader()
+        for point in points:
+            writer.writerow(asdict(point))
+
+
+def print_report(points: List[DensityPoint]) -> None:
+    print(f"\n{'='*60}")
+    print("DENSITY (K tenants on the same pattern)")
+    print(f"{'='*60}")
+    patterns = list(dict.fromkeys(p.pattern for p in points))
+    for pattern in patterns:
+        print(f"\n{pattern}")
+        print(f"  {'env':<12} {'K':>3} {'aggr MB/s':>10} {'per tenant':>10} {'eff':>5} "
+              f"{'Jain':>6} {'worst':>6} {'p99 μs':>9} {'worst p99':>10} {'x K=1':>6}")
+        for p in points:
+            if p.pattern != pattern:
+                continue
+            print(f"  {p.env:<12} {p.tenants:>3} {p.aggregate_mbps:>10.1f} {p.per_tenant_mbps:>10.1f} "
+                  f"{p.scaling_efficiency:>5.2f} {p.jain:>6.3f} {p.worst_jain:>6.3f} "
+                  f"{p.p99_median_us:>9.1f} {p.p99_worst_us:>10.1f} {p.p99_inflation:>6.2f}")
+        gap = density_gap(points, pattern)
+        if gap:
+            print(f"  Gap: {gap}")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aggregate throughput, fairness and tail latency of a density run")
+    parser.add_argument('results_dir')
+    parser.add_argument('--no-csv', action='store_true', help="Only print the report")
+    args = parser.parse_args(argv)
+
+    if not Path(args.results_dir).is_dir():
+        print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+        return 1
+    points = summarize(load_runs(args.results_dir))
+    if not points:
+        print(f"No density results in {Path(args.results_dir) / DENSITY_DIR}")
+        return 1
+    print_report(points)
+    if not args.no_csv:
+        output = Path(args.results_dir) / OUTPUT_CSV
+        write_csv(points, output)
+        print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,71 @@
+#!/bin/bash
+
+# I/O engine capability check for the IO Performance Comparison Framework
+# Before a pattern runs on a non-default ioengine, a one-second fio probe with the
+# same engine options checks that the environment's kernel and fio support it
+
+# Source configuration and modules
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+
+# Scratch file of the probe (job_matrix.py PROBE_FILE)
+ENGINE_PROBE_FILE=".engine_probe"
+
+# Probe verdict per environment and probe command ("ok" or the reason it failed)
+declare -gA ENGINE_SUPPORT=()
+
+# One row per environment and engine probed in this run
+engine_support_file() {
+    echo "${RESULTS_DIR}/engine_support.csv"
+}
+
+# Succeeds when kernel release $1 (e.g. 6.1.141-custom) is at least version $2
+kernel_at_least() {
+    local release="${1%%-*}"
+    [ "$(printf '%s\n%s\n' "$2" "$release" | sort -V | head -n 1)" = "$2" ]
+}
+
+# Returns non-zero, after saying why, when `env` cannot run the pattern's ioengine
+engine_supported() {
+    local env="$1"
+    local workdir="$2"
+    local pattern="$3"
+
+    # Replayed traces always run on libaio, the default engine
+    [ -n "$TRACE_REPLAY" ] && return 0
+
+    local engine min_kernel probe
+    IFS=$'\t' read -r engine min_kernel probe < <(python3 "$JOB_MATRIX" probe "$pattern" "${JOB_MATRIX_ARGS[@]}")
+    if [ -z "$probe" ]; then
+        return 0
+    fi
+
+    local key="$env|$probe"
+    if [ -z "${ENGINE_SUPPORT[$key]}" ]; then
+        local output status kernel error reason=""
+        output=$(env_exec "$env" "$workdir" "uname -r; $probe >/dev/null 2>$ENGINE_PROBE_FILE.err; s=\$?; tail -n 1 $ENGINE_PROBE_FILE.err; rm -f $ENGINE_PROBE_FILE $ENGINE_PROBE_FILE.err; exit \$s" 60)
+        status=$?
+        kernel=$(sed -n 1p <<< "$output")
+        error=$(sed -n 2p <<< "$output")
+        if [ -z "$kernel" ]; then
+            reason="probe could not run (exit $status)"
+        elif ! kernel_at_least "$kernel" "$min_kernel"; then
+            reason="kernel $kernel older than $min_kernel"
+        elif [ $status -ne 0 ]; then
+            # e.g. fio built without libaio, or io_uring blocked by the container's seccomp profile
+            reason="fio: ${error:-exit status $status}"
+        fi
+        ENGINE_SUPPORT[$key]="${reason:-ok}"
+
+        local support_file=$(engine_support_file)
+        mkdir -p "$(dirname "$support_file")"
+        [ -f "$support_file" ] || echo "env,ioengine,kernel,supported,reason" > "$support_file"
+        echo "$env,$engine,$kernel,$([ -z "$reason" ] && echo true || echo false),\"${reason//\"/\'}\"" >> "$support_file"
+    fi
+
+    if [ "${ENGINE_SUPPORT[$key]}" != "ok" ]; then
+        echo "   Skipping $env: $engine not supported (${ENGINE_SUPPORT[$key]})"
+        return 1
+    fi
+    return 0
+}
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Preallocated test-file pool for the IO Performance Comparison Framework
+Lays out and preconditions each fio file once per environment (fallocate
+plus one full write) and reuses it across iterations and patterns
+"""
+
+# Runs inside the guest (Ubuntu 24.04) and the container (Ubuntu 20.04):
+# standard library only, Python 3.8 syntax.
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MANIFEST = '.file_pool.json'
+WRITE_CHUNK = 1 << 20
+# Space left free for fio JSON, latency logs and filesystem metadata
+HEADROOM_BYTES = 64 << 20
+# fio's default kb_base is 1024, so "100M" is 100 MiB
+SIZE_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+
+def parse_size(text: str) -> int:
+    """fio size string ("100M", "1g", "512k", "4096") in bytes."""
+    match = re.fullmatch(r'(\d+)([kmgt]?)i?b?', text.strip().lower())
+    if not match:
+        raise ValueError(f"unsupported fio size: {text}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2)]
+
+
+def pool_entries(commands: Iterable[str]) -> Dict[str, int]:
+    """File name -> size for every fio command naming a --filename and --size."""
+    entries = {}
+    for command in commands:
+        name = re.search(r'--filename=(\S+)', command)
+        size = re.search(r'--size=(\S+)', command)
+        if name and size:
+            entries[name.group(1)] = max(entries.get(name.group(1), 0), parse_size(size.group(1)))
+    return entries
+
+
+def allocated_bytes(path: str) -> int:
+    return os.stat(path).st_blocks * 512
+
+
+def extent_count(path: str) -> Optional[int]:
+    """Number of extents via filefrag (FIEMAP), or None when filefrag is unavailable."""
+    if not shutil.which('filefrag'):
+        return None
+    proc = subprocess.run(['filefrag', path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    match = re.search(rb'(\d+) extents? found', proc.stdout)
+    return int(match.group(1)) if match else None
+
+
+def precondition(path: str, size: int) -> None:
+    """Allocate `size` bytes up front, then write every block once."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.posix_fallocate(fd, 0, size)
+        # Incompressible data, so thin-provisioned or deduplicating backends see real blocks
+        chunk = os.urandom(WRITE_CHUNK)
+        written = 0
+        while written < size:
+            written += os.write(fd, chunk[:min(WRITE_CHUNK, size - written)])
+        os.fsync(fd)
+        # Tests run with --direct=1; do not leave the layout in the page cache
+        os.posix_fadvise(fd, 0, size, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def drop_page_cache(path: str) -> None:
+    """Write back and evict `path`'s cached pages (one file, unlike /proc/sys/vm/drop_caches)."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+class FilePool:
+    """Preconditioned files in one directory, tracked in a small JSON manifest."""
+
+    def __init__(self, workdir: str = '.'):
+        self.workdir = workdir
+        self.manifest_path = os.path.join(workdir, MANIFEST)
+        self.files = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    self.files = json.load(f).get('files', {})
+            except (OSError, ValueError):
+                self.files = {}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.workdir, name)
+
+    def save(self) -> None:
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'files': self.files}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def verify(self, name: str, size: int) -> Optional[str]:
+        """Why `name` cannot be reused as-is (None when it can): cheap size and extent checks."""
+        entry = self.files.get(name)
+        path = self.path(name)
+        if entry is None:
+            return "not in pool"
+        if not os.path.exists(path):
+            return "missing"
+        if os.path.getsize(path) != size or entry['size'] != size:
+            return "size changed"
+        if allocated_bytes(path) < size:
+            return "sparse"
+        extents = extent_count(path)
+        if extents is not None and entry.get('extents') is not None and extents > entry['extents']:
+            # In-place overwrites keep the layout; more extents means the file was re-created
+            return "re-laid out"
+        return None
+
+    def used_bytes(self) -> int:
+        return sum(entry['size'] for name, entry in self.files.items() if os.path.exists(self.path(name)))
+
+    def evict(self, needed: int, keep: Iterable[str]) -> List[str]:
+        """Remove least recently used pool files until `needed` bytes are free."""
+        keep = set(keep)
+        evicted = []
+        for name in sorted(self.files, key=lambda n: self.files[n].get('last_used', 0)):
+            if free_bytes(self.workdir) >= needed:
+                break
+            if name in keep:
+                continue
+            try:
+                os.remove(self.path(name))
+            except OSError:
+                pass
+            del self.files[name]
+            evicted.append(name)
+        return evicted
+
+    def prepare(self, name: str, size: int, keep: Iterable[str] = ()) -> Tuple[str, float]:
+        """Make `name` a preconditioned `size`-byte file; returns (status, seconds)."""
+        started = time.monotonic()
+        reason = self.verify(name, size)
+        if reason is None:
+            self.files[name]['last_used'] = time.time()
+            self.save()
+            return "reused", time.monotonic() - started
+
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(path)
+        self.files.pop(name, None)
+        needed = size + HEADROOM_BYTES
+        evicted = self.evict(needed, keep)
+        if free_bytes(self.workdir) < needed:
+            self.save()
+            raise OSError(f"{name}: need {needed >> 20}MB, {free_bytes(self.workdir) >> 20}MB free "
+                          f"after evicting {len(evicted)} pool file(s)")
+        precondition(path, size)
+        self.files[name] = {'size': size, 'extents': extent_count(path),
+                            'prepared': time.time(), 'last_used': time.time()}
+        self.save()
+        status = f"prepared ({reason}" + (f", evicted {' '.join(evicted)})" if evicted else ")")
+        return status, time.monotonic() - started
+
+    def drop(self) -> int:
+        """Remove every pool file and the manifest."""
+        removed = 0
+        for name in list(self.files):
+            if os.path.exists(self.path(name)):
+                os.remove(self.path(name))
+                removed += 1
+        self.files = {}
+        if os.path.exists(self.manifest_path):
+            os.remove(self.manifest_path)
+        return removed
+
+
+def free_bytes(path: str) -> int:
+    stat = os.statvfs(path)
+    return stat.f_bavail * stat.f_frsize
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Preallocated, preconditioned fio test files")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    plan = sub.add_parser('plan', help="Pool accounting for fio commands read from stdin (one per line)")
+    plan.add_argument('--spec', action='store_true', help="Print name:bytes pairs for `prepare --file`")
+    plan.add_argument('--total-mb', action='store_true', help="Print only the total pool size in MB")
+
+    prepare = sub.add_parser('prepare', help="Create or verify pool files in the current directory")
+    prepare.add_argument('--file', nargs='+', required=True, metavar='NAME:BYTES')
+
+    sub.add_parser('status', help="List pool files in the current directory")
+    sub.add_parser('drop', help="Remove all pool files in the current directory")
+
+    evict = sub.add_parser('drop-cache', help="Evict files from the page cache (default: the pool files)")
+    evict.add_argument('paths', nargs='*')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        entries = pool_entries(line for line in sys.stdin if line.strip())
+        total = sum(entries.values())
+        if args.spec:
+            print(' '.join(f"{name}:{size}" for name, size in sorted(entries.items())))
+        elif args.total_mb:
+            print((total + (1 << 20) - 1) >> 20)
+        else:
+            for name, size in sorted(entries.items()):
+                print(f"{name:<20} {size >> 20:>6} MB")
+            print(f"{'total':<20} {total >> 20:>6} MB ({len(entries)} files)")
+        return 0
+
+    pool = FilePool('.')
+
+    if args.command == 'drop-cache':
+        status = 0
+        for path in args.paths or [pool.path(name) for name in pool.files]:
+            try:
+                drop_page_cache(path)
+            except OSError as e:
+                print(f"Warning: {path}: {e}", file=sys.stderr)
+                status = 1
+        return status
+
+    if args.command == 'prepare':
+        wanted = {}
+        for spec in args.file:
+            name, _, size = spec.rpartition(':')
+            wanted[name] = int(size)
+        for name, size in wanted.items():
+            try:
+                status, seconds = pool.prepare(name, size, keep=wanted)
+            except OSError as e:
+                print(f"Error: File pool: {e}", file=sys.stderr)
+                return 1
+            print(f"File pool: {name} {size >> 20}MB {status} in {seconds:.1f}s")
+        return 0
+
+    if args.command == 'status':
+        for name, entry in sorted(pool.files.items()):
+            reason = pool.verify(name, entry['size'])
+            print(f"{name:<20} {entry['size'] >> 20:>6} MB  {reason or 'ok'}")
+        print(f"Pool: {pool.used_bytes() >> 20} MB used, {free_bytes('.') >> 20} MB free")
+        return 0
+
+    print(f"Removed {pool.drop()} pool file(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
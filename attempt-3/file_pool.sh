@@ -0,0 +1,65 @@
+#!/bin/bash
+
+# Test-file pool for the IO Performance Comparison Framework
+# Each pattern's fio file is preallocated and preconditioned once per environment
+# (file_pool.py) and reused across iterations instead of being deleted and re-laid out
+
+# Source configuration
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+
+FILE_POOL="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/file_pool.py"
+
+# Test files removed before and after every iteration (pool files excepted in steady mode)
+TEST_FILE_GLOBS="test_seq *.fio fio_test_file random_* mixed* testfile* seq_test_file rand_test_file mixed_test_file *_4k_* *_64k_* *_1m_* *_512b_* *.file"
+
+# Every --filename used by the configured patterns
+pool_file_names() {
+    for cmd in "${IO_PATTERNS[@]}"; do
+        echo "$cmd" | grep -o -- '--filename=[^ ]*' | cut -d= -f2
+    done | sort -u | tr '\n' ' '
+}
+
+# Files the per-iteration cleanup must leave in place
+pool_preserve() {
+    if [ "$FILE_POOL_MODE" = "steady" ]; then
+        pool_file_names
+    fi
+}
+
+# Shell snippet that removes leftover test files but keeps the pool
+test_file_cleanup() {
+    local preserve=" $(pool_preserve) "
+    echo "for f in $TEST_FILE_GLOBS ${LATENCY_LOG_PREFIX}_*; do case \"$preserve\" in *\" \$f \"*) ;; *) rm -rf \"\$f\" ;; esac; done 2>/dev/null || true"
+}
+
+# Total pool size in MB for the configured patterns
+pool_total_mb() {
+    printf '%s\n' "${IO_PATTERNS[@]}" | python3 "$FILE_POOL" plan --total-mb
+}
+
+# Free space prepare keeps beyond a pool file, in MB (file_pool.HEADROOM_BYTES)
+pool_headroom_mb() {
+    PYTHONPATH="$(dirname "$FILE_POOL")" python3 -c 'import file_pool; print(file_pool.HEADROOM_BYTES >> 20)'
+}
+
+# Preallocate/verify the pattern's file in the environment (uses agent_channel.sh)
+# Returns non-zero when the pool cannot be used; the runner then keeps fresh-file semantics
+prepare_file_pool() {
+    local env="$1"
+    local workdir="$2"
+    local io_command="$3"
+
+    if [ "$FILE_POOL_MODE" != "steady" ]; then
+        return 1
+    fi
+    local spec=$(printf '%s\n' "$io_command" | python3 "$FILE_POOL" plan --spec)
+    if [ -z "$spec" ]; then
+        return 1
+    fi
+    if ! deploy_helper "$env" "$FILE_POOL"; then
+        echo "    Warning: Could not deploy file_pool.py to $env (python3 missing?), using fresh files"
+        return 1
+    fi
+    env_exec "$env" "$workdir" "python3 $(helper_path "$FILE_POOL") prepare --file $spec" 2>&1 | sed 's/^/    /'
+    return ${PIPESTATUS[0]}
+}
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+fio JSON metrics ingestion for the IO Performance Comparison Framework
+Parses `fio --output-format=json+` output once per job into typed records
+"""
+
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from job_matrix import cache_mode
+
+# Directions reported by fio, in output order
+DIRECTIONS = ('read', 'write', 'trim')
+
+# CSV schema written by the test runners (first five columns are the legacy schema)
+CSV_FIELDS = [
+    'timestamp', 'operation', 'latency_us', 'throughput_mbps', 'cpu_usage',
+    'iops', 'read_iops', 'write_iops', 'read_mbps', 'write_mbps',
+    'clat_p50_us', 'clat_p99_us', 'clat_p999_us',
+    'start_time', 'end_time',
+    # Host CPU charged to the environment's cgroup during the iteration
+    'cgroup_cpu_s', 'cpu_us_per_io', 'mbps_per_core',
+    # Page-cache regime, bytes fio read and bytes the guest kernel read from its disks
+    'cache_mode', 'read_bytes', 'guest_read_bytes',
+    # Filled in from the telemetry samples of [start_time, end_time] (telemetry.py join)
+    'host_cpu_s', 'throttled_ms', 'nr_throttled',
+    'device_util_pct', 'io_pressure_pct',
+    'host_read_bytes', 'guest_cache_hit_pct', 'host_cache_hit_pct',
+    # How long fio ran and, with STEADY_STATE, the steady window of its bw/iops logs (steady_state.py)
+    'runtime_s', 'steady_s', 'steady_start_s', 'steady_mbps', 'steady_iops', 'transient_mbps',
+]
+
+
+@dataclass
+class LatencyStats:
+    """Latency summary for one stage (slat, clat or lat), in microseconds."""
+    min_us: float = 0.0
+    max_us: float = 0.0
+    mean_us: float = 0.0
+    stddev_us: float = 0.0
+    samples: int = 0
+    percentiles: Dict[float, float] = field(default_factory=dict)
+
+    def percentile(self, pct: float) -> float:
+        """Return the recorded percentile closest to `pct`, or 0 if none."""
+        if not self.percentiles:
+            return 0.0
+        key = min(self.percentiles, key=lambda p: abs(p - pct))
+        return self.percentiles[key]
+
+
+@dataclass
+class DirectionMetrics:
+    """Per-direction (read/write/trim) results of one fio job."""
+    io_bytes: int = 0
+    total_ios: int = 0
+    runtime_ms: float = 0.0
+    iops: float = 0.0
+    bw_bytes: float = 0.0
+    slat: LatencyStats = field(default_factory=LatencyStats)
+    clat: LatencyStats = field(default_factory=LatencyStats)
+    lat: LatencyStats = field(default_factory=LatencyStats)
+
+    @property
+    def throughput_mbps(self) -> float:
+        """Bandwidth in MB/s (decimal, matching fio's parenthesised figure)."""
+        return self.bw_bytes / 1e6
+
+    @property
+    def active(self) -> bool:
+        return self.total_ios > 0
+
+
+@dataclass
+class JobMetrics:
+    """All metrics of a single fio job."""
+    name: str
+    error: int = 0
+    directions: Dict[str, DirectionMetrics] = field(default_factory=dict)
+    sync: LatencyStats = field(default_factory=LatencyStats)
+    usr_cpu: float = 0.0
+    sys_cpu: float = 0.0
+    options: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def cache_mode(self) -> str:
+        """direct, cold or warm, from the options fio ran with (fio defaults: buffered, invalidate)."""
+        return cache_mode(self.options.get('direct', 0), self.options.get('invalidate', 1))
+
+    def direction(self, name: str) -> DirectionMetrics:
+        return self.directions.get(name, DirectionMetrics())
+
+    @property
+    def active_directions(self) -> List[DirectionMetrics]:
+        return [d for d in self.directions.values() if d.active]
+
+    @property
+    def iops(self) -> float:
+        return sum(d.iops for d in self.active_directions)
+
+    @property
+    def total_ios(self) -> int:
+        return sum(d.total_ios for d in self.active_directions)
+
+    @property
+    def io_bytes(self) -> int:
+        return sum(d.io_bytes for d in self.active_directions)
+
+    @property
+    def throughput_mbps(self) -> float:
+        return sum(d.throughput_mbps for d in self.active_directions)
+
+    @property
+    def runtime_ms(self) -> float:
+        """How long the job ran (fio's steadystate options can end it early)."""
+        return max((d.runtime_ms for d in self.active_directions), default=0.0)
+
+    @property
+    def latency_us(self) -> float:
+        """Mean completion latency, weighted by the I/O count of each direction."""
+        active = self.active_directions
+        total = sum(d.total_ios for d in active)
+        if total == 0:
+            return 0.0
+        return sum(d.clat.mean_us * d.total_ios for d in active) / total
+
+    def clat_percentile(self, pct: float) -> float:
+        """Completion-latency percentile of the dominant (most I/Os) direction."""
+        active = self.active_directions
+        if not active:
+            return 0.0
+        dominant = max(active, key=lambda d: d.total_ios)
+        return dominant.clat.percentile(pct)
+
+
+def _parse_latency(data: Optional[dict], unit_divisor: float) -> LatencyStats:
+    """Convert a fio latency block to microseconds."""
+    if not data:
+        return LatencyStats()
+    percentiles = {
+        float(p): float(v) / unit_divisor
+        for p, v in (data.get('percentile') or {}).items()
+    }
+    return LatencyStats(
+        min_us=float(data.get('min', 0)) / unit_divisor,
+        max_us=float(data.get('max', 0)) / unit_divisor,
+        mean_us=float(data.get('mean', 0)) / unit_divisor,
+        stddev_us=float(data.get('stddev', 0)) / unit_divisor,
+        samples=int(data.get('N', 0)),
+        percentiles=percentiles,
+    )
+
+
+def _latency_block(data: dict, stage: str) -> LatencyStats:
+    # fio >= 3.0 reports *_ns, older versions report usec without suffix
+    if f'{stage}_ns' in data:
+        return _parse_latency(data[f'{stage}_ns'], 1000.0)
+    return _parse_latency(data.get(stage), 1.0)
+
+
+def _parse_direction(data: dict) -> DirectionMetrics:
+    bw_bytes = data.get('bw_bytes')
+    if bw_bytes is None:
+        # Older fio only reports bw in KiB/s
+        bw_bytes = float(data.get('bw', 0)) * 1024
+    return DirectionMetrics(
+        io_bytes=int(data.get('io_bytes', 0)),
+        total_ios=int(data.get('total_ios', 0)),
+        runtime_ms=float(data.get('runtime', 0)),
+        iops=float(data.get('iops', 0)),
+        bw_bytes=float(bw_bytes),
+        slat=_latency_block(data, 'slat'),
+        clat=_latency_block(data, 'clat'),
+        lat=_latency_block(data, 'lat'),
+    )
+
+
+def _parse_job(data: dict) -> JobMetrics:
+    job = JobMetrics(
+        name=data.get('jobname', ''),
+        error=int(data.get('error', 0)),
+        usr_cpu=float(data.get('usr_cpu', 0)),
+        sys_cpu=float(data.get('sys_cpu', 0)),
+        options=dict(data.get('job options') or {}),
+    )
+    for direction in DIRECTIONS:
+        if direction in data:
+            job.directions[direction] = _parse_direction(data[direction])
+    if 'sync' in data:
+        job.sync = _latency_block(data['sync'], 'lat')
+    return job
+
+
+def load_fio_json(text: str) -> dict:
+    """Decode fio JSON output, skipping any warnings fio printed before it."""
+    start = text.find('{')
+    if start < 0:
+        raise ValueError("no JSON object in fio output")
+    data, _ = json.JSONDecoder().raw_decode(text[start:])
+    return data
+
+
+def parse_fio_json(text: str) -> List[JobMetrics]:
+    """Parse fio JSON/JSON+ output into one JobMetrics per job."""
+    data = load_fio_json(text)
+    return [_parse_job(job) for job in data.get('jobs', [])]
+
+
+def parse_fio_file(path: str) -> List[JobMetrics]:
+    with open(path, 'r') as f:
+        return parse_fio_json(f.read())
+
+
+def cpu_cost(job: JobMetrics, cpu_usec: Optional[float]) -> Optional[Tuple[float, float]]:
+    """
+    CPU-µs per I/O and MB moved per host CPU-second (the MB/s one fully busy
+    core sustains), or None without a CPU measurement or completed I/O.
+    """
+    if cpu_usec is None or cpu_usec <= 0 or job.total_ios == 0:
+        return None
+    return cpu_usec / job.total_ios, job.io_bytes / cpu_usec
+
+
+def csv_row(job: Optional[JobMetrics], operation: str, cpu_usage: str = '',
+            timestamp: Optional[str] = None, start_time: str = '',
+            end_time: str = '', cpu_usec: Optional[float] = None,
+            guest_read_bytes: Optional[float] = None, steady=None) -> Dict[str, str]:
+    """
+    Build a runner CSV row; a missing job yields zeros like a failed iteration.
+    `cpu_usec` is the host CPU time the environment's cgroup used during the job,
+    `guest_read_bytes` what the guest kernel read from its block devices meanwhile,
+    `steady` the steady_state.SteadyState of the job's bandwidth log.
+    """
+    if timestamp is None:
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    if job is None:
+        job = JobMetrics(name=operation)
+    read, write = job.direction('read'), job.direction('write')
+    cpu = cpu_cost(job, cpu_usec)
+    row = {
+        'timestamp': timestamp,
+        'operation': operation,
+        'latency_us': f"{job.latency_us:.2f}",
+        'throughput_mbps': f"{job.throughput_mbps:.2f}",
+        'cpu_usage': cpu_usage,
+        'iops': f"{job.iops:.0f}",
+        'read_iops': f"{read.iops:.0f}",
+        'write_iops': f"{write.iops:.0f}",
+        'read_mbps': f"{read.throughput_mbps:.2f}",
+        'write_mbps': f"{write.throughput_mbps:.2f}",
+        'clat_p50_us': f"{job.clat_percentile(50.0):.2f}",
+        'clat_p99_us': f"{job.clat_percentile(99.0):.2f}",
+        'clat_p999_us': f"{job.clat_percentile(99.9):.2f}",
+        'start_time': start_time,
+        'end_time': end_time,
+        'cgroup_cpu_s': f"{cpu_usec / 1e6:.6f}" if cpu_usec is not None else '',
+        'cpu_us_per_io': f"{cpu[0]:.3f}" if cpu else '',
+        'mbps_per_core': f"{cpu[1]:.2f}" if cpu else '',
+        'cache_mode': job.cache_mode if job.options else '',
+        'read_bytes': str(read.io_bytes),
+        'guest_read_bytes': f"{guest_read_bytes:.0f}" if guest_read_bytes is not None else '',
+        'runtime_s': f"{job.runtime_ms / 1000:.3f}",
+    }
+    if steady is not None:
+        row['steady_s'] = f"{steady.steady_s:.3f}"
+        if steady.attained:
+            row['steady_start_s'] = f"{steady.start_s:.3f}"
+            for name in ('steady_mbps', 'steady_iops', 'transient_mbps'):
+                value = getattr(steady, name)
+                row[name] = f"{value:.2f}" if value == value else ''
+    return row
+
+
+def summary_line(job: Optional[JobMetrics], row: Optional[Dict[str, str]] = None) -> str:
+    """One-line human readable summary for the runner log."""
+    if job is None or job.throughput_mbps == 0:
+        latency = job.latency_us if job is not None else 0.0
+        return f"Latency: {latency:.2f}μs, No throughput data"
+    line = (f"Latency: {job.latency_us:.2f}μs, Throughput: {job.throughput_mbps:.2f} MB/s, "
+            f"IOPS: {job.iops:.0f}, p99: {job.clat_percentile(99.0):.2f}μs")
+    if row and row.get('cpu_us_per_io'):
+        line += f", CPU: {row['cpu_us_per_io']}μs/IO, {row['mbps_per_core']} MB/s/core"
+    if row and row.get('steady_mbps'):
+        line += f", steady: {row['steady_mbps']} MB/s after {float(row['steady_start_s']):.1f}s"
+    return line
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parse fio JSON output for the IO benchmark runners")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('header', help="Print the runner CSV header")
+
+    row = sub.add_parser('csv-row', help="Append one CSV row parsed from a fio JSON file")
+    row.add_argument('json_file', help="fio --output-format=json+ output ('-' for stdin)")
+    row.add_argument('--operation', required=True)
+    row.add_argument('--cpu-usage', default='', help="Left empty when telemetry fills it in later")
+    row.add_argument('--start', default='', help="Iteration start (epoch seconds)")
+    row.add_argument('--end', default='', help="Iteration end (epoch seconds)")
+    row.add_argument('--cpu-usec', type=float, help="Host CPU µs used by the environment's cgroup")
+    row.add_argument('--guest-read-bytes', type=float, help="Bytes the guest read from its block devices")
+    row.add_argument('--steady-state', help="steady_state.py detect --output file of this iteration")
+    row.add_argument('--output', help="CSV file to append to (default: stdout)")
+
+    summary = sub.add_parser('summary', help="Print a one-line summary for the runner log")
+    summary.add_argument('json_file')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'header':
+        print(','.join(CSV_FIELDS))
+        return 0
+
+    try:
+        jobs = parse_fio_json(sys.stdin.read()) if args.json_file == '-' else parse_fio_file(args.json_file)
+    except (OSError, ValueError) as e:
+        print(f"    Error: could not parse fio JSON output: {e}", file=sys.stderr)
+        jobs = []
+    job = jobs[0] if jobs else None
+
+    if args.command == 'summary':
+        print(summary_line(job))
+        return 0 if job is not None else 1
+
+    steady = None
+    if args.steady_state:
+        # Only STEADY_STATE runs pay for the numpy import
+        from steady_state import load
+        steady = load(args.steady_state)
+    row = csv_row(job, args.operation, args.cpu_usage, start_time=args.start,
+                  end_time=args.end, cpu_usec=args.cpu_usec, guest_read_bytes=args.guest_read_bytes,
+                  steady=steady)
+    if args.output:
+        with open(args.output, 'a', newline='') as out:
+            csv.DictWriter(out, fieldnames=CSV_FIELDS, lineterminator='\n').writerow(row)
+        # The runners log this line, so one process both records and reports
+        print(summary_line(job, row))
+    else:
+        csv.DictWriter(sys.stdout, fieldnames=CSV_FIELDS, lineterminator='\n').writerow(row)
+    return 0 if job is not None else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
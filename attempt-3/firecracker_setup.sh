@@ -7,9 +7,24 @@
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
 source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
 
+# Restrict a cgroup v2 directory to the host CPUs in `cpus` (cpuset list)
+set_cgroup_cpuset() {
+    local cgroup_path="$1"
+    local cpus="$2"
+    
+    # The cpuset controller must be enabled for the children of the root cgroup first
+    echo "+cpuset" | sudo tee /sys/fs/cgroup/cgroup.subtree_control >/dev/null 2>&1 || true
+    if echo "$cpus" | sudo tee "$cgroup_path/cpuset.cpus" >/dev/null 2>&1; then
+        echo "cgroups v2: $cgroup_path limited to CPUs $cpus"
+        return 0
+    fi
+    echo "Warning: Could not write $cgroup_path/cpuset.cpus, Firecracker is pinned by taskset only"
+    return 1
+}
+
 # Function to create CPU cgroup for limiting
 create_cpu_cgroup() {
-    local cgroup_name="firecracker_io_test"
+    local cgroup_name="$FC_CGROUP_NAME"
     local quota_us=$(echo "$VCPU_COUNT * 100000" | bc | cut -d. -f1)
     local period_us=100000
     
@@ -39,6 +54,7 @@ create_cpu_cgroup() {
             # Try to write CPU limits with error handling
             if echo "$quota_us $period_us" | sudo tee "$CGROUP_PATH/cpu.max" >/dev/null 2>&1; then
                 echo "cgroups v2: Created $CGROUP_PATH with ${VCPU_COUNT} CPU limit"
+                [ -n "$FC_CPUSET" ] && set_cgroup_cpuset "$CGROUP_PATH" "$FC_CPUSET"
                 return 0
             else
                 echo "Warning: Failed to write to cgroup cpu.max, continuing without CPU limits"
@@ -69,6 +85,27 @@ create_cpu_cgroup() {
     return 1
 }
 
+# Put Firecracker in its own cgroup without CPU limits, so the host CPU of the
+# VMM, vCPU and IO threads is still accounted (cpu.stat) for the CPU cost metrics
+create_accounting_cgroup() {
+    local pid="$1"
+    local cgroup_path="/sys/fs/cgroup/$FC_CGROUP_NAME"
+    
+    if [ ! -f "/sys/fs/cgroup/cgroup.controllers" ]; then
+        echo "Warning: cgroups v2 not available, Firecracker CPU cost will not be recorded"
+        return 1
+    fi
+    
+    if sudo mkdir -p "$cgroup_path" 2>/dev/null && \
+       echo "$pid" | sudo tee "$cgroup_path/cgroup.procs" >/dev/null 2>&1; then
+        echo "cgroups v2: Accounting Firecracker CPU in $cgroup_path"
+        [ -n "$FC_CPUSET" ] && set_cgroup_cpuset "$cgroup_path" "$FC_CPUSET"
+        return 0
+    fi
+    echo "Warning: Could not create accounting cgroup, Firecracker CPU cost will not be recorded"
+    return 1
+}
+
 # Firecracker VM setup
 setup_firecracker_vm() {
     echo "Setting up Firecracker VM..."
@@ -77,25 +114,39 @@ setup_firecracker_vm() {
     mkdir -p "$RESULTS_DIR"
     
     # Copy required files to local directory for absolute paths
-    cp "../firecracker" "./firecracker"
+    # (-u: the binary of a running VM, e.g. another density tenant, cannot be overwritten)
+    cp -u "../firecracker" "./firecracker"
     cp "../vmlinux-6.1.141" "./vmlinux-6.1.141"
-    cp "../ubuntu-24.04.ext4" "./ubuntu-24.04.ext4"
+    cp "../ubuntu-24.04.ext4" "$FC_ROOTFS"
     cp "../ubuntu-24.04.id_rsa" "./ubuntu-24.04.id_rsa"
     chmod 600 "./ubuntu-24.04.id_rsa"
     
     # Ensure adequate storage space for IO tests
     if [ "$USE_DEDICATED_TEST_DISK" = "true" ]; then
         echo "Creating dedicated test disk (${DISK_SIZE_MB}MB) for IO tests..."
-        dd if=/dev/zero of="./test_disk.ext4" bs=1M count="$DISK_SIZE_MB" 2>/dev/null
-        mkfs.ext4 -F "./test_disk.ext4" >/dev/null 2>&1
+        mkdir -p "$(dirname "$FC_TEST_DISK")"
+        dd if=/dev/zero of="$FC_TEST_DISK" bs=1M count="$DISK_SIZE_MB" 2>/dev/null
+        mkfs.ext4 -F "$FC_TEST_DISK" >/dev/null 2>&1
         echo "Created ${DISK_SIZE_MB}MB test disk"
+        
+        # Loop backing: Firecracker opens a host block device instead of the image file
+        if [ "$FC_DRIVE_BACKING" = "loop" ]; then
+            FC_LOOP_DEVICE=$(sudo losetup --find --show "$FC_TEST_DISK")
+            if [ -z "$FC_LOOP_DEVICE" ]; then
+                echo "Error: Failed to create loop device for the test disk"
+                return 1
+            fi
+            sudo chown "$(id -u)" "$FC_LOOP_DEVICE"
+            echo "$FC_LOOP_DEVICE" > "$FC_LOOP_FILE"
+            echo "Test disk backed by loop device $FC_LOOP_DEVICE"
+        fi
     else
         echo "Using root filesystem (ext4) for testing - expanding image for adequate space..."
         # Create a backup first
-        cp "./ubuntu-24.04.ext4" "./ubuntu-24.04.ext4.backup"
+        cp "$FC_ROOTFS" "$FC_ROOTFS.backup"
         
         # Expand the image file to provide more space
-        current_size=$(stat -c%s "./ubuntu-24.04.ext4")
+        current_size=$(stat -c%s "$FC_ROOTFS")
         target_size=$((DISK_SIZE_MB * 1024 * 1024))
         
         if [ $current_size -lt $target_size ]; then
@@ -103,24 +154,24 @@ setup_firecracker_vm() {
             echo "Expanding root filesystem by ${additional_mb}MB..."
             
             # Extend the image file
-            dd if=/dev/zero bs=1M count=$additional_mb >> "./ubuntu-24.04.ext4" 2>/dev/null
+            dd if=/dev/zero bs=1M count=$additional_mb >> "$FC_ROOTFS" 2>/dev/null
             
             # Resize the filesystem
-            if ! e2fsck -f -p "./ubuntu-24.04.ext4" >/dev/null 2>&1; then
+            if ! e2fsck -f -p "$FC_ROOTFS" >/dev/null 2>&1; then
                 echo "Filesystem check failed, restoring backup..."
-                mv "./ubuntu-24.04.ext4.backup" "./ubuntu-24.04.ext4"
+                mv "$FC_ROOTFS.backup" "$FC_ROOTFS"
                 echo "Warning: Could not resize root filesystem, using original"
-            elif ! resize2fs "./ubuntu-24.04.ext4" >/dev/null 2>&1; then
+            elif ! resize2fs "$FC_ROOTFS" >/dev/null 2>&1; then
                 echo "Resize failed, restoring backup..."
-                mv "./ubuntu-24.04.ext4.backup" "./ubuntu-24.04.ext4"
+                mv "$FC_ROOTFS.backup" "$FC_ROOTFS"
                 echo "Warning: Could not resize root filesystem, using original"
             else
                 echo "Successfully expanded root filesystem to ~${DISK_SIZE_MB}MB"
-                rm -f "./ubuntu-24.04.ext4.backup"
+                rm -f "$FC_ROOTFS.backup"
             fi
         else
             echo "Root filesystem already has adequate space"
-            rm -f "./ubuntu-24.04.ext4.backup"
+            rm -f "$FC_ROOTFS.backup"
         fi
     fi
     
@@ -137,7 +188,7 @@ setup_firecracker_vm() {
         USE_CPU_LIMIT=true
         CPU_QUOTA=$(echo "$VCPU_COUNT * 100000" | bc)  # Convert to microseconds for 100ms period
         CPU_PERIOD=100000  # 100ms period
-        DEDICATED_CPU=0  # Use CPU 0 for dedicated access
+        DEDICATED_CPU=${FC_CPUSET:-0}  # Use CPU 0 (or FC_CPUSET) for dedicated access
         echo "Configuring Firecracker for ${VCPU_COUNT} vCPU (${CPU_QUOTA}us quota per ${CPU_PERIOD}us period)"
     else
         # Integer vCPU count
@@ -152,7 +203,7 @@ setup_firecracker_vm() {
         echo "Setting up CPU constraints using cgroups..."
         
         # Try cgroup v2 first - use simple path
-        CGROUP_PATH="/sys/fs/cgroup/firecracker_io_test"
+        CGROUP_PATH="/sys/fs/cgroup/$FC_CGROUP_NAME"
         
         # Clean up any existing cgroup and processes
         if [ -d "$CGROUP_PATH" ]; then
@@ -193,10 +244,20 @@ setup_firecracker_vm() {
             echo "Adding Firecracker process to cgroup..."
             echo "$FIRECRACKER_PID" | sudo tee "$CGROUP_PATH/cgroup.procs" >/dev/null 2>&1 || echo "Warning: Could not add process to cgroup"
         fi
+    elif [ -n "$FC_CPUSET" ]; then
+        # vCPU and IO threads inherit the affinity of the process
+        taskset -c "$FC_CPUSET" ./firecracker --api-sock "$API_SOCKET" --no-seccomp &
+        FIRECRACKER_PID=$!
+        echo "Started Firecracker monitor PID: $FIRECRACKER_PID on CPUs $FC_CPUSET"
+        
+        create_accounting_cgroup "$FIRECRACKER_PID" || true
     else
         ./firecracker --api-sock "$API_SOCKET" --no-seccomp &
         FIRECRACKER_PID=$!
         echo "Started Firecracker monitor PID: $FIRECRACKER_PID"
+        
+        # Threads started later (vCPUs, IO) inherit the cgroup of the process
+        create_accounting_cgroup "$FIRECRACKER_PID" || true
     fi
     
     # Wait for API socket
@@ -233,25 +294,39 @@ setup_firecracker_vm() {
         }" \
         "http://localhost/boot-source"
     
+    # Cache type and host IO engine of the drive holding the test data (storage backend)
+    local test_drive_options="\"cache_type\": \"$FC_DRIVE_CACHE\", \"io_engine\": \"$FC_DRIVE_IO_ENGINE\""
+    local rootfs_options="\"cache_type\": \"Unsafe\", \"io_engine\": \"Sync\""
+    if [ "$USE_DEDICATED_TEST_DISK" != "true" ]; then
+        rootfs_options="$test_drive_options"
+    fi
+    echo "Test drive: $FC_DRIVE_BACKING backing, cache_type $FC_DRIVE_CACHE, io_engine $FC_DRIVE_IO_ENGINE"
+    
     # Set rootfs - using ext4 (read-write) for the OS
     sudo curl -X PUT --unix-socket "${API_SOCKET}" \
         --data "{
             \"drive_id\": \"rootfs\",
-            \"path_on_host\": \"$(pwd)/ubuntu-24.04.ext4\",
+            \"path_on_host\": \"$FC_ROOTFS\",
             \"is_root_device\": true,
-            \"is_read_only\": false
+            \"is_read_only\": false,
+            $rootfs_options
         }" \
         "http://localhost/drives/rootfs"
 
     # Add dedicated test disk if configured
-    if [ "$USE_DEDICATED_TEST_DISK" = "true" ] && [ -f "./test_disk.ext4" ]; then
+    if [ "$USE_DEDICATED_TEST_DISK" = "true" ] && [ -f "$FC_TEST_DISK" ]; then
         echo "Adding dedicated test disk to VM..."
+        local test_disk_path="$FC_TEST_DISK"
+        if [ "$FC_DRIVE_BACKING" = "loop" ] && [ -n "$FC_LOOP_DEVICE" ]; then
+            test_disk_path="$FC_LOOP_DEVICE"
+        fi
         sudo curl -X PUT --unix-socket "${API_SOCKET}" \
             --data "{
                 \"drive_id\": \"test_disk\",
-                \"path_on_host\": \"$(pwd)/test_disk.ext4\",
+                \"path_on_host\": \"$test_disk_path\",
                 \"is_root_device\": false,
-                \"is_read_only\": false
+                \"is_read_only\": false,
+                $test_drive_options
             }" \
             "http://localhost/drives/test_disk"
         echo "VM will use dedicated ${DISK_SIZE_MB}MB test disk (/dev/vdb)"
@@ -352,8 +427,8 @@ setup_firecracker_vm() {
             
             # Fallback: constrain the main Firecracker process
             sudo taskset -cp $DEDICATED_CPU $FIRECRACKER_PID 2>/dev/null || true
-            echo $FIRECRACKER_PID | sudo tee /sys/fs/cgroup/firecracker_io_test/cgroup.procs >/dev/null 2>&1 || \
-            echo $FIRECRACKER_PID | sudo tee /sys/fs/cgroup/cpu/firecracker_io_test/cgroup.procs >/dev/null 2>&1 || true
+            echo $FIRECRACKER_PID | sudo tee /sys/fs/cgroup/$FC_CGROUP_NAME/cgroup.procs >/dev/null 2>&1 || \
+            echo $FIRECRACKER_PID | sudo tee /sys/fs/cgroup/cpu/$FC_CGROUP_NAME/cgroup.procs >/dev/null 2>&1 || true
         fi
     fi
     
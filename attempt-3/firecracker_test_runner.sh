@@ -7,6 +7,9 @@
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
 source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
 source "$(dirname "${BASH_SOURCE[0]}")/metrics_parser.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/cache_control.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/campaign.sh"
 
 # Get the correct test directory based on configuration
 get_vm_test_directory() {
@@ -17,6 +20,13 @@ get_vm_test_directory() {
     fi
 }
 
+# Guest CLOCK_MONOTONIC minus the host's in ms (empty if the guest does not answer),
+# from the best of several round trips over one SSH session
+guest_clock_offset() {
+    python3 "$PREEMPTION_ANALYSIS" clock-offset ssh -T -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no \
+        -o ConnectTimeout=10 root@"$GUEST_IP" 2>/dev/null | cut -d' ' -f1
+}
+
 # Firecracker IO testing
 run_firecracker_io_test() {
     local test_name="$1"
@@ -24,106 +34,158 @@ run_firecracker_io_test() {
     local output_file="$3"
     
     echo "Running Firecracker IO test: $test_name"
-    echo "timestamp,operation,latency_us,throughput_mbps,cpu_usage" > "$output_file"
+    # A resumed pattern appends to the rows an interrupted run journaled (campaign_enter)
+    [ "$CAMPAIGN_ATTEMPTS" -gt 0 ] || write_results_header "$output_file"
+    local json_dir=$(fio_json_dir)
+    
+    # Persistent channel into the guest; falls back to one SSH session per step
+    local agent_ready=false
+    start_agent "firecracker" && agent_ready=true
     
-    for i in $(seq 1 $ITERATIONS); do
-        echo "  Firecracker test $i/$ITERATIONS..."
+    # Preconditioned file reused by every iteration (FILE_POOL_MODE=steady);
+    # this pattern keeps fresh-file semantics if the pool cannot be prepared
+    local FILE_POOL_MODE="$FILE_POOL_MODE"
+    prepare_file_pool "firecracker" "$(get_vm_test_directory)" "$io_command" || FILE_POOL_MODE=fresh
+    cache_prime "firecracker" "$(get_vm_test_directory)" "$io_command"
+    
+    # The guest's block-device reads are counted around fio (guest page-cache hit ratio)
+    local fio_command=$(with_guest_read_counter "$io_command $FIO_OUTPUT_FORMAT $(latency_log_options) $(steady_state_options)")
+    
+    # i numbers attempts (file names), completed counts the iterations that produced a result
+    local i=$CAMPAIGN_ATTEMPTS
+    local completed=$CAMPAIGN_DONE
+    local failures=0
+    while iterations_remaining "firecracker" "$test_name" "$output_file" "$completed"; do
+        # An interleaved schedule hands over to the other environment after each round
+        round_complete "$completed" && return $ROUND_PENDING
+        i=$((i + 1))
+        echo "  Firecracker test $((completed + 1))/$(iteration_budget)..."
         
         # Check if VM is still responsive
         if ! ping -c 1 -W 2 "$GUEST_IP" >/dev/null 2>&1; then
             echo "    Warning: VM not responsive, attempting to reconnect..."
             if ! wait_for_connectivity "$GUEST_IP"; then
                 echo "    Error: VM connection lost, skipping this iteration"
+                campaign_record failed "$i" "$output_file" "VM unreachable"
+                failures=$((failures + 1))
+                campaign_retry "$failures" "$test_name" || return 1
                 continue
             fi
         fi
         
         # Execute IO operation and extract fio metrics - use configured test directory
         VM_TEST_DIR=$(get_vm_test_directory)
+        json_file="${json_dir}/firecracker_${test_name}_${i}.json"
+        cache_reset "firecracker" "$VM_TEST_DIR"
+        # Host CPU charged to the Firecracker cgroup (VMM, vCPU and IO threads) across the fio run
+        cgroup=$(telemetry_cgroup "firecracker")
         
-        # First, clean up any existing test files and check disk space
-        cleanup_output=$(timeout 30 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "
-            cd $VM_TEST_DIR 2>/dev/null || mkdir -p $VM_TEST_DIR
-            # Aggressive cleanup of all test files
-            rm -rf test_seq *.fio fio_test_file random_* mixed* testfile* seq_test_file rand_test_file mixed_test_file *_4k_* *_64k_* *_1m_* *_512b_* *.file 2>/dev/null || true
-            sync
-            # Check available space
-            df -h $VM_TEST_DIR | tail -1 | awk '{print \"Available:\" \$4 \" (\" \$5 \" used)\"}'
-        " 2>&1)
-        
-        echo "    VM disk status: $cleanup_output"
+        # The guest's monotonic clock starts at its boot: its offset from the host's lines the
+        # per-I/O log up with the cgroup's throttling samples
+        clock_offset=""
+        throttle_join=false
+        [ "$LATENCY_LOG" = "true" ] && [ "$THROTTLE_JOIN" = "true" ] && throttle_join=true
+        # Logs the agent brings back in its reply (removed once folded)
+        latency_payload="${json_file%.json}.lat"
+        steady_payload="${json_file%.json}.steady"
         
-        # Execute the actual IO command
-        io_output=$(timeout 60 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && $io_command" 2>&1 || echo "timeout_or_error")
-        
-        # Clean up the test file immediately after the test
-        timeout 15 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && rm -f *_4k_* *_64k_* *_1m_* *_512b_* *.file 2>/dev/null && sync" >/dev/null 2>&1 || true
-        
-        # Debug: show first few lines of fio output
-        echo "    Debug: fio output preview:"
-        echo "$io_output" | head -n 10 | sed 's/^/      /'
-        
-        # Extract metrics from fio output
-        latency_us="0"
-        throughput_mb="0"
-        iops="0"
-        
-        if [[ "$io_output" == "timeout_or_error" ]] || echo "$io_output" | grep -q "Connection.*refused\|Connection.*timed out\|No route to host"; then
-            echo "    Error: SSH connection failed or timed out"
-            echo "    Skipping this iteration"
-            latency_us="0"
-            throughput_mb="0"
-        elif [[ "$io_output" != "timeout_or_error" ]] && echo "$io_output" | grep -q "Run status"; then
-            # Use metrics parser functions
-            latency_us=$(parse_latency "$io_output")
-            throughput_mb=$(parse_throughput "$io_output")
-            
-            # Extract IOPS from the main line
-            # Format: "write: IOPS=13.5k, BW=52.6MiB/s"
-            if echo "$io_output" | grep -q "IOPS="; then
-                iops_raw=$(echo "$io_output" | grep "IOPS=" | sed -n 's/.*IOPS=\([0-9.k]*\).*/\1/p')
-                # Convert k notation (e.g., "13.5k" -> "13500")
-                if echo "$iops_raw" | grep -q "k"; then
-                    iops_num=$(echo "$iops_raw" | sed 's/k//')
-                    if [[ "$iops_num" =~ ^[0-9.]+$ ]]; then
-                        iops=$(echo "$iops_num * 1000" | bc -l | cut -d. -f1)
-                    fi
-                elif [[ "$iops_raw" =~ ^[0-9.]+$ ]]; then
-                    iops="$iops_raw"
-                fi
+        agent_status=$AGENT_UNAVAILABLE
+        if [ "$agent_ready" = "true" ]; then
+            # Cleanup, fio and cleanup in one round-trip over the persistent channel;
+            # start/end come back as the fio run's own window on the host clock, together
+            # with the guest clock offset and the latency and bw/iops logs
+            cpu_before=$(cgroup_cpu_usec "$cgroup")
+            agent_output=$(agent_run "firecracker" "$VM_TEST_DIR" "$fio_command" \
+                "$json_file" "${json_file%.json}.err" "$(fio_timeout)" "$latency_payload" "$steady_payload")
+            agent_status=$?
+            cpu_after=$(cgroup_cpu_usec "$cgroup")
+            if [ $agent_status -eq $AGENT_UNAVAILABLE ]; then
+                echo "    Warning: Agent channel lost, falling back to per-step SSH"
+                agent_ready=false
             fi
-        elif echo "$io_output" | grep -q "copied"; then
-            # Handle dd output format (keeping for backwards compatibility)
-            # Format: "104857600 bytes (105 MB, 100 MiB) copied, 0.280155 s, 374 MB/s"
-            if echo "$io_output" | grep -oE '[0-9.]+ [GM]B/s'; then
-                dd_throughput=$(echo "$io_output" | grep -oE '[0-9.]+ [GM]B/s' | tail -1)
-                if echo "$dd_throughput" | grep -q "GB/s"; then
-                    throughput_gb=$(echo "$dd_throughput" | sed 's/ GB\/s//')
-                    if [[ "$throughput_gb" =~ ^[0-9.]+$ ]]; then
-                        throughput_mb=$(echo "$throughput_gb * 1000" | bc -l | xargs printf "%.2f")
-                    fi
-                elif echo "$dd_throughput" | grep -q "MB/s"; then
-                    throughput_mb=$(echo "$dd_throughput" | sed 's/ MB\/s//')
-                fi
+        fi
+        
+        if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+            read -r start_time end_time clock_offset cleanup_output <<< "$agent_output"
+            [ "$clock_offset" = "-" ] && clock_offset=""
+            [ "$throttle_join" = "true" ] || clock_offset=""
+            echo "    VM disk status: $cleanup_output"
+            if [ $agent_status -ne 0 ]; then
+                echo "    Error: fio failed or timed out in the guest"
+                echo "    Output preview: $(grep -v '^pgpgin ' "${json_file%.json}.err" | head -n 2 | tr '\n' ' ')"
             fi
-            
-            # For dd, we don't have latency info, so leave it as 0
-            latency_us="0"
         else
-            echo "    Warning: IO command produced unexpected output format"
-            echo "    Output preview: $(echo "$io_output" | head -n 2 | tr '\n' ' ')"
+            # First, clean up any existing test files and check disk space
+            cleanup_output=$(timeout 30 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "
+                cd $VM_TEST_DIR 2>/dev/null || mkdir -p $VM_TEST_DIR
+                # Aggressive cleanup of all test files
+                $(test_file_cleanup)
+                sync
+                # Check available space
+                df -h $VM_TEST_DIR | tail -1 | awk '{print \"Available:\" \$4 \" (\" \$5 \" used)\"}'
+            " 2>&1)
+            
+            echo "    VM disk status: $cleanup_output"
+            
+            # Without the agent, measure the guest clock over its own SSH session right before fio
+            [ "$throttle_join" = "true" ] && clock_offset=$(guest_clock_offset)
+            
+            # Execute the actual IO command - JSON goes to its own file, fio/SSH warnings to stderr
+            cpu_before=$(cgroup_cpu_usec "$cgroup")
+            start_time=$(date +%s.%N)
+            if ! timeout "$(fio_timeout)" ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && $fio_command" > "$json_file" 2> "${json_file%.json}.err"; then
+                echo "    Error: SSH connection failed or timed out"
+                echo "    Output preview: $(grep -v '^pgpgin ' "${json_file%.json}.err" | head -n 2 | tr '\n' ' ')"
+            fi
+            end_time=$(date +%s.%N)
+            cpu_after=$(cgroup_cpu_usec "$cgroup")
+        fi
+        
+        [ "$throttle_join" = "true" ] && [ -z "$clock_offset" ] && \
+            echo "    Warning: Guest clock offset unavailable, I/O events not kept this iteration"
+        
+        # Fold the latency log (from the agent's reply, or streamed out of the guest) into a
+        # mergeable histogram
+        if [ "$LATENCY_LOG" = "true" ]; then
+            hist_file="$(latency_hist_dir)/firecracker_${test_name}_${i}.npz"
+            events_file=""
+            [ -n "$clock_offset" ] && events_file="$(io_events_dir)/firecracker_${test_name}_${i}.npz"
+            if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+                cat "$latency_payload" 2>/dev/null
+            else
+                timeout 300 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && cat $(latency_log_glob)" 2>/dev/null
+            fi | fold_latency_log "$hist_file" "$events_file" "$clock_offset" | sed 's/^/    Latency histogram: /'
         fi
         
-        # Get CPU usage (simple approximation - for more accurate monitoring, we'd need additional tooling)
-        cpu_usage="0"  # Placeholder - would need more sophisticated monitoring
+        # Find the steady window of the bandwidth/IOPS logs
+        steady_file=""
+        if steady_state_logging; then
+            steady_file="$(steady_state_dir)/firecracker_${test_name}_${i}.json"
+            if [ $agent_status -ne $AGENT_UNAVAILABLE ]; then
+                cat "$steady_payload" 2>/dev/null
+            else
+                timeout 60 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && tail -v -n +1 $(steady_log_glob)" 2>/dev/null
+            fi | detect_steady_state "$steady_file" | sed 's/^/    Steady state: /'
+        fi
+        rm -f "$latency_payload" "$steady_payload"
         
-        timestamp=$(date '+%Y-%m-%d %H:%M:%S.%3N')
-        echo "$timestamp,$test_name,$latency_us,$throughput_mb,$cpu_usage" >> "$output_file"
+        # Clean up the test file immediately after the test (the agent already did)
+        [ $agent_status -eq $AGENT_UNAVAILABLE ] && timeout 15 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" "cd $VM_TEST_DIR && $(test_file_cleanup) && sync" >/dev/null 2>&1 || true
         
-        if [[ "$throughput_mb" != "0" ]]; then
-            echo "    Latency: ${latency_us}μs, Throughput: ${throughput_mb} MB/s"
+        # Parse fio JSON once and append the CSV row (zeros if the run failed)
+        if summary=$(append_fio_result "$json_file" "$test_name" "$start_time" "$end_time" "$output_file" "$(cpu_usec_delta "$cpu_before" "$cpu_after")" \
+                "$(guest_read_bytes "${json_file%.json}.err")" "$steady_file"); then
+            echo "    $summary"
+            campaign_record done "$i" "$output_file"
+            live_summary "$(dirname "$output_file")" "$test_name"
+            completed=$((completed + 1))
+            failures=0
         else
-            echo "    Latency: ${latency_us}μs, No throughput data"
+            echo "    Skipping this iteration"
+            echo "    $summary"
+            campaign_record failed "$i" "$output_file" "no fio result"
+            failures=$((failures + 1))
+            campaign_retry "$failures" "$test_name" || return 1
         fi
         
         sleep 2
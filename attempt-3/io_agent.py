@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Persistent execution channel for the IO Performance Comparison Framework
+A small agent runs inside the guest/container and executes job specs
+(cleanup, fio, cleanup) sent as JSON lines over one long-lived transport
+(SSH session, `docker exec -i`, or a local subprocess stand-in). The reply
+carries the agent's clock sample and the fio logs the host folds afterwards,
+so an iteration is one round-trip even with latency and steady-state logging
+"""
+
+# Runs inside the guest (Ubuntu 24.04) and the container (Ubuntu 20.04):
+# standard library only, Python 3.8 syntax.
+
+import base64
+import glob
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# 2: clock acknowledgement before each job and collected log payloads in the reply
+PROTOCOL_VERSION = 2
+DEFAULT_TIMEOUT = 60
+# Extra time the broker waits beyond a job's own timeout (cleanup, sync, transport)
+TRANSPORT_MARGIN = 30
+EXIT_UNAVAILABLE = 2
+
+
+# Agent side (inside the guest/container)
+
+def _remove(patterns: List[str], keep: List[str]) -> int:
+    """Delete files/directories matching `patterns` in the cwd, except those matching `keep`."""
+    kept = {path for pattern in keep for path in glob.glob(pattern)}
+    removed = 0
+    for pattern in patterns:
+        for path in glob.glob(pattern):
+            if path in kept:
+                continue
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+def _collect(spec: Dict) -> str:
+    """
+    The files matching spec['globs'] in glob order, as `cat` (or, with
+    spec['headers'], `tail -v -n +1`) would print them, zlib-compressed and base64-encoded.
+    """
+    chunks = []
+    for pattern in spec.get('globs', []):
+        for path in sorted(glob.glob(pattern)):
+            if spec.get('headers'):
+                chunks.append(("\n" if chunks else "").encode() + f"==> {path} <==\n".encode())
+            try:
+                with open(path, 'rb') as f:
+                    chunks.append(f.read())
+            except OSError:
+                pass
+    return base64.b64encode(zlib.compress(b''.join(chunks), 1)).decode('ascii')
+
+
+def run_job(job: Dict) -> Dict:
+    """Execute one job spec: pre-cleanup, command, post-cleanup, all in `workdir`."""
+    received = time.time()
+    workdir = job.get('workdir') or '.'
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    # `preserve` (pool files) survives both cleanups, `keep` (latency logs) only the post-run one
+    preserve = job.get('preserve', [])
+    _remove(job.get('pre_cleanup', []), preserve)
+    os.sync()
+    stat = os.statvfs('.')
+
+    response = {'id': job.get('id'), 'returncode': None, 'stdout': '', 'stderr': '',
+                'disk_free_bytes': stat.f_bavail * stat.f_frsize,
+                'disk_size_bytes': stat.f_blocks * stat.f_frsize}
+    start = time.time()
+    try:
+        proc = subprocess.run(['/bin/bash', '-c', job['command']], stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, timeout=job.get('timeout', DEFAULT_TIMEOUT))
+        response['returncode'] = proc.returncode
+        response['stdout'] = proc.stdout.decode(errors='replace')
+        response['stderr'] = proc.stderr.decode(errors='replace')
+    except subprocess.TimeoutExpired as e:
+        response['returncode'] = 124
+        response['stderr'] = (e.stderr or b'').decode(errors='replace') + "\nio_agent: command timed out"
+    response['start'] = start
+    response['end'] = time.time()
+    # Logs the host folds after the run come back in this reply, before the post-run cleanup
+    response['collected'] = [_collect(spec) for spec in job.get('collect', [])]
+
+    _remove(job.get('post_cleanup', []), job.get('keep', []) + preserve)
+    os.sync()
+    # Agent-clock offsets let the host place the command inside its own round-trip
+    response['received'] = received
+    response['replied'] = time.time()
+    return response
+
+
+def serve(stdin=None, stdout=None) -> int:
+    """Read one JSON job per line and answer with one JSON line, until EOF."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            if job.get('op') == 'ping':
+                response = {'id': job.get('id'), 'ok': True, 'protocol': PROTOCOL_VERSION,
+                            'python': sys.version.split()[0]}
+            else:
+                # Immediate CLOCK_MONOTONIC sample: the broker times this short exchange,
+                # not the job, to place the agent's clock on the host's
+                stdout.write(json.dumps({'id': job.get('id'), 'ack': True, 'mono': time.monotonic()}) + '\n')
+                stdout.flush()
+                response = run_job(job)
+        except Exception as e:  # never let one bad job kill the channel
+            response = {'error': f"{type(e).__name__}: {e}"}
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
+    return 0
+
+
+# Broker side (on the host): owns the transport, listens on a Unix socket
+
+class Transport:
+    """A long-lived `serve` process reached through a command (ssh, docker exec -i, python3)."""
+
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.proc = None
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self) -> None:
+        self.close()
+        self.proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, bufsize=0)
+        self._buffer = b''
+
+    def close(self) -> None:
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            try:
+                self.proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+            self.proc = None
+
+    def _readline(self, deadline: float, timeout: float) -> Dict:
+        fd = self.proc.stdout.fileno()
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                # The agent is stuck; drop the channel so the next job starts clean
+                self.proc.kill()
+                raise TimeoutError(f"no reply within {timeout:.0f}s")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                chunk = os.read(fd, 1 << 20)
+                if not chunk:
+                    raise ConnectionError("transport closed")
+                self._buffer += chunk
+        line, _, self._buffer = self._buffer.partition(b'\n')
+        return json.loads(line)
+
+    def request(self, message: Dict, timeout: float) -> Dict:
+        """
+        Send one message and wait for its reply; raises on a dead transport. A job's
+        reply gains clock_offset_ms (agent CLOCK_MONOTONIC minus the host's) and its
+        uncertainty (half the round trip) from the agent's acknowledgement.
+        """
+        if not self.alive():
+            self.start()
+        sent = time.monotonic()
+        self.proc.stdin.write((json.dumps(message) + '\n').encode())
+        deadline = sent + timeout
+        reply = self._readline(deadline, timeout)
+        if reply.get('ack'):
+            received = time.monotonic()
+            clock = {'clock_offset_ms': (reply['mono'] - (sent + received) / 2) * 1e3,
+                     'clock_uncertainty_ms': (received - sent) / 2 * 1e3}
+            reply = dict(self._readline(deadline, timeout), **clock)
+        return reply
+
+
+def _forward(transport: Transport, message: Dict) -> Dict:
+    timeout = float(message.get('timeout', DEFAULT_TIMEOUT)) + TRANSPORT_MARGIN
+    for attempt in range(2):
+        try:
+            return transport.request(message, timeout)
+        except TimeoutError as e:
+            # Checked before OSError (its base class): a stuck job is not retried
+            return {'id': message.get('id'), 'error': f"transport timed out: {e}"}
+        except (OSError, ValueError) as e:
+            # One reconnect: pre-cleanup makes a replayed job idempotent
+            if attempt == 1:
+                return {'id': message.get('id'), 'error': f"transport failed: {e}"}
+            transport.start()
+
+
+def broker(socket_path: str, command: List[str], pidfile: Optional[str] = None) -> int:
+    """Serve jobs from local clients over `socket_path`, one at a time, through one transport."""
+    transport = Transport(command)
+    transport.start()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(4)
+    if pidfile:
+        with open(pidfile, 'w') as f:
+            f.write(f"{os.getpid()}\n")
+
+    stop = []
+    signal.signal(signal.SIGTERM, lambda *_: stop.append(True) or server.close())
+    try:
+        while not stop:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            with conn, conn.makefile('rwb') as stream:
+                line = stream.readline()
+                if not line:
+                    continue
+                try:
+                    reply = _forward(transport, json.loads(line))
+                except ValueError as e:
+                    reply = {'error': f"bad request: {e}"}
+                stream.write((json.dumps(reply) + '\n').encode())
+                stream.flush()
+    finally:
+        transport.close()
+        server.close()
+        for path in (socket_path, pidfile):
+            if path and os.path.exists(path):
+                os.remove(path)
+    return 0
+
+
+# Client side (called by the runners once per iteration)
+
+def submit(socket_path: str, message: Dict, timeout: float) -> Dict:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path)
+        with client.makefile('rwb') as stream:
+            stream.write((json.dumps(message) + '\n').encode())
+            stream.flush()
+            line = stream.readline()
+    finally:
+        client.close()
+    if not line:
+        raise ConnectionError("broker closed the connection")
+    return json.loads(line)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Persistent job channel to the guest/container")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('serve', help="Agent: run JSON-line jobs from stdin (inside the guest/container)")
+
+    brk = sub.add_parser('broker', help="Host: keep one transport open and serve jobs on a Unix socket")
+    brk.add_argument('--socket', required=True)
+    brk.add_argument('--pidfile')
+    brk.add_argument('transport', nargs=argparse.REMAINDER,
+                     help="Command that starts `io_agent.py serve` on the other side (after --)")
+
+    ping = sub.add_parser('ping', help="Exit 0 if the broker and agent answer")
+    ping.add_argument('--socket', required=True)
+
+    run = sub.add_parser('run', help="Run one cleanup + command + cleanup round-trip; prints the "
+                                     "command's host-clock start/end, the agent clock offset and disk status")
+    run.add_argument('--socket', required=True)
+    run.add_argument('--workdir', required=True)
+    run.add_argument('--cleanup', default='', help="Space separated globs removed before and after")
+    run.add_argument('--keep', default='', help="Globs the post-run cleanup leaves in place")
+    run.add_argument('--preserve', default='', help="Globs neither cleanup touches (file pool)")
+    run.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    run.add_argument('--stdout', required=True, help="File receiving the command's stdout")
+    run.add_argument('--stderr', required=True, help="File receiving the command's stderr")
+    run.add_argument('--collect', action='append', default=[], metavar='FILE=GLOBS',
+                     help="Write the files matching GLOBS after the run to FILE, as cat would (repeatable)")
+    run.add_argument('--collect-headed', action='append', default=[], metavar='FILE=GLOBS',
+                     help="Same, as tail -v -n +1 would (a header before each file)")
+    run.add_argument('job', help="Shell command to run in the workdir")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        return serve()
+
+    if args.command == 'broker':
+        transport = args.transport[1:] if args.transport[:1] == ['--'] else args.transport
+        if not transport:
+            parser.error("broker needs a transport command after --")
+        return broker(args.socket, transport, args.pidfile)
+
+    if args.command == 'ping':
+        try:
+            reply = submit(args.socket, {'op': 'ping', 'timeout': 10}, 10 + TRANSPORT_MARGIN)
+        except (OSError, ValueError) as e:
+            print(f"Agent unavailable: {e}", file=sys.stderr)
+            return EXIT_UNAVAILABLE
+        if not reply.get('ok'):
+            print(f"Agent unavailable: {reply.get('error', 'no reply')}", file=sys.stderr)
+            return EXIT_UNAVAILABLE
+        if reply.get('protocol') != PROTOCOL_VERSION:
+            # A broker left over from an older framework: the runner redeploys the agent
+            print(f"Agent speaks protocol {reply.get('protocol')}, need {PROTOCOL_VERSION}", file=sys.stderr)
+            return EXIT_UNAVAILABLE
+        print(f"Agent ready (protocol {reply['protocol']}, python {reply['python']})")
+        return 0
+
+    collect = [(target, {'globs': globs.split(), 'headers': headers})
+               for option, headers in ((args.collect, False), (args.collect_headed, True))
+               for target, _, globs in (value.partition('=') for value in option)]
+    message = {
+        'id': f"{os.getpid()}-{time.time():.6f}",
+        'workdir': args.workdir,
+        'command': args.job,
+        'pre_cleanup': args.cleanup.split(),
+        'post_cleanup': args.cleanup.split(),
+        'keep': args.keep.split(),
+        'preserve': args.preserve.split(),
+        'timeout': args.timeout,
+        'collect': [spec for _, spec in collect],
+    }
+    sent = time.time()
+    try:
+        reply = submit(args.socket, message, args.timeout + 2 * TRANSPORT_MARGIN)
+    except (OSError, ValueError) as e:
+        print(f"Agent unavailable: {e}", file=sys.stderr)
+        return EXIT_UNAVAILABLE
+    if reply.get('error'):
+        print(f"Agent unavailable: {reply['error']}", file=sys.stderr)
+        return EXIT_UNAVAILABLE
+
+    with open(args.stdout, 'w') as f:
+        f.write(reply['stdout'])
+    with open(args.stderr, 'w') as f:
+        f.write(reply['stderr'])
+    done = time.time()
+    for (target, _), payload in zip(collect, reply.get('collected', [])):
+        with open(target, 'wb') as f:
+            f.write(zlib.decompress(base64.b64decode(payload)))
+
+    # Host-clock window of the command itself (no guest clock sync needed): shift the
+    # send/receive instants by the time the agent spent on cleanup before and after
+    start = sent + (reply['start'] - reply['received'])
+    end = done - (reply['replied'] - reply['end'])
+    free_gb = reply['disk_free_bytes'] / 1e9
+    used_pct = 100.0 * (1 - reply['disk_free_bytes'] / reply['disk_size_bytes']) if reply['disk_size_bytes'] else 0
+    offset = reply.get('clock_offset_ms')
+    offset = '-' if offset is None else f"{offset:.3f}"
+    # "<start> <end> <clock offset ms or -> <disk status>" for the runner; the command's
+    # own output and the collected logs went to the files
+    print(f"{start:.6f} {end:.6f} {offset} Available:{free_gb:.1f}G ({used_pct:.0f}% used)")
+    return 0 if reply['returncode'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,6 @@
+"""
+Analysis package of the IO Performance Comparison Framework
+(`io-analysis` / `python3 -m io_analysis`); see cli.py for the subcommands
+"""
+
+__version__ = '0.1.0'
@@ -0,0 +1,129 @@
+"""
+io-analysis command line: compare, blocksize, table, preemption, replay and plot.
+Only the standard library is imported up front; each subcommand imports
+numpy, the results store or matplotlib when it runs
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+
+def run_compare(args) -> int:
+    # Small inputs (too few iterations for any significance test) and --live take the
+    # csv/array fast path and never import numpy
+    from io_analysis import fast
+
+    results_dir = Path(args.results_dir)
+    if not results_dir.is_dir():
+        print(f"Error: Results directory {results_dir} does not exist", file=sys.stderr)
+        return 1
+    samples = fast.load_samples(results_dir, args.pattern)
+    if args.live or not fast.testable(samples):
+        fast.print_summary(results_dir, samples, live=args.live)
+        return 0
+
+    from io_analysis import compare
+    compare.report(results_dir, args.pattern)
+    return 0
+
+
+def run_blocksize(args) -> int:
+    from io_analysis import blocksize
+
+    blocksize.report()
+    return 0
+
+
+def run_table(args) -> int:
+    from io_analysis import table
+
+    table.report(args.fleet, args.since, args.until, args.workers)
+    return 0
+
+
+def run_preemption(args) -> int:
+    import preemption_analysis
+
+    return preemption_analysis.main(args.args)
+
+
+def run_replay(args) -> int:
+    import trace_replay
+
+    return trace_replay.main(args.args)
+
+
+def run_plot(args) -> int:
+    # Probe only: the workers import matplotlib themselves
+    if importlib.util.find_spec('matplotlib') is None:
+        print("Error: plot needs matplotlib (pip install 'io-analysis[plot]')", file=sys.stderr)
+        return 1
+    from io_analysis import plots
+
+    if not Path(args.results_dir).is_dir():
+        print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+        return 1
+    specs = plots.load_specs(args.results_dir)
+    if args.only:
+        specs = [spec for spec in specs if spec['name'] in args.only]
+    output_dir = args.output or Path(args.results_dir) / plots.OUTPUT_DIR
+    for path in plots.render_all(specs, output_dir, args.format, args.workers):
+        print(path)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='io-analysis', description="Firecracker vs container I/O analysis")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    cmp = sub.add_parser('compare', help="Per-pattern comparison of one results directory")
+    cmp.add_argument('results_dir')
+    cmp.add_argument('--pattern', help="Only this pattern")
+    cmp.add_argument('--live', action='store_true',
+                     help="Running means and CIs from the CSVs only (fast path, no significance tests)")
+    cmp.set_defaults(handler=run_compare)
+
+    blk = sub.add_parser('blocksize', help="Block-size report of the latest run in the results store")
+    blk.set_defaults(handler=run_blocksize)
+
+    tbl = sub.add_parser('table', help="Comprehensive table of the latest run (saved as CSV)")
+    tbl.add_argument('--fleet', action='store_true', help="Aggregate every run in the results store instead of the latest")
+    tbl.add_argument('--since', help="Fleet: first run date (YYYYMMDD)")
+    tbl.add_argument('--until', help="Fleet: last run date (YYYYMMDD)")
+    tbl.add_argument('--workers', type=int, help="Fleet: worker processes (default: one per CPU)")
+    tbl.set_defaults(handler=run_table)
+
+    pre = sub.add_parser('preemption', help="Throttling vs tail latency (preemption_analysis.py subcommands)")
+    pre.add_argument('args', nargs=argparse.REMAINDER, help="ingest | clock-offset | analyze ...")
+    pre.set_defaults(handler=run_preemption)
+
+    rep = sub.add_parser('replay', help="Block trace conversion and replay divergence (trace_replay.py subcommands)")
+    rep.add_argument('args', nargs=argparse.REMAINDER, help="convert | list | report ...")
+    rep.set_defaults(handler=run_replay)
+
+    plt = sub.add_parser('plot', help="Render the analysis figures of one results directory in parallel")
+    plt.add_argument('results_dir')
+    plt.add_argument('--output', help="Output directory (default: <results_dir>/plots)")
+    plt.add_argument('--format', choices=('png', 'svg', 'pdf'), default='png')
+    plt.add_argument('--only', nargs='+', metavar='FIGURE',
+                     help="latency, throughput, iops, consistency, block_size_scaling, speedup, preemption")
+    plt.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    plt.set_defaults(handler=run_plot)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except BrokenPipeError:
+        # Piped into head and closed early: point stdout at /dev/null so the flush at
+        # exit does not raise again, and stop without a traceback
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+"""
+Full container vs Firecracker report of one results directory: means, CIs,
+host CPU cost and Welch-test winners from the comparison model
+"""
+
+import csv
+import statistics
+from pathlib import Path
+
+import numpy as np
+
+from comparison import load_comparison, relative_ci, verdict_labels, CONTAINER, FIRECRACKER
+from significance import MIN_SAMPLES, underpowered
+
+ENVS = (('container', CONTAINER), ('firecracker', FIRECRACKER))
+
+def load_stopping_decisions(results_dir):
+    """Final adaptive-iteration decision per (env, pattern), if the run was adaptive"""
+    decisions = {}
+    decisions_file = Path(results_dir) / "stopping_decisions.csv"
+    if decisions_file.exists():
+        with open(decisions_file, 'r') as f:
+            for row in csv.DictReader(f):
+                decisions[(row['env'], row['pattern'])] = row
+    return decisions
+
+def format_ci(rel):
+    """Relative 95% Student-t CI half-width of the mean"""
+    return "±n/a" if rel == float('inf') else f"±{rel * 100:.1f}%"
+
+def format_cpu_cost(per_io, per_core):
+    """Host CPU-µs per I/O and MB/s per host core, or n/a without cgroup accounting"""
+    if np.isnan(per_io):
+        return "n/a"
+    return f"{per_io:.1f} CPU-μs/IO, {per_core:.1f} MB/s per host core"
+
+def format_significance(row, metric):
+    """Firecracker/container ratio CI and adjusted p-value"""
+    ratio = row[f'{metric}_mean'][FIRECRACKER] / row[f'{metric}_mean'][CONTAINER]
+    return (f"FC/container {ratio:.3f} [{row[f'{metric}_ratio_lo']:.3f}, {row[f'{metric}_ratio_hi']:.3f}], "
+            f"p(adj)={row[f'{metric}_p']:.4f}")
+
+def winners(table, metric):
+    """Per-row winner; 'Unknown' unless both environments have a mean"""
+    known = (np.nan_to_num(table[f'{metric}_mean']) > 0).all(axis=1)
+    return [label if ok else 'Unknown' for label, ok in zip(verdict_labels(table, metric), known)]
+
+def advantage(table, metric, higher_is_better):
+    """How much better the winner's mean is than the loser's, relative to the loser, in percent"""
+    means = table[f'{metric}_mean']
+    loser = means.min(axis=1) if higher_is_better else means.max(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nan_to_num(np.abs(means[:, FIRECRACKER] - means[:, CONTAINER]) / loser * 100)
+
+def analyze_performance(table, decisions=None):
+    """Print the per-test comparison of every paired row of the comparison table"""
+    latency_winners = winners(table, 'latency')
+    throughput_winners = winners(table, 'throughput')
+    latency_advantage = advantage(table, 'latency', higher_is_better=False)
+    throughput_advantage = advantage(table, 'throughput', higher_is_better=True)
+    latency_ci = relative_ci(table, 'latency')
+    throughput_ci = relative_ci(table, 'throughput')
+    
+    for i, row in enumerate(table):
+        test_name = row['pattern']
+        print(f"\nTEST: {test_name}")
+        print(f"{'='*60}")
+        for env, e in ENVS:
+            print(f"{env.title():<12} | Latency: {np.nan_to_num(row['latency_mean'][e]):.2f}μs {format_ci(latency_ci[i, e])} | Throughput: {np.nan_to_num(row['throughput_mean'][e]):.2f} MB/s {format_ci(throughput_ci[i, e])} | n={row['count'][e]}")
+        print(f"Host CPU     | Container: {format_cpu_cost(row['cpu_us_per_io'][CONTAINER], row['mbps_per_core'][CONTAINER])} | Firecracker: {format_cpu_cost(row['cpu_us_per_io'][FIRECRACKER], row['mbps_per_core'][FIRECRACKER])}")
+        
+        # Why each environment stopped iterating (adaptive mode only)
+        for env, _ in ENVS:
+            decision = (decisions or {}).get((env, test_name))
+            if decision:
+                print(f"{env.title():<12} | Stopped after {decision['iterations']} iterations: {decision['reason']}")
+        
+        for label, winner, amount, metric in (('Latency', latency_winners[i], latency_advantage[i], 'latency'),
+                                              ('Throughput', throughput_winners[i], throughput_advantage[i], 'throughput')):
+            detail = f" | {format_significance(row, metric)}"
+            if winner == 'No significant difference':
+                print(f"{label}: No significant difference ({amount:.1f}% apart){detail}")
+            elif winner != 'Unknown':
+                print(f"{label} Winner: {winner} ({amount:.1f}% better){detail}")
+    
+    return latency_winners, throughput_winners
+
+def report(results_dir, pattern=None):
+    """Print the comparison of every pattern (or only `pattern`) with a summary of the winners"""
+    results_dir = Path(results_dir)
+    
+    print(f"\n{'='*60}")
+    print("IO PERFORMANCE ANALYSIS REPORT")
+    print(f"{'='*60}")
+    print(f"Results Directory: {results_dir}")
+    
+    # One row per pattern from the columnar results store (ingested on first use); storage-matrix
+    # runs are compared on each environment's first backend (backend_analysis.py has the rest)
+    table = load_comparison(results_dir)
+    if pattern is not None:
+        table = table[table['pattern'] == pattern]
+    decisions = load_stopping_decisions(results_dir)
+    
+    has_container = table['count'][:, CONTAINER] > 0
+    if not has_container.any():
+        print("No container CSV files found in results directory")
+        return
+    for test_name in table['pattern'][has_container & (table['count'][:, FIRECRACKER] == 0)]:
+        print(f"Missing Firecracker data for {test_name}")
+    
+    # Significance was tested for every pattern at once, so the correction sees the whole family of tests
+    table = table[has_container & (table['count'][:, FIRECRACKER] > 0)]
+    latency_winners, throughput_winners = analyze_performance(table, decisions)
+    
+    # Generate summary
+    if len(table):
+        print(f"\n{'='*60}")
+        print("SUMMARY")
+        print(f"{'='*60}")
+        
+        print(f"Total tests analyzed: {len(table)}")
+        print("\nLatency comparison:")
+        print(f"  Firecracker wins: {latency_winners.count('Firecracker')}")
+        print(f"  Container wins: {latency_winners.count('Container')}")
+        print(f"  No significant difference: {latency_winners.count('No significant difference')}")
+        
+        print("\nThroughput comparison:")
+        print(f"  Firecracker wins: {throughput_winners.count('Firecracker')}")
+        print(f"  Container wins: {throughput_winners.count('Container')}")
+        print(f"  No significant difference: {throughput_winners.count('No significant difference')}")
+        # Host CPU per I/O bounds how many microVMs fit on a node
+        cpu_cost = table['cpu_us_per_io'][np.isfinite(table['cpu_us_per_io']).all(axis=1)]
+        if len(cpu_cost):
+            firecracker_cheaper = int((cpu_cost[:, FIRECRACKER] < cpu_cost[:, CONTAINER]).sum())
+            ratio = statistics.mean(cpu_cost[:, FIRECRACKER] / cpu_cost[:, CONTAINER])
+            print("\nHost CPU per I/O:")
+            print(f"  Firecracker cheaper: {firecracker_cheaper}")
+            print(f"  Container cheaper: {len(cpu_cost) - firecracker_cheaper}")
+            print(f"  Mean Firecracker/Container CPU-μs per I/O: {ratio:.2f}x")
+        
+        print(f"\nWinners require p < 0.05 after Holm correction (Welch t-test) "
+              f"and ≥{MIN_SAMPLES} iterations per environment")
+        short = int(underpowered(table['count']).sum())
+        if short:
+            print(f"  {short} tests have fewer iterations and no verdict")
+    else:
+        print("No matching result pairs found for analysis")
+    
+    print(f"\n{'='*60}")
+    print("ANALYSIS COMPLETE")
+    print(f"{'='*60}")
@@ -0,0 +1,136 @@
+"""
+Fast path of the analysis CLI: per-pattern container vs Firecracker summaries
+read straight from a results directory's CSVs with csv and array only, so a
+live summary after every iteration starts in tens of milliseconds
+"""
+
+import csv
+import math
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+from adaptive_iterations import student_t_ppf
+from job_matrix import load_manifest, matrix_order
+
+# Same names and order as results_store.ENVIRONMENTS (which imports numpy)
+ENVIRONMENTS = ('container', 'firecracker')
+METRICS = ('latency_us', 'throughput_mbps')
+# Iterations per environment the full report's Welch tests need (significance.MIN_SAMPLES)
+MIN_SAMPLES = 3
+
+Samples = Dict[str, Dict[str, Dict[str, array]]]
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def load_samples(results_dir, pattern: Optional[str] = None) -> Samples:
+    """
+    pattern -> env -> metric -> per-iteration values, in job-matrix order.
+    Rows without a latency are parsing errors and are dropped, as in the
+    comparison model; non-positive metric values are skipped.
+    """
+    results_dir = Path(results_dir)
+    samples: Samples = {}
+    for env in ENVIRONMENTS:
+        paths = [results_dir / f"{env}_{pattern}.csv"] if pattern else sorted(results_dir.glob(f"{env}_*.csv"))
+        for path in paths:
+            try:
+                with open(path, 'r', newline='') as f:
+                    rows = list(csv.DictReader(f))
+            except (OSError, csv.Error):
+                continue
+            columns = {metric: array('d') for metric in METRICS}
+            for row in rows:
+                if not _to_float(row.get('latency_us')) > 0:
+                    continue
+                for metric in METRICS:
+                    value = _to_float(row.get(metric))
+                    if value > 0:
+                        columns[metric].append(value)
+            samples.setdefault(path.stem[len(env) + 1:], {})[env] = columns
+    manifest = load_manifest(results_dir)
+    return {name: samples[name] for name in sorted(samples, key=lambda p: matrix_order(p, manifest))}
+
+
+def mean_std(values: array):
+    """Mean and sample standard deviation (NaN where undefined)."""
+    n = len(values)
+    if n == 0:
+        return float('nan'), float('nan')
+    mean = math.fsum(values) / n
+    if n < 2:
+        return mean, float('nan')
+    return mean, math.sqrt(math.fsum((v - mean) ** 2 for v in values) / (n - 1))
+
+
+@lru_cache(maxsize=None)
+def _t_quantile(confidence: float, df: int) -> float:
+    # student_t_ppf bisects; every pattern with the same iteration count shares one quantile
+    return student_t_ppf(0.5 + confidence / 2, df)
+
+
+def relative_halfwidth(values: array, confidence: float = 0.95) -> float:
+    """Student-t CI half-width of the mean relative to the mean (inf below 2 samples)."""
+    mean, std = mean_std(values)
+    if len(values) < 2 or not mean > 0:
+        return float('inf')
+    return _t_quantile(confidence, len(values) - 1) * std / math.sqrt(len(values)) / mean
+
+
+def testable(samples: Samples) -> bool:
+    """
+    Whether any pattern has the MIN_SAMPLES iterations per environment the
+    Welch test needs to name a winner; otherwise the full report would only
+    print "No significant difference", so the fast path suffices.
+    """
+    for by_env in samples.values():
+        counts = [len(by_env.get(env, {}).get('throughput_mbps', ())) for env in ENVIRONMENTS]
+        if min(counts) >= MIN_SAMPLES:
+            return True
+    return False
+
+
+def _format(values: array) -> str:
+    mean, _ = mean_std(values)
+    if math.isnan(mean):
+        return "-"
+    rel = relative_halfwidth(values)
+    ci = "±n/a" if rel == float('inf') else f"±{rel * 100:.1f}%"
+    return f"{mean:.1f} {ci}"
+
+
+def print_summary(results_dir, samples: Samples, live: bool = False) -> None:
+    """Means with their 95% CI per environment and the Firecracker/container ratio of each pattern."""
+    print(f"\n{'='*60}")
+    print("IO PERFORMANCE LIVE SUMMARY")
+    print(f"{'='*60}")
+    print(f"Results Directory: {results_dir}")
+    if not samples:
+        print("No container or Firecracker CSV files found in results directory")
+        return
+
+    print(f"\n{'Pattern':<32} {'Env':<12} {'n':>3}  {'Latency (μs)':<20} {'Throughput (MB/s)':<20}")
+    print("-" * 92)
+    for pattern, by_env in samples.items():
+        for i, env in enumerate(ENVIRONMENTS):
+            columns = by_env.get(env, {metric: array('d') for metric in METRICS})
+            print(f"{pattern if i == 0 else '':<32} {env.title():<12} {len(columns['throughput_mbps']):>3}  "
+                  f"{_format(columns['latency_us']):<20} {_format(columns['throughput_mbps']):<20}")
+        ratios = []
+        for metric in METRICS:
+            means = [mean_std(by_env.get(env, {}).get(metric, array('d')))[0] for env in ENVIRONMENTS]
+            ratios.append(f"{means[1] / means[0]:.2f}x" if means[0] > 0 and means[1] > 0 else "-")
+        print(f"{'':<32} {'FC/C':<12} {'':>3}  {ratios[0]:<20} {ratios[1]:<20}")
+
+    if live:
+        print(f"\nLive summary without significance testing; `compare {results_dir}` names the winners")
+    else:
+        print(f"\nNo winners: too few iterations for a significance test "
+              f"(the full report runs once some pattern has {MIN_SAMPLES} per environment)")
@@ -0,0 +1,212 @@
+"""
+Figures of one results directory, rendered in parallel worker processes:
+the views of attempt-1's analysis notebook (latency and throughput spread,
+IOPS, consistency, block-size scaling, preemption) over the results store
+"""
+
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from comparison import block_labels, load_run, CONTAINER, FIRECRACKER
+from preemption_analysis import OUTPUT_CSV as PREEMPTION_CSV
+from results_store import ENVIRONMENTS, ResultsStore
+
+OUTPUT_DIR = 'plots'
+FORMATS = ('png', 'svg', 'pdf')
+# Strip dates and library versions so the same data renders byte-identical files
+METADATA = {
+    'png': {'Software': None},
+    'svg': {'Date': None, 'Creator': None},
+    'pdf': {'CreationDate': None, 'Creator': None, 'Producer': None},
+}
+# Figure style of the notebook
+RC_PARAMS = {'figure.figsize': (12, 8), 'font.size': 10, 'svg.hashsalt': 'io-analysis'}
+ENV_COLORS = {'container': '#1f77b4', 'firecracker': '#d62728'}
+# Coefficient-of-variation bands of the notebook's consistency figure
+CV_BANDS = ((10, 'green', 'Excellent (<10%)'), (20, 'orange', 'Acceptable (<20%)'))
+
+
+# Figure specs: plain lists and dicts, so rendering needs only matplotlib in the worker
+
+def _spread(name: str, title: str, ylabel: str, patterns: List[str], samples: Dict[str, List[List[float]]]) -> Dict:
+    return {'name': name, 'kind': 'boxes', 'title': title, 'ylabel': ylabel,
+            'labels': patterns, 'series': samples}
+
+
+def figure_specs(table: np.ndarray, samples: Dict[str, Dict[str, List[List[float]]]],
+                 preemption: Optional[List[Dict]] = None) -> List[Dict]:
+    """Every figure of a comparison table, its per-iteration samples and the preemption summary."""
+    patterns = [str(p) for p in table['pattern']]
+    specs = [
+        _spread('latency', 'Latency per iteration', 'Latency (μs)', patterns, samples['latency_us']),
+        _spread('throughput', 'Throughput per iteration', 'Throughput (MB/s)', patterns, samples['throughput_mbps']),
+    ]
+    # Runs from before the iops column have no IOPS figure
+    iops = {env.title(): [float(np.nanmean(v)) if np.isfinite(v).any() else 0.0 for v in values]
+            for env, values in samples['iops'].items()}
+    if any(value > 0 for values in iops.values() for value in values):
+        specs.append({'name': 'iops', 'kind': 'bars', 'title': 'Mean IOPS', 'ylabel': 'IOPS', 'log': True,
+                      'labels': patterns, 'series': iops})
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = {metric: np.nan_to_num(table[f'{metric}_std'] / table[f'{metric}_mean'] * 100)
+              for metric in ('latency', 'throughput')}
+    specs.append({'name': 'consistency', 'kind': 'bars', 'title': 'Consistency (lower CV% = more predictable)',
+                  'ylabel': 'Coefficient of variation (%)', 'labels': patterns, 'bands': CV_BANDS,
+                  'panels': {f'{metric.title()} CV%': {env.title(): cv[metric][:, e].tolist()
+                                                       for e, env in enumerate(ENVIRONMENTS)}
+                             for metric in cv}})
+
+    # One line per operation (colour) and environment (line style) over the block sizes it ran at
+    order = np.argsort(table['block_size'], kind='stable')
+    lines = {}
+    operations = list(dict.fromkeys(table['operation'][order]))
+    blocks = block_labels(table)
+    for i in order:
+        for e, env in enumerate(ENVIRONMENTS):
+            if table['count'][i, e] == 0:
+                continue
+            line = lines.setdefault(f"{table['operation'][i]} ({env})", {
+                'env': env, 'color': f"C{operations.index(table['operation'][i]) % 10}", 'x': [], 'labels': [], 'y': []})
+            line['x'].append(int(table['block_size'][i]))
+            line['labels'].append(str(blocks[i]))
+            line['y'].append(float(table['throughput_mean'][i, e]))
+    specs.append({'name': 'block_size_scaling', 'kind': 'lines', 'title': 'Throughput scaling with block size',
+                  'xlabel': 'Block size', 'ylabel': 'Throughput (MB/s)', 'series': lines})
+
+    paired = (table['count'] > 0).all(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = table['throughput_mean'][:, FIRECRACKER] / table['throughput_mean'][:, CONTAINER]
+    specs.append({'name': 'speedup', 'kind': 'ratios', 'title': 'Firecracker/container throughput (95% CI)',
+                  'ylabel': 'FC/C throughput ratio', 'labels': [p for p, ok in zip(patterns, paired) if ok],
+                  'ratio': ratio[paired].tolist(), 'lo': table['throughput_ratio_lo'][paired].tolist(),
+                  'hi': table['throughput_ratio_hi'][paired].tolist()})
+
+    if preemption:
+        panels = {}
+        for row in preemption:
+            panel = panels.setdefault(row['env'].title(), {})
+            panel.setdefault(row['quota'], {})[row['pattern']] = float(row['p99_explained_pct'])
+        labels = list(dict.fromkeys(row['pattern'] for row in preemption))
+        specs.append({'name': 'preemption', 'kind': 'bars', 'title': 'Share of p99 explained by CPU throttling',
+                      'ylabel': 'p99 explained (%)', 'labels': labels,
+                      'panels': {env: {quota: [by_pattern.get(p, 0.0) for p in labels]
+                                       for quota, by_pattern in quotas.items()}
+                                 for env, quotas in panels.items()}})
+    return specs
+
+
+def load_specs(results_dir, store: Optional[ResultsStore] = None) -> List[Dict]:
+    """Figure specs of one results directory (ingested into the store first)."""
+    store = store or ResultsStore()
+    store.ingest_run(results_dir)
+    run = store.run_id_for(results_dir)
+    table = load_run(store, run)
+    table = table[(table['count'] > 0).any(axis=1)]
+
+    # Per-iteration values of each pattern on the backends the table compares
+    data = store.query(('latency_us', 'throughput_mbps', 'iops'), runs=[run])
+    backends = store.primary_backends(run)
+    keep = np.array([backends.get(env) == backend for env, backend in zip(data['env'], data['backend'])], dtype=bool)
+    keep &= data['latency_us'] > 0
+    samples = {}
+    for metric in ('latency_us', 'throughput_mbps', 'iops'):
+        samples[metric] = {}
+        for env in ENVIRONMENTS:
+            rows = keep & (data['env'] == env)
+            samples[metric][env] = [data[metric][rows & (data['pattern'] == p)].tolist() for p in table['pattern']]
+
+    preemption = None
+    summary = Path(results_dir) / PREEMPTION_CSV
+    if summary.exists():
+        with open(summary, 'r', newline='') as f:
+            preemption = list(csv.DictReader(f))
+    return figure_specs(table, samples, preemption)
+
+
+# Rendering (worker processes)
+
+def _grouped_bars(ax, labels, series, log=False):
+    width = 0.8 / max(len(series), 1)
+    x = np.arange(len(labels))
+    for k, (name, values) in enumerate(series.items()):
+        ax.bar(x + (k - (len(series) - 1) / 2) * width, values, width, label=name,
+               color=ENV_COLORS.get(name.lower()), alpha=0.8)
+    ax.set_xticks(x)
+    ax.set_xticklabels(labels, rotation=45, ha='right')
+    if log:
+        ax.set_yscale('log')
+
+
+def render(spec: Dict, output_dir: str, fmt: str = 'png') -> str:
+    """Draw one figure spec into output_dir/<name>.<fmt> and return the path."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.style.use('default')
+    plt.rcParams.update(RC_PARAMS)
+    panels = spec.get('panels') or {spec['title']: spec.get('series')}
+    fig, axes = plt.subplots(1, len(panels), figsize=(8 * len(panels), 7), squeeze=False)
+    fig.suptitle(spec['title'], fontsize=16, fontweight='bold')
+
+    for ax, (panel, series) in zip(axes[0], panels.items()):
+        if len(panels) > 1:
+            ax.set_title(panel)
+        if spec['kind'] == 'boxes':
+            x = np.arange(len(spec['labels']))
+            for k, (env, values) in enumerate(series.items()):
+                boxes = ax.boxplot([v or [np.nan] for v in values], positions=x + (k - 0.5) * 0.35, widths=0.3,
+                                   patch_artist=True, manage_ticks=False)
+                for box in boxes['boxes']:
+                    box.set_facecolor(ENV_COLORS[env])
+                    box.set_alpha(0.6)
+                ax.plot([], [], color=ENV_COLORS[env], linewidth=8, alpha=0.6, label=env.title())
+            ax.set_xticks(x)
+            ax.set_xticklabels(spec['labels'], rotation=45, ha='right')
+            ax.legend()
+        elif spec['kind'] == 'bars':
+            _grouped_bars(ax, spec['labels'], series, spec.get('log', False))
+            for level, color, label in spec.get('bands', ()):
+                ax.axhline(y=level, color=color, linestyle='--', alpha=0.7, label=label)
+            ax.legend()
+        elif spec['kind'] == 'lines':
+            for name, line in series.items():
+                ax.plot(line['x'], line['y'], marker='o', linewidth=2, markersize=6, label=name,
+                        color=line['color'], linestyle='-' if line['env'] == 'firecracker' else '--')
+            ticks = sorted({(x, label) for line in series.values() for x, label in zip(line['x'], line['labels'])})
+            ax.set_xscale('log', base=2)
+            ax.set_xticks([x for x, _ in ticks])
+            ax.set_xticklabels([label for _, label in ticks])
+            ax.set_xlabel(spec['xlabel'])
+            ax.legend(fontsize=8)
+        elif spec['kind'] == 'ratios':
+            x = np.arange(len(spec['labels']))
+            ratio, lo, hi = (np.asarray(spec[k], dtype=float) for k in ('ratio', 'lo', 'hi'))
+            errors = np.nan_to_num(np.vstack([ratio - lo, hi - ratio]))
+            ax.bar(x, ratio, color=np.where(ratio >= 1, ENV_COLORS['firecracker'], ENV_COLORS['container']), alpha=0.8)
+            ax.errorbar(x, ratio, yerr=errors, fmt='none', ecolor='black', capsize=4)
+            ax.axhline(y=1, color='black', linestyle='-', alpha=0.3)
+            ax.set_xticks(x)
+            ax.set_xticklabels(spec['labels'], rotation=45, ha='right')
+        ax.set_ylabel(spec['ylabel'])
+        ax.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    path = str(Path(output_dir) / f"{spec['name']}.{fmt}")
+    fig.savefig(path, format=fmt, dpi=100, metadata=METADATA[fmt])
+    plt.close(fig)
+    return path
+
+
+def render_all(specs: List[Dict], output_dir, fmt: str = 'png', workers: Optional[int] = None) -> List[str]:
+    """Render every spec, one figure per worker process."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    if workers == 1:
+        return [render(spec, str(output_dir), fmt) for spec in specs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(render, specs, [str(output_dir)] * len(specs), [fmt] * len(specs)))
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Parametric fio job matrix for the IO Performance Comparison Framework
+Expands declared axes (rw, bs, size, iodepth, numjobs, ioengine, sync/direct,
+rwmixread, batch sizes, cache mode) into named fio jobs and the manifest runners and analysis read
+"""
+
+import json
+import math
+import sys
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from file_pool import parse_size
+
+MANIFEST_NAME = 'job_manifest.json'
+MANIFEST_VERSION = 1
+
+# fio rw mode -> (operation, report label, short pattern type, test file prefix)
+OPERATIONS = {
+    'read': ('sequential_read', 'Sequential Read', 'seq_read', 'seq'),
+    'write': ('sequential_write', 'Sequential Write', 'seq_write', 'seq'),
+    'randread': ('random_read', 'Random Read', 'rand_read', 'rand'),
+    'randwrite': ('random_write', 'Random Write', 'rand_write', 'rand'),
+    'randrw': ('mixed', 'Mixed R/W', 'mixed', 'mixed'),
+}
+
+# Axis values every job starts from; a matrix block overrides any of them.
+# Names only carry a suffix for values that differ from these.
+DEFAULTS = {
+    'size': None,        # None: SIZE_BY_BS
+    'iodepth': 1,
+    'numjobs': 1,
+    'ioengine': 'psync',
+    'direct': 1,
+    'sync': 1,
+    'fsync': 0,
+    'rwmixread': 70,     # randrw only
+    'batch_submit': 1,   # iodepth_batch_submit (asynchronous engines)
+    'batch_complete': 1, # iodepth_batch_complete_min (asynchronous engines)
+    'invalidate': 1,     # fio drops the file's page cache before the job (0 keeps it warm)
+    'runtime': '10s',
+}
+
+
+@dataclass(frozen=True)
+class Engine:
+    """An ioengine axis value: fio's --ioengine plus engine-specific options."""
+    fio_engine: str
+    asynchronous: bool = False
+    min_kernel: str = ''
+    options: Tuple[tuple, ...] = ()
+    overrides: Tuple[tuple, ...] = ()   # axis values the engine cannot run without
+
+
+# ioengine axis values; names other than DEFAULTS['ioengine'] become a name suffix
+ENGINES = {
+    'psync': Engine('psync'),
+    'libaio': Engine('libaio', asynchronous=True),
+    'io_uring': Engine('io_uring', asynchronous=True, min_kernel='5.1'),
+    'io_uring_fixed': Engine('io_uring', asynchronous=True, min_kernel='5.1',
+                             options=(('fixedbufs', None), ('registerfiles', None))),
+    # Unprivileged SQPOLL needs 5.11; the kernel thread polls the SQ so submission needs no syscall
+    'io_uring_sqpoll': Engine('io_uring', asynchronous=True, min_kernel='5.11',
+                              options=(('sqthread_poll', None), ('fixedbufs', None), ('registerfiles', None))),
+    # Page-cache I/O by definition: O_DIRECT does not apply to a mapping
+    'mmap': Engine('mmap', overrides=(('direct', 0),)),
+}
+
+# Test file size per block size (big enough that the run does not just hit one region)
+SIZE_BY_BS = {'512': '50M', '4k': '100M', '64k': '200M', '1m': '500M'}
+DEFAULT_SIZE = '200M'
+
+# Each block is a cross product: list-valued entries are axes, every combination is a job
+MATRIX = (
+    {'rw': ['randwrite', 'randread', 'write', 'read'], 'bs': ['4k', '64k', '1m']},
+    {'rw': ['randrw'], 'bs': ['4k', '64k', '1m'], 'fsync': [1]},
+    # 512B edge case: random I/O only
+    {'rw': ['randwrite'], 'bs': ['512'], 'fsync': [1]},
+    {'rw': ['randread'], 'bs': ['512']},
+)
+
+# QUICK_TEST subset: representative jobs from each block size
+QUICK = (
+    'random_write_512b', 'random_read_512b',
+    'sequential_write_4k', 'random_read_4k', 'mixed_4k',
+    'sequential_write_64k', 'random_read_64k', 'mixed_64k',
+    'sequential_write_1m', 'random_read_1m', 'mixed_1m',
+)
+
+# SCALING_SWEEP: iodepth x numjobs variants of a few base jobs. psync ignores iodepth,
+# so the sweep switches to an asynchronous engine to actually keep I/Os outstanding.
+SWEEP_ENGINE = 'libaio'
+SWEEP_IODEPTHS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# CACHE_MODE: axis values behind each page-cache regime (the runners add the cache drops/priming)
+CACHE_MODES = {
+    'direct': {'direct': 1},
+    'cold': {'direct': 0},
+    'warm': {'direct': 0, 'invalidate': 0},
+}
+
+# IO_ENGINES: queue depth given to asynchronous engines (synchronous ones keep the job's)
+ENGINE_IODEPTH = 32
+
+# Capability probe: a second of the job's engine options on a small scratch file
+PROBE_FILE = '.engine_probe'
+PROBE_OPTIONS = {'name': 'engine_probe', 'rw': 'randread', 'size': '4M', 'bs': '4k',
+                 'numjobs': 1, 'runtime': '1s', 'filename': PROBE_FILE}
+
+
+def bs_token(size_bytes: int) -> str:
+    """Block size as used in pattern and file names ('512b', '4k', '64k', '1m')."""
+    if size_bytes >= 1 << 20 and size_bytes % (1 << 20) == 0:
+        return f"{size_bytes >> 20}m"
+    if size_bytes >= 1 << 10 and size_bytes % (1 << 10) == 0:
+        return f"{size_bytes >> 10}k"
+    return f"{size_bytes}b"
+
+
+def variant_suffix(job: Dict) -> str:
+    """Name suffix for axis values that differ from DEFAULTS ('' for the baseline jobs)."""
+    parts = []
+    if int(job.get('iodepth', DEFAULTS['iodepth'])) != DEFAULTS['iodepth']:
+        parts.append(f"qd{job['iodepth']}")
+    if int(job.get('numjobs', DEFAULTS['numjobs'])) != DEFAULTS['numjobs']:
+        parts.append(f"j{job['numjobs']}")
+    if job.get('ioengine', DEFAULTS['ioengine']) != DEFAULTS['ioengine']:
+        parts.append(job['ioengine'])
+    if int(job.get('batch_submit', DEFAULTS['batch_submit'])) != DEFAULTS['batch_submit']:
+        parts.append(f"sb{job['batch_submit']}")
+    if int(job.get('batch_complete', DEFAULTS['batch_complete'])) != DEFAULTS['batch_complete']:
+        parts.append(f"cb{job['batch_complete']}")
+    if int(job.get('direct', DEFAULTS['direct'])) != DEFAULTS['direct']:
+        parts.append('buffered')
+    if int(job.get('invalidate', DEFAULTS['invalidate'])) != DEFAULTS['invalidate']:
+        parts.append('warm')
+    if int(job.get('sync', DEFAULTS['sync'])) != DEFAULTS['sync']:
+        parts.append('nosync')
+    if job.get('rw') == 'randrw' and int(job.get('rwmixread', DEFAULTS['rwmixread'])) != DEFAULTS['rwmixread']:
+        parts.append(f"r{job['rwmixread']}")
+    return ''.join(f"_{part}" for part in parts)
+
+
+def cache_mode(direct, invalidate=1) -> str:
+    """Page-cache regime of a job's direct/invalidate options (see CACHE_MODES)."""
+    if int(direct):
+        return 'direct'
+    return 'warm' if not int(invalidate) else 'cold'
+
+
+@dataclass
+class Job:
+    """One fio job of the matrix."""
+    rw: str
+    bs: str
+    size: str
+    iodepth: int
+    numjobs: int
+    ioengine: str
+    direct: int
+    sync: int
+    fsync: int
+    rwmixread: int
+    batch_submit: int
+    batch_complete: int
+    invalidate: int
+    runtime: str
+
+    @property
+    def block_size(self) -> int:
+        return parse_size(self.bs)
+
+    @property
+    def operation(self) -> str:
+        return OPERATIONS[self.rw][0]
+
+    @property
+    def label(self) -> str:
+        if self.rw == 'randrw':
+            return f"Mixed R/W ({self.rwmixread}/{100 - self.rwmixread})"
+        return OPERATIONS[self.rw][1]
+
+    @property
+    def engine(self) -> Engine:
+        return ENGINES[self.ioengine]
+
+    @property
+    def cache_mode(self) -> str:
+        return cache_mode(self.direct, self.invalidate)
+
+    @property
+    def variant(self) -> str:
+        return variant_suffix(asdict(self))
+
+    @property
+    def name(self) -> str:
+        return f"{self.operation}_{bs_token(self.block_size)}{self.variant}"
+
+    @property
+    def filename(self) -> str:
+        # Shared by every job with the same access family and block size (reused by the file pool)
+        return f"{OPERATIONS[self.rw][3]}_{bs_token(self.block_size)}_file"
+
+    def options(self) -> List[tuple]:
+        """fio options in command-line order."""
+        options = [('name', self.name), ('rw', self.rw)]
+        if self.rw == 'randrw':
+            options.append(('rwmixread', self.rwmixread))
+        options += [('size', self.size), ('bs', self.bs), ('ioengine', self.engine.fio_engine),
+                    ('iodepth', self.iodepth)]
+        options += list(self.engine.options)
+        if self.batch_submit != DEFAULTS['batch_submit']:
+            options.append(('iodepth_batch_submit', self.batch_submit))
+        if self.batch_complete != DEFAULTS['batch_complete']:
+            options.append(('iodepth_batch_complete_min', self.batch_complete))
+        options += [('numjobs', self.numjobs), ('runtime', self.runtime),
+                    ('time_based', None), ('group_reporting', None), ('filename', self.filename)]
+        if self.fsync:
+            options.append(('fsync', self.fsync))
+        options += [('sync', self.sync), ('direct', self.direct)]
+        if self.invalidate != DEFAULTS['invalidate']:
+            options.append(('invalidate', self.invalidate))
+        return options
+
+    @property
+    def command(self) -> str:
+        return 'fio ' + ' '.join(f"--{key}" if value is None else f"--{key}={value}"
+                                 for key, value in self.options())
+
+    def probe_command(self) -> str:
+        """Short fio run with this job's engine, engine options and I/O flags (capability check)."""
+        options = [(key, PROBE_OPTIONS.get(key, value)) for key, value in self.options()
+                   if key not in ('rwmixread', 'time_based', 'fsync')]
+        return 'fio ' + ' '.join(f"--{key}" if value is None else f"--{key}={value}" for key, value in options)
+
+    def job_file(self) -> str:
+        """The same job as an fio job file."""
+        lines = [f"[{self.name}]"]
+        lines += [key if value is None else f"{key}={value}" for key, value in self.options() if key != 'name']
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self) -> Dict:
+        entry = asdict(self)
+        entry.update(name=self.name, block_size=self.block_size, operation=self.operation,
+                     fio_engine=self.engine.fio_engine, asynchronous=self.engine.asynchronous,
+                     cache_mode=self.cache_mode,
+                     label=self.label, pattern_type=OPERATIONS[self.rw][2], variant=self.variant,
+                     filename=self.filename, command=self.command, quick=self.name in QUICK)
+        return entry
+
+
+def make_job(values: Dict) -> Job:
+    """Job from a full set of axis values, after the engine's overrides."""
+    if values['ioengine'] not in ENGINES:
+        raise ValueError(f"unknown ioengine {values['ioengine']} (known: {', '.join(ENGINES)})")
+    values = dict(values, **dict(ENGINES[values['ioengine']].overrides))
+    job = Job(**{f.name: values[f.name] for f in fields(Job)})
+    if job.rw not in OPERATIONS:
+        raise ValueError(f"unsupported rw mode: {job.rw}")
+    return job
+
+
+def expand(matrix: Iterable[Dict] = MATRIX, defaults: Dict = DEFAULTS) -> List[Job]:
+    """Every job of the matrix in declaration order; names must be unique."""
+    axis_names = [f.name for f in fields(Job)]
+    jobs = []
+    seen = {}
+    for block in matrix:
+        axes = {key: value if isinstance(value, (list, tuple)) else [value] for key, value in block.items()}
+        unknown = set(axes) - set(axis_names)
+        if unknown:
+            raise ValueError(f"unknown matrix axes: {', '.join(sorted(unknown))}")
+        for combination in product(*axes.values()):
+            values = dict(defaults)
+            values.update(zip(axes, combination))
+            if values['size'] is None:
+                values['size'] = SIZE_BY_BS.get(str(values['bs']).lower(), DEFAULT_SIZE)
+            job = make_job(values)
+            if job.name in seen and seen[job.name] != job:
+                raise ValueError(f"two different jobs are both named {job.name}; "
+                                 f"add the differing axis to variant_suffix()")
+            if job.name not in seen:
+                seen[job.name] = job
+                jobs.append(job)
+    return jobs
+
+
+def sweep_numjobs(vcpus: float) -> List[int]:
+    """numjobs axis of the sweep: 1 .. vCPU count, rounded up (fractional vCPUs give [1])."""
+    return list(range(1, max(1, math.ceil(vcpus)) + 1))
+
+
+def sweep(patterns: Iterable[str], iodepths: Iterable[int] = SWEEP_IODEPTHS,
+          numjobs: Iterable[int] = (1,), jobs: Optional[List[Job]] = None) -> List[Job]:
+    """Queue-depth x numjobs variants of the named base jobs, in curve order."""
+    base = {job.name: job for job in (expand() if jobs is None else jobs)}
+    missing = [name for name in patterns if name not in base]
+    if missing:
+        raise ValueError(f"unknown sweep patterns: {', '.join(missing)}")
+    return [make_job(dict(asdict(base[name]), ioengine=SWEEP_ENGINE, iodepth=int(qd), numjobs=int(nj)))
+            for name in patterns for nj in numjobs for qd in iodepths]
+
+
+def engine_variants(jobs: Iterable[Job], engines: Iterable[str], iodepth: int = ENGINE_IODEPTH) -> List[Job]:
+    """Every job once per engine; asynchronous engines run at `iodepth`."""
+    variants = []
+    for job in jobs:
+        for engine in engines:
+            values = dict(asdict(job), ioengine=engine)
+            if engine in ENGINES and ENGINES[engine].asynchronous:
+                values['iodepth'] = iodepth
+            variants.append(make_job(values))
+    return variants
+
+
+def with_cache_mode(jobs: Iterable[Job], mode: str) -> List[Job]:
+    """The jobs rewritten for one CACHE_MODES regime (engines may still override direct)."""
+    if mode not in CACHE_MODES:
+        raise ValueError(f"unknown cache mode {mode} (known: {', '.join(CACHE_MODES)})")
+    return [make_job(dict(asdict(job), **CACHE_MODES[mode])) for job in jobs]
+
+
+def selected_jobs(jobs: List[Job], args) -> List[Job]:
+    """Sweep and engine variants requested on the command line (empty without either option)."""
+    extra = []
+    if getattr(args, 'sweep', None):
+        extra += sweep(args.sweep, args.iodepths, args.numjobs or sweep_numjobs(args.vcpus), jobs)
+    if getattr(args, 'engines', None):
+        extra += engine_variants(jobs, args.engines, args.engine_iodepth)
+    return list({job.name: job for job in extra}.values())
+
+
+def build_manifest(jobs: Optional[List[Job]] = None) -> Dict:
+    jobs = expand() if jobs is None else jobs
+    return {
+        'version': MANIFEST_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'defaults': DEFAULTS,
+        'jobs': [job.to_dict() for job in jobs],
+    }
+
+
+def load_manifest(results_dir=None) -> Dict[str, Dict]:
+    """Jobs by name from a run's job_manifest.json, or from the current matrix."""
+    if results_dir is not None:
+        path = Path(results_dir) / MANIFEST_NAME
+        if path.exists():
+            try:
+                return {job['name']: job for job in json.loads(path.read_text())['jobs']}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Warning: Could not read {path}: {e}", file=sys.stderr)
+    return {job.name: job.to_dict() for job in expand()}
+
+
+def describe(pattern: str, manifest: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+    """Manifest entry of a pattern; `pattern` may carry an env_ prefix."""
+    manifest = load_manifest() if manifest is None else manifest
+    for prefix in ('', 'container_', 'firecracker_'):
+        if pattern.startswith(prefix) and pattern[len(prefix):] in manifest:
+            return manifest[pattern[len(prefix):]]
+    return None
+
+
+def matrix_order(pattern: str, manifest: Dict[str, Dict]):
+    """Sort key: block size, then operation, then variant (unknown patterns last)."""
+    job = describe(pattern, manifest)
+    if job is None:
+        return (float('inf'), len(OPERATIONS), pattern)
+    return (job['block_size'], list(OPERATIONS).index(job['rw']), job['variant'])
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="fio job matrix")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    # Sweep options, shared by the subcommands that see the whole job set
+    sweep_options = argparse.ArgumentParser(add_help=False)
+    sweep_options.add_argument('--sweep', nargs='+', default=[], metavar='PATTERN',
+                               help="Add iodepth x numjobs variants of these jobs (SCALING_SWEEP)")
+    sweep_options.add_argument('--iodepths', nargs='+', type=int, default=list(SWEEP_IODEPTHS))
+    sweep_options.add_argument('--numjobs', nargs='+', type=int,
+                               help="numjobs axis (default: 1 .. --vcpus rounded up)")
+    sweep_options.add_argument('--vcpus', type=float, default=1.0)
+    sweep_options.add_argument('--engines', nargs='+', default=[], metavar='ENGINE',
+                               help=f"Run every job once per ioengine (IO_ENGINES; known: {', '.join(ENGINES)})")
+    sweep_options.add_argument('--engine-iodepth', type=int, default=ENGINE_IODEPTH,
+                               help="iodepth of the asynchronous engines' variants")
+    sweep_options.add_argument('--cache-mode', choices=list(CACHE_MODES), default='direct',
+                               help="Page-cache regime of every job (CACHE_MODE)")
+
+    manifest = sub.add_parser('manifest', parents=[sweep_options],
+                              help="Write the machine-readable job manifest")
+    manifest.add_argument('--output', help=f"Output file (default: stdout); usually <results>/{MANIFEST_NAME}")
+
+    sub.add_parser('commands', parents=[sweep_options],
+                   help="Tab-separated name and fio command line per job (for config.sh)")
+
+    names = sub.add_parser('names', parents=[sweep_options],
+                           help="Job names in matrix order, optionally filtered (only the sweep with --sweep)")
+    names.add_argument('--quick', action='store_true', help="Only the QUICK_TEST subset")
+    names.add_argument('--block-size', help="Only jobs with this block size (e.g. 4k, 1m, 512)")
+
+    jobfiles = sub.add_parser('jobfiles', help="Write one .fio job file per job")
+    jobfiles.add_argument('--output-dir', required=True)
+
+    sub.add_parser('list', parents=[sweep_options], help="Print the matrix as a table")
+
+    probe = sub.add_parser('probe', parents=[sweep_options],
+                           help="Engine, minimum kernel and capability-check fio command of a job")
+    probe.add_argument('name')
+
+    args = parser.parse_args(argv)
+    base = expand()
+    mode = getattr(args, 'cache_mode', 'direct')
+    try:
+        extra = selected_jobs(base, args)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    known = {job.name for job in base}
+    # Sweeps, engines and filters address jobs by their plain names; the cache mode comes last
+    jobs = with_cache_mode(base + [job for job in extra if job.name not in known], mode)
+
+    if args.command == 'manifest':
+        text = json.dumps(build_manifest(jobs), indent=1) + '\n'
+        if args.output:
+            Path(args.output).write_text(text)
+        else:
+            sys.stdout.write(text)
+        return 0
+
+    if args.command == 'commands':
+        for job in jobs:
+            print(f"{job.name}\t{job.command}")
+        return 0
+
+    if args.command == 'names':
+        block_size = parse_size(args.block_size.rstrip('bB') or '0') if args.block_size else None
+        filtered = [job for job in base if (not args.quick or job.name in QUICK)
+                    and (block_size is None or job.block_size == block_size)]
+        # The sweep stands on its own; engine variants follow the quick/block-size filter
+        for job in with_cache_mode(selected_jobs(filtered, args) or filtered, mode):
+            print(job.name)
+        return 0
+
+    if args.command == 'probe':
+        job = next((job for job in jobs if job.name == args.name), None)
+        if job is None:
+            print(f"Error: unknown job {args.name}", file=sys.stderr)
+            return 1
+        # Nothing to check for the default engine: every run so far has used it
+        if job.ioengine != DEFAULTS['ioengine']:
+            print(f"{job.ioengine}\t{job.engine.min_kernel or '0'}\t{job.probe_command()}")
+        return 0
+
+    if args.command == 'jobfiles':
+        output_dir = Path(args.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for job in jobs:
+            (output_dir / f"{job.name}.fio").write_text(job.job_file())
+        print(f"Wrote {len(jobs)} job files to {output_dir}")
+        return 0
+
+    print(f"{'Name':<32} {'rw':<10} {'bs':<5} {'size':<6} {'qd':>3} {'jobs':>4} {'engine':<16} {'file'}")
+    for job in jobs:
+        print(f"{job.name:<32} {job.rw:<10} {job.bs:<5} {job.size:<6} {job.iodepth:>3} {job.numjobs:>4} "
+              f"{job.ioengine:<16} {job.filename}")
+    print(f"{len(jobs)} jobs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Mergeable latency histograms for the IO Performance Comparison Framework
+Streams fio per-I/O latency logs (write_lat_log) or histogram logs
+(write_hist_log/log_hist_msec) into HDR-style log-bucketed histograms
+in constant memory. Histograms add together across iterations and runs.
+"""
+
+import io
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+# 2^7 sub-buckets per power of two: <0.8% relative error per recorded value
+DEFAULT_SUB_BUCKET_BITS = 7
+CHUNK_BYTES = 32 * 1024 * 1024
+TAIL_PERCENTILES = (50.0, 99.0, 99.9, 99.99)
+
+# fio histogram logs use the same bucket scheme with 6 bits (FIO_IO_U_PLAT_BITS)
+FIO_PLAT_BITS = 6
+
+
+def bucket_count(sub_bucket_bits: int) -> int:
+    """Buckets needed to cover every non-negative 64-bit value."""
+    return (64 - sub_bucket_bits + 1) << sub_bucket_bits
+
+
+def bucket_index(values: np.ndarray, sub_bucket_bits: int) -> np.ndarray:
+    """Vectorised value -> bucket index (fio's plat_val_to_idx, any bit width)."""
+    values = np.asarray(values, dtype=np.int64)
+    values = np.maximum(values, 0)
+    # frexp is exact for values below 2^53, far beyond any latency in ns
+    _, exponent = np.frexp(values.astype(np.float64))
+    msb = exponent.astype(np.int64) - 1
+    error_bits = np.maximum(msb - sub_bucket_bits, 0)
+    base = (error_bits + 1) << sub_bucket_bits
+    offset = (values >> error_bits) & ((1 << sub_bucket_bits) - 1)
+    return np.where(msb <= sub_bucket_bits, values, base + offset)
+
+
+def bucket_value(indexes: np.ndarray, sub_bucket_bits: int) -> np.ndarray:
+    """Representative (midpoint) value of each bucket (fio's plat_idx_to_val)."""
+    indexes = np.asarray(indexes, dtype=np.int64)
+    sub_buckets = 1 << sub_bucket_bits
+    error_bits = np.maximum((indexes >> sub_bucket_bits) - 1, 0)
+    base = (np.ones_like(indexes) << (error_bits + sub_bucket_bits)).astype(np.float64)
+    k = indexes % sub_buckets
+    value = base + (k + 0.5) * (np.ones_like(indexes) << error_bits)
+    return np.where(indexes < (sub_buckets << 1), indexes.astype(np.float64), value)
+
+
+class LatencyHistogram:
+    """Fixed-size log-bucketed histogram of latencies in nanoseconds."""
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = np.zeros(bucket_count(sub_bucket_bits), dtype=np.uint64)
+        self.total = 0
+        self.sum_ns = 0.0
+        self.min_ns = None
+        self.max_ns = None
+
+    # Recording
+
+    def record(self, values_ns: np.ndarray) -> None:
+        """Add raw latency samples (ns)."""
+        values_ns = np.asarray(values_ns, dtype=np.int64)
+        if values_ns.size == 0:
+            return
+        idx = bucket_index(values_ns, self.sub_bucket_bits)
+        self.counts += np.bincount(idx, minlength=self.counts.size).astype(np.uint64)
+        self._update_summary(int(values_ns.size), float(values_ns.sum()),
+                             int(values_ns.min()), int(values_ns.max()))
+
+    def record_weighted(self, values_ns: np.ndarray, counts: np.ndarray) -> None:
+        """Add pre-binned samples, e.g. the bins of a fio histogram log."""
+        values_ns = np.asarray(values_ns, dtype=np.float64)
+        counts = np.asarray(counts, dtype=np.int64)
+        mask = counts > 0
+        if not mask.any():
+            return
+        values_ns, counts = values_ns[mask], counts[mask]
+        idx = bucket_index(np.rint(values_ns).astype(np.int64), self.sub_bucket_bits)
+        self.counts += np.bincount(idx, weights=counts, minlength=self.counts.size).astype(np.uint64)
+        self._update_summary(int(counts.sum()), float((values_ns * counts).sum()),
+                             int(values_ns.min()), int(values_ns.max()))
+
+    def _update_summary(self, n: int, total_ns: float, lo: int, hi: int) -> None:
+        self.total += n
+        self.sum_ns += total_ns
+        self.min_ns = lo if self.min_ns is None else min(self.min_ns, lo)
+        self.max_ns = hi if self.max_ns is None else max(self.max_ns, hi)
+
+    # Merging
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """Add another histogram's counts into this one (in place)."""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("cannot merge histograms with different bucket resolution")
+        self.counts += other.counts
+        if other.total:
+            self._update_summary(other.total, other.sum_ns, other.min_ns, other.max_ns)
+        return self
+
+    def __iadd__(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        return self.merge(other)
+
+    # Queries
+
+    @property
+    def mean_ns(self) -> float:
+        return self.sum_ns / self.total if self.total else 0.0
+
+    def percentiles(self, pcts: Sequence[float] = TAIL_PERCENTILES) -> List[float]:
+        """Latency (ns) at each percentile, clamped to the recorded min/max."""
+        if self.total == 0:
+            return [0.0 for _ in pcts]
+        cumulative = np.cumsum(self.counts)
+        ranks = np.ceil(np.asarray(pcts, dtype=np.float64) / 100.0 * self.total)
+        ranks = np.clip(ranks, 1, self.total)
+        idx = np.searchsorted(cumulative, ranks.astype(np.uint64), side='left')
+        values = bucket_value(idx, self.sub_bucket_bits)
+        return [float(v) for v in np.clip(values, self.min_ns, self.max_ns)]
+
+    def percentile(self, pct: float) -> float:
+        return self.percentiles([pct])[0]
+
+    # Persistence (sparse, so a histogram file is a few KB)
+
+    def save(self, path: Union[str, Path]) -> None:
+        nonzero = np.flatnonzero(self.counts)
+        np.savez_compressed(
+            path,
+            sub_bucket_bits=self.sub_bucket_bits,
+            indexes=nonzero.astype(np.int32),
+            counts=self.counts[nonzero],
+            summary=np.array([self.total, self.sum_ns,
+                              self.min_ns if self.min_ns is not None else -1,
+                              self.max_ns if self.max_ns is not None else -1], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'LatencyHistogram':
+        with np.load(path) as data:
+            hist = cls(int(data['sub_bucket_bits']))
+            hist.counts[data['indexes']] = data['counts']
+            total, sum_ns, lo, hi = data['summary']
+        hist.total = int(total)
+        hist.sum_ns = float(sum_ns)
+        hist.min_ns = int(lo) if lo >= 0 else None
+        hist.max_ns = int(hi) if hi >= 0 else None
+        return hist
+
+
+def merge_histograms(histograms: Iterable[LatencyHistogram]) -> Optional[LatencyHistogram]:
+    """Merge any number of histograms; returns None for an empty input."""
+    merged = None
+    for hist in histograms:
+        if merged is None:
+            merged = LatencyHistogram(hist.sub_bucket_bits)
+        merged.merge(hist)
+    return merged
+
+
+def load_merged(paths: Iterable[Union[str, Path]]) -> Optional[LatencyHistogram]:
+    """Load and merge saved histograms one file at a time."""
+    return merge_histograms(LatencyHistogram.load(p) for p in paths)
+
+
+# Streaming log readers
+
+def _open_binary(source: Union[str, Path, BinaryIO]) -> BinaryIO:
+    if isinstance(source, (str, Path)):
+        return sys.stdin.buffer if str(source) == '-' else open(source, 'rb')
+    return source
+
+
+def iter_log_chunks(source: Union[str, Path, BinaryIO], usecols=None,
+                    chunk_bytes: int = CHUNK_BYTES) -> Iterator[np.ndarray]:
+    """
+    Yield 2-D int64 arrays parsed from a comma separated fio log, one chunk of
+    at most `chunk_bytes` at a time. Only the partial last line of each chunk
+    is carried over, so memory stays bounded by the chunk size.
+    """
+    f = _open_binary(source)
+    try:
+        remainder = b''
+        while True:
+            block = f.read(chunk_bytes)
+            if not block:
+                break
+            block = remainder + block
+            cut = block.rfind(b'\n')
+            if cut < 0:
+                remainder = block
+                continue
+            remainder = block[cut + 1:]
+            rows = np.loadtxt(io.BytesIO(block[:cut + 1]), delimiter=',', dtype=np.int64,
+                              usecols=usecols, ndmin=2)
+            if rows.size:
+                yield rows
+        if remainder.strip():
+            yield np.loadtxt(io.BytesIO(remainder), delimiter=',', dtype=np.int64,
+                             usecols=usecols, ndmin=2)
+    finally:
+        if f is not source and f is not sys.stdin.buffer:
+            f.close()
+
+
+def histogram_from_lat_log(source, direction: Optional[int] = None,
+                           sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS,
+                           chunk_bytes: int = CHUNK_BYTES) -> LatencyHistogram:
+    """Fold a per-I/O log (time_ms, latency_ns, direction, bs, offset[, prio])."""
+    hist = LatencyHistogram(sub_bucket_bits)
+    for rows in iter_log_chunks(source, usecols=(1, 2), chunk_bytes=chunk_bytes):
+        values = rows[:, 0] if direction is None else rows[rows[:, 1] == direction, 0]
+        hist.record(values)
+    return hist
+
+
+def histogram_from_hist_log(source, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS,
+                            chunk_bytes: int = CHUNK_BYTES) -> LatencyHistogram:
+    """Fold a fio histogram log (time_ms, direction, bs, bin0 ... binN) of clat in ns."""
+    hist = LatencyHistogram(sub_bucket_bits)
+    bin_values = None
+    for rows in iter_log_chunks(source, chunk_bytes=chunk_bytes):
+        bins = rows[:, 3:]
+        if bin_values is None:
+            # Bin count depends on the fio version; the bucket scheme does not
+            bin_values = bucket_value(np.arange(bins.shape[1]), FIO_PLAT_BITS)
+        hist.record_weighted(bin_values, bins.sum(axis=0))
+    return hist
+
+
+def format_percentiles(hist: LatencyHistogram, pcts: Sequence[float] = TAIL_PERCENTILES) -> str:
+    values = hist.percentiles(pcts)
+    return ', '.join(f"p{p:g}={v / 1000:.1f}μs" for p, v in zip(pcts, values))
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and merge latency histograms from fio logs")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help="Fold a fio latency log into a histogram file")
+    build.add_argument('log', help="fio log file ('-' for stdin)")
+    build.add_argument('--format', choices=('lat', 'hist'), default='lat',
+                       help="lat: write_lat_log per-I/O log, hist: write_hist_log log")
+    build.add_argument('--output', required=True, help="Histogram file (.npz)")
+
+    merge = sub.add_parser('merge', help="Merge histogram files")
+    merge.add_argument('histograms', nargs='+')
+    merge.add_argument('--output', required=True)
+
+    show = sub.add_parser('percentiles', help="Print tail percentiles of merged histogram files")
+    show.add_argument('histograms', nargs='+')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        if args.format == 'hist':
+            hist = histogram_from_hist_log(args.log)
+        else:
+            hist = histogram_from_lat_log(args.log)
+        hist.save(args.output)
+        print(f"{hist.total} samples, {format_percentiles(hist)}")
+        return 0 if hist.total else 1
+
+    hist = load_merged(args.histograms)
+    if args.command == 'merge':
+        hist.save(args.output)
+    print(f"{hist.total} samples, mean={hist.mean_ns / 1000:.1f}μs, {format_percentiles(hist)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
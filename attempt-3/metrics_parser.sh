@@ -1,206 +1,180 @@
 #!/bin/bash
 
 # Metrics parsing functions for the IO Performance Comparison Framework
-# Handles extraction and parsing of performance metrics from fio output
+# fio runs with --output-format=json+ and fio_metrics.py turns each job's
+# JSON into a CSV row, so no text scraping (grep/sed/bc) happens per iteration
 
 # Source configuration
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
 
-# Parse latency from fio output
-parse_latency() {
-    local fio_output="$1"
-    local latency_us="0"
-    
-    # Check if this is a mixed workload (has both read and write operations)
-    if echo "$fio_output" | grep -q "read.*:" && echo "$fio_output" | grep -q "write.*:"; then
-        # Mixed workload - extract both read and write latencies
-        echo "    Debug: Mixed workload detected, extracting separate read/write latencies" >&2
-        
-        read_lat=""
-        write_lat=""
-        
-        # Extract read latency
-        if echo "$fio_output" | grep -A 10 "read.*:" | grep -q "clat (nsec)"; then
-            read_lat=$(echo "$fio_output" | grep -A 10 "read.*:" | grep "clat (nsec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-            if [[ "$read_lat" =~ ^[0-9.]+$ ]]; then
-                read_lat=$(echo "$read_lat / 1000" | bc -l)
-            fi
-        elif echo "$fio_output" | grep -A 10 "read.*:" | grep -q "clat (usec)"; then
-            read_lat=$(echo "$fio_output" | grep -A 10 "read.*:" | grep "clat (usec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-        elif echo "$fio_output" | grep -A 10 "read.*:" | grep -q "clat (msec)"; then
-            read_lat_msec=$(echo "$fio_output" | grep -A 10 "read.*:" | grep "clat (msec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-            if [[ "$read_lat_msec" =~ ^[0-9.]+$ ]]; then
-                read_lat=$(echo "$read_lat_msec * 1000" | bc -l)
-            fi
-        fi
-        
-        # Extract write latency
-        if echo "$fio_output" | grep -A 10 "write.*:" | grep -q "clat (nsec)"; then
-            write_lat=$(echo "$fio_output" | grep -A 10 "write.*:" | grep "clat (nsec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-            if [[ "$write_lat" =~ ^[0-9.]+$ ]]; then
-                write_lat=$(echo "$write_lat / 1000" | bc -l)
-            fi
-        elif echo "$fio_output" | grep -A 10 "write.*:" | grep -q "clat (usec)"; then
-            write_lat=$(echo "$fio_output" | grep -A 10 "write.*:" | grep "clat (usec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-        elif echo "$fio_output" | grep -A 10 "write.*:" | grep -q "clat (msec)"; then
-            write_lat_msec=$(echo "$fio_output" | grep -A 10 "write.*:" | grep "clat (msec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p' | head -1)
-            if [[ "$write_lat_msec" =~ ^[0-9.]+$ ]]; then
-                write_lat=$(echo "$write_lat_msec * 1000" | bc -l)
-            fi
-        fi
-        
-        # Calculate weighted average latency (70% read, 30% write for randrw)
-        if [[ "$read_lat" =~ ^[0-9.]+$ ]] && [[ "$write_lat" =~ ^[0-9.]+$ ]]; then
-            latency_us=$(echo "($read_lat * 0.7) + ($write_lat * 0.3)" | bc -l | xargs printf "%.2f")
-            echo "    Debug: Read lat: ${read_lat}μs, Write lat: ${write_lat}μs, Weighted avg: ${latency_us}μs" >&2
-        elif [[ "$read_lat" =~ ^[0-9.]+$ ]]; then
-            latency_us=$(printf "%.2f" "$read_lat")
-            echo "    Debug: Using read latency: ${latency_us}μs" >&2
-        elif [[ "$write_lat" =~ ^[0-9.]+$ ]]; then
-            latency_us=$(printf "%.2f" "$write_lat")
-            echo "    Debug: Using write latency: ${latency_us}μs" >&2
-        fi
+FIO_METRICS="$(dirname "${BASH_SOURCE[0]}")/fio_metrics.py"
+LATENCY_HISTOGRAM="$(dirname "${BASH_SOURCE[0]}")/latency_histogram.py"
+STEADY_STATE_ANALYZER="$(dirname "${BASH_SOURCE[0]}")/steady_state.py"
+PREEMPTION_ANALYSIS="$(dirname "${BASH_SOURCE[0]}")/preemption_analysis.py"
+FIO_OUTPUT_FORMAT="--output-format=json+"
+LATENCY_LOG_PREFIX="fio_latlog"
+
+# Directory holding the raw fio JSON output of every iteration
+fio_json_dir() {
+    local dir="${RESULTS_DIR}/fio_json"
+    mkdir -p "$dir"
+    echo "$dir"
+}
+
+# Write the runner CSV header
+write_results_header() {
+    local output_file="$1"
+    python3 "$FIO_METRICS" header > "$output_file"
+}
+
+# Parse one fio JSON output file, append its CSV row and print a summary line
+# start/end (epoch seconds) let the telemetry join attribute CPU and device usage;
+# cpu_usec is the host CPU the environment's cgroup used (CPU-µs per I/O, MB/s per core),
+# guest_read_bytes what the guest kernel read from its disks (page-cache hit ratio),
+# steady_file the iteration's detect_steady_state result (steady-state columns)
+# Returns non-zero when the file held no parsable job (a zero row is still written)
+append_fio_result() {
+    local json_file="$1"
+    local test_name="$2"
+    local start_time="$3"
+    local end_time="$4"
+    local output_file="$5"
+    local cpu_usec="$6"
+    local guest_read_bytes="$7"
+    local steady_file="$8"
+
+    local extra_args=()
+    [ -n "$cpu_usec" ] && extra_args=(--cpu-usec "$cpu_usec")
+    [ -n "$guest_read_bytes" ] && extra_args+=(--guest-read-bytes "$guest_read_bytes")
+    [ -n "$steady_file" ] && [ -f "$steady_file" ] && extra_args+=(--steady-state "$steady_file")
+    python3 "$FIO_METRICS" csv-row "$json_file" \
+        --operation "$test_name" \
+        --start "$start_time" \
+        --end "$end_time" \
+        "${extra_args[@]}" \
+        --output "$output_file"
+}
+
+# Print a one-line summary of a fio JSON output file
+summarize_fio_result() {
+    local json_file="$1"
+    python3 "$FIO_METRICS" summary "$json_file"
+}
+
+# Extra fio options for latency logging (empty unless LATENCY_LOG=true)
+latency_log_options() {
+    [ "$LATENCY_LOG" = "true" ] || return 0
+    if [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]; then
+        echo "--write_hist_log=$LATENCY_LOG_PREFIX --log_hist_msec=$LATENCY_HIST_MSEC"
+    elif [ "$THROTTLE_JOIN" = "true" ]; then
+        # Completion times on CLOCK_MONOTONIC (clock id 1), the clock the telemetry sampler shares
+        echo "--write_lat_log=$LATENCY_LOG_PREFIX --log_avg_msec=0 --log_alternate_epoch=1 --log_alternate_epoch_clock_id=1"
+    else
+        echo "--write_lat_log=$LATENCY_LOG_PREFIX --log_avg_msec=0"
+    fi
+}
+
+# Glob (relative to the test directory) of the completion latency logs fio writes
+latency_log_glob() {
+    if [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]; then
+        echo "${LATENCY_LOG_PREFIX}_clat_hist.*.log"
     else
-        # Single operation workload - use original parsing logic
-        if echo "$fio_output" | grep -q "clat (nsec)"; then
-            # Format: "clat (nsec): min=871, max=1636.2k, avg=1776.38, stdev=1857.40"
-            avg_lat_nsec=$(echo "$fio_output" | grep "clat (nsec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_nsec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(echo "$avg_lat_nsec / 1000" | bc -l | xargs printf "%.2f")
-            fi
-        elif echo "$fio_output" | grep -q "clat (usec)"; then
-            # Format: "clat (usec): min=46, max=67734, avg=73.71, stdev=460.55"
-            avg_lat_usec=$(echo "$fio_output" | grep "clat (usec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_usec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(printf "%.2f" "$avg_lat_usec")
-            fi
-        elif echo "$fio_output" | grep -q "lat (nsec)"; then
-            # Format: "lat (nsec): min=36, max=1372, avg=57.76"
-            avg_lat_nsec=$(echo "$fio_output" | grep "lat (nsec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_nsec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(echo "$avg_lat_nsec / 1000" | bc -l | xargs printf "%.2f")
-            fi
-        elif echo "$fio_output" | grep -q "lat (usec)"; then
-            # Format: "lat (usec): min=36, max=1372, avg=57.76"
-            avg_lat_usec=$(echo "$fio_output" | grep "lat (usec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_usec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(printf "%.2f" "$avg_lat_usec")
-            fi
-        elif echo "$fio_output" | grep -q "clat (msec)"; then
-            # Format: "clat (msec): min=1, max=10, avg=5.23"
-            avg_lat_msec=$(echo "$fio_output" | grep "clat (msec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_msec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(echo "$avg_lat_msec * 1000" | bc -l | xargs printf "%.2f")
-            fi
-        elif echo "$fio_output" | grep -q "lat (msec)"; then
-            # Format: "lat (msec): min=1, max=10, avg=5.23"
-            avg_lat_msec=$(echo "$fio_output" | grep "lat (msec)" | sed -n 's/.*avg=\([0-9.]*\).*/\1/p')
-            if [[ "$avg_lat_msec" =~ ^[0-9.]+$ ]]; then
-                latency_us=$(echo "$avg_lat_msec * 1000" | bc -l | xargs printf "%.2f")
-            fi
-        fi
+        echo "${LATENCY_LOG_PREFIX}_clat.*.log"
+    fi
+}
+
+# Directory holding the per-iteration latency histograms
+latency_hist_dir() {
+    local dir="${RESULTS_DIR}/latency_hist"
+    mkdir -p "$dir"
+    echo "$dir"
+}
+
+# Directory holding the per-iteration I/O events (THROTTLE_JOIN=true)
+io_events_dir() {
+    local dir="${RESULTS_DIR}/io_events"
+    mkdir -p "$dir"
+    echo "$dir"
+}
+
+# Fold a latency log streamed on stdin into a histogram file
+# The raw log never lands on the host, only the few-KB histogram does, unless an
+# events file is given: then every I/O is kept, shifted by clock_offset_ms onto the host clock.
+# A replayed trace's log is also split into the trace's phases (trace_replay.py fold)
+fold_latency_log() {
+    local hist_file="$1"
+    local events_file="$2"
+    local clock_offset_ms="${3:-0}"
+    local format="lat"
+    if [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]; then
+        format="hist"
+    fi
+    if [ -n "$events_file" ] && [ "$format" = "lat" ]; then
+        python3 "$PREEMPTION_ANALYSIS" ingest - --output "$events_file" --histogram "$hist_file" \
+            --clock-offset-ms "$clock_offset_ms"
+        return
+    fi
+    if [ -n "$TRACE_REPLAY" ] && [ "$format" = "lat" ]; then
+        python3 "$TRACE_REPLAY_TOOL" fold - --histogram "$hist_file" --results-dir "$RESULTS_DIR"
+        return
+    fi
+    python3 "$LATENCY_HISTOGRAM" build - --format "$format" --output "$hist_file"
+}
+
+# Whether fio writes bandwidth/IOPS logs for steady-state detection
+# log_avg_msec applies to every log of a job, so raw per-I/O latency logs
+# (LATENCY_LOG=true without LATENCY_HIST_MSEC) rule them out
+steady_state_logging() {
+    case "$STEADY_STATE" in log|adaptive) ;; *) return 1 ;; esac
+    [ "$LATENCY_LOG" != "true" ] || [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]
+}
+
+# Extra fio options for steady-state detection (empty unless STEADY_STATE is log or adaptive)
+# The logs share the latency-log prefix, so the same cleanup and keep rules cover them
+steady_state_options() {
+    local options=""
+    if steady_state_logging; then
+        options="--write_bw_log=$LATENCY_LOG_PREFIX --write_iops_log=$LATENCY_LOG_PREFIX --log_avg_msec=$STEADY_LOG_MSEC"
+    fi
+    if [ "$STEADY_STATE" = "adaptive" ]; then
+        # fio tests a per-second slope, so the trend allowed across the hold is spread over it;
+        # the later --runtime overrides the pattern's and caps jobs that never settle
+        local slope=$(awk -v pct="$STEADY_SLOPE_PCT" -v hold="$STEADY_HOLD" 'BEGIN { printf "%.3f", pct / hold }')
+        options+=" --steadystate=bw_slope:${slope}% --ss_dur=${STEADY_HOLD}s --runtime=${STEADY_MAX_RUNTIME}s"
     fi
-    
-    echo "$latency_us"
+    echo "$options"
 }
 
-# Parse throughput from fio output
-parse_throughput() {
-    local fio_output="$1"
-    local throughput_mb="0"
-    
-    # Extract throughput from summary line
-    # For mixed workloads, sum read and write throughput
-    if echo "$fio_output" | grep -qE "(bw=|BW=)"; then
-        if echo "$fio_output" | grep -q "read.*:" && echo "$fio_output" | grep -q "write.*:"; then
-            # Mixed workload - sum read and write throughput
-            echo "    Debug: Mixed workload throughput - summing read and write" >&2
-            
-            read_throughput_mb="0"
-            write_throughput_mb="0"
-            
-            # Get read throughput
-            read_line=$(echo "$fio_output" | grep -E "^\s*read\s*:" | head -1)
-            if echo "$read_line" | grep -qi "([0-9.]*MB/s)"; then
-                read_throughput_mb=$(echo "$read_line" | grep -oEi '\([0-9.]*MB/s\)' | head -1 | sed 's/[()MBmb/s]//g')
-            elif echo "$read_line" | grep -qi "([0-9.]*kB/s)"; then
-                read_throughput_kb=$(echo "$read_line" | grep -oEi '\([0-9.]*kB/s\)' | head -1 | sed 's/[()KBkb/s]//g')
-                if [[ "$read_throughput_kb" =~ ^[0-9.]+$ ]]; then
-                    read_throughput_mb=$(echo "scale=2; $read_throughput_kb / 1000" | bc -l)
-                fi
-            elif echo "$read_line" | grep -qi "bw=[0-9.]*MiB/s"; then
-                read_throughput_mib=$(echo "$read_line" | grep -oEi 'bw=[0-9.]*MiB/s' | head -1 | sed 's/bw=\|MiB\/s//gI')
-                if [[ "$read_throughput_mib" =~ ^[0-9.]+$ ]]; then
-                    read_throughput_mb=$(echo "scale=2; $read_throughput_mib * 1.048576" | bc -l)
-                fi
-            elif echo "$read_line" | grep -qi "bw=[0-9.]*KiB/s"; then
-                read_throughput_kib=$(echo "$read_line" | grep -oEi 'bw=[0-9.]*KiB/s' | head -1 | sed 's/bw=\|KiB\/s//gI')
-                if [[ "$read_throughput_kib" =~ ^[0-9.]+$ ]]; then
-                    read_throughput_mb=$(echo "scale=2; $read_throughput_kib * 1.024 / 1000" | bc -l)
-                fi
-            fi
-            
-            # Get write throughput  
-            write_line=$(echo "$fio_output" | grep -E "^\s*write\s*:" | head -1)
-            if echo "$write_line" | grep -qi "([0-9.]*MB/s)"; then
-                write_throughput_mb=$(echo "$write_line" | grep -oEi '\([0-9.]*MB/s\)' | head -1 | sed 's/[()MBmb/s]//g')
-            elif echo "$write_line" | grep -qi "([0-9.]*kB/s)"; then
-                write_throughput_kb=$(echo "$write_line" | grep -oEi '\([0-9.]*kB/s\)' | head -1 | sed 's/[()KBkb/s]//g')
-                if [[ "$write_throughput_kb" =~ ^[0-9.]+$ ]]; then
-                    write_throughput_mb=$(echo "scale=2; $write_throughput_kb / 1000" | bc -l)
-                fi
-            elif echo "$write_line" | grep -qi "bw=[0-9.]*MiB/s"; then
-                write_throughput_mib=$(echo "$write_line" | grep -oEi 'bw=[0-9.]*MiB/s' | head -1 | sed 's/bw=\|MiB\/s//gI')
-                if [[ "$write_throughput_mib" =~ ^[0-9.]+$ ]]; then
-                    write_throughput_mb=$(echo "scale=2; $write_throughput_mib * 1.048576" | bc -l)
-                fi
-            elif echo "$write_line" | grep -qi "bw=[0-9.]*KiB/s"; then
-                write_throughput_kib=$(echo "$write_line" | grep -oEi 'bw=[0-9.]*KiB/s' | head -1 | sed 's/bw=\|KiB\/s//gI')
-                if [[ "$write_throughput_kib" =~ ^[0-9.]+$ ]]; then
-                    write_throughput_mb=$(echo "scale=2; $write_throughput_kib * 1.024 / 1000" | bc -l)
-                fi
-            fi
-            
-            # Sum read and write throughput
-            if [[ "$read_throughput_mb" =~ ^[0-9.]+$ ]] && [[ "$write_throughput_mb" =~ ^[0-9.]+$ ]]; then
-                throughput_mb=$(echo "scale=2; $read_throughput_mb + $write_throughput_mb" | bc -l)
-                echo "    Debug: Read: ${read_throughput_mb} MB/s, Write: ${write_throughput_mb} MB/s, Total: ${throughput_mb} MB/s" >&2
-            elif [[ "$read_throughput_mb" =~ ^[0-9.]+$ ]]; then
-                throughput_mb="$read_throughput_mb"
-            elif [[ "$write_throughput_mb" =~ ^[0-9.]+$ ]]; then
-                throughput_mb="$write_throughput_mb"
-            fi
-        else
-            # Single operation workload - use original parsing logic
-            throughput_line=$(echo "$fio_output" | grep -E "(READ|write|READ|WRITE): .*(bw=|BW=)" | tail -1)
-            
-            # Look for MB/s in parentheses first (more standard)
-            if echo "$throughput_line" | grep -qi "([0-9.]*MB/s)"; then
-                throughput_mb=$(echo "$throughput_line" | grep -oEi '\([0-9.]*MB/s\)' | head -1 | sed 's/[()MBmb/s]//g')
-            # Look for kB/s in parentheses and convert to MB/s
-            elif echo "$throughput_line" | grep -qi "([0-9.]*kB/s)"; then
-                throughput_kb=$(echo "$throughput_line" | grep -oEi '\([0-9.]*kB/s\)' | head -1 | sed 's/[()KBkb/s]//g')
-                if [[ "$throughput_kb" =~ ^[0-9.]+$ ]]; then
-                    throughput_mb=$(echo "scale=2; $throughput_kb / 1000" | bc -l)
-                fi
-            # Look for MiB/s directly
-            elif echo "$throughput_line" | grep -qi "(bw=|BW=)[0-9.]*MiB/s"; then
-                throughput_mib=$(echo "$throughput_line" | grep -oEi '(bw=|BW=)[0-9.]*MiB/s' | head -1 | sed 's/bw=\|BW=\|MiB\/s//gI')
-                if [[ "$throughput_mib" =~ ^[0-9.]+$ ]]; then
-                    throughput_mb=$(echo "scale=2; $throughput_mib * 1.048576" | bc -l)
-                fi
-            # Look for KiB/s directly and convert to MB/s  
-            elif echo "$throughput_line" | grep -qi "(bw=|BW=)[0-9.]*KiB/s"; then
-                throughput_kib=$(echo "$throughput_line" | grep -oEi '(bw=|BW=)[0-9.]*KiB/s' | head -1 | sed 's/bw=\|BW=\|KiB\/s//gI')
-                if [[ "$throughput_kib" =~ ^[0-9.]+$ ]]; then
-                    throughput_mb=$(echo "scale=2; $throughput_kib * 1.024 / 1000" | bc -l)
-                fi
-            # Look for MB/s directly
-            elif echo "$throughput_line" | grep -qi "(bw=|BW=)[0-9.]*MB/s"; then
-                throughput_mb=$(echo "$throughput_line" | grep -oEi '(bw=|BW=)[0-9.]*MB/s' | head -1 | sed 's/bw=\|BW=\|MB\/s//gI')
-            fi
-        fi
+# Seconds one fio run may take before the runner gives up on it
+fio_timeout() {
+    if [ -n "$TRACE_REPLAY" ]; then
+        echo $((TRACE_MAX_RUNTIME + 30))
+    elif [ "$STEADY_STATE" = "adaptive" ]; then
+        echo $((STEADY_MAX_RUNTIME + 30))
+    else
+        echo 60
     fi
-    
-    echo "$throughput_mb"
+}
+
+# Logs (relative to the test directory) streamed to detect_steady_state with `tail -v -n +1`
+steady_log_glob() {
+    echo "${LATENCY_LOG_PREFIX}_bw.*.log ${LATENCY_LOG_PREFIX}_iops.*.log"
+}
+
+# Directory holding the per-iteration steady-state windows (and the series they came from)
+steady_state_dir() {
+    local dir="${RESULTS_DIR}/steady_state"
+    mkdir -p "$dir"
+    echo "$dir"
+}
+
+# Find the steady window of the logs streamed on stdin and print it in one line
+detect_steady_state() {
+    local result_file="$1"
+    python3 "$STEADY_STATE_ANALYZER" detect - \
+        --interval-ms "$STEADY_LOG_MSEC" \
+        --hold "$STEADY_HOLD" \
+        --range-pct "$STEADY_RANGE_PCT" \
+        --slope-pct "$STEADY_SLOPE_PCT" \
+        --output "$result_file"
 }
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Throttling vs tail latency for the IO Performance Comparison Framework
+Joins fio per-I/O latency logs with the cgroup's cpu.stat samples on CLOCK_MONOTONIC
+and reports how much of each quota level's p99 comes from I/Os in flight while throttled
+"""
+
+import csv
+import json
+import re
+import shlex
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from latency_histogram import CHUNK_BYTES, LatencyHistogram, format_percentiles, iter_log_chunks
+
+EVENTS_DIR = 'io_events'
+TELEMETRY_DIR = 'telemetry'
+OUTPUT_CSV = 'preemption_summary.csv'
+TAIL_PERCENTILE = 99.0
+CLOCK_PINGS = 20
+
+# Events file of one iteration: <env>_<pattern>_<iteration>.npz (metrics_parser.sh io_events_dir)
+EVENTS_FILE = re.compile(r'^(?P<env>[a-z]+)_(?P<pattern>.+)_(?P<iteration>\d+)\.npz$')
+
+# Remote half of clock-offset: one CLOCK_MONOTONIC reading per line received
+CLOCK_PROBE = "import sys, time\nwhile sys.stdin.readline():\n    print(repr(time.monotonic()), flush=True)"
+
+# cpu.stat counters the join needs, next to the sampler's monotonic clock
+COUNTERS = ('mono', 'cg_throttled_usec', 'cg_nr_throttled')
+
+
+@dataclass
+class ThrottleJoin:
+    """One pattern at one quota level, all iterations' I/Os pooled."""
+    env: str
+    quota: str
+    pattern: str
+    iterations: int
+    ios: int
+    # I/Os whose whole in-flight window lies inside the telemetry samples
+    joined_ios: int
+    throttled_ms: float
+    nr_throttled: int
+    p99_us: float
+    # p99 of the I/Os never in flight while throttled, and how much lower than p99 that is
+    p99_unthrottled_us: float
+    p99_explained_pct: float
+    throttled_io_pct: float
+    tail_throttled_pct: float
+    # How over-represented throttled I/Os are in the tail (1.0: no more than anywhere else)
+    tail_lift: float
+    # Share of the tail I/Os' latency spent while the cgroup was throttled
+    tail_throttle_share_pct: float
+
+
+# Ingest
+
+def ingest_lat_log(source, output, offset_ms: float = 0.0,
+                   chunk_bytes: int = CHUNK_BYTES) -> LatencyHistogram:
+    """
+    Stream a per-I/O log (time_ms, latency_ns, direction, ...) written with
+    log_alternate_epoch on CLOCK_MONOTONIC into an events file: each I/O's
+    completion on the host's monotonic clock, its latency and direction.
+    `offset_ms` is the writer's clock minus the host's (0 for the container).
+    Returns the same histogram fold_latency_log would have built.
+    """
+    hist = LatencyHistogram()
+    times, latencies, directions = [], [], []
+    for rows in iter_log_chunks(source, usecols=(0, 1, 2), chunk_bytes=chunk_bytes):
+        times.append(rows[:, 0])
+        latencies.append(rows[:, 1])
+        directions.append(rows[:, 2].astype(np.int8))
+        hist.record(rows[:, 1])
+    end_ms = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+    np.savez(output,
+             end_s=(end_ms - offset_ms) / 1e3,
+             latency_ns=np.concatenate(latencies) if latencies else np.empty(0, dtype=np.int64),
+             direction=np.concatenate(directions) if directions else np.empty(0, dtype=np.int8),
+             offset_ms=np.float64(offset_ms))
+    return hist
+
+
+def clock_offset(command: List[str], pings: int = CLOCK_PINGS) -> Tuple[float, float]:
+    """
+    Remote CLOCK_MONOTONIC minus the local one in ms, with its uncertainty (half
+    the best round trip). `command` is a remote shell prefix such as `ssh root@vm`;
+    the probe runs behind it and answers `pings` requests over one session.
+    """
+    probe = f"python3 -u -c {shlex.quote(CLOCK_PROBE)}"
+    proc = subprocess.Popen(command + [probe], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, bufsize=0)
+    best = None
+    try:
+        for _ in range(pings):
+            sent = time.monotonic()
+            proc.stdin.write(b'\n')
+            line = proc.stdout.readline()
+            received = time.monotonic()
+            if not line:
+                break
+            rtt = received - sent
+            if best is None or rtt < best[1]:
+                best = (float(line) - (sent + received) / 2, rtt)
+    except (OSError, ValueError):
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    if best is None:
+        raise OSError(f"no reply from the clock probe behind '{' '.join(command)}'")
+    return best[0] * 1e3, best[1] * 1e3 / 2
+
+
+# Join
+
+def parse_cpu_max(cpu_max: Optional[str]) -> Tuple[str, float]:
+    """cpu.max ('50000 100000', 'max 100000') as a quota level in CPUs ('0.50', 'max') and its period in µs."""
+    if not cpu_max:
+        return 'unknown', 100000.0
+    quota, _, period = cpu_max.partition(' ')
+    try:
+        period_us = float(period or 100000)
+    except ValueError:
+        return 'unknown', 100000.0
+    if quota == 'max':
+        return 'max', period_us
+    try:
+        return f"{int(quota) / period_us:.2f}", period_us
+    except ValueError:
+        return 'unknown', period_us
+
+
+def load_throttling(samples_path) -> Optional[Tuple[Dict[str, np.ndarray], Optional[str]]]:
+    """Monotonic time and cumulative cpu.stat throttling of a telemetry file, plus the cpu.max in force."""
+    from telemetry import load_samples
+
+    try:
+        samples = load_samples(str(samples_path))
+        with open(f"{samples_path}.json", 'r') as f:
+            cpu_max = json.load(f).get('cpu_max')
+    except (OSError, ValueError):
+        return None
+    if any(name not in samples for name in COUNTERS):
+        return None
+    valid = ~np.any([np.isnan(samples[name]) for name in COUNTERS], axis=0)
+    if valid.sum() < 2:
+        return None
+    return {name: samples[name][valid] for name in COUNTERS}, cpu_max
+
+
+def throttle_timeline(counters: Dict[str, np.ndarray], period_us: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative throttled wall time (s) as a piecewise-linear function of CLOCK_MONOTONIC,
+    as (breakpoints, values) for np.interp. The kernel adds an episode's throttled time
+    when it ends, so each sample interval whose throttled_usec grew closes an episode of
+    that length ending at the sample. throttled_usec adds up every CPU of the cgroup and
+    an episode ends at the next refill at the latest, so one is never longer than a period.
+    """
+    mono = counters['mono']
+    grew = np.diff(counters['cg_throttled_usec'])
+    closed = grew > 0
+    ends = mono[1:][closed]
+    lengths = np.minimum(grew[closed], period_us) / 1e6
+    if not len(ends):
+        return np.array([mono[0], mono[-1]]), np.zeros(2)
+    # Episodes do not overlap: each starts no earlier than the previous one ended
+    starts = np.maximum(ends - lengths, np.concatenate(([-np.inf], ends[:-1])))
+    starts = np.maximum(starts, mono[0])
+    total = np.cumsum(ends - starts)
+    breakpoints = np.column_stack([starts, ends]).ravel()
+    values = np.column_stack([total - (ends - starts), total]).ravel()
+    return breakpoints, values
+
+
+def join_throttling(end_s: np.ndarray, latency_ns: np.ndarray, counters: Dict[str, np.ndarray],
+                    period_us: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Join every I/O's in-flight window [end - latency, end] onto the throttle episodes
+    (vectorised as-of lookups into the cumulative timeline). Returns which I/Os fall
+    inside the samples and the µs each one spent while the cgroup was throttled.
+    """
+    mono = counters['mono']
+    start_s = end_s - latency_ns / 1e9
+    joined = (start_s >= mono[0]) & (end_s <= mono[-1])
+    breakpoints, values = throttle_timeline(counters, period_us)
+    overlap_us = (np.interp(end_s, breakpoints, values) - np.interp(start_s, breakpoints, values)) * 1e6
+    return joined, np.clip(overlap_us, 0, latency_ns / 1e3)
+
+
+def _percentile(values: np.ndarray, pct: float) -> float:
+    return float(np.percentile(values, pct)) if len(values) else float('nan')
+
+
+def summarize(env: str, quota: str, pattern: str, iterations: int, ios: int,
+              latency_us: np.ndarray, overlap_us: np.ndarray,
+              throttled_ms: float, nr_throttled: int) -> ThrottleJoin:
+    """Tail statistics of the joined I/Os of one pattern at one quota level."""
+    throttled = overlap_us > 0
+    p99 = _percentile(latency_us, TAIL_PERCENTILE)
+    p99_unthrottled = _percentile(latency_us[~throttled], TAIL_PERCENTILE)
+    tail = latency_us >= p99
+    throttled_pct = 100.0 * throttled.mean() if len(throttled) else float('nan')
+    tail_pct = 100.0 * throttled[tail].mean() if tail.any() else float('nan')
+    tail_latency = latency_us[tail].sum()
+    return ThrottleJoin(
+        env=env, quota=quota, pattern=pattern, iterations=iterations, ios=ios,
+        joined_ios=len(latency_us), throttled_ms=throttled_ms, nr_throttled=nr_throttled,
+        p99_us=p99, p99_unthrottled_us=p99_unthrottled,
+        p99_explained_pct=100.0 * (p99 - p99_unthrottled) / p99 if p99 > 0 else float('nan'),
+        throttled_io_pct=throttled_pct, tail_throttled_pct=tail_pct,
+        tail_lift=tail_pct / throttled_pct if throttled_pct > 0 else float('nan'),
+        tail_throttle_share_pct=100.0 * overlap_us[tail].sum() / tail_latency if tail_latency > 0 else float('nan'))
+
+
+def analyze(results_dirs: List[str]) -> List[ThrottleJoin]:
+    """
+    One ThrottleJoin per (env, quota, pattern) over every results directory, so a
+    sweep of runs at different VCPU_COUNT reports each quota level side by side.
+    """
+    # (env, quota, pattern) -> per-iteration arrays and counts
+    groups = {}
+    for results_dir in results_dirs:
+        throttling = {}
+        for path in sorted((Path(results_dir) / EVENTS_DIR).glob('*.npz')):
+            match = EVENTS_FILE.match(path.name)
+            if match is None:
+                continue
+            env, pattern = match['env'], match['pattern']
+            if (env, pattern) not in throttling:
+                samples_path = Path(results_dir) / TELEMETRY_DIR / f"{env}_{pattern}.tlm"
+                throttling[env, pattern] = load_throttling(samples_path)
+                if throttling[env, pattern] is None:
+                    print(f"Warning: {samples_path} has no monotonic cpu.stat samples, "
+                          f"{env} {pattern} skipped", file=sys.stderr)
+            if throttling[env, pattern] is None:
+                continue
+            counters, cpu_max = throttling[env, pattern]
+            quota, period_us = parse_cpu_max(cpu_max)
+
+            with np.load(path) as data:
+                end_s, latency_ns = data['end_s'], data['latency_ns']
+            joined, overlap_us = join_throttling(end_s, latency_ns, counters, period_us)
+            group = groups.setdefault((env, quota, pattern), {
+                'iterations': 0, 'ios': 0, 'latency_us': [], 'overlap_us': [],
+                'throttled_ms': 0.0, 'nr_throttled': 0})
+            group['iterations'] += 1
+            group['ios'] += len(latency_ns)
+            if not joined.any():
+                print(f"Warning: no I/O of {path.name} falls inside the telemetry samples "
+                      f"(fio without log_alternate_epoch, or a stale clock offset)", file=sys.stderr)
+                continue
+            group['latency_us'].append(latency_ns[joined] / 1e3)
+            group['overlap_us'].append(overlap_us[joined])
+            # The cgroup's throttling across the span of this iteration's joined I/Os
+            span = [(end_s[joined] - latency_ns[joined] / 1e9).min(), end_s[joined].max()]
+            lo, hi = np.interp(span, counters['mono'], counters['cg_throttled_usec'])
+            group['throttled_ms'] += float(hi - lo) / 1e3
+            lo, hi = np.interp(span, counters['mono'], counters['cg_nr_throttled'])
+            group['nr_throttled'] += int(round(hi - lo))
+
+    results = []
+    for (env, quota, pattern), group in groups.items():
+        if not group['latency_us']:
+            continue
+        results.append(summarize(
+            env, quota, pattern, group['iterations'], group['ios'],
+            np.concatenate(group['latency_us']), np.concatenate(group['overlap_us']),
+            group['throttled_ms'], group['nr_throttled']))
+    # Tightest quota first, unlimited last
+    results.sort(key=lambda r: (r.env, r.quota == 'unknown', r.quota == 'max',
+                                float(r.quota) if r.quota not in ('max', 'unknown') else 0.0, r.pattern))
+    return results
+
+
+def write_csv(results: List[ThrottleJoin], path) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(ThrottleJoin)])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(asdict(result))
+
+
+def print_report(results: List[ThrottleJoin]) -> None:
+    print(f"\n{'='*60}")
+    print(f"THROTTLING vs TAIL LATENCY (p{TAIL_PERCENTILE:g}, per-I/O join on CLOCK_MONOTONIC)")
+    print(f"{'='*60}")
+    for env in dict.fromkeys(r.env for r in results):
+        print(f"\n{env}")
+        print(f"  {'CPUs':>5} {'pattern':<28} {'I/Os':>9} {'thr ms':>8} {'p99 μs':>9} {'unthr μs':>9} "
+              f"{'explained':>9} {'thr I/Os':>8} {'tail thr':>8} {'lift':>5} {'share':>6}")
+        for r in results:
+            if r.env != env:
+                continue
+            print(f"  {r.quota:>5} {r.pattern:<28} {r.joined_ios:>9} {r.throttled_ms:>8.1f} {r.p99_us:>9.1f} "
+                  f"{r.p99_unthrottled_us:>9.1f} {r.p99_explained_pct:>8.1f}% {r.throttled_io_pct:>7.1f}% "
+                  f"{r.tail_throttled_pct:>7.1f}% {r.tail_lift:>5.2f} {r.tail_throttle_share_pct:>5.1f}%")
+    print("\n  explained: how much lower p99 is without the I/Os in flight while the cgroup was throttled")
+    print("  tail thr / lift: throttled share of the tail I/Os, and its ratio to the throttled share of all I/Os")
+    print("  share: part of the tail I/Os' latency spent while the cgroup was throttled")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Join per-I/O latency logs with cgroup CPU throttling")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ing = sub.add_parser('ingest', help="Store a per-I/O log as an events file (and its latency histogram)")
+    ing.add_argument('log', help="fio write_lat_log log ('-' for stdin)")
+    ing.add_argument('--output', required=True, help="Events file (.npz)")
+    ing.add_argument('--histogram', help="Also save the latency histogram (.npz)")
+    ing.add_argument('--clock-offset-ms', type=float, default=0.0,
+                     help="Log's clock minus the host's CLOCK_MONOTONIC (see clock-offset)")
+
+    off = sub.add_parser('clock-offset', help="Print a remote CLOCK_MONOTONIC's offset and uncertainty in ms")
+    off.add_argument('remote', nargs=argparse.REMAINDER, help="Remote shell command prefix, e.g. ssh root@vm")
+
+    ana = sub.add_parser('analyze', help="Report throttling vs tail latency per quota level")
+    ana.add_argument('results_dirs', nargs='+', help="Results directories (one per quota level in a sweep)")
+    ana.add_argument('--output', help=f"Summary CSV (default: {OUTPUT_CSV} in the first results directory)")
+    ana.add_argument('--no-csv', action='store_true', help="Only print the report")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'ingest':
+        hist = ingest_lat_log(args.log, args.output, args.clock_offset_ms)
+        if args.histogram:
+            hist.save(args.histogram)
+        print(f"{hist.total} samples, {format_percentiles(hist)}")
+        return 0 if hist.total else 1
+
+    if args.command == 'clock-offset':
+        if not args.remote:
+            print("Error: No remote command given", file=sys.stderr)
+            return 1
+        try:
+            offset_ms, uncertainty_ms = clock_offset(args.remote)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"{offset_ms:.3f} {uncertainty_ms:.3f}")
+        return 0
+
+    for results_dir in args.results_dirs:
+        if not Path(results_dir).is_dir():
+            print(f"Error: Results directory {results_dir} does not exist", file=sys.stderr)
+            return 1
+    results = analyze(args.results_dirs)
+    if not results:
+        print(f"No joined per-I/O events in {', '.join(args.results_dirs)} (run with THROTTLE_JOIN=true)")
+        return 1
+    print_report(results)
+    if not args.no_csv:
+        output = args.output or Path(args.results_dirs[0]) / OUTPUT_CSV
+        write_csv(results, output)
+        print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Cross-run regression tracking for the IO Performance Comparison Framework
+Compares a run with blessed per-pattern baselines against each pattern's run-to-run
+noise, finds change points over the whole history in the results store, and writes a
+machine-readable verdict whose exit status can gate kernel or Firecracker upgrades
+"""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from adaptive_iterations import student_t_cdf
+from results_store import DEFAULT_BACKENDS, DEFAULT_STORE, ENVIRONMENTS, RUN_INFO, ResultsStore
+from significance import bootstrap_distributions, pad_samples, permutation_pvalues
+
+BASELINES = 'baselines.jsonl'
+VERDICT = 'regression_verdict.json'
+
+# Metric -> whether higher is better
+METRICS = {'throughput_mbps': True, 'iops': True, 'latency_us': False, 'clat_p99_us': False}
+DEFAULT_METRICS = ('throughput_mbps', 'clat_p99_us')
+
+MIN_EFFECT = 0.05  # smallest relative change a run fails on, however quiet the pattern
+NOISE_K = 3.0  # changes within NOISE_K run-to-run standard deviations are noise
+# Largest noise floor: NOISE_K x a sigma from a handful of runs can exceed 30%,
+# which would pass a clear 15% slowdown as noise
+MAX_NOISE_FLOOR = 0.10
+MIN_HISTORY = 3  # runs of a pattern before its run-to-run spread is trusted
+ALPHA = 0.05
+RESAMPLES = 2000
+CHANGE_POINT_ALPHA = 0.05
+MIN_SEGMENT = 2  # runs on each side of a change point
+MIN_CHANGE_POINT_RUNS = 2 * MIN_SEGMENT  # shorter series cannot be split
+
+# Exit status of `check`
+PASS, REGRESSION, NO_VERDICT = 0, 1, 2
+
+# (env, backend, pattern)
+SeriesKey = Tuple[str, str, str]
+
+
+# Run info: what each run was measured with
+
+def file_digest(path) -> Optional[str]:
+    """Short sha256 of a file (kernel image, Firecracker binary), None if missing."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()[:16]
+
+
+def collect_run_info(files: Dict[str, str], components: Dict[str, str],
+                     settings: Dict[str, str]) -> Dict:
+    info = {'host_kernel': os.uname().release, 'components': dict(components), 'settings': dict(settings)}
+    for name, path in files.items():
+        info['components'][f"{name}_sha256"] = file_digest(path)
+    return info
+
+
+def load_run_info(store: ResultsStore, run: str) -> Dict:
+    entry = store.entry(run) or {}
+    if entry.get('run_info'):
+        return entry['run_info']
+    try:
+        with open(Path(entry.get('source', '')) / RUN_INFO, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def run_info_changes(before: Dict, after: Dict) -> List[str]:
+    """'name: old -> new' for every component or setting that differs between two runs."""
+    changes = []
+    flat_before = dict(before.get('components', {}), host_kernel=before.get('host_kernel'), **before.get('settings', {}))
+    flat_after = dict(after.get('components', {}), host_kernel=after.get('host_kernel'), **after.get('settings', {}))
+    for name in sorted(set(flat_before) | set(flat_after)):
+        if flat_before.get(name) != flat_after.get(name):
+            changes.append(f"{name}: {flat_before.get(name) or '?'} -> {flat_after.get(name) or '?'}")
+    return changes
+
+
+# Baselines
+
+class Baselines:
+    """Append-only log of blessed runs per (env, backend, pattern); the latest blessing wins."""
+
+    def __init__(self, store: ResultsStore):
+        self.path = store.root / BASELINES
+
+    def current(self) -> Dict[SeriesKey, Dict]:
+        baselines = {}
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        baselines[entry['env'], entry['backend'], entry['pattern']] = entry
+        except OSError:
+            pass
+        return baselines
+
+    def bless(self, run: str, keys: Sequence[SeriesKey], note: str = '') -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        blessed_at = datetime.now().isoformat(timespec='seconds')
+        with open(self.path, 'a') as f:
+            for env, backend, pattern in keys:
+                f.write(json.dumps({'env': env, 'backend': backend, 'pattern': pattern, 'run': run,
+                                    'note': note, 'blessed_at': blessed_at}, sort_keys=True) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+# Samples and history
+
+def _groups(data: Dict[str, np.ndarray], metric: str) -> Dict[Tuple[str, str, str, str], np.ndarray]:
+    """(run, env, backend, pattern) -> the valid (finite, positive) iterations of a query result."""
+    values = data[metric]
+    groups = {}
+    if not len(values):
+        return groups
+    keys = np.stack([data['run'], data['env'], data['backend'], data['pattern']], axis=1).astype(str)
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    valid = np.isfinite(values) & (values > 0)
+    for i, key in enumerate(unique):
+        groups[tuple(key)] = values[(inverse == i) & valid]
+    return groups
+
+
+def run_samples(store: ResultsStore, run: str, metric: str) -> Dict[SeriesKey, np.ndarray]:
+    groups = _groups(store.query([metric], runs=[run]), metric)
+    return {(env, backend, pattern): values for (_, env, backend, pattern), values in groups.items()}
+
+
+def history(store: ResultsStore, metric: str) -> Dict[SeriesKey, Tuple[List[str], np.ndarray]]:
+    """Per series, the runs in time order (run ids carry their start time) and each run's median."""
+    by_series = {}
+    for (run, env, backend, pattern), values in _groups(store.query([metric]), metric).items():
+        if len(values):
+            by_series.setdefault((env, backend, pattern), []).append((run, float(np.median(values))))
+    return {key: ([run for run, _ in sorted(points)], np.array([m for _, m in sorted(points)]))
+            for key, points in by_series.items()}
+
+
+def run_to_run_sigma(medians: np.ndarray) -> float:
+    """
+    Relative run-to-run standard deviation of a pattern's per-run medians, from
+    successive differences of their logs: a step change in the history moves only
+    one difference, so it barely widens the noise it is judged against.
+    """
+    if len(medians) < MIN_HISTORY:
+        return float('nan')
+    steps = np.abs(np.diff(np.log(medians)))
+    return float(1.4826 * np.median(steps) / np.sqrt(2))
+
+
+# Change points
+
+def _split_statistic(x: np.ndarray, min_segment: int) -> Tuple[float, int]:
+    """
+    Largest |pooled two-sample t| between x[:k] and x[k:] over the allowed splits k,
+    and the k where it falls. A noise-free step gives an infinite t.
+    """
+    n = len(x)
+    k = np.arange(min_segment, n - min_segment + 1)
+    total, total_sq = np.cumsum(x), np.cumsum(x * x)
+    left_sum, left_sq = total[k - 1], total_sq[k - 1]
+    right_sum, right_sq = total[-1] - left_sum, total_sq[-1] - left_sq
+    right_n = n - k
+    diff = right_sum / right_n - left_sum / k
+    # Within-segment sum of squares, clipped at 0 against rounding
+    ss = np.maximum(left_sq - left_sum ** 2 / k + right_sq - right_sum ** 2 / right_n, 0.0)
+    scale = np.sqrt(ss / (n - 2) * (1.0 / k + 1.0 / right_n))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(scale > 0, np.abs(diff) / scale, np.where(diff != 0, np.inf, 0.0))
+    best = int(np.argmax(t))
+    return float(t[best]), int(k[best])
+
+
+def segment_change_points(values: np.ndarray, alpha: float = CHANGE_POINT_ALPHA,
+                          min_segment: int = MIN_SEGMENT) -> List[Tuple[int, float]]:
+    """
+    Binary segmentation: split a segment where the two-sample t statistic of its halves
+    peaks if the Student-t p-value of that peak, Bonferroni-corrected over the candidate
+    splits, is below alpha, then search both halves. Unlike a permutation test of the
+    peak, whose smallest p is 2 / C(n, k) (0.1 at 6 runs), this resolves short histories.
+    Returns (index of the first run of the new regime, p-value), in order.
+    """
+    found = []
+    segments = [(0, len(values))]
+    while segments:
+        lo, hi = segments.pop()
+        x = values[lo:hi]
+        if len(x) < 2 * min_segment:
+            continue
+        t, at = _split_statistic(x, min_segment)
+        candidates = len(x) - 2 * min_segment + 1
+        tail = 0.0 if np.isinf(t) else 1.0 - student_t_cdf(t, len(x) - 2)
+        p_value = min(1.0, 2.0 * tail * candidates)
+        if p_value >= alpha:
+            continue
+        found.append((lo + at, p_value))
+        segments += [(lo, lo + at), (lo + at, hi)]
+    return sorted(found)
+
+
+def short_series(store: ResultsStore, metrics: Sequence[str], env: Optional[str] = None,
+                 pattern: Optional[str] = None) -> List[Tuple[SeriesKey, str, int]]:
+    """(series, metric, runs) of every series too short for change-point detection."""
+    short = []
+    for metric in metrics:
+        for (e, backend, p), (runs, _) in sorted(history(store, metric).items()):
+            if (env and e != env) or (pattern and p != pattern):
+                continue
+            if len(runs) < MIN_CHANGE_POINT_RUNS:
+                short.append(((e, backend, p), metric, len(runs)))
+    return short
+
+
+def find_change_points(store: ResultsStore, metrics: Sequence[str], env: Optional[str] = None,
+                       pattern: Optional[str] = None, min_effect: float = MIN_EFFECT) -> List[Dict]:
+    """
+    Change points of every series' per-run medians (on a log scale) that shift it by
+    at least min_effect, with what changed in the run info there.
+    """
+    info_cache = {}
+    points = []
+    for metric in metrics:
+        for (e, backend, p), (runs, medians) in sorted(history(store, metric).items()):
+            if (env and e != env) or (pattern and p != pattern):
+                continue
+            for index, p_value in segment_change_points(np.log(medians)):
+                before, after = medians[:index], medians[index:]
+                # Medians of the neighbouring regimes only, not the whole history
+                prev = [i for i, _ in segment_change_points(np.log(medians[:index]))]
+                nxt = [i for i, _ in segment_change_points(np.log(medians[index:]))]
+                before = before[prev[-1] if prev else 0:]
+                after = after[:nxt[0] if nxt else len(after)]
+                shift = float(np.median(after) / np.median(before) - 1)
+                if abs(shift) < min_effect:
+                    continue
+                for run in (runs[index - 1], runs[index]):
+                    if run not in info_cache:
+                        info_cache[run] = load_run_info(store, run)
+                points.append({
+                    'env': e, 'backend': backend, 'pattern': p, 'metric': metric,
+                    'run': runs[index], 'previous_run': runs[index - 1], 'p_value': p_value,
+                    'before': float(np.median(before)), 'after': float(np.median(after)),
+                    'shift_pct': 100.0 * shift,
+                    'direction': 'improvement' if (shift > 0) == METRICS[metric] else 'regression',
+                    'changes': run_info_changes(info_cache[runs[index - 1]], info_cache[runs[index]]),
+                })
+    return points
+
+
+# Baseline comparison
+
+def compare_to_baselines(store: ResultsStore, run: str, metrics: Sequence[str],
+                         min_effect: float = MIN_EFFECT, noise_k: float = NOISE_K,
+                         max_floor: float = MAX_NOISE_FLOOR, alpha: float = ALPHA,
+                         resamples: int = RESAMPLES) -> List[Dict]:
+    """
+    One comparison per (env, backend, pattern, metric) of `run`. A change counts when
+    the bootstrap interval of the median ratio excludes no change and the change is
+    larger than the pattern's noise floor: max(min_effect, noise_k x its run-to-run
+    spread), capped at max_floor. The spread comes from the runs up to the baseline
+    only, so a regression between baseline and candidate cannot widen the floor it is
+    judged against. The noise floor, not a multiple-comparison
+    correction, guards the many patterns: with 3-5 iterations a side a permutation
+    test cannot reach a corrected significance level, its p-value is reported only.
+    """
+    rng = np.random.default_rng(0)
+    baselines = Baselines(store).current()
+    comparisons, base_groups, cand_groups = [], [], []
+    for metric in metrics:
+        series = history(store, metric)
+        for key, candidate in sorted(run_samples(store, run, metric).items()):
+            env, backend, pattern = key
+            item = {'env': env, 'backend': backend, 'pattern': pattern, 'metric': metric,
+                    'n': int(len(candidate)), 'median': float(np.median(candidate)) if len(candidate) else None}
+            baseline = baselines.get(key)
+            if baseline is None or not store.has_run(baseline['run']):
+                comparisons.append(dict(item, status='no-baseline'))
+                continue
+            item['baseline_run'] = baseline['run']
+            if baseline['run'] == run:
+                comparisons.append(dict(item, status='baseline'))
+                continue
+            reference = run_samples(store, baseline['run'], metric).get(key, np.empty(0))
+            item['baseline_n'] = int(len(reference))
+            item['baseline_median'] = float(np.median(reference)) if len(reference) else None
+            if len(reference) < 2 or len(candidate) < 2:
+                comparisons.append(dict(item, status='insufficient'))
+                continue
+            runs, medians = series.get(key, ([], np.empty(0)))
+            earlier = medians[[i for i, r in enumerate(runs) if r <= baseline['run'] and r < run]]
+            sigma = run_to_run_sigma(earlier)
+            item['noise_pct'] = 100.0 * sigma if sigma == sigma else None
+            floor = min(max_floor, noise_k * sigma) if sigma == sigma else 0.0
+            item['threshold_pct'] = 100.0 * max(min_effect, floor)
+            comparisons.append(item)
+            base_groups.append(reference)
+            cand_groups.append(candidate)
+
+    tested = [c for c in comparisons if 'status' not in c]
+    if tested:
+        b_values, b_counts = pad_samples(base_groups)
+        c_values, c_counts = pad_samples(cand_groups)
+        pvalues = permutation_pvalues(b_values, b_counts, c_values, c_counts, resamples, rng)
+        _, b_medians = bootstrap_distributions(b_values, b_counts, resamples, rng)
+        _, c_medians = bootstrap_distributions(c_values, c_counts, resamples, rng)
+        ratio_lo, ratio_hi = np.quantile(c_medians / b_medians, [alpha / 2, 1 - alpha / 2], axis=1)
+        for i, item in enumerate(tested):
+            change = item['median'] / item['baseline_median'] - 1
+            worse = (change < 0) == METRICS[item['metric']]
+            significant = not ratio_lo[i] <= 1 <= ratio_hi[i]
+            beyond_noise = abs(change) * 100.0 > item['threshold_pct']
+            item.update(change_pct=100.0 * change, change_lo_pct=100.0 * (ratio_lo[i] - 1),
+                        change_hi_pct=100.0 * (ratio_hi[i] - 1), p_value=float(pvalues[i]),
+                        status=('regression' if worse else 'improvement') if significant and beyond_noise
+                        else 'unchanged')
+    return comparisons
+
+
+def verdict(store: ResultsStore, run: str, metrics: Sequence[str], **options) -> Dict:
+    comparisons = compare_to_baselines(store, run, metrics, **options)
+    statuses = [c['status'] for c in comparisons]
+    if 'regression' in statuses:
+        status = 'regression'
+    elif not any(s in ('unchanged', 'improvement', 'baseline') for s in statuses):
+        status = 'no-baseline'
+    else:
+        status = 'pass'
+    info = load_run_info(store, run)
+    baseline_runs = sorted({c['baseline_run'] for c in comparisons if c.get('baseline_run') not in (None, run)})
+    return {
+        'run': run,
+        'status': status,
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'metrics': list(metrics),
+        'run_info': info,
+        'changes_since_baseline': {b: run_info_changes(load_run_info(store, b), info) for b in baseline_runs},
+        'regressions': [c for c in comparisons if c['status'] == 'regression'],
+        'comparisons': comparisons,
+        'change_points': find_change_points(store, metrics, min_effect=options.get('min_effect', MIN_EFFECT)),
+    }
+
+
+# Reports
+
+def _pct(value: Optional[float]) -> str:
+    return 'n/a' if value is None or value != value else f"{value:+.1f}%"
+
+
+def print_verdict(result: Dict) -> None:
+    print(f"\n{'='*60}")
+    print(f"REGRESSION CHECK: {result['run']}")
+    print(f"{'='*60}")
+    for baseline, changes in result['changes_since_baseline'].items():
+        print(f"Changed since {baseline}: {', '.join(changes) if changes else 'nothing recorded'}")
+    print(f"\n  {'env':<12} {'pattern':<32} {'metric':<16} {'change':>8} {'95% CI':>17} {'noise':>7} {'p':>6} {'status'}")
+    for c in result['comparisons']:
+        if c['status'] in ('no-baseline', 'baseline', 'insufficient'):
+            continue
+        ci = f"{_pct(c['change_lo_pct'])}..{_pct(c['change_hi_pct'])}"
+        noise = f"±{c['threshold_pct']:.1f}%"
+        print(f"  {c['env']:<12} {c['pattern']:<32} {c['metric']:<16} {_pct(c['change_pct']):>8} {ci:>17} "
+              f"{noise:>7} {c['p_value']:>6.3f} {c['status']}")
+    missing = [c for c in result['comparisons'] if c['status'] == 'no-baseline']
+    if missing:
+        print(f"\n  {len(missing)} series without a baseline (regression.py bless {result['run']})")
+    recent = [p for p in result['change_points'] if p['run'] == result['run'] or p['previous_run'] == result['run']]
+    if result['change_points']:
+        print(f"\nChange points in the history: {len(result['change_points'])} ({len(recent)} at this run)")
+        print_change_points(result['change_points'][-10:])
+    print(f"\nVerdict: {result['status'].upper()}")
+
+
+def print_change_points(points: List[Dict]) -> None:
+    for p in points:
+        changes = f" [{'; '.join(p['changes'])}]" if p['changes'] else ''
+        print(f"  {p['env']:<12} {p['pattern']:<32} {p['metric']:<16} {p['shift_pct']:+6.1f}% at {p['run']} "
+              f"(p={p['p_value']:.3f}, {p['direction']}){changes}")
+
+
+def _resolve_run(store: ResultsStore, run_or_dir: str) -> Optional[str]:
+    """Run id of an ingested run, or of a results directory (ingested first)."""
+    if Path(run_or_dir).is_dir():
+        store.ingest_run(run_or_dir)
+        run_or_dir = store.run_id_for(run_or_dir)
+    return run_or_dir if store.has_run(run_or_dir) else None
+
+
+def _pairs(values: Sequence[str]) -> Dict[str, str]:
+    return dict(value.split('=', 1) for value in values)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Regression tracking against blessed baselines")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="Store root directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    info = sub.add_parser('run-info', help="Record what a run was measured with")
+    info.add_argument('--output', required=True)
+    info.add_argument('--file', action='append', default=[], metavar='NAME=PATH', help="Fingerprint a file")
+    info.add_argument('--component', action='append', default=[], metavar='NAME=VERSION')
+    info.add_argument('--setting', action='append', default=[], metavar='NAME=VALUE')
+
+    bless = sub.add_parser('bless', help="Make a run the baseline of its patterns")
+    bless.add_argument('run', help="Run id or results directory")
+    bless.add_argument('--env', choices=ENVIRONMENTS)
+    bless.add_argument('--pattern')
+    bless.add_argument('--note', default='')
+
+    sub.add_parser('baselines', help="List the current baselines")
+
+    check = sub.add_parser('check', help="Compare a run with its baselines; exit 1 on a regression")
+    check.add_argument('run', help="Run id or results directory")
+    check.add_argument('--metric', action='append', choices=sorted(METRICS),
+                       help=f"Repeatable (default: {', '.join(DEFAULT_METRICS)})")
+    check.add_argument('--min-effect', type=float, default=MIN_EFFECT * 100, help="Percent")
+    check.add_argument('--noise-k', type=float, default=NOISE_K)
+    check.add_argument('--max-floor', type=float, default=MAX_NOISE_FLOOR * 100,
+                       help="Largest noise floor, percent")
+    check.add_argument('--output', help=f"Verdict JSON (default: {VERDICT} in the results directory)")
+
+    hist = sub.add_parser('history', help="Change points over every run in the store")
+    hist.add_argument('--metric', action='append', choices=sorted(METRICS))
+    hist.add_argument('--env', choices=ENVIRONMENTS)
+    hist.add_argument('--pattern')
+    hist.add_argument('--min-effect', type=float, default=MIN_EFFECT * 100, help="Percent")
+
+    args = parser.parse_args(argv)
+    store = ResultsStore(args.store)
+
+    if args.command == 'run-info':
+        result = collect_run_info(_pairs(args.file), _pairs(args.component), _pairs(args.setting))
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        return 0
+
+    if args.command == 'baselines':
+        for (env, backend, pattern), entry in sorted(Baselines(store).current().items()):
+            note = f"  ({entry['note']})" if entry.get('note') else ''
+            print(f"{env:<12} {backend:<22} {pattern:<32} {entry['run']}  {entry['blessed_at']}{note}")
+        return 0
+
+    if args.command == 'history':
+        points = find_change_points(store, args.metric or DEFAULT_METRICS, args.env, args.pattern, args.min_effect / 100)
+        try:
+            print(f"{len(points)} change points over {len(store.runs())} runs")
+            print_change_points(points)
+            for (env, backend, pattern), metric, runs in short_series(store, args.metric or DEFAULT_METRICS,
+                                                                     args.env, args.pattern):
+                print(f"  {env:<12} {pattern:<32} {metric:<16} insufficient history "
+                      f"({runs} runs, need ≥{MIN_CHANGE_POINT_RUNS})")
+        except BrokenPipeError:
+            # Piped into head and closed early: point stdout at /dev/null so the flush at
+            # exit does not raise again, and stop without a traceback
+            devnull = os.open(os.devnull, os.O_WRONLY)
+            os.dup2(devnull, sys.stdout.fileno())
+            return 1
+        return 0
+
+    run = _resolve_run(store, args.run)
+    if run is None:
+        print(f"Error: {args.run} is neither a results directory nor an ingested run", file=sys.stderr)
+        return NO_VERDICT
+
+    if args.command == 'bless':
+        groups = store.select(runs=[run], env=args.env, pattern=args.pattern)
+        keys = sorted({(g['env'], g.get('backend', DEFAULT_BACKENDS[g['env']]), g['pattern']) for g in groups})
+        Baselines(store).bless(run, keys, args.note)
+        print(f"Blessed {run} as the baseline of {len(keys)} series")
+        return 0
+
+    result = verdict(store, run, args.metric or DEFAULT_METRICS,
+                     min_effect=args.min_effect / 100, noise_k=args.noise_k, max_floor=args.max_floor / 100)
+    print_verdict(result)
+    output = args.output or (Path(args.run) / VERDICT if Path(args.run).is_dir() else None)
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"Wrote {output}")
+    if result['status'] == 'regression':
+        return REGRESSION
+    return PASS if result['status'] == 'pass' else NO_VERDICT
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Columnar results store for the IO Performance Comparison Framework
+Ingests io_benchmark_results_* directories into per-run partitions of
+memory-mapped NumPy column files, indexed by an append-only manifest
+"""
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from file_pool import parse_size
+from job_matrix import DEFAULTS, MANIFEST_NAME, OPERATIONS, cache_mode, load_manifest, variant_suffix
+
+DEFAULT_STORE = os.environ.get('IO_RESULTS_STORE', 'io_results_store')
+MANIFEST = 'manifest.jsonl'
+ENVIRONMENTS = ('container', 'firecracker')
+
+# Storage backend of each environment (storage_backends.sh); runs without a
+# storage_backends.json were measured on the defaults of the time
+BACKENDS_FILE = 'storage_backends.json'
+RUN_INFO = 'run_info.json'
+BACKEND_CELLS_DIR = 'backends'
+DEFAULT_BACKENDS = {'container': 'loop', 'firecracker': 'rootfs-unsafe-sync'}
+
+# Numeric per-iteration columns; legacy CSVs lacking a column get NaN
+NUMERIC_COLUMNS = (
+    'timestamp', 'latency_us', 'throughput_mbps', 'cpu_usage',
+    'iops', 'read_iops', 'write_iops', 'read_mbps', 'write_mbps',
+    'clat_p50_us', 'clat_p99_us', 'clat_p999_us',
+    'start_time', 'end_time', 'cgroup_cpu_s', 'cpu_us_per_io', 'mbps_per_core',
+    'host_cpu_s', 'throttled_ms', 'nr_throttled', 'device_util_pct', 'io_pressure_pct',
+    'read_bytes', 'guest_read_bytes', 'host_read_bytes', 'guest_cache_hit_pct', 'host_cache_hit_pct',
+    'runtime_s', 'steady_s', 'steady_start_s', 'steady_mbps', 'steady_iops', 'transient_mbps',
+)
+
+# fio rw mode -> operation name used by the analysis scripts
+RW_OPERATIONS = {rw: names[0] for rw, names in OPERATIONS.items()}
+RW_OPERATIONS.update(rw='mixed', readwrite='mixed')
+
+# Job axes kept per (env, pattern) group and expanded per row by query()
+JOB_KEYS = ('block_size', 'rw', 'iodepth', 'numjobs', 'ioengine', 'cache_mode', 'variant')
+KEY_COLUMNS = ('run', 'env', 'backend', 'pattern') + JOB_KEYS
+# Default grouping of `aggregate` (aggregation.py): one group per environment, backend and pattern
+AGGREGATE_BY = ('env', 'backend', 'pattern')
+
+def block_size_label(size_bytes: int) -> str:
+    """Human label used in the reports ('512B', '4KB', '64KB', '1MB')."""
+    if size_bytes <= 0:
+        return 'Unknown'
+    if size_bytes >= 1024 ** 2 and size_bytes % 1024 ** 2 == 0:
+        return f"{size_bytes // 1024 ** 2}MB"
+    if size_bytes >= 1024 and size_bytes % 1024 == 0:
+        return f"{size_bytes // 1024}KB"
+    return f"{size_bytes}B"
+
+
+def _block_size(bs) -> int:
+    """Bytes of an fio bs option; 0 (unknown) for what a single size cannot express, e.g. '4k-64k'."""
+    try:
+        return parse_size(str(bs))
+    except ValueError:
+        return 0
+
+
+def job_metadata(job: Dict) -> Dict:
+    """The JOB_KEYS of one job (manifest entry or fio options), with fio defaults filled in."""
+    meta = {
+        'block_size': job['block_size'] if 'block_size' in job else _block_size(job.get('bs', '0')),
+        'rw': job.get('rw', ''),
+        'iodepth': int(job.get('iodepth', DEFAULTS['iodepth'])),
+        'numjobs': int(job.get('numjobs', DEFAULTS['numjobs'])),
+        'ioengine': job.get('ioengine', DEFAULTS['ioengine']),
+        'cache_mode': job.get('cache_mode') or cache_mode(job.get('direct', DEFAULTS['direct']),
+                                                          job.get('invalidate', DEFAULTS['invalidate'])),
+    }
+    meta['variant'] = job.get('variant', variant_suffix(dict(job, **meta)))
+    return meta
+
+
+def load_pattern_metadata(results_dir=None) -> Dict[str, Dict]:
+    """Job axes of every pattern, from the run's job manifest or the current matrix."""
+    return {name: job_metadata(job) for name, job in load_manifest(results_dir).items()}
+
+
+def _metadata_from_fio_json(results_dir: Path, env: str, pattern: str) -> Optional[Dict]:
+    """Recover the job axes from the options fio recorded for the first iteration."""
+    json_file = results_dir / 'fio_json' / f"{env}_{pattern}_1.json"
+    if not json_file.exists():
+        return None
+    try:
+        text = json_file.read_text()
+        data = json.loads(text[text.index('{'):])
+        options = data['jobs'][0]['job options']
+    except (OSError, ValueError, KeyError, IndexError):
+        return None
+    return job_metadata(options)
+
+
+def load_backends(results_dir) -> Dict[str, str]:
+    """env -> storage backend the results in `results_dir` were measured on."""
+    backends = dict(DEFAULT_BACKENDS)
+    try:
+        with open(Path(results_dir) / BACKENDS_FILE) as f:
+            backends.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return backends
+
+
+def result_dirs(results_dir) -> List[Path]:
+    """A run's own directory followed by its storage-matrix cell directories."""
+    results_dir = Path(results_dir)
+    cells = results_dir / BACKEND_CELLS_DIR
+    return [results_dir] + (sorted(p for p in cells.iterdir() if p.is_dir()) if cells.is_dir() else [])
+
+
+def _parse_timestamp(value: str) -> float:
+    for fmt in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S'):
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return float('nan')
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _read_results_csv(path: Path) -> Dict[str, List[float]]:
+    columns = {name: [] for name in NUMERIC_COLUMNS}
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            columns['timestamp'].append(_parse_timestamp(row.get('timestamp')))
+            for name in NUMERIC_COLUMNS[1:]:
+                columns[name].append(_to_float(row.get(name)))
+    return columns
+
+
+def _read_run_info(results_dir: Path) -> Dict:
+    """Kernel, Firecracker and settings a run was measured with (regression.py run-info)."""
+    try:
+        with open(results_dir / RUN_INFO, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def source_fingerprint(results_dir: Path) -> str:
+    """Cheap change detector for a results directory (runner CSV names, sizes, mtimes)."""
+    digest = hashlib.sha1()
+    for directory in result_dirs(results_dir):
+        for csv_path in sorted(directory.glob('*.csv')):
+            # Reports the analysis writes next to the runner CSVs are not ingested
+            if csv_path.stem.partition('_')[0] not in ENVIRONMENTS:
+                continue
+            stat = csv_path.stat()
+            digest.update(f"{csv_path.relative_to(results_dir)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    if (results_dir / RUN_INFO).exists():
+        digest.update(f"{RUN_INFO}:{(results_dir / RUN_INFO).stat().st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+class ResultsStore:
+    """Append-only, partitioned columnar store of benchmark iterations."""
+
+    def __init__(self, root: str = DEFAULT_STORE):
+        self.root = Path(root)
+        self.manifest_path = self.root / MANIFEST
+        self._manifest_cache = None
+        self._manifest_mtime = None
+
+    # Manifest handling
+
+    def manifest(self) -> List[Dict]:
+        """
+        Return the current partition entry of every run, re-reading the manifest
+        only when it changed. A run re-ingested later supersedes its older entry.
+        """
+        try:
+            mtime = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return []
+        if self._manifest_cache is None or mtime != self._manifest_mtime:
+            latest = {}
+            with open(self.manifest_path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        latest[entry['run']] = entry
+            self._manifest_cache = list(latest.values())
+            self._manifest_mtime = mtime
+        return self._manifest_cache
+
+    def runs(self) -> List[str]:
+        return [entry['run'] for entry in self.manifest()]
+
+    def entry(self, run_id: str) -> Optional[Dict]:
+        for entry in self.manifest():
+            if entry['run'] == run_id:
+                return entry
+        return None
+
+    def has_run(self, run_id: str) -> bool:
+        return self.entry(run_id) is not None
+
+    def run_id_for(self, results_dir) -> str:
+        """
+        Run id of a results directory: its name, unless a run of that name was ingested
+        from another directory (two hosts starting a run in the same second); that one
+        gets the name plus a short hash of its path, so neither replaces the other.
+        """
+        source = str(Path(results_dir).resolve())
+        run_id = Path(source).name
+        existing = self.entry(run_id)
+        if existing is None or existing.get('source') == source:
+            return run_id
+        return f"{run_id}-{hashlib.sha1(source.encode()).hexdigest()[:8]}"
+
+    def _append_manifest(self, entry: Dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(entry, sort_keys=True) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._manifest_cache = None
+
+    # Ingestion
+
+    def ingest_run(self, results_dir, run_id: Optional[str] = None,
+                   metadata: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
+        """
+        Add one results directory as a new partition. Runs already ingested are
+        skipped unless their CSVs changed since (e.g. a run that was still in
+        progress); partitions are never rewritten, and a re-ingested run's old
+        partition is removed once the manifest points at the new one. Only a run
+        from the same source directory counts as re-ingested (see run_id_for).
+        """
+        results_dir = Path(results_dir)
+        run_id = run_id or self.run_id_for(results_dir)
+        fingerprint = source_fingerprint(results_dir)
+        existing = self.entry(run_id)
+        if existing is not None and existing.get('fingerprint') == fingerprint:
+            return None
+        # Runs with a job manifest describe their own patterns; older runs fall back
+        # to the options fio recorded, then to the current matrix
+        has_manifest = (results_dir / MANIFEST_NAME).exists()
+        if has_manifest or metadata is None:
+            metadata = load_pattern_metadata(results_dir)
+
+        groups = []
+        columns = {name: [] for name in NUMERIC_COLUMNS}
+        iterations = []
+        row = 0
+        # Storage-matrix cells are results directories of their own, one backend each
+        for directory in result_dirs(results_dir):
+            source = '' if directory == results_dir else str(directory.relative_to(results_dir))
+            backends = load_backends(directory)
+            for csv_path in sorted(directory.glob('*.csv')):
+                env, _, pattern = csv_path.stem.partition('_')
+                if env not in ENVIRONMENTS or not pattern:
+                    continue
+                try:
+                    data = _read_results_csv(csv_path)
+                except (OSError, csv.Error) as e:
+                    print(f"Warning: Could not ingest {csv_path}: {e}", file=sys.stderr)
+                    continue
+                count = len(data['timestamp'])
+                if count == 0:
+                    continue
+                meta = ((metadata.get(pattern) if has_manifest else None)
+                        or _metadata_from_fio_json(directory, env, pattern)
+                        or metadata.get(pattern)
+                        or job_metadata({}))
+                for name in NUMERIC_COLUMNS:
+                    columns[name].extend(data[name])
+                iterations.extend(range(1, count + 1))
+                groups.append(dict({'env': env, 'backend': backends[env], 'pattern': pattern}, **meta,
+                                   source=source, start=row, count=count))
+                row += count
+
+        if not groups:
+            return None
+
+        # Write the partition into a temporary directory and rename it into place,
+        # so a crash never leaves a half-written partition referenced by the manifest
+        partition = Path('partitions') / f"{run_id}-{fingerprint[:12]}"
+        final_dir = self.root / partition
+        tmp_dir = self.root / 'partitions' / f".{partition.name}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for name in NUMERIC_COLUMNS:
+            np.save(tmp_dir / f"{name}.npy", np.asarray(columns[name], dtype=np.float64))
+        np.save(tmp_dir / 'iteration.npy', np.asarray(iterations, dtype=np.int32))
+        # Raw telemetry samples travel with the partition for time-series analysis
+        for directory in result_dirs(results_dir):
+            telemetry_dir = directory / 'telemetry'
+            if telemetry_dir.is_dir():
+                shutil.copytree(telemetry_dir, tmp_dir / directory.relative_to(results_dir) / 'telemetry')
+        shutil.rmtree(final_dir, ignore_errors=True)
+        os.replace(tmp_dir, final_dir)
+        run_info = _read_run_info(results_dir)
+
+        entry = {
+            'run': run_id,
+            'source': str(results_dir.resolve()),
+            'path': str(partition),
+            'fingerprint': fingerprint,
+            'rows': row,
+            'columns': list(NUMERIC_COLUMNS) + ['iteration'],
+            'groups': groups,
+            'run_info': run_info,
+            'ingested_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        self._append_manifest(entry)
+        if (existing is not None and existing.get('source') == entry['source']
+                and existing.get('path') and existing['path'] != entry['path']):
+            shutil.rmtree(self.root / existing['path'], ignore_errors=True)
+        return entry
+
+    def ingest_all(self, pattern: str = 'io_benchmark_results_*', base: str = '.') -> List[Dict]:
+        """Ingest every results directory under `base` that is not in the store yet."""
+        metadata = load_pattern_metadata()
+        added = []
+        for results_dir in sorted(Path(base).glob(pattern)):
+            if results_dir.is_dir():
+                entry = self.ingest_run(results_dir, metadata=metadata)
+                if entry:
+                    added.append(entry)
+        return added
+
+    # Queries
+
+    def select(self, runs: Optional[Iterable[str]] = None, env: Optional[str] = None,
+               pattern: Optional[str] = None, block_size: Optional[int] = None,
+               rw: Optional[str] = None, ioengine: Optional[str] = None,
+               backend: Optional[str] = None) -> List[Dict]:
+        """Return manifest groups matching the filters, each tagged with its run."""
+        runs = set(runs) if runs is not None else None
+        selected = []
+        for entry in self.manifest():
+            if runs is not None and entry['run'] not in runs:
+                continue
+            for group in entry['groups']:
+                if env is not None and group['env'] != env:
+                    continue
+                if pattern is not None and group['pattern'] != pattern:
+                    continue
+                if block_size is not None and group['block_size'] != block_size:
+                    continue
+                if rw is not None and group['rw'] != rw:
+                    continue
+                if ioengine is not None and group.get('ioengine', DEFAULTS['ioengine']) != ioengine:
+                    continue
+                if backend is not None and group.get('backend', DEFAULT_BACKENDS[group['env']]) != backend:
+                    continue
+                selected.append(dict(group, run=entry['run'], path=entry['path']))
+        return selected
+
+    def primary_backends(self, run: str) -> Dict[str, str]:
+        """env -> the backend the paired tables compare in `run` (the default one if it ran)."""
+        ran = {}
+        for group in self.select(runs=[run]):
+            ran.setdefault(group['env'], []).append(group.get('backend', DEFAULT_BACKENDS[group['env']]))
+        return {env: DEFAULT_BACKENDS[env] if DEFAULT_BACKENDS[env] in backends else backends[0]
+                for env, backends in ran.items()}
+
+    def load_telemetry(self, run: str, env: str, pattern: str,
+                       backend: Optional[str] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Raw telemetry samples recorded while `env` ran `pattern` in `run`, if any."""
+        from telemetry import load_samples
+
+        groups = self.select(runs=[run], env=env, pattern=pattern, backend=backend)
+        if not groups:
+            return None
+        samples = (self.root / groups[0]['path'] / groups[0].get('source', '') / 'telemetry'
+                   / f"{env}_{pattern}.tlm")
+        if not samples.exists():
+            return None
+        return load_samples(str(samples))
+
+    def _column(self, path: str, name: str) -> np.ndarray:
+        column_file = self.root / path / f"{name}.npy"
+        if not column_file.exists():
+            return None
+        return np.load(column_file, mmap_mode='r')
+
+    def query(self, columns: Iterable[str] = ('latency_us', 'throughput_mbps'),
+              iterations: Optional[Iterable[int]] = None, **filters) -> Dict[str, np.ndarray]:
+        """
+        Load only the requested columns of the matching partitions.
+        Key columns (KEY_COLUMNS and iteration) are expanded per row.
+        """
+        return self.load_groups(self.select(**filters), columns, iterations)
+
+    def load_groups(self, groups: List[Dict], columns: Iterable[str] = ('latency_us', 'throughput_mbps'),
+                    iterations: Optional[Iterable[int]] = None) -> Dict[str, np.ndarray]:
+        """query() of groups already chosen with select()."""
+        columns = list(columns)
+        wanted_iterations = set(iterations) if iterations is not None else None
+
+        parts = {name: [] for name in columns}
+        keys = {name: [] for name in KEY_COLUMNS + ('iteration',)}
+        for group in groups:
+            sl = slice(group['start'], group['start'] + group['count'])
+            iteration = np.asarray(self._column(group['path'], 'iteration')[sl])
+            mask = (np.isin(iteration, list(wanted_iterations))
+                    if wanted_iterations is not None else np.ones(len(iteration), dtype=bool))
+            n = int(mask.sum())
+            if n == 0:
+                continue
+            for name in columns:
+                data = self._column(group['path'], name)
+                if data is None:
+                    parts[name].append(np.full(n, np.nan))
+                else:
+                    parts[name].append(np.asarray(data[sl])[mask])
+            keys['iteration'].append(iteration[mask])
+            # Partitions ingested before a key existed get the fio default
+            legacy = dict(job_metadata(group), backend=DEFAULT_BACKENDS[group['env']])
+            for key in KEY_COLUMNS:
+                keys[key].append(np.full(n, group.get(key, legacy.get(key)), dtype=object))
+
+        result = {}
+        for name, chunks in list(keys.items()) + list(parts.items()):
+            result[name] = np.concatenate(chunks) if chunks else np.empty(0)
+        return result
+
+    def query_frame(self, columns: Iterable[str] = ('latency_us', 'throughput_mbps'), **filters):
+        """Same as query() but returned as a pandas DataFrame."""
+        import pandas as pd
+        return pd.DataFrame(self.query(columns, **filters))
+
+    def latest_run(self) -> Optional[str]:
+        runs = self.runs()
+        return max(runs) if runs else None
+
+
+def open_store_for(results_dir, root: str = DEFAULT_STORE) -> ResultsStore:
+    """Open the store and make sure `results_dir` has been ingested into it."""
+    store = ResultsStore(root)
+    store.ingest_run(results_dir)
+    return store
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Columnar store of IO benchmark results")
+    parser.add_argument('--store', default=DEFAULT_STORE, help="Store root directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ingest = sub.add_parser('ingest', help="Ingest results directories (default: all io_benchmark_results_*)")
+    ingest.add_argument('results_dirs', nargs='*')
+
+    sub.add_parser('list', help="List ingested runs")
+
+    query = sub.add_parser('query', help="Print matching rows as CSV")
+    query.add_argument('--run', action='append')
+    query.add_argument('--env', choices=ENVIRONMENTS)
+    query.add_argument('--pattern')
+    query.add_argument('--block-size', help="e.g. 4k, 1M")
+    query.add_argument('--rw')
+    query.add_argument('--ioengine', help="e.g. psync, libaio, io_uring_sqpoll")
+    query.add_argument('--backend', help="e.g. tmpfs, loop-writeback-async")
+    query.add_argument('--columns', default='latency_us,throughput_mbps')
+
+    agg = sub.add_parser('aggregate', help="Fleet-wide statistics over many runs, in parallel")
+    agg.add_argument('results_dirs', nargs='*', help="Ingest and aggregate these (default: every ingested run)")
+    agg.add_argument('--run', action='append')
+    agg.add_argument('--since', help="First run date (YYYYMMDD)")
+    agg.add_argument('--until', help="Last run date (YYYYMMDD)")
+    agg.add_argument('--env', choices=ENVIRONMENTS)
+    agg.add_argument('--pattern')
+    agg.add_argument('--block-size', help="e.g. 4k, 1M")
+    agg.add_argument('--rw')
+    agg.add_argument('--ioengine')
+    agg.add_argument('--backend')
+    agg.add_argument('--by', default=','.join(AGGREGATE_BY), help=f"Group columns (of {', '.join(KEY_COLUMNS)})")
+    agg.add_argument('--columns', default='latency_us,throughput_mbps,cpu_us_per_io,mbps_per_core')
+    agg.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    agg.add_argument('--output', help="Also write the aggregate as CSV")
+
+    args = parser.parse_args(argv)
+    store = ResultsStore(args.store)
+
+    if args.command == 'ingest':
+        if args.results_dirs:
+            added = [e for e in (store.ingest_run(d) for d in args.results_dirs) if e]
+        else:
+            added = store.ingest_all()
+        for entry in added:
+            print(f"Ingested {entry['run']}: {entry['rows']} rows in {len(entry['groups'])} groups")
+        print(f"Store {store.root}: {len(store.runs())} runs")
+        return 0
+
+    if args.command == 'list':
+        for entry in store.manifest():
+            print(f"{entry['run']}\t{entry['rows']} rows\t{len(entry['groups'])} groups\t{entry['ingested_at']}")
+        return 0
+
+    columns = [c for c in args.columns.split(',') if c]
+    block_size = parse_size(args.block_size) if args.block_size else None
+
+    if args.command == 'aggregate':
+        import aggregation
+
+        by = [k for k in args.by.split(',') if k]
+        unknown = [k for k in by if k not in KEY_COLUMNS]
+        if unknown:
+            print(f"Error: Cannot group by {', '.join(unknown)}", file=sys.stderr)
+            return 1
+        result = aggregation.aggregate(store, runs=args.run, results_dirs=args.results_dirs, by=by,
+                                       columns=columns, workers=args.workers, since=args.since,
+                                       until=args.until, env=args.env, pattern=args.pattern,
+                                       block_size=block_size, rw=args.rw, ioengine=args.ioengine,
+                                       backend=args.backend)
+        aggregation.print_report(result)
+        if args.output:
+            aggregation.write_csv(result, args.output)
+            print(f"Wrote {args.output}")
+        return 0
+    data = store.query(columns, runs=args.run, env=args.env, pattern=args.pattern,
+                       block_size=block_size, rw=args.rw, ioengine=args.ioengine, backend=args.backend)
+    header = list(KEY_COLUMNS) + ['iteration'] + columns
+    writer = csv.writer(sys.stdout, lineterminator='\n')
+    writer.writerow(header)
+    for i in range(len(data['run'])):
+        writer.writerow([data[name][i] for name in header])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
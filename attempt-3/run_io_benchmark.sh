@@ -18,8 +18,203 @@ source "$SCRIPT_DIR/firecracker_setup.sh"
 source "$SCRIPT_DIR/container_setup.sh"
 source "$SCRIPT_DIR/container_test_runner.sh"
 source "$SCRIPT_DIR/firecracker_test_runner.sh"
+source "$SCRIPT_DIR/engine_support.sh"
+source "$SCRIPT_DIR/trace_replay.sh"
+source "$SCRIPT_DIR/storage_backends.sh"
+source "$SCRIPT_DIR/campaign.sh"
+source "$SCRIPT_DIR/schedule.sh"
+source "$SCRIPT_DIR/density.sh"
 source "$SCRIPT_DIR/analysis.sh"
 
+# Run one pattern in one environment, with telemetry (capped at ~90s per iteration:
+# the fio timeout plus SSH/cleanup). Patterns on an ioengine the environment lacks are
+# skipped there (engine_support.csv); a replayed trace that could not be staged is left
+# for a later pass. The pattern is journaled complete once its runner finishes;
+# returns the runner's status (ROUND_PENDING: an interleaved round ended, iterations remain)
+run_pattern_in() {
+    local env="$1"
+    local pattern_name="$2"
+    local command="$3"
+    local workdir="/mnt/test_data"
+    [ "$env" = "firecracker" ] && workdir=$(get_vm_test_directory)
+    local output_file="${RESULTS_DIR}/${env}_${pattern_name}.csv"
+    
+    campaign_enter "$env" "$(storage_backend "$env")" "$pattern_name" "$output_file"
+    if ! engine_supported "$env" "$workdir" "$pattern_name"; then
+        campaign_finish skipped "ioengine not supported"
+        return 0
+    fi
+    stage_trace "$env" "$workdir" "$pattern_name" || return 1
+    # Rows of an interrupted run get their telemetry before the sampler starts a new file
+    if [ "$CAMPAIGN_ATTEMPTS" -gt 0 ]; then
+        join_telemetry "${env}_${pattern_name}" "$output_file"
+    fi
+    local monitor_pids=$(monitor_system_metrics "$pattern_name" $(($(iteration_budget) * ($(fio_timeout) + 30))) "${env}_${pattern_name}")
+    local status
+    if [ "$env" = "firecracker" ]; then
+        run_firecracker_io_test "$pattern_name" "$command" "$output_file"
+    else
+        run_container_io_test "$pattern_name" "$command" "$output_file"
+    fi
+    status=$?
+    stop_monitoring "$monitor_pids"
+    join_telemetry "${env}_${pattern_name}" "$output_file"
+    if [ $status -eq 0 ]; then
+        campaign_finish complete
+    elif [ $status -ne $ROUND_PENDING ]; then
+        # Repeated failures may mean the VM/container died; the next pass reprovisions it
+        unset "PROVISIONED_BACKEND[$env]"
+    fi
+    
+    echo "   ${env^} done, wait 5s..."
+    sleep 5
+    return $status
+}
+
+# Run one "env backend pattern" unit into its results directory (its own cell's under STORAGE_MATRIX)
+run_unit() {
+    local env backend pattern_name
+    read -r env backend pattern_name <<< "$1"
+    local base_results_dir="$RESULTS_DIR"
+    if [ -n "$STORAGE_MATRIX" ]; then
+        RESULTS_DIR=$(backend_results_dir "$env" "$backend")
+        mkdir -p "$RESULTS_DIR"
+        cp "$base_results_dir/job_manifest.json" "$RESULTS_DIR/"
+        write_storage_backends "$RESULTS_DIR" "$env"
+    fi
+    run_pattern_in "$env" "$pattern_name" "${IO_PATTERNS[$pattern_name]}"
+    local status=$?
+    RESULTS_DIR="$base_results_dir"
+    return $status
+}
+
+# One iteration of each unit per round, in a fresh random order every round, so slow host
+# drift (thermals, background writeback) lands on both environments alike
+run_interleaved() {
+    local pending=("$@")
+    local ROUND_ITERATIONS=1
+    local round=0
+    local order unit
+    while [ ${#pending[@]} -gt 0 ]; do
+        round=$((round + 1))
+        order=("${pending[@]}")
+        if [ ${#order[@]} -eq 2 ] && [ $((RANDOM % 2)) -eq 1 ]; then
+            order=("${order[1]}" "${order[0]}")
+        fi
+        echo "   Round $round: $(printf '%s ' "${order[@]%% *}")"
+        pending=()
+        for unit in "${order[@]}"; do
+            run_unit "$unit"
+            [ $? -eq $ROUND_PENDING ] && pending+=("$unit")
+        done
+    done
+}
+
+# Every unit at once (each environment on its own CPUs and device), output prefixed by environment
+run_concurrent() {
+    local units=("$@")
+    local pids=()
+    local unit
+    for unit in "${units[@]}"; do
+        (
+            run_unit "$unit" 2>&1 | sed -u "s/^/   [${unit%% *}] /"
+            exit "${PIPESTATUS[0]}"
+        ) &
+        pids+=($!)
+    done
+    local i
+    for i in "${!pids[@]}"; do
+        # The subshell's reprovisioning marker is lost with it
+        wait "${pids[$i]}" || unset "PROVISIONED_BACKEND[${units[$i]%% *}]"
+    done
+}
+
+# Every selected pattern in every env:backend cell (one per environment unless STORAGE_MATRIX).
+# campaign.py orders the unfinished patterns so each environment is provisioned once per
+# backend; patterns that kept failing get up to CELL_RETRIES more passes, with backoff.
+# Unless SCHEDULE=sequential, the two environments' units of a pattern run together
+# (interleaved or concurrently). A storage-matrix cell writes its own results directory
+run_campaign() {
+    local selected_tests=("$@")
+    local cells
+    if [ -n "$STORAGE_MATRIX" ]; then
+        cells=$(storage_matrix_cells | tr '\n' ' ')
+    else
+        cells="firecracker:$(storage_backend firecracker) container:$(storage_backend container)"
+    fi
+    
+    local pass units unit env backend pattern_name
+    [ -n "$SCHEDULE_SEED" ] && RANDOM=$SCHEDULE_SEED
+    for pass in $(seq 0 "$CELL_RETRIES"); do
+        readarray -t units < <(campaign_plan "$cells" "${selected_tests[@]}")
+        if [ ${#units[@]} -eq 0 ]; then
+            return 0
+        fi
+        if [ "$pass" -gt 0 ]; then
+            local delay=$(campaign_backoff "$pass")
+            echo ""
+            echo "=== Retry pass $pass/$CELL_RETRIES: ${#units[@]} unfinished, waiting ${delay}s ==="
+            sleep "$delay"
+        fi
+        
+        local -A unavailable=()
+        local next=0
+        while [ $next -lt ${#units[@]} ]; do
+            # The plan lists a pattern's units of both environments next to each other
+            local group=("${units[$next]}")
+            local next_unit="${units[$((next + 1))]}"
+            if [ "$SCHEDULE" != "sequential" ] && [ -n "$next_unit" ] && \
+               [ "${next_unit##* }" = "${units[$next]##* }" ] && [ "${next_unit%% *}" != "${units[$next]%% *}" ]; then
+                group+=("$next_unit")
+            fi
+            next=$((next + ${#group[@]}))
+            
+            local ready=()
+            for unit in "${group[@]}"; do
+                read -r env backend pattern_name <<< "$unit"
+                [ -n "${unavailable[$env:$backend]}" ] && continue
+                if [ -n "$STORAGE_MATRIX" ] && [ "${PROVISIONED_BACKEND[$env]}" != "$backend" ]; then
+                    echo ""
+                    echo "=== Backend: $env on $backend ==="
+                fi
+                if ! provision_backend "$env" "$backend"; then
+                    echo "   Could not provision $env on $backend, leaving its patterns for a later pass"
+                    unavailable[$env:$backend]=1
+                    continue
+                fi
+                ready+=("$unit")
+            done
+            [ ${#ready[@]} -eq 0 ] && continue
+            
+            local label=""
+            for unit in "${ready[@]}"; do
+                read -r env backend pattern_name <<< "$unit"
+                label+="${label:+ / }$env ($backend)"
+            done
+            echo ""
+            echo "[$next/${#units[@]}] $pattern_name: $label"
+            local conflicts
+            if [ ${#ready[@]} -eq 1 ]; then
+                run_unit "${ready[0]}"
+            elif [ "$SCHEDULE" = "concurrent" ] && conflicts=$(print_isolation_conflicts); then
+                run_concurrent "${ready[@]}"
+            else
+                if [ "$SCHEDULE" = "concurrent" ]; then
+                    echo "   Not isolated on these backends, interleaving:"
+                    echo "$conflicts"
+                fi
+                run_interleaved "${ready[@]}"
+            fi
+        done
+    done
+    
+    readarray -t units < <(campaign_plan "$cells" "${selected_tests[@]}")
+    if [ ${#units[@]} -gt 0 ]; then
+        echo ""
+        echo "Warning: ${#units[@]} patterns still unfinished; RESUME_DIR=$RESULTS_DIR ./run_io_benchmark.sh retries them"
+    fi
+}
+
 # Main function
 main() {
     # Get test list
@@ -27,89 +222,134 @@ main() {
     local total_tests=${#selected_tests[@]}
     
     echo "=== IO PERFORMANCE TESTS ==="
-    echo "Blocks: 512B, 4KB, 64KB, 1MB"
-    echo "Ops: Sequential/Random Read/Write, Mixed"
-    echo "Sizes: 8MB (512B,4K), 10MB (64K), 12MB (1M)"
     echo "Tests: $total_tests patterns"
     echo "Results: $RESULTS_DIR"
+    if [ -n "$RESUME_DIR" ]; then
+        echo "Resuming: finished iterations in $RESUME_DIR/campaign.jsonl are skipped"
+    fi
     echo ""
     
-    echo "Test Matrix:"
-    echo "   512B: 2 tests - rand r/w on 8MB"
-    echo "   4KB: 4 tests - seq/rand ops on 8MB" 
-    echo "   64KB: 4 tests - seq/rand ops on 10MB"
-    echo "   1MB: 4 tests - seq/rand ops on 12MB"
-    echo "   Mixed: 3 tests - randrw ops"
-    echo "   Runtime: ~$(($total_tests * 2 * $ITERATIONS * 12 / 60))m"
+    if [ -n "$TRACE_REPLAY" ]; then
+        echo "Trace Replay (trace_replay.py):"
+        python3 "$TRACE_REPLAY_TOOL" list "${TRACE_REPLAY_ARGS[@]}" | sed 's/^/   /'
+    else
+        echo "Test Matrix (job_matrix.py):"
+        python3 "$JOB_MATRIX" list "${JOB_MATRIX_ARGS[@]}" | sed 's/^/   /'
+    fi
+    if [ "$ADAPTIVE_ITERATIONS" = "true" ]; then
+        echo "   Iterations: adaptive, $MIN_ITERATIONS-$MAX_ITERATIONS per pattern (target ±${CI_TARGET} at ${CI_CONFIDENCE})"
+        echo "   Runtime: ~$(($total_tests * 2 * $MIN_ITERATIONS * 12 / 60))-$(($total_tests * 2 * $MAX_ITERATIONS * 12 / 60))m"
+    else
+        echo "   Runtime: ~$(($total_tests * 2 * $ITERATIONS * 12 / 60))m"
+    fi
     echo ""
     
     check_prerequisites
     
-    # Setup
+    if [ $total_tests -eq 0 ]; then
+        echo "No tests selected"
+        exit 1
+    fi
+    
+    # CPU sets and devices for concurrent runs (before anything is provisioned on them)
+    check_isolation || exit 1
+    
+    # Journal of finished iterations (a resumed run picks up where it stopped); density
+    # runs are short and start over
+    if [ -z "$DENSITY_LEVELS" ]; then
+        campaign_start || exit 1
+    fi
+    
+    # Setup (each environment is provisioned when its first unfinished pattern comes up)
     echo "Setting up environment..."
     setup_network
-    setup_firecracker_vm
-    setup_container
+    
+    # Job manifest: what every pattern name in this run means (read by the analysis scripts)
+    if [ -n "$TRACE_REPLAY" ]; then
+        setup_trace_replay || exit 1
+    else
+        python3 "$JOB_MATRIX" manifest "${JOB_MATRIX_ARGS[@]}" --output "$RESULTS_DIR/job_manifest.json"
+    fi
     
     # Storage backend info
     echo ""
     echo "Storage Backend:"
-    echo "Both use raw block devices + ext4"
-    echo "Firecracker: /dev/vdb → /mnt/test_data"
-    echo "Docker: /dev/test_disk → /mnt/test_data"
-    echo "Same filesystem + mount options"
-    echo "Direct I/O flags removed"
+    if [ -n "$STORAGE_MATRIX" ]; then
+        echo "Matrix: $(storage_matrix_cells | tr '\n' ' ')"
+    else
+        echo "Firecracker: $(storage_backend firecracker) → $(get_vm_test_directory)"
+        echo "Docker: $(storage_backend container) → /mnt/test_data"
+        write_storage_backends "$RESULTS_DIR" firecracker container
+    fi
+    echo "Cache mode: $CACHE_MODE"
+    if [ -n "$DENSITY_LEVELS" ]; then
+        echo "Density: $DENSITY_LEVELS tenants of $DENSITY_ENVS, $ITERATIONS iterations each"
+    else
+        echo "Schedule: $SCHEDULE${SCHEDULE_SEED:+ (seed $SCHEDULE_SEED)}"
+    fi
+    if [ "$STEADY_STATE" = "log" ] || [ "$STEADY_STATE" = "adaptive" ]; then
+        echo "Steady state: $STEADY_STATE (${STEADY_HOLD}s within ${STEADY_RANGE_PCT}% spread and ${STEADY_SLOPE_PCT}% trend, logged every ${STEADY_LOG_MSEC}ms)"
+        if [ "$STEADY_STATE" = "adaptive" ]; then
+            echo "   Jobs end once steady, after ${STEADY_MAX_RUNTIME}s at most"
+        fi
+        if ! steady_state_logging; then
+            echo "   Warning: Raw latency logs leave no bandwidth logs to analyze; set LATENCY_HIST_MSEC to keep both"
+        fi
+    fi
+    if [ "$THROTTLE_JOIN" = "true" ]; then
+        echo "Throttling join: per-I/O logs on CLOCK_MONOTONIC, cgroup cpu.stat every ${TELEMETRY_INTERVAL_MS}ms"
+        if [ "$LATENCY_LOG" != "true" ] || [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]; then
+            echo "   Warning: Needs per-I/O latency logs (LATENCY_LOG=true without LATENCY_HIST_MSEC); nothing will be joined"
+        fi
+    fi
+    if [ -n "$TRACE_REPLAY" ]; then
+        echo "Trace replay: ${TRACE_REPLAY_SPEED}x speed (0 = as fast as possible), ${TRACE_PHASE_S}s phases, at most ${TRACE_MAX_RUNTIME}s per replay"
+        if [ "$LATENCY_LOG" != "true" ] || [ "${LATENCY_HIST_MSEC:-0}" -gt 0 ]; then
+            echo "   Warning: Needs per-I/O latency logs (LATENCY_LOG=true without LATENCY_HIST_MSEC); no phases will be compared"
+        fi
+    fi
+    if [ "$REGRESSION_CHECK" = "true" ]; then
+        echo "Regression check: $REGRESSION_METRICS against the baselines in ${IO_RESULTS_STORE:-io_results_store} (min effect ${REGRESSION_MIN_EFFECT}%)"
+    fi
     echo ""
     
     echo "Starting IO tests..."
-    
-    if [ $total_tests -eq 0 ]; then
-        echo "No tests selected"
-        exit 1
-    fi
-    
     echo "Selected: $total_tests/${#IO_PATTERNS[@]} patterns"
     
-    # Run tests
-    local test_count=0
-    
-    for pattern_name in "${selected_tests[@]}"; do
-        test_count=$((test_count + 1))
-        echo ""
-        echo "[$test_count/$total_tests] Pattern: $pattern_name"
-        echo "=============================="
-        
-        command="${IO_PATTERNS[$pattern_name]}"
-        
-        # Test Firecracker
-        echo "Testing Firecracker..."
-        monitor_pids=$(monitor_system_metrics "$pattern_name" $((ITERATIONS * 3)) "firecracker_${pattern_name}")
-        run_firecracker_io_test "$pattern_name" "$command" "${RESULTS_DIR}/firecracker_${pattern_name}.csv"
-        stop_monitoring "$monitor_pids"
-        
-        echo "   Firecracker done, wait 5s..."
-        sleep 5
-
-        # Test container
-        echo "Testing container..."
-        monitor_pids=$(monitor_system_metrics "$pattern_name" $((ITERATIONS * 3)) "container_${pattern_name}")
-        run_container_io_test "$pattern_name" "$command" "${RESULTS_DIR}/container_${pattern_name}.csv"
-        stop_monitoring "$monitor_pids"
-        
-        echo "   Container done, wait 5s..."
-        sleep 5
-        
-        # Progress
-        local remaining=$((total_tests - test_count))
-        if [ $remaining -gt 0 ]; then
-            echo "   $remaining remaining..."
-        fi
-    done
+    if [ -n "$DENSITY_LEVELS" ]; then
+        run_density "${selected_tests[@]}"
+    else
+        run_campaign "${selected_tests[@]}"
+    fi
+    write_run_info
     
     # Analysis
     echo ""
     echo "Generating analysis..."
-    analyze_results
+    if [ "$SCALING_SWEEP" = "true" ]; then
+        analyze_scaling
+    fi
+    if [ -n "$DENSITY_LEVELS" ]; then
+        analyze_density
+    elif [ -n "$STORAGE_MATRIX" ]; then
+        analyze_backends
+    else
+        analyze_results
+    fi
+    if steady_state_logging; then
+        analyze_steady_state
+    fi
+    if [ "$THROTTLE_JOIN" = "true" ]; then
+        analyze_preemption
+    fi
+    if [ -n "$TRACE_REPLAY" ]; then
+        analyze_trace_replay
+    fi
+    local regression_status=0
+    if [ "$REGRESSION_CHECK" = "true" ]; then
+        check_regressions
+        regression_status=$?
+    fi
     
     echo ""
     echo "TESTS COMPLETE!"
@@ -117,10 +357,42 @@ main() {
     echo "Results: $RESULTS_DIR"
     echo ""
     echo "Files:"
-    echo "   ${#IO_PATTERNS[@]} container_*.csv"
-    echo "   ${#IO_PATTERNS[@]} firecracker_*.csv"
-    echo "   *_cpu.log - CPU utilization"
-    echo "   analyze_results.py - Analysis script"
+    if [ -n "$DENSITY_LEVELS" ]; then
+        echo "   density/ - one CSV per environment, tenant count, tenant and pattern"
+        echo "   density_summary.csv - aggregate throughput, Jain's fairness and worst-tenant p99 per tenant count"
+    elif [ -n "$STORAGE_MATRIX" ]; then
+        echo "   backends/<env>-<backend>/ - one results directory per backend cell"
+        echo "   backend_comparison.csv - throughput and MB/s per core of every backend"
+    else
+        echo "   $total_tests container_*.csv"
+        echo "   $total_tests firecracker_*.csv"
+    fi
+    echo "   job_manifest.json - what each pattern name means (axes, fio command)"
+    [ -z "$DENSITY_LEVELS" ] && echo "   campaign.jsonl - journal of finished iterations (resume with RESUME_DIR=$RESULTS_DIR)"
+    echo "   telemetry/ - host/cgroup samples (joined into the CSVs)"
+    if [ -f "$(engine_support_file)" ]; then
+        echo "   engine_support.csv - which ioengines each environment could run"
+    fi
+    if [ "$SCALING_SWEEP" = "true" ]; then
+        echo "   scaling_curves.csv, scaling_knees.csv - throughput-latency curves and saturation knees"
+    fi
+    if steady_state_logging; then
+        echo "   steady_state/ - steady window and bw/iops series of every iteration"
+        echo "   steady_state_summary.csv - steady vs whole-run throughput per pattern"
+    fi
+    if [ "$THROTTLE_JOIN" = "true" ]; then
+        echo "   io_events/ - every I/O's completion time (host CLOCK_MONOTONIC), latency and direction"
+        echo "   preemption_summary.csv - share of each pattern's p99 explained by cgroup throttling"
+    fi
+    if [ -n "$TRACE_REPLAY" ]; then
+        echo "   traces/ - each replayed trace's summary and phases as captured"
+        echo "   trace_phases/ - per-phase latency and throughput of every replay"
+        echo "   trace_replay_summary.csv - divergence of each phase from the original trace"
+    fi
+    echo "   run_info.json - host and guest kernel, Firecracker and fio versions, settings"
+    if [ "$REGRESSION_CHECK" = "true" ]; then
+        echo "   regression_verdict.json - comparison with the baselines and change points"
+    fi
     echo "   firecracker-io-test.log - VM logs"
     echo ""
     echo "Analysis:"
@@ -128,6 +400,16 @@ main() {
     echo "   Op type analysis (Seq/Rand/Mixed)"
     echo "   Performance percentages"
     echo "   Use case recommendations"
+    if [ "$REGRESSION_CHECK" = "true" ]; then
+        echo ""
+        case $regression_status in
+            0) echo "Regression check: PASS" ;;
+            1) echo "Regression check: REGRESSION (see regression_verdict.json)" ;;
+            *) echo "Regression check: no verdict (bless a baseline: python3 regression.py bless $RESULTS_DIR)" ;;
+        esac
+    fi
+    # Exit status gates upgrades: 1 on a regression, 2 without a verdict
+    return $regression_status
 }
 
 # Execute main
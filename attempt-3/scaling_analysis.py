@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Queue-depth / numjobs scaling analysis for the IO Performance Comparison Framework
+Builds throughput-latency curves per environment from a SCALING_SWEEP run and
+finds where each one stops scaling (Little's-law consistency, marginal gain)
+"""
+
+import csv
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from results_store import ENVIRONMENTS, ResultsStore, block_size_label
+
+# Knee: one more outstanding I/O buys less than this fraction of what the first one did
+KNEE_GAIN = 0.1
+# IOPS x latency / outstanding may drift this far from 1 before the queue is considered
+# not held (fio latency_us is the mean completion latency, so it reads slightly low)
+LITTLE_TOLERANCE = 0.25
+# Fewer distinct depths than this is not a curve
+MIN_POINTS = 3
+
+CURVES_CSV = 'scaling_curves.csv'
+KNEES_CSV = 'scaling_knees.csv'
+
+
+@dataclass
+class CurvePoint:
+    """Median of all iterations at one (iodepth, numjobs) setting."""
+    iodepth: int
+    numjobs: int
+    iops: float
+    throughput_mbps: float
+    latency_us: float
+    samples: int
+    littles_ratio: float = float('nan')
+    marginal_gain: float = float('nan')
+
+    @property
+    def outstanding(self) -> int:
+        return self.iodepth * self.numjobs
+
+
+@dataclass
+class Knee:
+    """Where one environment's curve stops scaling."""
+    env: str
+    curve: str
+    outstanding: int
+    iodepth: int
+    iops: float
+    throughput_mbps: float
+    latency_us: float
+    peak_iops: float
+    reason: str
+    points: List[CurvePoint] = field(default_factory=list, repr=False)
+
+
+def curve_name(rw: str, block_size: int, ioengine: str, numjobs: int) -> str:
+    return f"{rw} {block_size_label(block_size)} {ioengine} numjobs={numjobs}"
+
+
+def build_curves(data: Dict[str, np.ndarray]) -> Dict[Tuple[str, str], List[CurvePoint]]:
+    """
+    (env, curve name) -> points sorted by outstanding I/Os, from store.query() rows.
+    Failed iterations (all-zero rows) and rows without a positive IOPS and latency
+    are dropped first, so they cannot pull the medians towards 0.
+    """
+    valid = (np.nan_to_num(data['iops']) > 0) & (np.nan_to_num(data['latency_us']) > 0)
+    groups = {}
+    for i in np.flatnonzero(valid):
+        key = (data['env'][i], data['backend'][i], data['rw'][i], int(data['block_size'][i]),
+               data['ioengine'][i], int(data['numjobs'][i]), int(data['iodepth'][i]))
+        groups.setdefault(key, []).append(i)
+    # A storage-matrix run has one curve per backend
+    several_backends = len(set(data['backend'])) > len(set(data['env']))
+
+    curves = {}
+    for (env, backend, rw, block_size, ioengine, numjobs, iodepth), rows in groups.items():
+        point = CurvePoint(iodepth=iodepth, numjobs=numjobs,
+                           iops=float(np.nanmedian(data['iops'][rows])),
+                           throughput_mbps=float(np.nanmedian(data['throughput_mbps'][rows])),
+                           latency_us=float(np.nanmedian(data['latency_us'][rows])),
+                           samples=len(rows))
+        name = curve_name(rw, block_size, ioengine, numjobs)
+        if several_backends:
+            name += f" on {backend}"
+        curves.setdefault((env, name), []).append(point)
+    return {key: sorted(points, key=lambda p: p.outstanding)
+            for key, points in curves.items() if len(points) >= MIN_POINTS}
+
+
+def find_knee(env: str, curve: str, points: List[CurvePoint]) -> Knee:
+    """Annotate `points` with Little's-law ratio and marginal gain and locate the knee."""
+    for point in points:
+        # Little's law: mean outstanding I/Os = throughput x latency
+        if point.iops > 0 and point.latency_us > 0:
+            point.littles_ratio = point.iops * point.latency_us * 1e-6 / point.outstanding
+
+    first = points[0]
+    base_slope = first.iops / first.outstanding if first.iops > 0 else float('nan')
+    knee, reason = None, "still scaling at the deepest queue"
+    for i in range(1, len(points)):
+        prev, point = points[i - 1], points[i]
+        point.marginal_gain = ((point.iops - prev.iops) / (point.outstanding - prev.outstanding)) / base_slope
+        if knee is not None:
+            continue
+        if abs(point.littles_ratio - 1) > LITTLE_TOLERANCE:
+            # More nominal depth no longer means more I/Os in flight (submission-bound)
+            knee, reason = i - 1, f"queue not held (Little's ratio {point.littles_ratio:.2f})"
+        elif point.marginal_gain < KNEE_GAIN:
+            knee, reason = i - 1, f"marginal gain {point.marginal_gain:.2f} per outstanding I/O"
+    if knee is None:
+        knee = len(points) - 1
+
+    at = points[knee]
+    return Knee(env=env, curve=curve, outstanding=at.outstanding, iodepth=at.iodepth, iops=at.iops,
+                throughput_mbps=at.throughput_mbps, latency_us=at.latency_us,
+                peak_iops=max(p.iops for p in points), reason=reason, points=points)
+
+
+def analyze(results_dir) -> Dict[str, Dict[str, Knee]]:
+    """curve name -> env -> Knee for every swept curve of the run."""
+    results_dir = Path(results_dir)
+    store = ResultsStore()
+    store.ingest_run(results_dir)
+    data = store.query(('iops', 'throughput_mbps', 'latency_us'), runs=[store.run_id_for(results_dir)])
+    knees = {}
+    for (env, curve), points in sorted(build_curves(data).items()):
+        knees.setdefault(curve, {})[env] = find_knee(env, curve, points)
+    return knees
+
+
+def write_csvs(knees: Dict[str, Dict[str, Knee]], results_dir) -> None:
+    results_dir = Path(results_dir)
+    with open(results_dir / CURVES_CSV, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['curve', 'env', 'outstanding', 'iodepth', 'numjobs', 'iops', 'throughput_mbps',
+                         'latency_us', 'littles_ratio', 'marginal_gain', 'samples'])
+        for curve, by_env in knees.items():
+            for env, knee in by_env.items():
+                for p in knee.points:
+                    writer.writerow([curve, env, p.outstanding, p.iodepth, p.numjobs, f"{p.iops:.1f}",
+                                     f"{p.throughput_mbps:.2f}", f"{p.latency_us:.2f}",
+                                     f"{p.littles_ratio:.3f}", f"{p.marginal_gain:.3f}", p.samples])
+    with open(results_dir / KNEES_CSV, 'w', newline='') as f:
+        columns = [name for name in asdict(next(iter(next(iter(knees.values())).values()))) if name != 'points']
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for by_env in knees.values():
+            for knee in by_env.values():
+                writer.writerow(asdict(knee))
+
+
+def print_report(knees: Dict[str, Dict[str, Knee]]) -> None:
+    print(f"\n{'='*60}")
+    print("SCALING SWEEP")
+    print(f"{'='*60}")
+    for curve, by_env in knees.items():
+        print(f"\n{curve}")
+        envs = [env for env in ENVIRONMENTS if env in by_env]
+        header = f"  {'N':>4}"
+        for env in envs:
+            header += f" | {env[:11]:>11} {'IOPS':>9} {'lat μs':>9} {'L/N':>5} {'gain':>5}"
+        print(header)
+        depths = sorted({p.outstanding for env in envs for p in by_env[env].points})
+        for n in depths:
+            line = f"  {n:>4}"
+            for env in envs:
+                point = next((p for p in by_env[env].points if p.outstanding == n), None)
+                if point is None:
+                    line += f" | {'':>11} {'-':>9} {'-':>9} {'-':>5} {'-':>5}"
+                    continue
+                marker = '<- knee' if n == by_env[env].outstanding else ''
+                line += (f" | {marker:>11} {point.iops:>9.0f} {point.latency_us:>9.1f} "
+                         f"{point.littles_ratio:>5.2f} {point.marginal_gain:>5.2f}")
+            print(line)
+        for env in envs:
+            knee = by_env[env]
+            print(f"  {env}: stops scaling at N={knee.outstanding} ({knee.iops:.0f} IOPS, "
+                  f"{knee.latency_us:.1f}μs), peak {knee.peak_iops:.0f} IOPS - {knee.reason}")
+        gap = scaling_gap(by_env)
+        if gap:
+            print(f"  Gap: {gap}")
+
+
+def scaling_gap(by_env: Dict[str, Knee]) -> Optional[str]:
+    """How far apart the two knees are, as one line (None unless both environments ran)."""
+    container, firecracker = by_env.get('container'), by_env.get('firecracker')
+    if container is None or firecracker is None or container.iops <= 0 or container.peak_iops <= 0:
+        return None
+    return (f"Firecracker knee at {firecracker.outstanding} vs container {container.outstanding} outstanding I/Os; "
+            f"{firecracker.iops / container.iops:.2f}x container throughput at the knee, "
+            f"{firecracker.peak_iops / container.peak_iops:.2f}x at peak")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Saturation knees of a SCALING_SWEEP run")
+    parser.add_argument('results_dir')
+    parser.add_argument('--no-csv', action='store_true', help="Only print the report")
+    args = parser.parse_args(argv)
+
+    if not Path(args.results_dir).is_dir():
+        print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+        return 1
+    knees = analyze(args.results_dir)
+    if not knees:
+        print(f"No swept curves (>= {MIN_POINTS} queue depths per pattern) in {args.results_dir}")
+        return 1
+    print_report(knees)
+    if not args.no_csv:
+        write_csvs(knees, args.results_dir)
+        print(f"\nWrote {CURVES_CSV} and {KNEES_CSV} to {args.results_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,111 @@
+#!/bin/bash
+
+# Environment scheduling for the IO Performance Comparison Framework
+# SCHEDULE=interleaved alternates the environments round by round; SCHEDULE=concurrent runs
+# them side by side, each on its own CPUs and device, once check_isolation finds nothing shared
+
+# Source configuration and utils
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/utils.sh"
+
+# Host CPUs left to the orchestrator, the telemetry samplers and host kernel threads
+HOST_RESERVED_CPUS=1
+
+# Expand a cpuset list ("0-2,5") to one CPU per line
+cpu_list() {
+    local spec="$1"
+    local range
+    for range in ${spec//,/ }; do
+        seq "${range%-*}" "${range#*-}"
+    done
+}
+
+# Host CPUs an environment needs on its own: its vCPUs rounded up, plus one for
+# Firecracker's VMM and block-IO threads
+cpuset_size() {
+    local env="$1"
+    local size=$(awk -v v="$VCPU_COUNT" 'BEGIN { n = int(v); if (n < v) n++; print n }')
+    [ "$env" = "firecracker" ] && size=$((size + 1))
+    echo "$size"
+}
+
+# Give FC_CPUSET and CONTAINER_CPUSET (where unset) consecutive blocks of online CPUs
+# after the reserved ones; fails if the host has too few
+assign_cpusets() {
+    local online=($(cpu_list "$(cat /sys/devices/system/cpu/online)"))
+    local next=$HOST_RESERVED_CPUS
+    local env var size
+    for env in firecracker container; do
+        var=$([ "$env" = "firecracker" ] && echo FC_CPUSET || echo CONTAINER_CPUSET)
+        [ -n "${!var}" ] && continue
+        size=$(cpuset_size "$env")
+        if [ $((next + size)) -gt ${#online[@]} ]; then
+            echo "   ${#online[@]} CPUs online: too few for $HOST_RESERVED_CPUS host, $(cpuset_size firecracker) Firecracker and $(cpuset_size container) container CPUs"
+            return 1
+        fi
+        printf -v "$var" '%s' "$(IFS=,; echo "${online[*]:next:size}")"
+        next=$((next + size))
+    done
+}
+
+# Print everything the two environments would share if run side by side; fails if anything is
+print_isolation_conflicts() {
+    local conflicts=()
+    if [ -z "$FC_CPUSET" ] || [ -z "$CONTAINER_CPUSET" ]; then
+        conflicts+=("FC_CPUSET and CONTAINER_CPUSET are not both set")
+    else
+        local shared=$(comm -12 <(cpu_list "$FC_CPUSET" | sort) <(cpu_list "$CONTAINER_CPUSET" | sort) | sort -n | tr '\n' ' ')
+        [ -n "$shared" ] && conflicts+=("CPUs ${shared% } are in both FC_CPUSET and CONTAINER_CPUSET")
+        local offline=$(comm -23 <({ cpu_list "$FC_CPUSET"; cpu_list "$CONTAINER_CPUSET"; } | sort -u) \
+            <(cpu_list "$(cat /sys/devices/system/cpu/online)" | sort) | sort -n | tr '\n' ' ')
+        [ -n "$offline" ] && conflicts+=("CPUs ${offline% } are not online")
+    fi
+
+    local fc_device=$(python3 "$TELEMETRY_SAMPLER" device "$(test_storage_path firecracker)" 2>/dev/null)
+    local container_path=$(test_storage_path container)
+    local container_device=""
+    [ -n "$container_path" ] && container_device=$(python3 "$TELEMETRY_SAMPLER" device "$container_path" 2>/dev/null)
+    if [ -n "$fc_device" ] && [ "$fc_device" = "$container_device" ]; then
+        conflicts+=("both environments' test data is on $fc_device (point FC_DISK_DIR or CONTAINER_DISK_DIR at another disk)")
+    fi
+    # The container runs on the host kernel, so the host page cache is the one both would drop
+    if [ "$CACHE_MODE" = "cold" ]; then
+        conflicts+=("CACHE_MODE=cold drops the host page cache under both environments")
+    fi
+
+    local conflict
+    for conflict in "${conflicts[@]}"; do
+        echo "   $conflict"
+    done
+    [ ${#conflicts[@]} -eq 0 ]
+}
+
+# Before anything is provisioned: check SCHEDULE and, for concurrent runs, assign the CPU sets
+# the setup functions pin to. A host that cannot isolate the environments runs them interleaved
+check_isolation() {
+    case "$SCHEDULE" in
+        sequential|interleaved)
+            return 0
+            ;;
+        concurrent)
+            ;;
+        *)
+            echo "Error: Unknown SCHEDULE '$SCHEDULE' (sequential, interleaved, concurrent)"
+            return 1
+            ;;
+    esac
+
+    echo "Checking isolation for concurrent runs..."
+    local fc_cpuset="$FC_CPUSET"
+    local container_cpuset="$CONTAINER_CPUSET"
+    if assign_cpusets && print_isolation_conflicts; then
+        local container_path=$(test_storage_path container)
+        echo "   Firecracker: CPUs $FC_CPUSET, test data in $(test_storage_path firecracker)"
+        echo "   Container: CPUs $CONTAINER_CPUSET, test data in ${container_path:-memory}"
+        return 0
+    fi
+    echo "Warning: The environments cannot run side by side, interleaving them instead"
+    SCHEDULE=interleaved
+    FC_CPUSET="$fc_cpuset"
+    CONTAINER_CPUSET="$container_cpuset"
+}
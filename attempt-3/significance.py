@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Batched significance testing for the IO Performance Comparison Framework
+Bootstrap confidence intervals (mean, median, Firecracker/container ratio)
+and Welch t-tests for every pattern at once, with multiple-comparison
+correction, so tables only declare a winner when the data supports one
+"""
+
+import warnings
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from adaptive_iterations import student_t_cdf
+
+DEFAULT_RESAMPLES = 10000
+# Upper bound on elements materialised per resampling block (~64 MB of float64)
+BLOCK_ELEMENTS = 8_000_000
+# Iterations per environment a verdict needs. Welch's test reaches any corrected
+# alpha from 3 samples (2+ degrees of freedom); at 2 its df can drop to 1. A
+# permutation test cannot: its smallest p is 2 / C(n_c + n_f, n_c), 0.1 at 3 vs 3.
+MIN_SAMPLES = 3
+
+
+def pad_samples(groups: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack ragged sample lists into a NaN-padded (patterns x max_n) array and counts."""
+    counts = np.array([len(g) for g in groups], dtype=np.int64)
+    width = int(counts.max()) if counts.size else 0
+    values = np.full((len(groups), max(width, 1)), np.nan)
+    for i, group in enumerate(groups):
+        values[i, :len(group)] = np.asarray(group, dtype=np.float64)
+    return values, counts
+
+
+def _blocks(total: int, per_resample: int):
+    size = max(1, BLOCK_ELEMENTS // max(per_resample, 1))
+    for start in range(0, total, size):
+        yield min(size, total - start)
+
+
+def _masked_median(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median along the last axis counting only the first counts[p] entries of row p."""
+    width = values.shape[-1]
+    valid = np.arange(width) < counts.reshape(-1, *([1] * (values.ndim - 1)))
+    ordered = np.sort(np.where(valid, values, np.inf), axis=-1)
+    lo = ((counts - 1) // 2).reshape(-1, *([1] * (values.ndim - 1)))
+    hi = (counts // 2).reshape(-1, *([1] * (values.ndim - 1)))
+    lo = np.broadcast_to(lo, values.shape[:-1] + (1,))
+    hi = np.broadcast_to(hi, values.shape[:-1] + (1,))
+    return ((np.take_along_axis(ordered, lo, -1) + np.take_along_axis(ordered, hi, -1)) / 2)[..., 0]
+
+
+def bootstrap_distributions(values: np.ndarray, counts: np.ndarray, resamples: int,
+                            rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Bootstrap distributions of the mean and median: two (patterns x resamples) arrays."""
+    patterns, width = values.shape
+    means = np.empty((patterns, resamples))
+    medians = np.empty((patterns, resamples))
+    safe_counts = np.maximum(counts, 1)
+    valid = np.arange(width) < counts[:, None]
+    done = 0
+    for block in _blocks(resamples, patterns * width):
+        # Index draws are scaled per pattern, so ragged groups share one array
+        idx = (rng.random((patterns, block, width)) * safe_counts[:, None, None]).astype(np.int64)
+        drawn = np.take_along_axis(values[:, None, :], idx, axis=-1)
+        drawn = np.where(valid[:, None, :], drawn, 0.0)
+        means[:, done:done + block] = drawn.sum(axis=-1) / safe_counts[:, None]
+        medians[:, done:done + block] = _masked_median(drawn, counts)
+        done += block
+    means[counts == 0] = np.nan
+    medians[counts == 0] = np.nan
+    return means, medians
+
+
+def permutation_pvalues(a_values: np.ndarray, a_counts: np.ndarray, b_values: np.ndarray,
+                        b_counts: np.ndarray, resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """Two-sided permutation test of equal means for every pattern at once."""
+    patterns = a_values.shape[0]
+    pooled_counts = a_counts + b_counts
+    width = int(pooled_counts.max()) if patterns else 0
+    pooled = np.zeros((patterns, max(width, 1)))
+    for p in range(patterns):
+        pooled[p, :a_counts[p]] = a_values[p, :a_counts[p]]
+        pooled[p, a_counts[p]:pooled_counts[p]] = b_values[p, :b_counts[p]]
+
+    positions = np.arange(pooled.shape[1])
+    in_pool = positions < pooled_counts[:, None]
+    in_a = positions < a_counts[:, None]
+    in_b = in_pool & ~in_a
+    safe_a, safe_b = np.maximum(a_counts, 1), np.maximum(b_counts, 1)
+    observed = np.abs((pooled * in_a).sum(-1) / safe_a - (pooled * in_b).sum(-1) / safe_b)
+
+    exceed = np.zeros(patterns)
+    for block in _blocks(resamples, patterns * pooled.shape[1]):
+        # Random sort keys permute each pool; padding sorts last and stays out of both groups
+        keys = np.where(in_pool[:, None, :], rng.random((patterns, block, pooled.shape[1])), 2.0)
+        shuffled = np.take_along_axis(pooled[:, None, :], np.argsort(keys, axis=-1), axis=-1)
+        diff = np.abs((shuffled * in_a[:, None, :]).sum(-1) / safe_a[:, None]
+                      - (shuffled * in_b[:, None, :]).sum(-1) / safe_b[:, None])
+        # Small tolerance so ties with the observed split count as "as extreme"
+        exceed += (diff >= observed[:, None] - 1e-12 * np.abs(observed[:, None])).sum(axis=1)
+    pvalues = (exceed + 1) / (resamples + 1)
+    pvalues[(a_counts < 2) | (b_counts < 2)] = np.nan
+    return pvalues
+
+
+def welch_pvalues(a_values: np.ndarray, a_counts: np.ndarray, b_values: np.ndarray,
+                  b_counts: np.ndarray) -> np.ndarray:
+    """Two-sided Welch t-test of equal means for every pattern (NaN below MIN_SAMPLES)."""
+    stats = []
+    for values, counts in ((a_values, a_counts), (b_values, b_counts)):
+        n = np.maximum(counts, 1).astype(np.float64)
+        valid = np.arange(values.shape[1]) < counts[:, None]
+        mean = np.where(valid, values, 0.0).sum(axis=1) / n
+        var = np.where(valid, (values - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(n - 1, 1)
+        stats.append((mean, var / n, n))
+    (a_mean, a_sem2, a_n), (b_mean, b_sem2, b_n) = stats
+    se2 = a_sem2 + b_sem2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.abs(a_mean - b_mean) / np.sqrt(se2)
+        df = se2 ** 2 / (a_sem2 ** 2 / (a_n - 1) + b_sem2 ** 2 / (b_n - 1))
+    pvalues = np.full(len(t), np.nan)
+    for p in np.flatnonzero((a_counts >= MIN_SAMPLES) & (b_counts >= MIN_SAMPLES)):
+        if se2[p] == 0:
+            # Constant samples: identical means are no evidence, different ones are certain
+            pvalues[p] = 1.0 if a_mean[p] == b_mean[p] else 0.0
+        else:
+            pvalues[p] = 2.0 * (1.0 - student_t_cdf(float(t[p]), float(df[p])))
+    return np.clip(pvalues, 0.0, 1.0)
+
+
+def adjust_pvalues(pvalues: np.ndarray, method: str = 'holm') -> np.ndarray:
+    """Holm (FWER) or Benjamini-Hochberg (FDR) adjustment; NaNs are left out."""
+    pvalues = np.asarray(pvalues, dtype=np.float64)
+    adjusted = np.full_like(pvalues, np.nan)
+    finite = np.flatnonzero(~np.isnan(pvalues))
+    m = finite.size
+    if m == 0 or method == 'none':
+        adjusted[finite] = pvalues[finite]
+        return adjusted
+    order = finite[np.argsort(pvalues[finite])]
+    ranked = pvalues[order]
+    if method == 'holm':
+        stepped = np.maximum.accumulate(ranked * (m - np.arange(m)))
+    elif method in ('bh', 'fdr'):
+        stepped = np.minimum.accumulate((ranked * m / np.arange(1, m + 1))[::-1])[::-1]
+    else:
+        raise ValueError(f"unknown correction method: {method}")
+    adjusted[order] = np.minimum(stepped, 1.0)
+    return adjusted
+
+
+def _interval(dist: np.ndarray, confidence: float) -> Tuple[np.ndarray, np.ndarray]:
+    alpha = (1.0 - confidence) / 2.0
+    if dist.shape[0] == 0:
+        return np.empty(0), np.empty(0)
+    with warnings.catch_warnings():
+        # Patterns without samples have all-NaN distributions and a NaN interval
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lo, hi = np.nanquantile(dist, [alpha, 1.0 - alpha], axis=1)
+    return lo, hi
+
+
+def compare_groups(container: Sequence[Sequence[float]], firecracker: Sequence[Sequence[float]],
+                   resamples: int = DEFAULT_RESAMPLES, confidence: float = 0.95,
+                   alpha: float = 0.05, correction: str = 'holm', seed: int = 0) -> Dict[str, np.ndarray]:
+    """
+    Compare container vs Firecracker samples for many patterns in one batch.
+    Element i of every returned array belongs to pattern i. Patterns with fewer
+    than MIN_SAMPLES iterations in either environment get a NaN p-value and no verdict.
+    """
+    rng = np.random.default_rng(seed)
+    c_values, c_counts = pad_samples(container)
+    f_values, f_counts = pad_samples(firecracker)
+
+    c_means, c_medians = bootstrap_distributions(c_values, c_counts, resamples, rng)
+    f_means, f_medians = bootstrap_distributions(f_values, f_counts, resamples, rng)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = f_means / c_means
+
+    result = {}
+    for prefix, values, counts, means, medians in (
+            ('container', c_values, c_counts, c_means, c_medians),
+            ('firecracker', f_values, f_counts, f_means, f_medians)):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result[f'{prefix}_mean'] = np.nanmean(values, axis=1)
+        result[f'{prefix}_mean_lo'], result[f'{prefix}_mean_hi'] = _interval(means, confidence)
+        result[f'{prefix}_median'] = np.where(counts > 0, _masked_median(np.nan_to_num(values), counts), np.nan)
+        result[f'{prefix}_median_lo'], result[f'{prefix}_median_hi'] = _interval(medians, confidence)
+        result[f'{prefix}_n'] = counts
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result['ratio'] = result['firecracker_mean'] / result['container_mean']
+    result['ratio_lo'], result['ratio_hi'] = _interval(ratios, confidence)
+    result['p_value'] = welch_pvalues(c_values, c_counts, f_values, f_counts)
+    result['p_adjusted'] = adjust_pvalues(result['p_value'], correction)
+    result['significant'] = np.nan_to_num(result['p_adjusted'], nan=1.0) < alpha
+    return result
+
+
+def underpowered(counts: np.ndarray) -> np.ndarray:
+    """Rows of a (patterns x environments) count array too small for a verdict."""
+    return (np.asarray(counts) < MIN_SAMPLES).any(axis=-1)
+
+
+def verdicts(result: Dict[str, np.ndarray], higher_is_better: bool = True) -> List[str]:
+    """Per-pattern winner label: 'Firecracker', 'Container' or 'No significant difference'."""
+    labels = []
+    for significant, ratio in zip(result['significant'], result['ratio']):
+        if not significant or not np.isfinite(ratio):
+            labels.append('No significant difference')
+        elif (ratio > 1) == higher_is_better:
+            labels.append('Firecracker')
+        else:
+            labels.append('Container')
+    return labels
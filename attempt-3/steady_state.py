@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Steady-state detection for the IO Performance Comparison Framework
+Finds where fio's bandwidth/IOPS time series (write_bw_log/write_iops_log) settles
+with a rolling slope and range test, and reports steady throughput apart from the warm-up
+"""
+
+import csv
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from results_store import ResultsStore
+
+# A window is steady when its values stay within RANGE_TOLERANCE of their mean and
+# the least-squares trend across it moves less than SLOPE_TOLERANCE of the mean
+# (the SNIA PTS data- and slope-excursion tests)
+RANGE_TOLERANCE = 0.20
+SLOPE_TOLERANCE = 0.10
+# Seconds the series must stay steady, and the fewest samples a window may have
+DEFAULT_HOLD_S = 5.0
+MIN_WINDOW = 4
+
+# `tail -v -n +1` puts "==> fio_latlog_bw.1.log <==" before every file it streams
+_FILE_HEADER = re.compile(r'^==> .*_(bw|iops)\.\d+\.log <==$')
+
+STEADY_DIR = 'steady_state'
+SUMMARY_CSV = 'steady_state_summary.csv'
+
+
+@dataclass
+class SteadyState:
+    """Steady window of one iteration; throughputs in MB/s, NaN where not measured."""
+    attained: bool
+    start_s: float
+    steady_s: float
+    total_s: float
+    steady_mbps: float = float('nan')
+    steady_iops: float = float('nan')
+    transient_mbps: float = float('nan')
+    mean_mbps: float = float('nan')
+    interval_ms: int = 0
+    # Combined series (all jobs and directions summed) the decision was made on
+    times_s: List[float] = field(default_factory=list, repr=False)
+    mbps: List[float] = field(default_factory=list, repr=False)
+    iops: List[float] = field(default_factory=list, repr=False)
+
+    def summary(self) -> str:
+        if not self.attained:
+            return f"not reached in {self.total_s:.1f}s (mean {self.mean_mbps:.2f} MB/s)"
+        line = f"from {self.start_s:.1f}s, {self.steady_mbps:.2f} MB/s over {self.steady_s:.1f}s"
+        if self.start_s > 0:
+            line += f" (warm-up {self.transient_mbps:.2f} MB/s)"
+        return line
+
+
+def parse_logs(stream: TextIO) -> Dict[str, List[np.ndarray]]:
+    """
+    'bw'/'iops' -> one (time_ms, value) array per fio job log. A stream without
+    file headers is taken to be a single bandwidth log.
+    """
+    logs = {'bw': [], 'iops': []}
+    kind, rows = 'bw', []
+
+    def flush():
+        if rows:
+            logs[kind].append(np.array(rows, dtype=np.float64))
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        header = _FILE_HEADER.match(line)
+        if header:
+            flush()
+            kind, rows = header.group(1), []
+            continue
+        parts = line.split(',')
+        try:
+            rows.append((float(parts[0]), float(parts[1])))
+        except (IndexError, ValueError):
+            continue
+    flush()
+    return logs
+
+
+def combine(series: List[np.ndarray], interval_ms: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum the jobs' logs (and the read/write entries of mixed jobs) per log interval.
+    Returns interval end times in seconds and the summed values.
+    """
+    if not series:
+        return np.empty(0), np.empty(0)
+    data = np.concatenate(series)
+    bins = np.maximum(np.rint(data[:, 0] / interval_ms).astype(np.int64), 1)
+    used = np.unique(bins)
+    totals = np.bincount(bins, weights=data[:, 1])[used]
+    return used * interval_ms / 1000.0, totals
+
+
+def steady_windows(values: np.ndarray, window: int, range_tolerance: float = RANGE_TOLERANCE,
+                   slope_tolerance: float = SLOPE_TOLERANCE) -> np.ndarray:
+    """Whether each `window`-sample run starting at index i passes both excursion tests."""
+    runs = np.lib.stride_tricks.sliding_window_view(values, window)
+    means = runs.mean(axis=1)
+    x = np.arange(window) - (window - 1) / 2.0
+    # Least-squares slope per sample, times the window span = the trend's excursion
+    slopes = (runs - means[:, None]) @ x / (x @ x)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        data_excursion = (runs.max(axis=1) - runs.min(axis=1)) / means
+        slope_excursion = np.abs(slopes) * (window - 1) / means
+    return (means > 0) & (data_excursion <= range_tolerance) & (slope_excursion <= slope_tolerance)
+
+
+def detect(logs: Dict[str, List[np.ndarray]], interval_ms: int, hold_s: float = DEFAULT_HOLD_S,
+           range_tolerance: float = RANGE_TOLERANCE,
+           slope_tolerance: float = SLOPE_TOLERANCE) -> Optional[SteadyState]:
+    """
+    Steady state = from the first sample after which every window passes; a series
+    whose last window fails never reached it. None without any logged samples.
+    """
+    times, bw = combine(logs['bw'], interval_ms)
+    iops_times, iops = combine(logs['iops'], interval_ms)
+    # Bandwidth decides; a run that only logged IOPS is judged on those
+    values = bw if len(bw) else iops
+    times = times if len(bw) else iops_times
+    if not len(values):
+        return None
+    # fio logs bandwidth in KiB/s
+    mbps = bw * 1024 / 1e6
+    if len(iops) != len(values):
+        iops = np.full(len(values), np.nan)
+
+    total_s = float(times[-1])
+    window = max(MIN_WINDOW, int(round(hold_s * 1000 / interval_ms)))
+    state = SteadyState(attained=False, start_s=float('nan'), steady_s=0.0, total_s=total_s,
+                        mean_mbps=float(mbps.mean()) if len(mbps) else float('nan'),
+                        interval_ms=interval_ms, times_s=times.round(3).tolist(),
+                        mbps=mbps.round(3).tolist(), iops=iops.round(1).tolist())
+    if len(values) < window:
+        return state
+    passes = steady_windows(values, window, range_tolerance, slope_tolerance)
+    if not passes[-1]:
+        return state
+
+    failed = np.flatnonzero(~passes)
+    start = int(failed[-1]) + 1 if len(failed) else 0
+    state.attained = True
+    # A sample covers the interval before its timestamp
+    state.start_s = float(times[start]) - interval_ms / 1000.0
+    state.steady_s = total_s - state.start_s
+    if len(mbps):
+        state.steady_mbps = float(mbps[start:].mean())
+        if start > 0:
+            state.transient_mbps = float(mbps[:start].mean())
+    if not np.isnan(iops).all():
+        state.steady_iops = float(np.nanmean(iops[start:]))
+    return state
+
+
+def save(state: SteadyState, path) -> None:
+    with open(path, 'w') as f:
+        json.dump(asdict(state), f)
+
+
+def load(path) -> Optional[SteadyState]:
+    """Read a save()d result; None if the file is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return SteadyState(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+# Run summary
+
+@dataclass
+class PatternSteadyState:
+    """Iterations of one pattern on one environment, medians over the steady ones."""
+    env: str
+    pattern: str
+    iterations: int
+    steady_iterations: int
+    warmup_s: float
+    steady_mbps: float
+    transient_mbps: float
+    overall_mbps: float
+    runtime_s: float
+
+    @property
+    def warmup_bias_pct(self) -> float:
+        """How far the whole-run figure sits from the steady one."""
+        if not self.steady_mbps > 0:
+            return float('nan')
+        return (self.overall_mbps / self.steady_mbps - 1) * 100
+
+
+def summarize(data: Dict[str, np.ndarray]) -> List[PatternSteadyState]:
+    """One PatternSteadyState per (env, pattern) of store.query() rows."""
+    # A storage-matrix run reports each backend as its own environment
+    several_backends = len(set(data['backend'])) > len(set(data['env']))
+    groups = {}
+    for i in range(len(data['env'])):
+        env = f"{data['env'][i]}/{data['backend'][i]}" if several_backends else data['env'][i]
+        groups.setdefault((env, data['pattern'][i]), []).append(i)
+
+    def median(name, rows):
+        values = data[name][rows]
+        return float(np.nanmedian(values)) if not np.isnan(values).all() else float('nan')
+
+    results = []
+    for (env, pattern), rows in sorted(groups.items()):
+        steady = [i for i in rows if data['steady_s'][i] > 0]
+        results.append(PatternSteadyState(
+            env=env, pattern=pattern, iterations=len(rows), steady_iterations=len(steady),
+            warmup_s=median('steady_start_s', steady), steady_mbps=median('steady_mbps', steady),
+            transient_mbps=median('transient_mbps', steady),
+            overall_mbps=median('throughput_mbps', rows), runtime_s=median('runtime_s', rows)))
+    return results
+
+
+def analyze(results_dir) -> List[PatternSteadyState]:
+    results_dir = Path(results_dir)
+    store = ResultsStore()
+    store.ingest_run(results_dir)
+    data = store.query(('throughput_mbps', 'runtime_s', 'steady_s', 'steady_mbps', 'transient_mbps',
+                        'steady_start_s'), runs=[store.run_id_for(results_dir)])
+    # Iterations run without STEADY_STATE logging have no steady_s at all
+    logged = ~np.isnan(data['steady_s'])
+    return summarize({name: values[logged] for name, values in data.items()})
+
+
+def write_csv(results: List[PatternSteadyState], path) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['env', 'pattern', 'iterations', 'steady_iterations', 'warmup_s', 'steady_mbps',
+                         'transient_mbps', 'overall_mbps', 'warmup_bias_pct', 'runtime_s'])
+        for r in results:
+            writer.writerow([r.env, r.pattern, r.iterations, r.steady_iterations, f"{r.warmup_s:.2f}",
+                             f"{r.steady_mbps:.2f}", f"{r.transient_mbps:.2f}", f"{r.overall_mbps:.2f}",
+                             f"{r.warmup_bias_pct:.1f}", f"{r.runtime_s:.1f}"])
+
+
+def print_report(results: List[PatternSteadyState]) -> None:
+    print(f"\n{'='*60}")
+    print("STEADY STATE (medians; MB/s)")
+    print(f"{'='*60}")
+    print(f"  {'Pattern':<28} {'Env':<12} {'held':>7} {'warm-up':>8} {'steady':>9} "
+          f"{'warm-up':>9} {'overall':>9} {'bias':>7} {'runtime':>8}")
+    for r in sorted(results, key=lambda r: (r.pattern, r.env)):
+        held = f"{r.steady_iterations}/{r.iterations}"
+        if r.steady_iterations:
+            print(f"  {r.pattern[:28]:<28} {r.env[:12]:<12} {held:>7} {r.warmup_s:>7.1f}s "
+                  f"{r.steady_mbps:>9.2f} {r.transient_mbps:>9.2f} {r.overall_mbps:>9.2f} "
+                  f"{r.warmup_bias_pct:>+6.1f}% {r.runtime_s:>7.1f}s")
+        else:
+            print(f"  {r.pattern[:28]:<28} {r.env[:12]:<12} {held:>7} {'-':>8} {'-':>9} {'-':>9} "
+                  f"{r.overall_mbps:>9.2f} {'-':>7} {r.runtime_s:>7.1f}s")
+    unsteady = [r for r in results if r.steady_iterations < r.iterations]
+    if unsteady:
+        print(f"\n  {len(unsteady)} pattern/environment pairs had iterations that never settled; "
+              f"their overall figure includes the transient")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Steady-state window of fio bandwidth/IOPS logs")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    det = sub.add_parser('detect', help="Find the steady window of one iteration's logs")
+    det.add_argument('log', help="fio bw/iops logs, as streamed by `tail -v -n +1` ('-' for stdin)")
+    det.add_argument('--interval-ms', type=int, required=True, help="fio log_avg_msec the logs were written with")
+    det.add_argument('--hold', type=float, default=DEFAULT_HOLD_S, help="Seconds the series must stay steady")
+    det.add_argument('--range-pct', type=float, default=RANGE_TOLERANCE * 100,
+                     help="Largest max-min spread in a window, %% of its mean")
+    det.add_argument('--slope-pct', type=float, default=SLOPE_TOLERANCE * 100,
+                     help="Largest trend across a window, %% of its mean")
+    det.add_argument('--output', help="JSON file for the result (read by fio_metrics.py csv-row)")
+
+    rep = sub.add_parser('report', help="Steady vs whole-run throughput of every pattern in a run")
+    rep.add_argument('results_dir')
+    rep.add_argument('--no-csv', action='store_true', help="Only print the report")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'detect':
+        if args.log == '-':
+            logs = parse_logs(sys.stdin)
+        else:
+            with open(args.log) as f:
+                logs = parse_logs(f)
+        state = detect(logs, args.interval_ms, args.hold, args.range_pct / 100, args.slope_pct / 100)
+        if state is None:
+            print("no bandwidth/IOPS log samples", file=sys.stderr)
+            return 1
+        if args.output:
+            save(state, args.output)
+        print(state.summary())
+        return 0
+
+    if not Path(args.results_dir).is_dir():
+        print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+        return 1
+    results = analyze(args.results_dir)
+    if not results:
+        print(f"No steady-state data in {args.results_dir} (run with STEADY_STATE=log or adaptive)")
+        return 1
+    print_report(results)
+    if not args.no_csv:
+        output = Path(args.results_dir) / SUMMARY_CSV
+        write_csv(results, output)
+        print(f"\nWrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+#!/bin/bash
+
+# Storage backends for the IO Performance Comparison Framework
+# Names the container storage mode and Firecracker test-drive configuration results were
+# measured on, and reprovisions one environment per STORAGE_MATRIX cell
+
+# Source configuration and modules
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/cleanup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/firecracker_setup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/container_setup.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/engine_support.sh"
+
+# Every backend of STORAGE_MATRIX=all; Firecracker ones are <backing>-<cache_type>-<io_engine>
+CONTAINER_BACKENDS="loop volume tmpfs overlay"
+FIRECRACKER_BACKENDS="file-unsafe-sync file-writeback-sync file-unsafe-async loop-unsafe-sync rootfs-unsafe-sync"
+
+# Backend each environment is currently provisioned with (empty: not set up yet)
+declare -gA PROVISIONED_BACKEND=()
+
+# Read by results_store.py to tag every result row with its backend
+STORAGE_BACKENDS_FILE="storage_backends.json"
+
+# Backend label of an environment as currently configured
+storage_backend() {
+    local env="$1"
+    if [ "$env" = "container" ]; then
+        echo "$CONTAINER_STORAGE_MODE"
+    else
+        echo "${FC_DRIVE_BACKING}-${FC_DRIVE_CACHE,,}-${FC_DRIVE_IO_ENGINE,,}"
+    fi
+}
+
+# Set the configuration variables the setup functions read from a backend label
+apply_storage_backend() {
+    local env="$1"
+    local backend="$2"
+
+    if [ "$env" = "container" ]; then
+        case "$backend" in
+            loop|volume|tmpfs|overlay) CONTAINER_STORAGE_MODE="$backend" ;;
+            *) echo "Error: Unknown container backend '$backend' ($CONTAINER_BACKENDS)"; return 1 ;;
+        esac
+        return 0
+    fi
+
+    local backing cache engine
+    IFS=- read -r backing cache engine <<< "$backend"
+    case "$backing" in rootfs|file|loop) ;; *) backing="" ;; esac
+    case "$cache" in unsafe|writeback) ;; *) cache="" ;; esac
+    case "$engine" in sync|async) ;; *) engine="" ;; esac
+    if [ -z "$backing" ] || [ -z "$cache" ] || [ -z "$engine" ]; then
+        echo "Error: Unknown Firecracker backend '$backend' (<rootfs|file|loop>-<unsafe|writeback>-<sync|async>)"
+        return 1
+    fi
+    FC_DRIVE_BACKING="$backing"
+    FC_DRIVE_CACHE="${cache^}"
+    FC_DRIVE_IO_ENGINE="${engine^}"
+    USE_DEDICATED_TEST_DISK=$([ "$backing" = "rootfs" ] && echo false || echo true)
+}
+
+# STORAGE_MATRIX as one "env:backend" cell per line
+storage_matrix_cells() {
+    local spec="$STORAGE_MATRIX"
+    if [ "$spec" = "all" ]; then
+        spec="$(printf 'container:%s ' $CONTAINER_BACKENDS)$(printf 'firecracker:%s ' $FIRECRACKER_BACKENDS)"
+    fi
+    printf '%s\n' $spec
+}
+
+# Results directory of one cell (a complete results directory of its own)
+backend_results_dir() {
+    local env="$1"
+    local backend="$2"
+    echo "${RESULTS_DIR}/backends/${env}-${backend}"
+}
+
+# Record which backend each environment in `dir` ran on
+write_storage_backends() {
+    local dir="$1"
+    shift
+    local entries=()
+    local env
+    for env in "$@"; do
+        entries+=("\"$env\": \"$(storage_backend "$env")\"")
+    done
+    mkdir -p "$dir"
+    (IFS=,; echo "{${entries[*]}}") > "$dir/$STORAGE_BACKENDS_FILE"
+}
+
+# Bring `env` up on `backend`; an environment already on it is reused as-is
+provision_backend() {
+    local env="$1"
+    local backend="$2"
+
+    if [ "${PROVISIONED_BACKEND[$env]}" = "$backend" ]; then
+        return 0
+    fi
+    apply_storage_backend "$env" "$backend" || return 1
+    echo "Provisioning $env on $backend..."
+
+    # Engine probes and the file pool belong to the old filesystem
+    for key in "${!ENGINE_SUPPORT[@]}"; do
+        [[ "$key" == "$env|"* ]] && unset "ENGINE_SUPPORT[$key]"
+    done
+    unset "PROVISIONED_BACKEND[$env]"
+    if [ "$env" = "firecracker" ]; then
+        stop_firecracker_vm
+        setup_firecracker_vm || return 1
+    else
+        stop_container
+        setup_container || return 1
+    fi
+    PROVISIONED_BACKEND[$env]="$backend"
+}
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Synthetic results generator for the IO Performance Comparison Framework
+Writes io_benchmark_results_* directories shaped like real runs (runner CSVs,
+job manifest, run info, fio JSON, telemetry, per-I/O events and latency
+histograms) at any scale, for benchmarking the analysis pipeline itself
+"""
+
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fio_metrics import CSV_FIELDS, csv_row, parse_fio_json
+from job_matrix import MANIFEST_NAME, QUICK, Job, build_manifest, expand
+from preemption_analysis import EVENTS_DIR, TELEMETRY_DIR, ingest_lat_log
+from results_store import BACKENDS_FILE, DEFAULT_BACKENDS, ENVIRONMENTS, RUN_INFO
+
+RUN_PREFIX = 'io_benchmark_results_'
+DEFAULT_START = '20250101'
+RUN_INTERVAL_HOURS = 6
+
+# Dataset sizes of the analysis benchmarks (benchmarks/); per-I/O rows are per iteration
+SCALES = {
+    'small': {'runs': 10, 'iterations': 5, 'io_rows': 10_000},
+    'medium': {'runs': 1_000, 'iterations': 5, 'io_rows': 100_000},
+    'large': {'runs': 100_000, 'iterations': 5, 'io_rows': 1_000_000},
+}
+
+# Device model: bandwidth ceiling (MB/s) and queue-depth-1 IOPS of each fio rw mode
+DEVICE_MBPS = {'read': 2000.0, 'write': 1200.0, 'randread': 1500.0, 'randwrite': 900.0, 'randrw': 1000.0}
+DEVICE_IOPS = {'read': 40000.0, 'write': 30000.0, 'randread': 12000.0, 'randwrite': 25000.0, 'randrw': 10000.0}
+FSYNC_PENALTY = 8.0
+# Iteration-to-iteration and run-to-run spread (lognormal sigma) and failed iterations (zero rows)
+ITERATION_SIGMA = 0.08
+RUN_SIGMA = 0.03
+FAILED_ITERATION_RATE = 0.002
+# Firecracker/container throughput of a pattern: lognormal around this median
+FIRECRACKER_RATIO = 0.8
+FIRECRACKER_RATIO_SIGMA = 0.25
+# Tail shape: p99 as a multiple of the median completion latency (Firecracker's is longer)
+TAIL_FACTOR = {'container': 3.0, 'firecracker': 4.0}
+# Host CPU per iteration second, in cores, and the VMM's share on top of the guest's
+CPU_CORES = 0.6
+VMM_OVERHEAD = 1.3
+
+RUNTIME_S = 10.0
+ITERATION_GAP_S = 1.0
+# cgroup cpu.max of the per-I/O patterns and how often a period ends throttled
+CPU_MAX = '150000 100000'
+THROTTLE_PROBABILITY = {'container': 0.02, 'firecracker': 0.05}
+THROTTLE_MS = (2.0, 30.0)
+TELEMETRY_COLUMNS = ['time', 'mono', 'cg_usage_usec', 'cg_nr_periods', 'cg_nr_throttled', 'cg_throttled_usec']
+# Guest CLOCK_MONOTONIC minus the host's: the VM booted long after the host
+GUEST_CLOCK_OFFSET_MS = -9_000_000.0
+HOST_UPTIME_S = 86_400.0
+DIRECTIONS = {'read': 0, 'write': 1}
+
+
+def run_name(start: datetime, index: int, interval_hours: float = RUN_INTERVAL_HOURS) -> str:
+    """Directory name of the index-th run, runs `interval_hours` apart."""
+    return RUN_PREFIX + (start + timedelta(hours=index * interval_hours)).strftime('%Y%m%d_%H%M%S')
+
+
+def select_matrix(matrix: str) -> List[Job]:
+    """Jobs of the QUICK_TEST subset ('quick') or of the whole matrix ('full')."""
+    jobs = expand()
+    return [job for job in jobs if job.name in QUICK] if matrix == 'quick' else jobs
+
+
+def read_share(job: Job) -> float:
+    """Share of a job's I/Os that are reads."""
+    return {'read': 1.0, 'randread': 1.0, 'write': 0.0, 'randwrite': 0.0}.get(job.rw, job.rwmixread / 100)
+
+
+def pattern_profiles(jobs: Sequence[Job], seed: int) -> Dict[str, Dict[str, float]]:
+    """
+    Per-pattern container IOPS and Firecracker/container ratio. Drawn once per seed,
+    so every run of a fleet measures the same hardware.
+    """
+    rng = np.random.default_rng([seed, 0])
+    profiles = {}
+    for job in jobs:
+        iops = DEVICE_IOPS[job.rw] * min(job.iodepth * job.numjobs, 32) ** 0.7
+        if job.fsync:
+            iops /= FSYNC_PENALTY
+        iops = min(iops, DEVICE_MBPS[job.rw] * 1e6 / job.block_size)
+        profiles[job.name] = {
+            'iops': float(iops * rng.lognormal(0.0, 0.1)),
+            'ratio': float(np.clip(rng.lognormal(np.log(FIRECRACKER_RATIO), FIRECRACKER_RATIO_SIGMA), 0.3, 1.5)),
+        }
+    return profiles
+
+
+# fio JSON of one iteration
+
+def _latency_block(mean_us: float, p99_us: float, ios: int) -> Dict:
+    # Lognormal completion latency with the given mean and p99, in ns like fio >= 3.0
+    sigma = max(np.log(max(p99_us / mean_us, 1.01)) / 2.0, 0.05)
+    median = mean_us / np.exp(sigma ** 2 / 2)
+    pcts = {p: median * np.exp(sigma * z) for p, z in ((1.0, -2.326), (50.0, 0.0), (90.0, 1.282),
+                                                       (99.0, 2.326), (99.9, 3.09), (99.99, 3.719))}
+    return {
+        'min': int(median * np.exp(-4 * sigma) * 1e3), 'max': int(pcts[99.99] * 3 * 1e3),
+        'mean': mean_us * 1e3, 'stddev': mean_us * np.sqrt(np.exp(sigma ** 2) - 1) * 1e3, 'N': ios,
+        'percentile': {f"{p:.6f}": int(v * 1e3) for p, v in pcts.items()},
+    }
+
+
+def _direction_block(iops: float, block_size: int, runtime_ms: float, mean_us: float, p99_us: float) -> Dict:
+    ios = int(iops * runtime_ms / 1e3)
+    clat = _latency_block(mean_us, p99_us, ios)
+    return {
+        'io_bytes': ios * block_size, 'io_kbytes': ios * block_size // 1024,
+        'bw_bytes': int(iops * block_size), 'bw': int(iops * block_size / 1024),
+        'iops': iops, 'runtime': int(runtime_ms), 'total_ios': ios, 'short_ios': 0, 'drop_ios': 0,
+        'slat_ns': _latency_block(1.0, 3.0, ios), 'clat_ns': clat,
+        'lat_ns': dict(clat, mean=clat['mean'] + 1e3),
+    }
+
+
+def fio_options(job: Job) -> Dict[str, str]:
+    """The 'job options' fio records in its JSON output."""
+    return {key: '' if value is None else str(value) for key, value in job.options()}
+
+
+def fio_document(job: Job, iops: float, env: str, runtime_ms: float, timestamp: int,
+                 options: Optional[Dict[str, str]] = None) -> Dict:
+    """`fio --output-format=json+` output of one iteration running `job` at `iops`."""
+    # Little's law: every outstanding I/O completes once per latency
+    mean_us = job.iodepth * job.numjobs / iops * 1e6
+    p99_us = mean_us * TAIL_FACTOR[env]
+    reads = read_share(job)
+    options = fio_options(job) if options is None else options
+    data = {'jobname': options['name'], 'groupid': 0, 'error': 0, 'job options': options,
+            'usr_cpu': 100 * CPU_CORES * 0.3, 'sys_cpu': 100 * CPU_CORES * 0.7}
+    for direction, share in (('read', reads), ('write', 1 - reads), ('trim', 0.0)):
+        data[direction] = _direction_block(iops * share, job.block_size, runtime_ms if share else 0.0,
+                                           mean_us, p99_us)
+    return {'fio version': 'fio-3.36', 'timestamp': timestamp, 'jobs': [data]}
+
+
+# One run
+
+def _telemetry_columns(row: Dict[str, str], env: str, rng: np.random.Generator) -> None:
+    # What telemetry.py join fills in from the iteration's window
+    cores = CPU_CORES * (VMM_OVERHEAD if env == 'firecracker' else 1.0) * rng.lognormal(0.0, 0.05)
+    runtime = float(row['runtime_s'] or RUNTIME_S)
+    row.update(cpu_usage=f"{100 * cores:.1f}", host_cpu_s=f"{cores * runtime * 1.1:.3f}",
+               throttled_ms=f"{rng.uniform(0, 50) * THROTTLE_PROBABILITY[env] * runtime:.3f}",
+               nr_throttled=str(int(rng.poisson(THROTTLE_PROBABILITY[env] * runtime * 10))),
+               device_util_pct=f"{rng.uniform(40, 95):.1f}", io_pressure_pct=f"{rng.uniform(0, 20):.2f}")
+
+
+def throttle_episodes(start_s: float, end_s: float, probability: float,
+                      rng: np.random.Generator, period_s: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """Throttled intervals of a cgroup: the tail of each period that ran out of quota."""
+    ends = np.arange(start_s + period_s, end_s + period_s / 2, period_s)
+    throttled = rng.random(len(ends)) < probability
+    lengths = rng.uniform(*THROTTLE_MS, size=int(throttled.sum())) / 1e3
+    return ends[throttled] - lengths, ends[throttled]
+
+
+def telemetry_samples(start_s: float, end_s: float, episodes: Tuple[np.ndarray, np.ndarray],
+                      period_s: float = 0.1) -> np.ndarray:
+    """
+    Sampler rows (time, mono, cpu.stat counters) at every period boundary, so each
+    episode is closed by the sample at its end, as the kernel accounts it.
+    """
+    mono = np.arange(start_s, end_s + period_s / 2, period_s)
+    starts, ends = episodes
+    closed = np.searchsorted(ends, mono, side='right')
+    throttled_usec = np.concatenate(([0.0], np.cumsum((ends - starts) * 1e6)))[closed]
+    periods = np.arange(len(mono), dtype=np.float64)
+    usage_usec = periods * period_s * 1e6 * CPU_CORES
+    wall = mono - HOST_UPTIME_S + 1.7e9
+    return np.column_stack([wall, mono, usage_usec, periods, closed.astype(np.float64), throttled_usec])
+
+
+def lat_log(rows: int, start_s: float, runtime_s: float, median_us: float, p99_us: float, job: Job,
+            episodes: Tuple[np.ndarray, np.ndarray], rng: np.random.Generator, offset_ms: float = 0.0) -> bytes:
+    """
+    fio per-I/O latency log (time_ms, latency_ns, direction, bs, offset) of one iteration
+    on the writer's CLOCK_MONOTONIC. I/Os due while the cgroup was throttled complete
+    after the episode and carry the stall in their latency.
+    """
+    end_s = np.sort(rng.uniform(start_s, start_s + runtime_s, rows))
+    sigma = max(np.log(max(p99_us / median_us, 1.01)) / 2.326, 0.05)
+    latency_s = rng.lognormal(np.log(median_us / 1e6), sigma, rows)
+    starts, ends = episodes
+    if len(starts):
+        inside = np.searchsorted(starts, end_s, side='right') - 1
+        stalled = (inside >= 0) & (end_s < ends[np.maximum(inside, 0)])
+        resumed = ends[inside[stalled]] + rng.uniform(0, 5e-4, int(stalled.sum()))
+        latency_s[stalled] += resumed - end_s[stalled]
+        end_s[stalled] = resumed
+    order = np.argsort(end_s, kind='stable')
+
+    direction = np.where(rng.random(rows) < read_share(job), DIRECTIONS['read'], DIRECTIONS['write'])
+    blocks = max(int(2 ** 20 * 100 // job.block_size), 1)
+    log = np.column_stack([
+        np.floor(end_s[order] * 1e3 + offset_ms).astype(np.int64),
+        (latency_s[order] * 1e9).astype(np.int64),
+        direction, np.full(rows, job.block_size),
+        rng.integers(0, blocks, rows) * job.block_size,
+    ])
+    out = io.BytesIO()
+    np.savetxt(out, log, fmt='%d', delimiter=', ')
+    return out.getvalue()
+
+
+def _write_io_events(results_dir: Path, env: str, job: Job, medians: Dict[int, float], rows: int,
+                     iterations: int, rng: np.random.Generator) -> None:
+    """Telemetry, per-I/O events and latency histograms of one pattern (THROTTLE_JOIN runs)."""
+    start_s = HOST_UPTIME_S + rng.uniform(0, 3600)
+    end_s = start_s + iterations * (RUNTIME_S + ITERATION_GAP_S)
+    episodes = throttle_episodes(start_s, end_s, THROTTLE_PROBABILITY[env], rng)
+    telemetry = results_dir / TELEMETRY_DIR / f"{env}_{job.name}.tlm"
+    telemetry.parent.mkdir(exist_ok=True)
+    telemetry_samples(start_s, end_s, episodes).tofile(telemetry)
+    with open(f"{telemetry}.json", 'w') as f:
+        json.dump({'columns': TELEMETRY_COLUMNS, 'devices': [], 'cgroup': f"/sys/fs/cgroup/io_test_{env}",
+                   'cpu_max': CPU_MAX}, f)
+
+    offset_ms = GUEST_CLOCK_OFFSET_MS if env == 'firecracker' else 0.0
+    (results_dir / EVENTS_DIR).mkdir(exist_ok=True)
+    (results_dir / 'latency_hist').mkdir(exist_ok=True)
+    for i, median_us in medians.items():
+        begin = start_s + (i - 1) * (RUNTIME_S + ITERATION_GAP_S)
+        text = lat_log(rows, begin, RUNTIME_S, median_us, median_us * TAIL_FACTOR[env], job, episodes, rng, offset_ms)
+        hist = ingest_lat_log(io.BytesIO(text), results_dir / EVENTS_DIR / f"{env}_{job.name}_{i}.npz", offset_ms)
+        hist.save(results_dir / 'latency_hist' / f"{env}_{job.name}_{i}.npz")
+
+
+def write_run(results_dir: Path, jobs: Sequence[Job], profiles: Dict[str, Dict[str, float]],
+              started: datetime, iterations: int, rng: np.random.Generator, fio_json: bool = True,
+              io_rows: int = 0, io_patterns: int = 1, slowdown: float = 0.0,
+              firecracker_build: str = 'baseline') -> None:
+    """One results directory: what run_io_benchmark.sh leaves behind for `jobs`."""
+    results_dir.mkdir(parents=True, exist_ok=True)
+    manifest = build_manifest(list(jobs))
+    manifest['generated_at'] = started.isoformat(timespec='seconds')
+    (results_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    with open(results_dir / BACKENDS_FILE, 'w') as f:
+        json.dump(DEFAULT_BACKENDS, f)
+    with open(results_dir / RUN_INFO, 'w') as f:
+        json.dump({'host_kernel': '6.8.0-generic',
+                   'components': {'fio': 'fio-3.36', 'firecracker_sha256': firecracker_build,
+                                  'guest_kernel_sha256': 'vmlinux-6.1.141'},
+                   'settings': {'cache_mode': 'direct', 'schedule': 'sequential', 'vcpus': '2',
+                                'test_duration': str(int(RUNTIME_S))}}, f, indent=2, sort_keys=True)
+    if fio_json:
+        (results_dir / 'fio_json').mkdir(exist_ok=True)
+
+    clock = started.timestamp()
+    for p, job in enumerate(jobs):
+        # Job properties are derived on every access; the loop below needs them per iteration
+        name, operation, options = job.name, job.operation, fio_options(job)
+        for env in ENVIRONMENTS:
+            iops = profiles[name]['iops'] * rng.lognormal(0.0, RUN_SIGMA)
+            if env == 'firecracker':
+                iops *= profiles[name]['ratio'] * (1.0 - slowdown)
+            rows, medians = [], {}
+            for i in range(1, iterations + 1):
+                # Environment setup between iterations takes a moment
+                start_time = clock + rng.uniform(0.0, ITERATION_GAP_S)
+                clock = start_time + RUNTIME_S + ITERATION_GAP_S
+                timestamp = datetime.fromtimestamp(clock).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+                if rng.random() < FAILED_ITERATION_RATE:
+                    # fio failed: the runners record zeros
+                    rows.append(csv_row(None, operation, timestamp=timestamp))
+                    continue
+                runtime_ms = RUNTIME_S * 1e3 * rng.uniform(0.995, 1.005)
+                document = fio_document(job, iops * rng.lognormal(0.0, ITERATION_SIGMA), env,
+                                        runtime_ms, int(clock), options)
+                text = json.dumps(document)
+                if fio_json:
+                    (results_dir / 'fio_json' / f"{env}_{name}_{i}.json").write_text(text)
+                # The runners' own path: fio JSON -> JobMetrics -> CSV row
+                metrics = parse_fio_json(text)[0]
+                cpu_usec = CPU_CORES * runtime_ms * 1e3 * (VMM_OVERHEAD if env == 'firecracker' else 1.0)
+                row = csv_row(metrics, operation, timestamp=timestamp, start_time=f"{start_time:.9f}",
+                              end_time=f"{start_time + runtime_ms / 1e3:.9f}", cpu_usec=cpu_usec)
+                _telemetry_columns(row, env, rng)
+                rows.append(row)
+                medians[i] = metrics.clat_percentile(50.0)
+            with open(results_dir / f"{env}_{name}.csv", 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, lineterminator='\n')
+                writer.writeheader()
+                writer.writerows(rows)
+            if io_rows and p < io_patterns and medians:
+                _write_io_events(results_dir, env, job, medians, io_rows, iterations, rng)
+
+
+def _write_run_task(task) -> str:
+    base, index, options = task
+    seed = options['seed']
+    step_at = options['step_at']
+    stepped = step_at is not None and index >= step_at
+    results_dir = Path(base) / run_name(options['start'], index, options['interval_hours'])
+    jobs = select_matrix(options['matrix'])
+    write_run(results_dir, jobs, pattern_profiles(jobs, seed), options['start'] + timedelta(
+                  hours=index * options['interval_hours']), options['iterations'],
+              np.random.default_rng([seed, 1, index]), options['fio_json'], options['io_rows'],
+              options['io_patterns'], options['step_pct'] / 100 if stepped else 0.0,
+              'candidate' if stepped else 'baseline')
+    return str(results_dir)
+
+
+def generate(base, runs: int = 10, iterations: int = 5, matrix: str = 'quick', io_rows: int = 0,
+             io_patterns: int = 1, fio_json: bool = True, step_at: Optional[int] = None,
+             step_pct: float = 0.0, seed: int = 0, start: str = DEFAULT_START,
+             interval_hours: float = RUN_INTERVAL_HOURS, workers: Optional[int] = None) -> List[Path]:
+    """
+    Write `runs` results directories under `base`, one every `interval_hours` from
+    `start` (YYYYMMDD). From run `step_at` on, Firecracker throughput drops by
+    `step_pct` percent with a new Firecracker build recorded in run_info.json.
+    Output depends only on the arguments, not on `workers`.
+    """
+    Path(base).mkdir(parents=True, exist_ok=True)
+    options = {'seed': seed, 'step_at': step_at, 'step_pct': step_pct, 'matrix': matrix,
+               'start': datetime.strptime(start, '%Y%m%d'), 'interval_hours': interval_hours,
+               'iterations': iterations, 'fio_json': fio_json, 'io_rows': io_rows, 'io_patterns': io_patterns}
+    tasks = [(str(base), index, options) for index in range(runs)]
+    workers = max(1, min(workers or os.cpu_count() or 1, runs))
+    if workers == 1:
+        return [Path(path) for path in map(_write_run_task, tasks)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [Path(path) for path in pool.map(_write_run_task, tasks, chunksize=max(1, runs // (workers * 8)))]
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic results directories for analysis benchmarks")
+    parser.add_argument('output', help="Directory the io_benchmark_results_* directories are written to")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help="Preset for --runs, --iterations and --io-rows")
+    parser.add_argument('--runs', type=int)
+    parser.add_argument('--iterations', type=int)
+    parser.add_argument('--matrix', choices=('quick', 'full'), default='quick')
+    parser.add_argument('--io-rows', type=int, help="Per-I/O rows per iteration (0: no events or telemetry)")
+    parser.add_argument('--io-patterns', type=int, default=1, help="Patterns of each run with per-I/O events")
+    parser.add_argument('--no-fio-json', dest='fio_json', action='store_false', help="Skip the fio JSON files")
+    parser.add_argument('--step-at', type=int, help="First run with a Firecracker regression")
+    parser.add_argument('--step-pct', type=float, default=10.0, help="Firecracker throughput drop (%%)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', default=DEFAULT_START, help="Date of the first run (YYYYMMDD)")
+    parser.add_argument('--interval-hours', type=float, default=RUN_INTERVAL_HOURS)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]
+    runs = args.runs if args.runs is not None else scale['runs']
+    iterations = args.iterations if args.iterations is not None else scale['iterations']
+    io_rows = args.io_rows if args.io_rows is not None else scale['io_rows']
+    if runs < 1 or iterations < 1:
+        print("Error: --runs and --iterations must be at least 1", file=sys.stderr)
+        return 1
+    dirs = generate(args.output, runs, iterations, args.matrix, io_rows, args.io_patterns, args.fio_json,
+                    args.step_at, args.step_pct, args.seed, args.start, args.interval_hours, args.workers)
+    print(f"Wrote {len(dirs)} runs to {args.output} ({dirs[0].name} .. {dirs[-1].name})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Host/cgroup telemetry sampler for the IO Performance Comparison Framework
+Samples /proc/stat, /proc/diskstats, /proc/pressure/io and cgroup v2
+cpu.stat/io.stat every 50-100 ms into a preallocated ring buffer, flushes it
+to disk, and joins the samples to each iteration's start/end window
+"""
+
+import csv
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_CAPACITY = 4096
+CLK_TCK = os.sysconf('SC_CLK_TCK')
+
+HOST_CPU_FIELDS = ('user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal')
+DISK_FIELDS = ('reads', 'read_sectors', 'writes', 'write_sectors', 'io_ticks_ms')
+CGROUP_CPU_FIELDS = ('usage_usec', 'user_usec', 'system_usec', 'nr_periods', 'nr_throttled', 'throttled_usec')
+CGROUP_IO_FIELDS = ('rbytes', 'wbytes', 'rios', 'wios')
+
+# Per-iteration columns added to the runner CSV by `join`
+ITERATION_FIELDS = [
+    'host_cpu_s', 'cgroup_cpu_s', 'throttled_ms', 'nr_throttled',
+    'device_util_pct', 'io_pressure_pct',
+    'guest_read_bytes', 'host_read_bytes', 'guest_cache_hit_pct', 'host_cache_hit_pct',
+]
+
+
+class ProcFile:
+    """A /proc or cgroupfs file kept open and re-read from offset 0 on every sample."""
+
+    def __init__(self, path: str):
+        self.path = path
+        try:
+            self.fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            self.fd = None
+
+    def read(self) -> Optional[str]:
+        if self.fd is None:
+            return None
+        try:
+            return os.pread(self.fd, 65536, 0).decode()
+        except OSError:
+            return None
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _parse_keyed(text: str, fields: Sequence[str]) -> List[float]:
+    """Parse 'key value' lines (cgroup cpu.stat) into the requested fields."""
+    values = dict(line.split()[:2] for line in text.splitlines() if line.strip())
+    return [float(values.get(name, 'nan')) for name in fields]
+
+
+def _parse_io_stat(text: str) -> List[float]:
+    """Sum cgroup io.stat counters over all devices."""
+    totals = dict.fromkeys(CGROUP_IO_FIELDS, 0.0)
+    for line in text.splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition('=')
+            if key in totals:
+                totals[key] += float(value)
+    return [totals[name] for name in CGROUP_IO_FIELDS]
+
+
+def _parse_host_cpu(text: str) -> List[float]:
+    """Aggregate 'cpu' line of /proc/stat, converted from jiffies to seconds."""
+    fields = text.split('\n', 1)[0].split()[1:1 + len(HOST_CPU_FIELDS)]
+    return [float(v) / CLK_TCK for v in fields]
+
+
+def _parse_diskstats(text: str, devices: Sequence[str]) -> List[float]:
+    rows = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 13 and parts[2] in devices:
+            # reads, sectors read, writes, sectors written, io_ticks (ms busy)
+            rows[parts[2]] = [float(parts[3]), float(parts[5]), float(parts[7]),
+                              float(parts[9]), float(parts[12])]
+    values = []
+    for device in devices:
+        values.extend(rows.get(device, [float('nan')] * len(DISK_FIELDS)))
+    return values
+
+
+def _parse_pressure(text: str) -> List[float]:
+    """Cumulative 'some' and 'full' stall time (us) from a PSI file."""
+    totals = {'some': float('nan'), 'full': float('nan')}
+    for line in text.splitlines():
+        kind, _, rest = line.partition(' ')
+        for item in rest.split():
+            if item.startswith('total='):
+                totals[kind] = float(item[6:])
+    return [totals['some'], totals['full']]
+
+
+def backing_device(path: str) -> Optional[str]:
+    """Whole-disk block device name holding `path` (partitions map to their disk)."""
+    try:
+        dev = os.stat(path).st_dev
+        sys_path = Path(f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}").resolve()
+    except OSError:
+        return None
+    if not sys_path.exists():
+        return None
+    if (sys_path / 'partition').exists():
+        sys_path = sys_path.parent
+    return sys_path.name
+
+
+class TelemetrySampler:
+    """Samples cumulative counters into a fixed-size ring buffer and flushes it to `output`."""
+
+    def __init__(self, output: str, cgroup: Optional[str] = None, devices: Sequence[str] = (),
+                 capacity: int = DEFAULT_CAPACITY):
+        self.output = output
+        self.devices = [d for d in devices if d]
+        self.sources = []
+        # Wall clock for the runners' start/end, CLOCK_MONOTONIC for fio's per-I/O logs
+        self.columns = ['time', 'mono']
+
+        self._add('/proc/stat', _parse_host_cpu, [f"cpu_{f}_s" for f in HOST_CPU_FIELDS])
+        self._add('/proc/diskstats', lambda t: _parse_diskstats(t, self.devices),
+                  [f"{d}_{f}" for d in self.devices for f in DISK_FIELDS])
+        self._add('/proc/pressure/io', _parse_pressure, ['io_some_us', 'io_full_us'])
+        if cgroup:
+            self._add(os.path.join(cgroup, 'cpu.stat'),
+                      lambda t: _parse_keyed(t, CGROUP_CPU_FIELDS), [f"cg_{f}" for f in CGROUP_CPU_FIELDS])
+            self._add(os.path.join(cgroup, 'io.stat'), _parse_io_stat,
+                      [f"cg_{f}" for f in CGROUP_IO_FIELDS])
+
+        # Preallocated ring: sampling never allocates, flushing drains it before it wraps
+        self.buffer = np.full((capacity, len(self.columns)), np.nan)
+        self.written = 0
+        self.flushed = 0
+        self._write_header(cgroup)
+
+    def _add(self, path, parser, columns):
+        if columns:
+            self.sources.append((ProcFile(path), parser, len(columns)))
+            self.columns.extend(columns)
+
+    def _write_header(self, cgroup: Optional[str]) -> None:
+        Path(self.output).parent.mkdir(parents=True, exist_ok=True)
+        # The CPU quota in force, so throttling can be reported per quota level
+        cpu_max = None
+        if cgroup:
+            try:
+                with open(os.path.join(cgroup, 'cpu.max'), 'r') as f:
+                    cpu_max = f.read().strip()
+            except OSError:
+                pass
+        with open(f"{self.output}.json", 'w') as f:
+            json.dump({'columns': self.columns, 'devices': self.devices, 'cgroup': cgroup,
+                       'cpu_max': cpu_max}, f)
+        open(self.output, 'wb').close()
+
+    def sample(self) -> None:
+        row = self.buffer[self.written % len(self.buffer)]
+        row[0] = time.time()
+        row[1] = time.monotonic()
+        col = 2
+        for source, parser, width in self.sources:
+            text = source.read()
+            if text is not None:
+                try:
+                    row[col:col + width] = parser(text)
+                except (ValueError, IndexError):
+                    row[col:col + width] = np.nan
+            else:
+                row[col:col + width] = np.nan
+            col += width
+        self.written += 1
+        if self.written - self.flushed >= len(self.buffer) // 2:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append unflushed rows to the output file (raw float64, row-major)."""
+        if self.written == self.flushed:
+            return
+        size = len(self.buffer)
+        start, end = self.flushed % size, self.written % size
+        with open(self.output, 'ab') as f:
+            if start < end:
+                self.buffer[start:end].tofile(f)
+            else:
+                self.buffer[start:].tofile(f)
+                self.buffer[:end].tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.flushed = self.written
+
+    def run(self, interval_ms: int = DEFAULT_INTERVAL_MS, duration_s: Optional[float] = None) -> None:
+        """Sample on a drift-free schedule until SIGTERM/SIGINT or `duration_s`."""
+        stop = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.append(True))
+        interval = interval_ms / 1000.0
+        deadline = time.monotonic() + duration_s if duration_s else None
+        next_tick = time.monotonic()
+        try:
+            while not stop:
+                self.sample()
+                next_tick += interval
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if next_tick > now:
+                    time.sleep(next_tick - now)
+                else:
+                    # Fell behind (host overloaded): skip missed ticks instead of bursting
+                    next_tick = now
+            self.sample()
+        finally:
+            self.flush()
+            for source, _, _ in self.sources:
+                source.close()
+
+
+def load_samples(path: str) -> Dict[str, np.ndarray]:
+    """Load a flushed sample file as {column: array}."""
+    with open(f"{path}.json", 'r') as f:
+        header = json.load(f)
+    columns = header['columns']
+    data = np.fromfile(path, dtype=np.float64)
+    data = data[:len(data) - len(data) % len(columns)].reshape(-1, len(columns))
+    return {name: data[:, i] for i, name in enumerate(columns)}
+
+
+def _delta(samples: Dict[str, np.ndarray], column: str, start: float, end: float) -> float:
+    """Change of a cumulative counter between two instants (linear interpolation)."""
+    t, values = samples['time'], samples.get(column)
+    if values is None:
+        return float('nan')
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return float('nan')
+    t, values = t[valid], values[valid]
+    if start < t[0] or end > t[-1]:
+        return float('nan')
+    lo, hi = np.interp([start, end], t, values)
+    return float(hi - lo)
+
+
+def summarize_window(samples: Dict[str, np.ndarray], start: float, end: float,
+                     device: Optional[str] = None) -> Dict[str, float]:
+    """CPU-seconds, throttling, device utilisation and IO pressure inside [start, end]."""
+    wall = end - start
+    deltas = {name: _delta(samples, name, start, end) for name in samples if name not in ('time', 'mono')}
+    busy = sum(deltas[f"cpu_{f}_s"] for f in HOST_CPU_FIELDS if f not in ('idle', 'iowait'))
+    total = sum(deltas[f"cpu_{f}_s"] for f in HOST_CPU_FIELDS)
+    summary = {
+        'cpu_usage': 100.0 * busy / total if total > 0 else float('nan'),
+        'host_cpu_s': busy,
+        'cgroup_cpu_s': deltas.get('cg_usage_usec', float('nan')) / 1e6,
+        'throttled_ms': deltas.get('cg_throttled_usec', float('nan')) / 1e3,
+        'nr_throttled': deltas.get('cg_nr_throttled', float('nan')),
+        'device_util_pct': float('nan'),
+        'io_pressure_pct': 100.0 * deltas.get('io_some_us', float('nan')) / (wall * 1e6) if wall > 0 else float('nan'),
+    }
+    if device and wall > 0:
+        summary['device_util_pct'] = 100.0 * deltas.get(f"{device}_io_ticks_ms", float('nan')) / (wall * 1e3)
+    return summary
+
+
+def cache_hit_pct(reached_below: float, requested: float) -> float:
+    """Share of the bytes read at one layer that the page cache served (never reached the layer below)."""
+    if not requested > 0 or reached_below != reached_below:
+        return float('nan')
+    # Readahead can fetch more than was asked for; that is still all misses
+    return 100.0 * min(1.0, max(0.0, 1.0 - reached_below / requested))
+
+
+def _row_float(row: Dict[str, str], name: str) -> float:
+    try:
+        return float(row.get(name) or 'nan')
+    except ValueError:
+        return float('nan')
+
+
+def _format(value: float, digits: int = 3) -> str:
+    return '' if value != value else f"{value:.{digits}f}"
+
+
+def join_iterations(samples_path: str, csv_path: str) -> int:
+    """Fill the telemetry columns of each runner CSV row from its start/end window."""
+    samples = load_samples(samples_path)
+    with open(f"{samples_path}.json", 'r') as f:
+        devices = json.load(f).get('devices') or []
+    device = devices[0] if devices else None
+
+    with open(csv_path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+    for name in ['cpu_usage'] + ITERATION_FIELDS:
+        if name not in fieldnames:
+            fieldnames.append(name)
+
+    joined = 0
+    for row in rows:
+        try:
+            start, end = float(row['start_time']), float(row['end_time'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        summary = summarize_window(samples, start, end, device)
+        if summary['cpu_usage'] == summary['cpu_usage']:
+            joined += 1
+        elif row.get('cpu_usage'):
+            # Joined from an earlier sampler's file (a resumed pattern); these samples miss it
+            continue
+        for name, value in summary.items():
+            # The runners measure cgroup CPU exactly at the iteration boundaries when they can
+            if name == 'cgroup_cpu_s' and row.get(name):
+                continue
+            row[name] = _format(value, 0 if name == 'nr_throttled' else 3)
+
+        # Page-cache hit ratios: fio's reads -> the test filesystem's disk -> the host disk.
+        # Firecracker reports its guest disk reads itself; the container's filesystem sits on
+        # the loop device (first device) whose image lives on the host disk (second device)
+        device_reads = [_delta(samples, f"{d}_read_sectors", start, end) * 512 for d in devices]
+        guest_read = _row_float(row, 'guest_read_bytes')
+        if guest_read != guest_read and len(device_reads) >= 2:
+            guest_read, host_read = device_reads[0], device_reads[1]
+        else:
+            host_read = device_reads[0] if device_reads else float('nan')
+        row['guest_read_bytes'] = _format(guest_read, 0)
+        row['host_read_bytes'] = _format(host_read, 0)
+        row['guest_cache_hit_pct'] = _format(cache_hit_pct(guest_read, _row_float(row, 'read_bytes')), 1)
+        row['host_cache_hit_pct'] = _format(cache_hit_pct(host_read, guest_read), 1)
+
+    # Rewrite atomically so an interrupted join never truncates results
+    tmp_path = f"{csv_path}.tmp"
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+    return joined
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="High-frequency host/cgroup telemetry for benchmark iterations")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    smp = sub.add_parser('sample', help="Sample until SIGTERM (or --duration) and flush to a file")
+    smp.add_argument('--output', required=True, help="Sample file (a .json header is written next to it)")
+    smp.add_argument('--interval-ms', type=int, default=DEFAULT_INTERVAL_MS)
+    smp.add_argument('--duration', type=float, help="Safety cap in seconds")
+    smp.add_argument('--cgroup', help="cgroup v2 directory with cpu.stat/io.stat")
+    smp.add_argument('--device', action='append', default=[],
+                     help="Block device from /proc/diskstats (repeatable; first one is reported as utilisation)")
+    smp.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help="Ring buffer size in samples")
+
+    join = sub.add_parser('join', help="Add per-iteration telemetry columns to a runner CSV")
+    join.add_argument('samples')
+    join.add_argument('csv_file')
+
+    dev = sub.add_parser('device', help="Print the block device holding a path")
+    dev.add_argument('path')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'sample':
+        if args.cgroup and not os.path.isdir(args.cgroup):
+            print(f"Warning: cgroup {args.cgroup} not found, sampling host counters only", file=sys.stderr)
+            args.cgroup = None
+        sampler = TelemetrySampler(args.output, args.cgroup, args.device, args.capacity)
+        sampler.run(args.interval_ms, args.duration)
+        return 0
+
+    if args.command == 'device':
+        device = backing_device(args.path)
+        if device:
+            print(device)
+        return 0 if device else 1
+
+    try:
+        joined = join_iterations(args.samples, args.csv_file)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not join telemetry to {args.csv_file}: {e}", file=sys.stderr)
+        return 1
+    print(f"  Telemetry joined to {joined} iterations of {os.path.basename(args.csv_file)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
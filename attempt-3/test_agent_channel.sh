@@ -0,0 +1,64 @@
+#!/bin/bash
+
+# Test script to verify the persistent execution channel (io_agent.py)
+# Runs the agent as a local subprocess, so it needs neither KVM nor Docker
+set -e
+
+export AGENT_TRANSPORT=local
+export USE_AGENT=true
+
+source ./config.sh
+source ./agent_channel.sh
+
+WORKDIR=$(mktemp -d)
+OUT=$(mktemp -d)
+trap 'stop_agent test; rm -rf "$WORKDIR" "$OUT"' EXIT
+
+echo "=== Testing Agent Channel ==="
+
+echo "1. Starting broker..."
+start_agent "test"
+python3 "$IO_AGENT" ping --socket "$(agent_socket test)"
+
+echo "2. Cleanup + command + cleanup in one round-trip..."
+touch "$WORKDIR/seq_test_file" "$WORKDIR/random_4k_file"
+agent_run "test" "$WORKDIR" "ls; echo done >&2" "$OUT/stdout" "$OUT/stderr" 10
+echo "   stdout: $(tr '\n' ' ' < "$OUT/stdout")"
+echo "   stderr: $(cat "$OUT/stderr")"
+[ -z "$(ls "$WORKDIR")" ] && echo "   Test files removed: OK" || echo "   Test files left behind: FAIL"
+
+echo "3. Failing command..."
+if agent_run "test" "$WORKDIR" "exit 3" "$OUT/stdout" "$OUT/stderr" 10 >/dev/null; then
+    echo "   Failure not reported: FAIL"
+else
+    echo "   Exit status $?: OK"
+fi
+
+echo "4. Latency log and clock offset in the same reply..."
+saved_latency_log=$LATENCY_LOG
+LATENCY_LOG=true
+agent_output=$(agent_run "test" "$WORKDIR" "echo '1, 10, 0, 4096' > ${LATENCY_LOG_PREFIX}_clat.1.log" \
+    "$OUT/stdout" "$OUT/stderr" 10 "$OUT/latency" "")
+LATENCY_LOG=$saved_latency_log
+read -r _ _ clock_offset _ <<< "$agent_output"
+[ "$(cat "$OUT/latency")" = "1, 10, 0, 4096" ] && echo "   Latency log collected: OK" || echo "   Latency log missing: FAIL"
+[ "$clock_offset" != "-" ] && echo "   Clock offset ${clock_offset} ms: OK" || echo "   Clock offset missing: FAIL"
+[ -z "$(ls "$WORKDIR")" ] && echo "   Logs removed in the guest: OK" || echo "   Logs left behind: FAIL"
+
+echo "5. Round-trip latency over 10 jobs..."
+start=$(date +%s.%N)
+for i in $(seq 10); do
+    agent_run "test" "$WORKDIR" "true" "$OUT/stdout" "$OUT/stderr" 10 >/dev/null
+done
+end=$(date +%s.%N)
+awk -v s="$start" -v e="$end" 'BEGIN { printf "   %.1f ms per job\n", (e - s) * 100 }'
+
+echo "6. Channel down..."
+stop_agent "test"
+set +e
+agent_run "test" "$WORKDIR" "true" "$OUT/stdout" "$OUT/stderr" 10 2>/dev/null
+status=$?
+set -e
+[ $status -eq $AGENT_UNAVAILABLE ] && echo "   Unavailable ($status): OK" || echo "   Unexpected status $status: FAIL"
+
+echo "=== Agent channel test completed ==="
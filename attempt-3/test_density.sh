@@ -0,0 +1,45 @@
+#!/bin/bash
+
+# Test script for the density mode scheduler (density.sh, density_analysis.py)
+# Runs 1 and 2 tenants as local host processes, so it needs fio but neither KVM nor Docker
+
+export DENSITY_ENVS=local
+export DENSITY_LEVELS="1 2"
+export DENSITY_LOCAL_DIR=$(mktemp -d)
+export ITERATIONS=2
+
+source ./config.sh
+source ./density.sh
+source ./analysis.sh
+trap - EXIT
+
+RESULTS_DIR=$(mktemp -d)
+trap 'rm -rf "$RESULTS_DIR" "$DENSITY_LOCAL_DIR"' EXIT
+
+echo "=== Testing Density Mode ==="
+
+echo "1. Tenant names..."
+select_tenant 3
+echo "   Tenant 3: $TAP_DEV $TAP_IP -> $GUEST_IP ($FC_MAC), $CONTAINER_NAME, $(basename "$FC_ROOTFS")"
+[ "$GUEST_IP" = "172.17.0.14" ] && [ "$FC_MAC" = "06:00:AC:11:00:0E" ] && echo "   Own /30 and MAC: OK" || echo "   Addressing: FAIL"
+select_tenant 0
+[ "$TAP_DEV" = "tap1" ] && [ "$CONTAINER_NAME" = "io_test_container" ] && echo "   Tenant 0 is the normal environment: OK" || echo "   Tenant 0: FAIL"
+
+if ! command -v fio >/dev/null 2>&1; then
+    echo "fio not found, skipping the local run"
+    exit 1
+fi
+
+echo "2. Local tenants (${DENSITY_LEVELS// /, } at once)..."
+run_density sequential_write_4k
+
+echo "3. Tenant CSVs..."
+for csv in "$RESULTS_DIR"/density/*.csv; do
+    echo "   $(basename "$csv"): $(($(wc -l < "$csv") - 1)) rows"
+done
+[ "$(ls "$RESULTS_DIR"/density/*.csv | wc -l)" -eq 3 ] && echo "   One CSV per tenant and level: OK" || echo "   Tenant CSVs: FAIL"
+
+echo "4. Analysis..."
+analyze_density
+
+echo "=== Density test completed ==="
@@ -3,8 +3,9 @@
 # Test script to verify adequate disk space is available
 # This helps ensure the "Limited disk space" warning never appears
 
-# Source configuration
+# Source configuration and the test-file pool accounting
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/file_pool.sh"
 
 echo "=== Disk Space Test ==="
 echo "Configuration:"
@@ -12,6 +13,17 @@ echo "  USE_DEDICATED_TEST_DISK: $USE_DEDICATED_TEST_DISK"
 echo "  DISK_SIZE_MB: $DISK_SIZE_MB MB"
 echo "  VCPU_COUNT: $VCPU_COUNT"
 echo "  MEMORY_SIZE_MIB: $MEMORY_SIZE_MIB MB"
+echo "  FILE_POOL_MODE: $FILE_POOL_MODE"
+echo ""
+
+# Space the configured patterns need: the whole pool to keep every file
+# preconditioned, the largest file (plus headroom) at the very least
+echo "Test-file pool for ${#IO_PATTERNS[@]} patterns:"
+printf '%s\n' "${IO_PATTERNS[@]}" | python3 "$FILE_POOL" plan | sed 's/^/  /'
+pool_mb=$(pool_total_mb)
+largest_mb=$(printf '%s\n' "${IO_PATTERNS[@]}" | python3 "$FILE_POOL" plan --spec | tr ' ' '\n' \
+    | awk -F: '{ if ($2 > max) max = $2 } END { printf "%d", (max + 1048575) / 1048576 }')
+headroom_mb=$(pool_headroom_mb)
 echo ""
 
 # Test dedicated test disk creation
@@ -81,14 +93,19 @@ echo ""
 echo "=== Configuration Recommendations ==="
 
 if [ "$USE_DEDICATED_TEST_DISK" = "true" ]; then
-    if [ "$DISK_SIZE_MB" -lt 512 ]; then
-        echo "Warning: Consider increasing DISK_SIZE_MB to at least 512MB for tests"
+    if [ "$DISK_SIZE_MB" -lt $((largest_mb + headroom_mb)) ]; then
+        echo "✗ Warning: DISK_SIZE_MB ($DISK_SIZE_MB MB) cannot hold the largest test file (${largest_mb}MB + ${headroom_mb}MB headroom)"
+    elif [ "$FILE_POOL_MODE" = "steady" ] && [ "$DISK_SIZE_MB" -lt $((pool_mb + headroom_mb)) ]; then
+        echo "Warning: DISK_SIZE_MB ($DISK_SIZE_MB MB) is below the pool size (${pool_mb}MB + ${headroom_mb}MB headroom)"
+        echo "  Least recently used files will be evicted and re-preconditioned between patterns"
+        echo "  DISK_SIZE_MB=$(( (pool_mb + headroom_mb + 1023) / 1024 * 1024 )) keeps the whole pool resident"
     else
-        echo "DISK_SIZE_MB ($DISK_SIZE_MB MB) should provide adequate space"
+        echo "DISK_SIZE_MB ($DISK_SIZE_MB MB) holds the ${pool_mb}MB test-file pool"
     fi
 else
     echo "ℹ Using root filesystem resize method"
     echo "  Consider setting USE_DEDICATED_TEST_DISK=true for better isolation"
+    echo "  The resized root filesystem also has to hold the ${pool_mb}MB test-file pool"
 fi
 
 echo ""
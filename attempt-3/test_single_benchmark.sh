@@ -76,10 +76,10 @@ else
 fi
 
 echo ""
-if [ -f "${RESULTS_DIR}/analyze_results.py" ]; then
-    echo "Analysis script created"
+if io_analysis compare "$RESULTS_DIR" --live >/dev/null 2>&1; then
+    echo "Analysis CLI ran"
 else
-    echo "Analysis script missing"
+    echo "Analysis CLI failed"
 fi
 
 echo ""
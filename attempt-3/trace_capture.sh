@@ -0,0 +1,78 @@
+#!/bin/bash
+
+# Capture a block device's I/O and convert it into a replayable trace (trace_replay.py)
+# Usage: ./trace_capture.sh <device> <seconds> <output.iolog>, as root on the production host
+# Replay it with TRACE_REPLAY=<output.iolog> ./run_io_benchmark.sh
+
+cd "$(dirname "${BASH_SOURCE[0]}")"
+source ./config.sh
+
+if [ $# -ne 3 ]; then
+    echo "Usage: $0 <device> <seconds> <output.iolog>"
+    exit 1
+fi
+device="$1"
+seconds="$2"
+output="$3"
+
+if [ ! -b "$device" ]; then
+    echo "Error: $device is not a block device"
+    exit 1
+fi
+
+tool="$TRACE_CAPTURE_TOOL"
+if [ "$tool" = "auto" ]; then
+    if command -v blktrace >/dev/null 2>&1 && command -v blkparse >/dev/null 2>&1; then
+        tool=blktrace
+    elif command -v bpftrace >/dev/null 2>&1; then
+        tool=bpftrace
+    else
+        echo "Error: Neither blktrace/blkparse nor bpftrace found"
+        exit 1
+    fi
+fi
+
+# The block tracepoints name the whole disk and count sectors from its start, so a partition
+# is traced through its disk and its offsets shifted back by the partition's start
+sysfs="/sys/class/block/$(basename "$(readlink -f "$device")")"
+origin=0
+trace_device="$device"
+if [ "$tool" = "bpftrace" ] && [ -f "$sysfs/partition" ]; then
+    origin=$(( $(cat "$sysfs/start") * 512 ))
+    trace_device="/dev/$(basename "$(readlink -f "$sysfs/..")")"
+fi
+
+# Issue and completion of every request; the trace is streamed into the converter, never stored raw
+capture() {
+    case "$tool" in
+        blktrace)
+            blktrace -d "$device" -a issue -a complete -w "$seconds" -o - | blkparse -q -i -
+            ;;
+        bpftrace)
+            # dev_t as the block layer packs it: major << 20 | minor
+            local dev=$(( (0x$(stat -c %t "$trace_device") << 20) | 0x$(stat -c %T "$trace_device") ))
+            timeout --signal=INT "$seconds" bpftrace -e "
+                tracepoint:block:block_rq_issue /args->dev == $dev/ {
+                    printf(\"D %lld %s %lld %d\\n\", nsecs, args->rwbs, args->sector, args->nr_sector);
+                }
+                tracepoint:block:block_rq_complete /args->dev == $dev/ {
+                    printf(\"C %lld %s %lld %d\\n\", nsecs, args->rwbs, args->sector, args->nr_sector);
+                }"
+            ;;
+        *)
+            echo "Error: Unknown TRACE_CAPTURE_TOOL $tool (blktrace, bpftrace or auto)" >&2
+            return 1
+            ;;
+    esac
+}
+
+format=blkparse
+[ "$tool" = "bpftrace" ] && format=bpf
+echo "Capturing $device for ${seconds}s with $tool..."
+capture | python3 "$TRACE_REPLAY_TOOL" convert - --format "$format" --output "$output" \
+    --target-size "$TRACE_TARGET_SIZE" \
+    --remap "$TRACE_REMAP" \
+    --device-size "$(blockdev --getsize64 "$device")" \
+    --origin "$origin" \
+    --time-scale "$TRACE_TIME_SCALE" \
+    --phase-s "$TRACE_PHASE_S"
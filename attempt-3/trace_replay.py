@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+"""
+Production trace replay for the IO Performance Comparison Framework
+Streams a block trace (blkparse output or block tracepoints printed by bpftrace) into a
+fio read_iolog v3 trace, time-scaled and remapped onto the replay file, and compares
+every phase of its replays in both environments with the captured original
+"""
+
+import csv
+import hashlib
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from file_pool import parse_size
+from job_matrix import CACHE_MODES, DEFAULTS, MANIFEST_NAME, MANIFEST_VERSION, bs_token, cache_mode
+from latency_histogram import CHUNK_BYTES, LatencyHistogram, format_percentiles, iter_log_chunks
+from results_store import ENVIRONMENTS
+
+# fio's version 3 trace format: every line starts with its time (ns) since the trace began
+IOLOG_HEADER = 'fio version 3 iolog'
+SECTOR_BYTES = 512
+
+# Replay file in each environment's test directory (a file-pool file), and the hidden
+# directory the traces are staged in, which the per-iteration cleanup globs never match
+REPLAY_FILE = 'trace_replay.file'
+STAGE_DIR = '.traces'
+PATTERN_PREFIX = 'trace_'
+
+# Per results directory: each replayed trace's summary and each iteration's phases
+TRACES_DIR = 'traces'
+PHASES_DIR = 'trace_phases'
+OUTPUT_CSV = 'trace_replay_summary.csv'
+
+DEFAULT_PHASE_S = 10.0
+DEFAULT_TARGET_SIZE = '1G'
+# wrap: offsets modulo the replay file (sequential runs and request sizes stay intact);
+# scale: the device squeezed into the file (regions keep their relative position);
+# none: offsets as captured, on a replay file as large as the trace's extent
+REMAP_MODES = ('wrap', 'scale', 'none')
+
+# Requests issued but not completed yet are kept to pair them with their completion;
+# beyond this many the oldest are taken to have lost their completion event
+MAX_PENDING = 1 << 16
+# Replay queue depth: the trace's own, within these bounds (without completions to
+# measure it, DEFAULT_IODEPTH)
+MAX_IODEPTH = 256
+DEFAULT_IODEPTH = 32
+# Latencies buffered per phase before they are folded into its histogram
+FOLD_BATCH = 1 << 16
+# 2^5 sub-buckets (~3% error) keep an hour of 10s phases' histograms in a few MB
+PHASE_SUB_BUCKET_BITS = 5
+
+# Phase file of one replayed iteration: <env>_<pattern>_<iteration>.json, named after
+# the iteration's latency histogram (metrics_parser.sh fold_latency_log)
+ITERATION_FILE = re.compile(r'^(?P<env>[a-z]+)_(?P<pattern>.+)_(?P<iteration>\d+)$')
+
+Event = Tuple[str, int, str, int, int]
+
+
+# Trace sources: (action, time_ns, rwbs, sector, sectors) of every issue (D) and completion (C)
+
+def parse_blkparse(lines: Iterable[str]) -> Iterator[Event]:
+    """blkparse's default output: "dev cpu seq seconds.ns pid action rwbs sector + sectors [process]"."""
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 7 or parts[5] not in ('D', 'C'):
+            continue
+        seconds, _, fraction = parts[3].partition('.')
+        try:
+            time_ns = int(seconds) * 1_000_000_000 + int(fraction[:9].ljust(9, '0'))
+            if len(parts) >= 10 and parts[8] == '+':
+                yield parts[5], time_ns, parts[6], int(parts[7]), int(parts[9])
+            else:
+                # Flushes carry no sector range
+                yield parts[5], time_ns, parts[6], 0, 0
+        except ValueError:
+            continue
+
+
+def parse_bpf(lines: Iterable[str]) -> Iterator[Event]:
+    """block_rq_issue/block_rq_complete as trace_capture.sh's bpftrace program prints them:
+    "action nsecs rwbs sector nr_sector" (bpftrace's own messages are skipped)."""
+    for line in lines:
+        parts = line.split()
+        if len(parts) != 5 or parts[0] not in ('D', 'C'):
+            continue
+        try:
+            yield parts[0], int(parts[1]), parts[2], int(parts[3]), int(parts[4])
+        except ValueError:
+            continue
+
+
+FORMATS: Dict[str, Callable[[Iterable[str]], Iterator[Event]]] = {'blkparse': parse_blkparse, 'bpf': parse_bpf}
+
+
+def iolog_action(rwbs: str, nbytes: int) -> Optional[str]:
+    """fio iolog action of a request's RWBS flags (None: nothing to replay)."""
+    if 'D' in rwbs:
+        return 'trim' if nbytes else None
+    if 'W' in rwbs and nbytes:
+        return 'write'
+    if 'R' in rwbs and nbytes:
+        return 'read'
+    # A flush without data (a write's preflush, fsync)
+    if 'F' in rwbs:
+        return 'sync'
+    return None
+
+
+class Remap:
+    """Byte offsets on the traced device -> offsets in the replay file (see REMAP_MODES)."""
+
+    def __init__(self, mode: str = 'wrap', target_size: int = parse_size(DEFAULT_TARGET_SIZE),
+                 device_size: int = 0, origin: int = 0):
+        if mode not in REMAP_MODES:
+            raise ValueError(f"unknown remap mode {mode} (known: {', '.join(REMAP_MODES)})")
+        if mode == 'scale' and device_size <= 0:
+            raise ValueError("scale remapping needs the traced device's size")
+        if target_size % SECTOR_BYTES:
+            raise ValueError(f"replay file size must be a multiple of {SECTOR_BYTES} bytes")
+        self.mode = mode
+        self.target_size = target_size
+        self.device_size = device_size
+        self.origin = origin
+
+    def __call__(self, offset: int, length: int) -> int:
+        # origin: where the traced partition starts, if the trace came from the whole disk
+        offset = max(offset - self.origin, 0)
+        if self.mode == 'none':
+            return offset
+        if self.mode == 'scale':
+            offset = offset * self.target_size // self.device_size
+        else:
+            offset %= self.target_size
+        offset = min(offset, max(self.target_size - length, 0))
+        return offset - offset % SECTOR_BYTES
+
+    def describe(self) -> Dict:
+        return {'mode': self.mode, 'target_size': self.target_size,
+                'device_size': self.device_size, 'origin': self.origin}
+
+
+@dataclass
+class Phase:
+    """One phase of a trace, or of one replay of it: what completed and how fast."""
+    phase: int
+    start_s: float
+    duration_s: float
+    ios: int
+    bytes: int
+    reads: int
+    # None (null in the JSON) when no request of the phase has a completion event
+    lat_p50_us: Optional[float]
+    lat_p99_us: Optional[float]
+
+    @property
+    def mbps(self) -> float:
+        return self.bytes / self.duration_s / 1e6 if self.duration_s > 0 else 0.0
+
+
+class PhaseStats:
+    """I/Os, bytes, reads and a latency histogram per phase, filled one request or one chunk at a time."""
+
+    def __init__(self):
+        self.ios = Counter()
+        self.bytes = Counter()
+        self.reads = Counter()
+        self.hists: Dict[int, LatencyHistogram] = {}
+        self._batches: Dict[int, List[int]] = {}
+
+    def add(self, phase: int, ios: int, nbytes: int, reads: int) -> None:
+        self.ios[phase] += ios
+        self.bytes[phase] += nbytes
+        self.reads[phase] += reads
+
+    def add_latency(self, phase: int, latency_ns: int) -> None:
+        batch = self._batches.setdefault(phase, [])
+        batch.append(latency_ns)
+        if len(batch) >= FOLD_BATCH:
+            self._fold(phase)
+
+    def record(self, phase: int, latency_ns: np.ndarray) -> None:
+        self._histogram(phase).record(latency_ns)
+
+    def _histogram(self, phase: int) -> LatencyHistogram:
+        if phase not in self.hists:
+            self.hists[phase] = LatencyHistogram(PHASE_SUB_BUCKET_BITS)
+        return self.hists[phase]
+
+    def _fold(self, phase: int) -> None:
+        self._histogram(phase).record(np.array(self._batches.pop(phase), dtype=np.int64))
+
+    def phases(self, spans: Dict[int, Tuple[float, float]]) -> List[Phase]:
+        """Every phase in `spans` (phase -> start and duration in seconds), in order."""
+        for phase in list(self._batches):
+            self._fold(phase)
+        result = []
+        for phase in sorted(spans):
+            hist = self.hists.get(phase)
+            p50 = p99 = None
+            if hist is not None and hist.total:
+                p50, p99 = (round(value / 1000, 3) for value in hist.percentiles((50.0, 99.0)))
+            start_s, duration_s = spans[phase]
+            result.append(Phase(phase, round(start_s, 6), round(duration_s, 6), self.ios[phase],
+                                self.bytes[phase], self.reads[phase], p50, p99))
+        return result
+
+
+# Conversion
+
+def convert(events: Iterable[Event], output: TextIO, remap: Remap, filename: str = REPLAY_FILE,
+            time_scale: float = 1.0, start_s: float = 0.0, duration_s: Optional[float] = None,
+            phase_s: float = DEFAULT_PHASE_S) -> Dict:
+    """
+    Write the requests issued in a time-ordered event stream to `output` as a fio
+    iolog v3 trace and return its summary: per phase (of the scaled timeline) the
+    requests, bytes and the device latency from issue to completion. Only requests
+    still in flight are held, so memory does not grow with the trace.
+    """
+    if time_scale <= 0 or phase_s <= 0:
+        raise ValueError("time scale and phase length must be positive")
+    digest = hashlib.blake2b(digest_size=8)
+
+    def write(line: str) -> None:
+        output.write(line)
+        digest.update(line.encode())
+
+    window_start = int(start_s * 1e9)
+    window_end = None if duration_s is None else window_start + int(duration_s * 1e9)
+    phase_ns = int(phase_s * 1e9)
+    stats = PhaseStats()
+    actions = Counter()
+    sizes = Counter()
+    # (sector, sectors) -> issue time and phase of the requests in flight
+    pending: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    first = None
+    last_stamp = 0
+    inflight = completions = extent = 0
+
+    write(f"{IOLOG_HEADER}\n0 {filename} add\n0 {filename} open\n")
+    for action, time_ns, rwbs, sector, sectors in events:
+        if first is None:
+            first = time_ns
+        elapsed = time_ns - first
+        if elapsed < window_start:
+            continue
+        if window_end is not None and elapsed >= window_end:
+            break
+        if action == 'C':
+            issued = pending.pop((sector, sectors), None)
+            if issued is not None:
+                completions += 1
+                stats.add_latency(issued[1], time_ns - issued[0])
+            continue
+
+        nbytes = sectors * SECTOR_BYTES
+        kind = iolog_action(rwbs, nbytes)
+        if kind is None:
+            continue
+        stamp = int((elapsed - window_start) * time_scale)
+        last_stamp = max(last_stamp, stamp)
+        actions[kind] += 1
+        if kind == 'sync':
+            write(f"{stamp} {filename} sync 0 0\n")
+            continue
+        offset = remap(sector * SECTOR_BYTES, nbytes)
+        write(f"{stamp} {filename} {kind} {offset} {nbytes}\n")
+        phase = stamp // phase_ns
+        stats.add(phase, 1, nbytes, kind == 'read')
+        sizes[nbytes] += 1
+        extent = max(extent, offset + nbytes)
+        pending[(sector, sectors)] = (time_ns, phase)
+        if len(pending) > MAX_PENDING:
+            pending.pop(next(iter(pending)))
+        inflight = max(inflight, len(pending))
+    write(f"{last_stamp} {filename} close\n")
+
+    duration = last_stamp / 1e9
+    # Every phase lasts phase_s but the last, which ends with the trace
+    count = last_stamp // phase_ns + 1 if stats.ios else 0
+    phases = stats.phases({phase: (phase * phase_s, min(phase_s, duration - phase * phase_s) or phase_s)
+                           for phase in range(count)})
+    target_size = remap.target_size if remap.mode != 'none' else -(-extent // (1 << 20)) << 20
+    return {
+        'filename': filename,
+        'ios': sum(phase.ios for phase in phases),
+        'reads': actions['read'],
+        'writes': actions['write'],
+        'trims': actions['trim'],
+        'syncs': actions['sync'],
+        'bytes': sum(phase.bytes for phase in phases),
+        'duration_s': round(duration, 6),
+        'block_size': sizes.most_common(1)[0][0] if sizes else 0,
+        'max_inflight': inflight if completions else None,
+        'completions': completions,
+        'extent': extent,
+        'target_size': target_size,
+        'remap': remap.describe(),
+        'time_scale': time_scale,
+        'phase_s': phase_s,
+        'digest': digest.hexdigest(),
+        'phases': [asdict(phase) for phase in phases],
+    }
+
+
+def load_trace(iolog) -> Dict:
+    """Summary of a converted trace (the .json next to its .iolog)."""
+    return json.loads(Path(iolog).with_suffix('.json').read_text())
+
+
+# Replay jobs
+
+def pattern_name(iolog) -> str:
+    """Pattern name of a converted trace ('traces/web-db.iolog' -> 'trace_web_db')."""
+    return PATTERN_PREFIX + re.sub(r'[^a-z0-9]+', '_', Path(iolog).stem.lower()).strip('_')
+
+
+def replay_job(iolog, speed: float = 1.0, mode: str = 'direct', max_runtime_s: int = 300) -> Dict:
+    """
+    Manifest entry of one trace's replay, with the job_matrix.py fields the runners
+    and the analysis read. The trace's read share stands in for rw, and its most
+    common request size for the block size.
+    """
+    trace = load_trace(iolog)
+    name = pattern_name(iolog)
+    read_share = trace['reads'] / trace['ios'] if trace['ios'] else 0.0
+    rw = 'randread' if read_share >= 0.9 else 'randwrite' if read_share <= 0.1 else 'randrw'
+    iodepth = min(max(trace['max_inflight'] or DEFAULT_IODEPTH, 1), MAX_IODEPTH)
+    axes = dict(DEFAULTS, **CACHE_MODES[mode])
+
+    options = [('name', name), ('read_iolog', f"{STAGE_DIR}/{name}.iolog"), ('replay_redirect', REPLAY_FILE),
+               ('filename', REPLAY_FILE), ('size', trace['target_size']), ('ioengine', 'libaio'),
+               ('iodepth', iodepth)]
+    if speed > 0:
+        # fio scales the trace's rate: 200 replays it twice as fast
+        options.append(('replay_time_scale', max(1, round(speed * 100))))
+    else:
+        options.append(('replay_no_stall', 1))
+    options += [('runtime', f"{max_runtime_s}s"), ('group_reporting', None), ('direct', axes['direct'])]
+    if axes['invalidate'] != DEFAULTS['invalidate']:
+        options.append(('invalidate', axes['invalidate']))
+    command = 'fio ' + ' '.join(f"--{key}" if value is None else f"--{key}={value}" for key, value in options)
+
+    return {
+        'rw': rw, 'bs': bs_token(trace['block_size']), 'size': str(trace['target_size']),
+        'iodepth': iodepth, 'numjobs': 1, 'ioengine': 'libaio', 'direct': axes['direct'], 'sync': 0,
+        'fsync': 0, 'rwmixread': round(read_share * 100), 'batch_submit': DEFAULTS['batch_submit'],
+        'batch_complete': DEFAULTS['batch_complete'], 'invalidate': axes['invalidate'],
+        'runtime': f"{max_runtime_s}s", 'name': name, 'block_size': trace['block_size'],
+        'operation': 'trace_replay', 'fio_engine': 'libaio', 'asynchronous': True,
+        'cache_mode': cache_mode(axes['direct'], axes['invalidate']),
+        'label': f"Trace {Path(iolog).stem}", 'pattern_type': 'trace', 'variant': '',
+        'filename': REPLAY_FILE, 'command': command, 'quick': False,
+        'trace': {'source': str(iolog), 'digest': trace['digest'], 'speed': speed,
+                  'ios': trace['ios'], 'duration_s': trace['duration_s'], 'phase_s': trace['phase_s'],
+                  'phases': len(trace['phases'])},
+    }
+
+
+def replay_jobs(traces: Iterable[str], speed: float = 1.0, mode: str = 'direct',
+                max_runtime_s: int = 300) -> List[Dict]:
+    jobs = {}
+    for iolog in traces:
+        job = replay_job(iolog, speed, mode, max_runtime_s)
+        if job['name'] in jobs:
+            raise ValueError(f"{iolog} and {jobs[job['name']]['trace']['source']} are both {job['name']}")
+        jobs[job['name']] = job
+    return list(jobs.values())
+
+
+def setup(jobs: List[Dict], results_dir) -> None:
+    """A replay run's job manifest, and each trace's summary with its replay speed."""
+    results_dir = Path(results_dir)
+    (results_dir / TRACES_DIR).mkdir(parents=True, exist_ok=True)
+    manifest = {'version': MANIFEST_VERSION, 'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'defaults': DEFAULTS, 'jobs': jobs}
+    (results_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=1) + '\n')
+    for job in jobs:
+        trace = dict(load_trace(job['trace']['source']), replay=job['trace'])
+        (results_dir / TRACES_DIR / f"{job['name']}.json").write_text(json.dumps(trace, indent=1) + '\n')
+
+
+# Replay folding and comparison
+
+def fold_replay(source, trace: Dict, chunk_bytes: int = CHUNK_BYTES) -> Tuple[List[Phase], LatencyHistogram]:
+    """
+    Split a replay's per-I/O log (time_ms, latency_ns, direction, bs, ...) into the
+    trace's phases. The n-th completion is taken for the trace's n-th request, so the
+    phases line up at any replay speed; a phase lasts from the previous phase's last
+    completion to its own.
+    """
+    stats = PhaseStats()
+    whole = LatencyHistogram()
+    boundaries = np.cumsum([phase['ios'] for phase in trace['phases']])
+    end_ms: Dict[int, int] = {}
+    seen = 0
+    for rows in iter_log_chunks(source, usecols=(0, 1, 2, 3), chunk_bytes=chunk_bytes):
+        whole.record(rows[:, 1])
+        if not len(boundaries):
+            continue
+        index = seen + np.arange(len(rows))
+        seen += len(rows)
+        phase_of = np.minimum(np.searchsorted(boundaries, index, side='right'), len(boundaries) - 1)
+        for phase in np.unique(phase_of):
+            chunk = rows[phase_of == phase]
+            phase = int(phase)
+            stats.add(phase, len(chunk), int(chunk[:, 3].sum()), int((chunk[:, 2] == 0).sum()))
+            stats.record(phase, chunk[:, 1])
+            end_ms[phase] = max(end_ms.get(phase, 0), int(chunk[:, 0].max()))
+    spans = {}
+    previous = 0
+    for phase in sorted(end_ms):
+        spans[phase] = (previous / 1000, (end_ms[phase] - previous) / 1000)
+        previous = end_ms[phase]
+    return stats.phases(spans), whole
+
+
+@dataclass
+class PhaseDivergence:
+    """One phase of a trace replayed in one environment, medians over the iterations."""
+    pattern: str
+    env: str
+    phase: int
+    start_s: float
+    iterations: int
+    trace_mbps: float
+    # The trace's rate at the replay speed (nan when replayed as fast as possible)
+    target_mbps: float
+    replay_mbps: float
+    mbps_divergence_pct: float
+    trace_p50_us: float
+    replay_p50_us: float
+    p50_divergence_pct: float
+    trace_p99_us: float
+    replay_p99_us: float
+    p99_divergence_pct: float
+
+
+def _latency(value: Optional[float]) -> float:
+    """A phase latency percentile, NaN for a phase without completions."""
+    return float('nan') if value is None else value
+
+
+def _median_latency(phases: List[Phase], field: str) -> float:
+    values = [getattr(phase, field) for phase in phases if getattr(phase, field) is not None]
+    return float(np.median(values)) if values else float('nan')
+
+
+def _divergence(value: float, reference: float) -> float:
+    return round((value / reference - 1) * 100, 2) if reference > 0 and np.isfinite(reference) else float('nan')
+
+
+def analyze(results_dir) -> List[PhaseDivergence]:
+    results_dir = Path(results_dir)
+    traces = {path.stem: json.loads(path.read_text()) for path in sorted((results_dir / TRACES_DIR).glob('*.json'))}
+    replays = defaultdict(list)
+    for path in sorted((results_dir / PHASES_DIR).glob('*.json')):
+        match = ITERATION_FILE.match(path.stem)
+        if match is None or match['pattern'] not in traces or match['env'] not in ENVIRONMENTS:
+            continue
+        phases = [Phase(**phase) for phase in json.loads(path.read_text())['phases']]
+        replays[(match['pattern'], match['env'])].append({phase.phase: phase for phase in phases})
+
+    results = []
+    for (pattern, env), iterations in sorted(replays.items(), key=lambda item: (item[0][0], ENVIRONMENTS.index(item[0][1]))):
+        trace = traces[pattern]
+        speed = trace['replay']['speed']
+        for original in (Phase(**phase) for phase in trace['phases']):
+            replayed = [phases[original.phase] for phases in iterations
+                        if original.phase in phases and phases[original.phase].duration_s > 0]
+            if not replayed:
+                continue
+            target = original.mbps * speed if speed > 0 else float('nan')
+            replay_mbps = float(np.median([phase.mbps for phase in replayed]))
+            p50 = _median_latency(replayed, 'lat_p50_us')
+            p99 = _median_latency(replayed, 'lat_p99_us')
+            # A trace without completion events has no latency to compare against
+            trace_p50, trace_p99 = _latency(original.lat_p50_us), _latency(original.lat_p99_us)
+            results.append(PhaseDivergence(
+                pattern, env, original.phase, original.start_s, len(replayed),
+                round(original.mbps, 3), round(target, 3), round(replay_mbps, 3), _divergence(replay_mbps, target),
+                trace_p50, round(p50, 3), _divergence(p50, trace_p50),
+                trace_p99, round(p99, 3), _divergence(p99, trace_p99)))
+    return results
+
+
+def write_csv(results: List[PhaseDivergence], path) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[field.name for field in fields(PhaseDivergence)])
+        writer.writeheader()
+        for result in results:
+            writer.writerow(asdict(result))
+
+
+def _with_divergence(value: float, divergence: float) -> str:
+    return f"{value:>9.1f} {divergence:>+6.0f}%" if np.isfinite(divergence) else f"{value:>9.1f} {'':>7}"
+
+
+def print_report(results: List[PhaseDivergence]) -> None:
+    print(f"\n{'='*60}")
+    print("TRACE REPLAY (per phase, medians over iterations; divergence from the trace)")
+    print(f"{'='*60}")
+    envs = [env for env in ENVIRONMENTS if any(r.env == env for r in results)]
+    for pattern in dict.fromkeys(r.pattern for r in results):
+        rows = defaultdict(dict)
+        for r in results:
+            if r.pattern == pattern:
+                rows[r.phase][r.env] = r
+        print(f"\n{pattern}")
+        print(f"  {'phase':>5} {'start s':>8} {'trace MB/s':>10} "
+              + ' '.join(f"{env + ' MB/s':>17}" for env in envs)
+              + f" {'trace p99 μs':>12} " + ' '.join(f"{env + ' p99 μs':>17}" for env in envs))
+        for phase in sorted(rows):
+            first = next(iter(rows[phase].values()))
+            mbps = ' '.join(_with_divergence(rows[phase][env].replay_mbps, rows[phase][env].mbps_divergence_pct)
+                            if env in rows[phase] else f"{'-':>17}" for env in envs)
+            p99 = ' '.join(_with_divergence(rows[phase][env].replay_p99_us, rows[phase][env].p99_divergence_pct)
+                           if env in rows[phase] else f"{'-':>17}" for env in envs)
+            trace_p99 = f"{first.trace_p99_us:>12.1f}" if np.isfinite(first.trace_p99_us) else f"{'-':>12}"
+            print(f"  {phase:>5} {first.start_s:>8.1f} {first.trace_mbps:>10.1f} {mbps} {trace_p99} {p99}")
+    print("\n  MB/s divergence: from the trace's rate at the replay speed (none when replayed as fast as possible)")
+    print("  p99 divergence: from the traced device's issue-to-completion p99 (none without completion events)")
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert block traces to fio iologs, replay them and compare phases")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    con = sub.add_parser('convert', help="Stream a block trace into a fio iolog v3 trace and its summary")
+    con.add_argument('source', help="blkparse output or bpftrace lines ('-' for stdin)")
+    con.add_argument('--format', choices=list(FORMATS), default='blkparse')
+    con.add_argument('--output', required=True, help="Trace file (.iolog); the summary goes next to it (.json)")
+    con.add_argument('--target-size', default=DEFAULT_TARGET_SIZE, help="Replay file the offsets are remapped into")
+    con.add_argument('--remap', choices=REMAP_MODES, default='wrap')
+    con.add_argument('--device-size', type=int, default=0, help="Traced device's size in bytes (--remap scale)")
+    con.add_argument('--origin', type=int, default=0, help="Byte offset subtracted first (partition start)")
+    con.add_argument('--time-scale', type=float, default=1.0, help="Timestamps multiplied by this (0.5: twice as dense)")
+    con.add_argument('--start-s', type=float, default=0.0, help="Skip the trace's first seconds")
+    con.add_argument('--duration-s', type=float, help="Keep this many seconds of the trace")
+    con.add_argument('--phase-s', type=float, default=DEFAULT_PHASE_S, help="Length of the phases compared after replay")
+
+    # Replay options, shared by the subcommands that build the replay jobs
+    replay_options = argparse.ArgumentParser(add_help=False)
+    replay_options.add_argument('traces', nargs='+', help="Converted traces (.iolog)")
+    replay_options.add_argument('--speed', type=float, default=1.0, help="Replay speed (0: as fast as possible)")
+    replay_options.add_argument('--cache-mode', choices=list(CACHE_MODES), default='direct')
+    replay_options.add_argument('--max-runtime', type=int, default=300, help="Seconds one replay may run")
+
+    sub.add_parser('commands', parents=[replay_options], help="Tab-separated name and fio command per trace (for config.sh)")
+    sub.add_parser('names', parents=[replay_options], help="Tab-separated name, trace file and digest per trace")
+    sub.add_parser('list', parents=[replay_options], help="Print the traces as a table")
+    stp = sub.add_parser('setup', parents=[replay_options],
+                         help="Write the job manifest and trace summaries into a results directory")
+    stp.add_argument('--results-dir', required=True)
+
+    fold = sub.add_parser('fold', help="Split a replay's per-I/O log into the trace's phases")
+    fold.add_argument('log', help="fio write_lat_log log ('-' for stdin)")
+    fold.add_argument('--histogram', required=True,
+                      help="Iteration's latency histogram (.npz), <results>/latency_hist/<env>_<pattern>_<i>.npz")
+    fold.add_argument('--results-dir', required=True)
+
+    rep = sub.add_parser('report', help="Per-phase throughput and latency divergence of every replayed trace")
+    rep.add_argument('results_dir')
+    rep.add_argument('--output', help=f"Summary CSV (default: {OUTPUT_CSV} in the results directory)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        source = sys.stdin if args.source == '-' else open(args.source, errors='replace')
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            remap = Remap(args.remap, parse_size(args.target_size), args.device_size, args.origin)
+            with open(output, 'w') as f:
+                summary = convert(FORMATS[args.format](source), f, remap, time_scale=args.time_scale,
+                                  start_s=args.start_s, duration_s=args.duration_s, phase_s=args.phase_s)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        summary = dict(source=args.source, format=args.format, converted_at=datetime.now().isoformat(timespec='seconds'),
+                       **summary)
+        output.with_suffix('.json').write_text(json.dumps(summary, indent=1) + '\n')
+        print(f"{output}: {summary['ios']} I/Os ({summary['reads']} reads, {summary['writes']} writes, "
+              f"{summary['trims']} trims, {summary['syncs']} syncs) over {summary['duration_s']:.1f}s, "
+              f"{len(summary['phases'])} phases, queue depth {summary['max_inflight'] or 'unknown'}")
+        return 0 if summary['ios'] else 1
+
+    if args.command == 'fold':
+        match = ITERATION_FILE.match(Path(args.histogram).stem)
+        trace_path = Path(args.results_dir) / TRACES_DIR / f"{match['pattern'] if match else ''}.json"
+        if match is None or not trace_path.exists():
+            print(f"Error: No replayed trace for {args.histogram}", file=sys.stderr)
+            return 1
+        phases, hist = fold_replay(args.log, json.loads(trace_path.read_text()))
+        hist.save(args.histogram)
+        phases_dir = Path(args.results_dir) / PHASES_DIR
+        phases_dir.mkdir(exist_ok=True)
+        (phases_dir / f"{Path(args.histogram).stem}.json").write_text(
+            json.dumps({'pattern': match['pattern'], 'env': match['env'], 'iteration': int(match['iteration']),
+                        'ios': hist.total, 'phases': [asdict(phase) for phase in phases]}) + '\n')
+        print(f"{hist.total} samples, {len(phases)} phases, {format_percentiles(hist)}")
+        return 0 if hist.total else 1
+
+    if args.command == 'report':
+        if not Path(args.results_dir).is_dir():
+            print(f"Error: Results directory {args.results_dir} does not exist", file=sys.stderr)
+            return 1
+        results = analyze(args.results_dir)
+        if not results:
+            print(f"No replayed trace phases in {args.results_dir} (run with TRACE_REPLAY and LATENCY_LOG=true)")
+            return 1
+        print_report(results)
+        output = args.output or Path(args.results_dir) / OUTPUT_CSV
+        write_csv(results, output)
+        print(f"\nWrote {output}")
+        return 0
+
+    try:
+        jobs = replay_jobs(args.traces, args.speed, args.cache_mode, args.max_runtime)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: Could not read the trace summaries: {e}", file=sys.stderr)
+        return 1
+
+    if args.command == 'commands':
+        for job in jobs:
+            print(f"{job['name']}\t{job['command']}")
+        return 0
+
+    if args.command == 'names':
+        for job in jobs:
+            print(f"{job['name']}\t{job['trace']['source']}\t{job['trace']['digest']}")
+        return 0
+
+    if args.command == 'setup':
+        setup(jobs, args.results_dir)
+        return 0
+
+    print(f"{'Name':<28} {'I/Os':>10} {'seconds':>8} {'read':>5} {'bs':<5} {'qd':>3} {'file':>6} {'phases':>6}")
+    for job in jobs:
+        trace = job['trace']
+        print(f"{job['name']:<28} {trace['ios']:>10} {trace['duration_s']:>8.1f} {job['rwmixread']:>4}% "
+              f"{job['bs']:<5} {job['iodepth']:>3} {int(job['size']) >> 20:>5}M {trace['phases']:>6}")
+    print(f"{len(jobs)} traces, replayed at {'full speed' if args.speed <= 0 else f'{args.speed:g}x'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
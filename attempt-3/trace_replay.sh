@@ -0,0 +1,51 @@
+#!/bin/bash
+
+# Trace replay for the IO Performance Comparison Framework
+# Converted production traces (TRACE_REPLAY) are copied into each environment's test
+# directory before their pattern runs; fio replays them onto the file-pool replay file
+
+# Source configuration and modules
+source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
+source "$(dirname "${BASH_SOURCE[0]}")/agent_channel.sh"
+
+# Directory (relative to the test directory) the traces are staged in (trace_replay.py STAGE_DIR)
+TRACE_STAGE_DIR=".traces"
+
+# Write the replay jobs into the job manifest and each trace's summary into RESULTS_DIR/traces
+setup_trace_replay() {
+    python3 "$TRACE_REPLAY_TOOL" setup "${TRACE_REPLAY_ARGS[@]}" --results-dir "$RESULTS_DIR"
+}
+
+# Copy a pattern's trace into the environment, compressed on the way; a trace whose digest
+# matches the staged copy's is not sent again. Returns non-zero if it could not be staged
+stage_trace() {
+    local env="$1"
+    local workdir="$2"
+    local pattern="$3"
+
+    [ -n "$TRACE_REPLAY" ] || return 0
+    local name iolog digest
+    IFS=$'\t' read -r name iolog digest < <(python3 "$TRACE_REPLAY_TOOL" names "${TRACE_REPLAY_ARGS[@]}" | awk -F'\t' -v name="$pattern" '$1 == name')
+    if [ -z "$iolog" ]; then
+        echo "   Error: No trace behind $pattern"
+        return 1
+    fi
+    local staged="$TRACE_STAGE_DIR/$pattern.iolog"
+    if [ "$(env_exec "$env" "$workdir" "cat $staged.digest 2>/dev/null" 30)" = "$digest" ]; then
+        return 0
+    fi
+
+    echo "   Staging trace $pattern in $env ($(du -h "$iolog" | cut -f1))..."
+    local receive="mkdir -p $TRACE_STAGE_DIR && gunzip -c > $staged.tmp && mv $staged.tmp $staged && echo $digest > $staged.digest"
+    if [ "$AGENT_TRANSPORT" = "local" ] || [ "$env" = "local" ]; then
+        gzip -c "$iolog" | (mkdir -p "$workdir" && cd "$workdir" && /bin/bash -c "$receive")
+    elif [ "$env" = "firecracker" ]; then
+        gzip -c "$iolog" | timeout 900 ssh -i "./ubuntu-24.04.id_rsa" -o StrictHostKeyChecking=no root@"$GUEST_IP" \
+            "mkdir -p $workdir && cd $workdir && $receive"
+    else
+        gzip -c "$iolog" | timeout 900 docker exec -i "$CONTAINER_NAME" /bin/bash -c "mkdir -p $workdir && cd $workdir && $receive"
+    fi
+    local status=${PIPESTATUS[1]}
+    [ $status -ne 0 ] && echo "   Error: Could not stage $iolog in $env"
+    return $status
+}
@@ -6,39 +6,86 @@
 # Source config
 source "$(dirname "${BASH_SOURCE[0]}")/config.sh"
 
-# Test selection
+# Test selection (job names in matrix order, see job_matrix.py)
 get_test_list() {
-    local all_tests=("${!IO_PATTERNS[@]}")
-    local selected_tests=()
+    local filter=()
     
+    # Trace replay - one job per converted trace (trace_replay.py)
+    if [ -n "$TRACE_REPLAY" ]; then
+        echo "Trace replay: $TRACE_REPLAY (speed ${TRACE_REPLAY_SPEED}x)" >&2
+        python3 "$TRACE_REPLAY_TOOL" names "${TRACE_REPLAY_ARGS[@]}" | cut -f1
+        return
+    fi
+    
+    # Scaling sweep - only the iodepth x numjobs variants (JOB_MATRIX_ARGS)
+    if [ "$SCALING_SWEEP" = "true" ]; then
+        echo "Scaling sweep: $SWEEP_PATTERNS" >&2
     # Test mode - run all
-    if [ "$COMPREHENSIVE_TEST" = "true" ]; then
-        echo "Running ALL 17 patterns" >&2
-        selected_tests=("${all_tests[@]}")
+    elif [ "$COMPREHENSIVE_TEST" = "true" ]; then
+        echo "Running ALL ${#IO_PATTERNS[@]} patterns" >&2
     # Quick mode - subset
     elif [ "$QUICK_TEST" = "true" ]; then
         echo "Quick mode - subset" >&2
-        for test in "${all_tests[@]}"; do
-            # Representative tests from each block size
-            if [[ "$test" =~ (random_write_512b|random_read_512b|sequential_write_4k|random_read_4k|mixed_4k|sequential_write_64k|random_read_64k|mixed_64k|sequential_write_1m|random_read_1m|mixed_1m) ]]; then
-                selected_tests+=("$test")
-            fi
-        done
+        # Representative tests from each block size
+        filter=(--quick)
     # Focused block size
     elif [ -n "$FOCUSED_BLOCK_SIZE" ]; then
         echo "Focused on: $FOCUSED_BLOCK_SIZE" >&2
-        for test in "${all_tests[@]}"; do
-            if [[ "$test" =~ "_${FOCUSED_BLOCK_SIZE}_" ]]; then
-                selected_tests+=("$test")
-            fi
-        done
+        filter=(--block-size "$FOCUSED_BLOCK_SIZE")
     else
         # Default - run all
-        echo "Default - ALL 17 patterns" >&2
-        selected_tests=("${all_tests[@]}")
+        echo "Default - ALL ${#IO_PATTERNS[@]} patterns" >&2
+    fi
+    
+    # Engine variants of the selected patterns
+    if [ -n "$IO_ENGINES" ] && [ "$SCALING_SWEEP" != "true" ]; then
+        echo "I/O engines: $IO_ENGINES" >&2
+    fi
+    
+    python3 "$JOB_MATRIX" names "${filter[@]}" "${JOB_MATRIX_ARGS[@]}"
+}
+
+# Iteration control
+ADAPTIVE_DECIDER="$(dirname "${BASH_SOURCE[0]}")/adaptive_iterations.py"
+
+# Upper bound on iterations per pattern (for progress output and monitoring windows)
+iteration_budget() {
+    if [ "$ADAPTIVE_ITERATIONS" = "true" ]; then
+        echo "$MAX_ITERATIONS"
+    else
+        echo "$ITERATIONS"
+    fi
+}
+
+# Succeeds while another iteration of a pattern should run
+# Fixed mode counts to ITERATIONS; adaptive mode asks adaptive_iterations.py,
+# which logs the final stop reason to stopping_decisions.csv
+iterations_remaining() {
+    local env="$1"
+    local test_name="$2"
+    local output_file="$3"
+    local completed="$4"
+    
+    if [ "$ADAPTIVE_ITERATIONS" != "true" ]; then
+        [ "$completed" -lt "$ITERATIONS" ]
+        return
     fi
     
-    printf '%s\n' "${selected_tests[@]}"
+    # No decision to make below the minimum
+    if [ "$completed" -lt "$MIN_ITERATIONS" ]; then
+        return 0
+    fi
+    
+    python3 "$ADAPTIVE_DECIDER" decide "$output_file" \
+        --completed "$completed" \
+        --min "$MIN_ITERATIONS" \
+        --max "$MAX_ITERATIONS" \
+        --target "$CI_TARGET" \
+        --confidence "$CI_CONFIDENCE" \
+        --method "$CI_METHOD" \
+        --log "${RESULTS_DIR}/stopping_decisions.csv" \
+        --env "$env" \
+        --pattern "$test_name"
 }
 
 # Utils
@@ -70,7 +117,7 @@ check_prerequisites() {
     echo "Checking prerequisites..."
     
     # Check for required commands
-    local required_commands="curl jq docker fio e2fsck taskset bc"
+    local required_commands="curl jq docker fio e2fsck taskset bc python3"
     for cmd in $required_commands; do
         if ! command -v "$cmd" >/dev/null 2>&1; then
             echo "Error: Required command '$cmd' not found"
@@ -123,18 +170,99 @@ check_prerequisites() {
 }
 
 # Performance monitoring
+TELEMETRY_SAMPLER="$(dirname "${BASH_SOURCE[0]}")/telemetry.py"
+
+# cgroup v2 directory of an environment (empty if it has none)
+telemetry_cgroup() {
+    local env="$1"
+    local candidates=()
+    if [ "$env" = "firecracker" ]; then
+        candidates=("/sys/fs/cgroup/$FC_CGROUP_NAME")
+    else
+        local container_id=$(docker inspect -f '{{.Id}}' "$CONTAINER_NAME" 2>/dev/null)
+        if [ -n "$container_id" ]; then
+            # systemd cgroup driver first, then the cgroupfs driver
+            candidates=("/sys/fs/cgroup/system.slice/docker-${container_id}.scope" "/sys/fs/cgroup/docker/${container_id}")
+        fi
+    fi
+    for path in "${candidates[@]}"; do
+        if [ -f "$path/cpu.stat" ]; then
+            echo "$path"
+            return 0
+        fi
+    done
+}
+
+# Cumulative CPU time (µs) charged to a cgroup v2 directory (empty if unavailable)
+cgroup_cpu_usec() {
+    local cgroup="$1"
+    [ -n "$cgroup" ] && [ -f "$cgroup/cpu.stat" ] || return 0
+    awk '$1 == "usage_usec" {print $2}' "$cgroup/cpu.stat" 2>/dev/null
+}
+
+# Host CPU µs used between two cgroup_cpu_usec readings (empty if either is missing)
+cpu_usec_delta() {
+    local before="$1"
+    local after="$2"
+    [ -n "$before" ] && [ -n "$after" ] || return 0
+    echo $((after - before))
+}
+
+# Host directory whose block device holds an environment's test data (empty: in memory)
+test_storage_path() {
+    local env="$1"
+    if [ "$env" = "firecracker" ]; then
+        if [ "$USE_DEDICATED_TEST_DISK" = "true" ]; then
+            dirname "$FC_TEST_DISK"
+        else
+            pwd
+        fi
+        return 0
+    fi
+    case "$CONTAINER_STORAGE_MODE" in
+        loop) dirname "$CONTAINER_TEST_DISK" ;;
+        tmpfs) ;;
+        *) docker info -f '{{.DockerRootDir}}' 2>/dev/null ;;
+    esac
+}
+
+# Block devices to sample; the first one is reported as device utilisation
+telemetry_devices() {
+    local env="$1"
+    # The container's loop device sits on top of the host disk, so record both
+    if [ "$env" = "container" ] && [ -f "$CONTAINER_LOOP_FILE" ]; then
+        basename "$(cat "$CONTAINER_LOOP_FILE")"
+    fi
+    # The disk holding the environment's test-disk image (or Docker's data)
+    local path=$(test_storage_path "$env")
+    python3 "$TELEMETRY_SAMPLER" device "${path:-.}" 2>/dev/null || true
+}
+
+telemetry_file() {
+    local output_prefix="$1"
+    echo "${RESULTS_DIR}/telemetry/${output_prefix}.tlm"
+}
+
 monitor_system_metrics() {
     local test_name="$1"
     local duration="$2"
     local output_prefix="$3"
+    local env="${output_prefix%%_*}"
     
-    echo "  Starting monitoring for ${output_prefix} (${duration}s)"
+    echo "  Starting telemetry for ${output_prefix} (${TELEMETRY_INTERVAL_MS}ms, max ${duration}s)" >&2
     
-    # CPU monitoring (run in background, don't wait)
-    mpstat -P ALL 1 "$duration" > "${RESULTS_DIR}/${output_prefix}_cpu.log" &
-    local cpu_pid=$!
+    local args=(--output "$(telemetry_file "$output_prefix")" --interval-ms "$TELEMETRY_INTERVAL_MS" --duration "$duration")
+    local cgroup=$(telemetry_cgroup "$env")
+    [ -n "$cgroup" ] && args+=(--cgroup "$cgroup")
+    for device in $(telemetry_devices "$env"); do
+        args+=(--device "$device")
+    done
+    
+    # Sampler runs in the background until stop_monitoring, flushing its ring buffer to disk
+    python3 "$TELEMETRY_SAMPLER" sample "${args[@]}" >/dev/null 2>>"${RESULTS_DIR}/telemetry.err" &
+    local sampler_pid=$!
     
-    echo "$cpu_pid"
+    echo "$sampler_pid"
 }
 
 stop_monitoring() {
@@ -143,5 +271,41 @@ stop_monitoring() {
     for pid in $pids; do
         kill "$pid" 2>/dev/null || true
     done
-    # Don't wait for processes to finish, let them complete in background
+    # Wait (up to 5s) for the samplers to flush so the join sees every sample
+    for _ in $(seq 50); do
+        local running=false
+        for pid in $pids; do
+            kill -0 "$pid" 2>/dev/null && running=true
+        done
+        [ "$running" = "false" ] && break
+        sleep 0.1
+    done
+}
+
+# Fill the per-iteration telemetry columns (CPU-seconds, throttling, device utilisation)
+join_telemetry() {
+    local output_prefix="$1"
+    local output_file="$2"
+    local samples=$(telemetry_file "$output_prefix")
+    if [ -f "$samples" ]; then
+        python3 "$TELEMETRY_SAMPLER" join "$samples" "$output_file" || true
+    fi
+}
+
+# Analysis CLI: the installed io-analysis command, or the io_analysis package next to this script
+IO_ANALYSIS_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+io_analysis() {
+    if command -v io-analysis >/dev/null 2>&1; then
+        io-analysis "$@"
+    else
+        PYTHONPATH="$IO_ANALYSIS_DIR${PYTHONPATH:+:$PYTHONPATH}" python3 -m io_analysis "$@"
+    fi
+}
+
+# Running summary of one pattern after each iteration (LIVE_SUMMARY=true)
+live_summary() {
+    local results_dir="$1"
+    local pattern="$2"
+    [ "$LIVE_SUMMARY" = "true" ] || return 0
+    io_analysis compare "$results_dir" --live --pattern "$pattern" 2>/dev/null | sed -n '/^Pattern/,/FC\/C/p' | sed 's/^/    /'
 }